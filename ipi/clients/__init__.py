@@ -0,0 +1,8 @@
+"""Python clients that connect to i-PI and compute energies and forces."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+__all__ = ["client", "driver", "pes"]
@@ -0,0 +1,259 @@
+"""A reference python implementation of an i-PI client.
+
+Takes care of the communication with i-PI, supporting all the variants of
+the protocol that are understood by the server: unix and internet sockets,
+batches of configurations (READYBATCH/POSDATABATCH) and the exchange of
+positions and forces through shared memory (SHMINIT/POSDATASHM). The actual
+calculation is done by a function that is passed to Client.run.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+import socket
+import time
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+from ipi.interfaces.sockets import (
+    DriverSocket,
+    Disconnected,
+    Message,
+    HDRLEN,
+    SHMHDR,
+)
+
+
+__all__ = ["Client"]
+
+
+class Client(DriverSocket):
+
+    """Connects to i-PI and answers its requests.
+
+    Attributes:
+       mode: The type of connection, 'unix', 'inet' or 'shm'.
+       batch: Whether the client declares it can evaluate several
+          configurations sent in a single message.
+       verbose: Whether to print the timings of each configuration.
+       rid: The index of the replica, as last sent by i-PI with INIT.
+       pars: The initialisation string last sent by i-PI with INIT.
+       results: The list of the results that have not yet been sent back, of
+          the form [natoms, potential, forces, virial, extra].
+       shm: The shared memory segment used to exchange data in 'shm' mode.
+       shmdata: An array wrapping the content of the segment.
+       timings: A list with an entry [rid, natoms, wait, compute] for each
+          configuration that has been evaluated, where compute is the time
+          spent in the calculation, and wait the time between sending the
+          previous results and starting the calculation.
+    """
+
+    def __init__(
+        self, address="localhost", port=31415, mode="unix", batch=False, verbose=False
+    ):
+        """Initialises Client, and connects to i-PI.
+
+        Args:
+           address: The address of the i-PI server, i.e. the host name for an
+              internet socket, or the name of the unix socket.
+           port: The port number, for an internet socket.
+           mode: The type of connection, 'unix', 'inet' or 'shm'. In 'shm' mode
+              the client connects to a unix socket, and gets positions and
+              forces through shared memory.
+           batch: If True, the client declares it can evaluate several
+              configurations in one go, and reply to all of them together.
+           verbose: If True, prints the timings of each configuration.
+
+        Raises:
+           NameError: Raised if mode is not 'unix', 'inet' or 'shm'.
+        """
+
+        if mode == "unix" or mode == "shm":
+            if mode == "shm" and shared_memory is None:
+                raise RuntimeError(
+                    "Communication through shared memory requires python >= 3.8"
+                )
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect("/tmp/ipi_" + address)
+        elif mode == "inet":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.connect((address, port))
+        else:
+            raise NameError(
+                "Client mode " + mode + " is not implemented (should be unix/inet/shm)"
+            )
+
+        super(Client, self).__init__(sock)
+        sock.close()
+
+        self.mode = mode
+        self.batch = batch
+        self.verbose = verbose
+        self.rid = -1
+        self.pars = ""
+        self.results = []
+        self.shm = None
+        self.shmdata = np.zeros(0, np.float64)
+        self.timings = []
+        self._header = np.zeros(HDRLEN, np.uint8)
+        self._tsent = None
+
+    def close(self):
+        """Closes the socket and detaches from the shared memory segment."""
+
+        super(Client, self).close()
+        self.shm_release()
+
+    def run(self, compute):
+        """Answers the requests of i-PI until it sends EXIT or disconnects.
+
+        Args:
+           compute: A function compute(cell, pos) that is called with the
+              cell matrix (a 3x3 array with the lattice vectors as columns)
+              and the positions (a natoms x 3 array), in atomic units, and
+              returns a tuple (potential, forces, virial, extra), where
+              forces has the same shape as pos, virial is a 3x3 array and
+              extra is a string or a dictionary (that will be sent as JSON).
+        """
+
+        while True:
+            try:
+                header = self.recvall(self._header).tobytes()
+            except Disconnected:
+                break
+
+            if header == Message("status"):
+                if len(self.results) > 0:
+                    self.send_msg("havedata")
+                elif self.batch:
+                    self.send_msg("readybatch")
+                else:
+                    self.send_msg("ready")
+            elif header == Message("init"):
+                self.rid = self.recvall(np.int32())
+                plen = self.recvall(np.int32())
+                self.pars = self.recvall(np.zeros(plen, np.uint8)).tobytes().decode()
+            elif header == Message("posdata"):
+                self.results = [self._compute(compute)]
+            elif header == Message("posdatabatch"):
+                nconf = self.recvall(np.int32())
+                self.results = []
+                for i in range(nconf):
+                    self.rid = self.recvall(np.int32())
+                    self.results.append(self._compute(compute))
+            elif header == Message("shminit"):
+                nlen = self.recvall(np.int32())
+                name = self.recvall(np.zeros(nlen, np.uint8)).tobytes().decode()
+                self.shm_attach(name, self.recvall(np.int32()))
+            elif header == Message("posdatashm"):
+                self.results = [self._compute_shm(compute)]
+            elif header == Message("getforce"):
+                self.sendall(self._forceready())
+                self.results = []
+                self._tsent = time.time()
+            elif header == Message("exit"):
+                break
+            else:
+                raise ValueError("Unexpected header from i-PI: " + str(header))
+
+    def _compute(self, compute):
+        """Reads one configuration from the socket and evaluates it."""
+
+        cell = self.recvall(np.zeros((3, 3), np.float64))
+        self.recvall(np.zeros((3, 3), np.float64))  # inverse cell, unused
+        natoms = self.recvall(np.int32())
+        pos = self.recvall(np.zeros((natoms, 3), np.float64))
+
+        pot, force, vir, extra = self._evaluate(compute, cell, pos)
+        return [natoms, pot, force, vir, extra]
+
+    def _compute_shm(self, compute):
+        """Evaluates the configuration that is in the shared memory segment,
+        and writes the results back into it."""
+
+        natoms = self.recvall(np.int32())
+        data = self.shmdata
+        cell = data[0:9].reshape((3, 3))
+        pos = data[SHMHDR : SHMHDR + 3 * natoms].reshape((natoms, 3))
+
+        pot, force, vir, extra = self._evaluate(compute, cell, pos)
+        data[18] = pot
+        data[19:SHMHDR] = np.asarray(vir).reshape(9)
+        data[SHMHDR + 3 * natoms : SHMHDR + 6 * natoms] = np.asarray(force).reshape(-1)
+        return [natoms, None, None, None, extra]
+
+    def _evaluate(self, compute, cell, pos):
+        """Calls compute, and records the timings of the request."""
+
+        tstart = time.time()
+        result = compute(cell, pos)
+        tend = time.time()
+
+        # configurations after the first in a batch have no waiting time
+        twait = 0.0 if self._tsent is None else tstart - self._tsent
+        self._tsent = None
+        self.timings.append([self.rid, len(pos), twait, tend - tstart])
+        if self.verbose:
+            print(
+                " CLIENT - rid %4d  natoms %6d  wait %10.3e s  compute %10.3e s"
+                % tuple(self.timings[-1])
+            )
+        return result
+
+    def _forceready(self):
+        """Returns the FORCEREADY message with the pending results."""
+
+        msg = [Message("forceready")]
+        for natoms, pot, force, vir, extra in self.results:
+            if not isinstance(extra, str):
+                extra = json.dumps(extra)
+            extra = extra.encode()
+            if self.mode == "shm":
+                msg.append(np.int32(natoms).tobytes())
+            else:
+                msg.append(np.float64(pot).tobytes())
+                msg.append(np.int32(natoms).tobytes())
+                msg.append(np.asarray(force, np.float64).tobytes())
+                msg.append(np.asarray(vir, np.float64).tobytes())
+            msg.append(np.int32(len(extra)).tobytes())
+            msg.append(extra)
+        return b"".join(msg)
+
+    def shm_attach(self, name, natoms):
+        """Attaches to the shared memory segment created by i-PI.
+
+        Args:
+           name: The name of the segment.
+           natoms: The number of atoms the segment can hold.
+        """
+
+        self.shm_release()
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before python 3.13 the resource tracker would remove the segment
+            # when the client exits, but the segment belongs to i-PI
+            self.shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.shmdata = np.ndarray(SHMHDR + 6 * natoms, np.float64, buffer=self.shm.buf)
+
+    def shm_release(self):
+        """Detaches from the shared memory segment, if any."""
+
+        if self.shm is None:
+            return
+        self.shmdata = np.zeros(0, np.float64)
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        self.shm = None
@@ -0,0 +1,129 @@
+"""A python driver for i-PI, that does not need to be compiled.
+
+Connects to i-PI and computes energy and forces with one of the vectorised
+potentials in ipi.clients.pes. The command line follows the Fortran driver,
+e.g.
+
+    python -m ipi.clients.driver -u -h localhost -m lj -o 5.67,3.8e-4,17.0
+
+At the end of the run, prints a summary of the time spent computing and
+waiting for i-PI, so that it can also be used to measure the throughput of
+the socket interface.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+
+import numpy as np
+
+from ipi.clients.client import Client
+from ipi.clients.pes import potentials
+
+
+__all__ = ["main"]
+
+
+def timing_summary(timings):
+    """Returns a string summarising the timings recorded by a client.
+
+    Args:
+       timings: A list of [rid, natoms, wait, compute] entries.
+    """
+
+    if len(timings) == 0:
+        return " DRIVER - No configuration has been evaluated."
+
+    t = np.asarray(timings)
+    twait, tcomp = t[:, 2].sum(), t[:, 3].sum()
+    return (
+        " DRIVER - Evaluated %d configurations.\n"
+        "          compute: %10.3e s per configuration, %10.3f s in total\n"
+        "          wait:    %10.3e s per configuration, %10.3f s in total\n"
+        "          fraction of time spent waiting for i-PI: %6.3f"
+        % (
+            len(t),
+            tcomp / len(t),
+            tcomp,
+            twait / len(t),
+            twait,
+            twait / max(twait + tcomp, 1e-300),
+        )
+    )
+
+
+def main(argv=None):
+    """Parses the command line, and runs the driver."""
+
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0], add_help=False
+    )
+    parser.add_argument("--help", action="help", help="Show this message and exit.")
+    parser.add_argument(
+        "-u", dest="unix", action="store_true", help="Use a unix socket."
+    )
+    parser.add_argument(
+        "-h",
+        dest="host",
+        default="localhost",
+        help="Host name for an internet socket, or name of the unix socket.",
+    )
+    parser.add_argument(
+        "-p", dest="port", type=int, default=31415, help="Port of the internet socket."
+    )
+    parser.add_argument(
+        "-m", dest="model", required=True, choices=sorted(potentials), help="Potential."
+    )
+    parser.add_argument(
+        "-o",
+        dest="params",
+        default="",
+        help="Comma-separated parameters of the potential, as for the Fortran driver.",
+    )
+    parser.add_argument(
+        "-v",
+        dest="verbose",
+        action="count",
+        default=0,
+        help="Print the timings of each configuration.",
+    )
+    parser.add_argument(
+        "--shm",
+        action="store_true",
+        help="Get positions and forces through shared memory (implies -u). "
+        "i-PI must use <ffsocket mode='shm'>.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Declare that the driver can evaluate batches of configurations.",
+    )
+    args = parser.parse_args(argv)
+
+    params = [float(x) for x in args.params.split(",") if x.strip() != ""]
+    pes = potentials[args.model](*params)
+
+    if args.shm:
+        mode = "shm"
+    elif args.unix:
+        mode = "unix"
+    else:
+        mode = "inet"
+
+    print(" DRIVER - Connecting to %s in %s mode" % (args.host, mode))
+    client = Client(
+        args.host, args.port, mode=mode, batch=args.batch, verbose=args.verbose > 0
+    )
+
+    try:
+        client.run(pes)
+    finally:
+        client.close()
+        print(timing_summary(client.timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Vectorised potentials for the python reference client.
+
+These follow the models of the same name in the Fortran driver (see
+drivers/driver.f90), and take the same parameters, so that either driver can
+be used for tests and benchmarks. All quantities are in atomic units.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+
+from ipi.utils.neighbours import NeighbourList
+
+
+__all__ = ["Dummy", "Gas", "Harmonic", "Harmonic3D", "Morse", "LennardJones"]
+
+
+class Potential(object):
+
+    """Base class for the potentials of the python client.
+
+    A potential is created from a list of numerical parameters, and is then
+    called as pes(cell, pos), returning (potential, forces, virial, extra).
+
+    Attributes:
+       params: The names of the parameters that must be given.
+    """
+
+    params = []
+
+    def __init__(self, *args):
+        """Initialises the potential.
+
+        Args:
+           args: The values of the parameters, in the order given by params.
+
+        Raises:
+           ValueError: Raised if the number of parameters is wrong.
+        """
+
+        if len(args) != len(self.params):
+            raise ValueError(
+                "%s needs %d parameters: %s"
+                % (self.__class__.__name__, len(self.params), ",".join(self.params))
+            )
+        for name, value in zip(self.params, args):
+            setattr(self, name, float(value))
+
+    def __call__(self, cell, pos):
+        """Computes energy, forces and virial.
+
+        Args:
+           cell: The cell matrix, with the lattice vectors as columns.
+           pos: A (natoms, 3) array with the positions.
+
+        Returns:
+           A tuple (potential, forces, virial, extra).
+        """
+
+        raise NotImplementedError()
+
+
+class Dummy(Potential):
+
+    """Returns random values, useful to test that i-PI 'just runs' and to
+    measure the communication overhead."""
+
+    def __init__(self, *args):
+        super(Dummy, self).__init__(*args)
+        self.prng = np.random.RandomState()
+
+    def __call__(self, cell, pos):
+        return (
+            self.prng.uniform() - 0.5,
+            self.prng.uniform(size=pos.shape) - 0.5,
+            self.prng.uniform(size=(3, 3)) - 0.5,
+            "",
+        )
+
+
+class Gas(Potential):
+
+    """Ideal gas. Returns a tiny but non-zero virial, so that constant
+    pressure simulations can be run."""
+
+    def __call__(self, cell, pos):
+        return 0.0, np.zeros(pos.shape), np.full((3, 3), 1e-200), ""
+
+
+class Harmonic(Potential):
+
+    """1D harmonic potential, acting on the x coordinate of the first atom."""
+
+    params = ["k"]
+
+    def __call__(self, cell, pos):
+        force = np.zeros(pos.shape)
+        force[0, 0] = -self.k * pos[0, 0]
+        vir = np.zeros((3, 3))
+        vir[0, 0] = force[0, 0] * pos[0, 0]
+        return 0.5 * self.k * pos[0, 0] ** 2, force, vir, ""
+
+
+class Harmonic3D(Potential):
+
+    """3D harmonic potential, acting on all atoms."""
+
+    params = ["k"]
+
+    def __call__(self, cell, pos):
+        force = -self.k * pos
+        return 0.5 * self.k * (pos ** 2).sum(), force, np.dot(force.T, pos), ""
+
+
+class Morse(Potential):
+
+    """3D Morse potential, acting on the distance of each atom from the
+    origin."""
+
+    params = ["r0", "D", "a"]
+
+    def __call__(self, cell, pos):
+        r = np.sqrt((pos ** 2).sum(axis=1))
+        e1 = np.exp(-self.a * (r - self.r0))
+        e2 = e1 * e1
+        force = (-2 * self.a * self.D * (e1 - e2) / r)[:, np.newaxis] * pos
+        return (self.D * (e2 - 2 * e1)).sum(), force, np.dot(force.T, pos), ""
+
+
+class LennardJones(Potential):
+
+    """Lennard-Jones potential with a cutoff, periodic boundary conditions
+    and long-range corrections, using a Verlet list to find the pairs of
+    interacting atoms."""
+
+    params = ["sigma", "epsilon", "cutoff"]
+
+    def __init__(self, *args):
+        super(LennardJones, self).__init__(*args)
+        self.nlist = NeighbourList(self.cutoff)
+
+    def __call__(self, cell, pos):
+        i, j, d = self.nlist.pairs(pos, cell, np.linalg.inv(cell))
+        r2 = (d ** 2).sum(axis=1)
+        s6 = (self.sigma ** 2 / r2) ** 3
+        pot = 4 * self.epsilon * (s6 * (s6 - 1)).sum()
+
+        # fij is the force on j due to i, and -fij the one on i due to j
+        fij = (24 * self.epsilon * s6 * (2 * s6 - 1) / r2)[:, np.newaxis] * d
+        force = np.zeros(pos.shape)
+        for k in range(3):
+            force[:, k] = np.bincount(j, fij[:, k], len(pos))
+            force[:, k] -= np.bincount(i, fij[:, k], len(pos))
+        vir = np.dot(fij.T, d)
+
+        # long-range corrections, as in the Fortran driver
+        volume = abs(np.linalg.det(cell))
+        sr3 = (self.sigma / self.cutoff) ** 3
+        prefactor = 8 * np.pi / 3 * len(pos) ** 2 * self.epsilon / volume
+        prefactor *= sr3 * self.sigma ** 3
+        pot_lr = prefactor * (sr3 ** 2 / 3 - 1)
+        pot += pot_lr
+        vir += np.eye(3) * (prefactor * (sr3 ** 2 - 1) + pot_lr)
+
+        return pot, force, vir, ""
+
+
+# maps the names used on the command line (the same as in the Fortran driver)
+# to the corresponding classes
+potentials = {
+    "dummy": Dummy,
+    "gas": Gas,
+    "harm": Harmonic,
+    "harm3d": Harmonic3D,
+    "morse": Morse,
+    "lj": LennardJones,
+}
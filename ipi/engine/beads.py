@@ -15,6 +15,7 @@ import numpy as np
 
 from ipi.utils.depend import *
 from ipi.engine.atoms import Atoms
+from ipi.utils.tensortools import kinetic_stress
 
 
 __all__ = ["Beads"]
@@ -166,7 +167,7 @@ class Beads(dobject):
             name="kstress",
             value=np.zeros((3, 3), float),
             func=self.get_kstress,
-            dependencies=[dd(b).kstress for b in self._blist],
+            dependencies=[dself.p, dself.m3],
         )
 
     def copy(self, nbeads=-1):
@@ -249,10 +250,8 @@ class Beads(dobject):
            The sum of the kinetic stress tensor of each replica.
         """
 
-        ks = np.zeros((3, 3), float)
-        for b in range(self.nbeads):
-            ks += self[b].kstress
-        return ks
+        # only the upper triangle is filled, as in Atoms.get_kstress
+        return np.triu(kinetic_stress(dstrip(self.p), dstrip(self.m3)))
 
     def get_vpath(self):
         """Calculates the spring potential between the replicas.
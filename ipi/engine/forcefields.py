@@ -11,16 +11,24 @@ layer for a driver that gets positions and returns forces (and energy).
 
 import time
 import threading
+import traceback
+import multiprocessing
 
 import numpy as np
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
 from ipi.utils.softexit import softexit
 from ipi.utils.messages import verbosity
-from ipi.utils.messages import info
+from ipi.utils.messages import info, warning
 from ipi.interfaces.sockets import InterfaceSocket
 from ipi.utils.depend import dobject
 from ipi.utils.depend import dstrip
 from ipi.utils.io import read_file
+from ipi.utils.neighbours import NeighbourList
 from ipi.utils.units import unit_to_internal, UnitMap
 
 try:
@@ -39,10 +47,263 @@ class ForceRequest(dict):
     This is useful for the `in` operator, which uses equality to test membership.
     """
 
+    def __init__(self, *args, **kwargs):
+        """Initialises ForceRequest, with an event that is set as soon as
+        the request is marked as done (or as aborted)."""
+
+        super(ForceRequest, self).__init__(*args, **kwargs)
+        self._done = threading.Event()
+        if self.get("status") in ["Done", "Exit"]:
+            self._done.set()
+
     def __eq__(self, y):
         """Overwrites the standard equals function."""
         return self is y
 
+    def __setitem__(self, key, value):
+        """Overwrites the standard setter, so that whoever is waiting for the
+        request is woken up as soon as the status changes to Done or Exit."""
+
+        super(ForceRequest, self).__setitem__(key, value)
+        if key == "status":
+            if value in ["Done", "Exit"]:
+                self._done.set()
+            else:
+                self._done.clear()
+
+    def wait(self, timeout=None):
+        """Blocks until the request is done, or until timeout seconds have
+        passed. Returns True if the request is done."""
+
+        return self._done.wait(timeout)
+
+
+class ForceWorkers(object):
+
+    """A pool of worker processes that evaluate the requests of a python
+    forcefield, so that they are not serialized by the GIL.
+
+    The workers are forked from the process that runs i-PI, so each of them
+    holds a copy of the forcefield, including any model that was loaded when
+    it was created. Forcefields hold locks, threads and models that cannot
+    be pickled, so the workers cannot be started with 'spawn' or
+    'forkserver': the pool must instead be created while the process runs a
+    single thread (see ForceField.start_workers), otherwise a worker could
+    inherit a lock held by another thread and hang. Requests with the same
+    id (i.e. the same bead) are always sent to the same worker, so that any
+    state the forcefield keeps for each id (e.g. neighbour lists) is
+    preserved. Positions and results are
+    exchanged through a shared memory segment, holding for each request a
+    block with positions (3N), potential (1), virial (9) and forces (3N),
+    while the pipes to the workers only carry the layout of the blocks and
+    the extra strings.
+
+    Attributes:
+       nworkers: The number of worker processes.
+       shm: The shared memory segment, or None if it has not been created yet.
+       shmdata: An array wrapping the content of the segment.
+    """
+
+    def __init__(self, ff, nworkers):
+        """Initialises ForceWorkers and starts the worker processes.
+
+        Args:
+           ff: The forcefield whose evaluate_batch is called by the workers.
+           nworkers: The number of worker processes.
+        """
+
+        if shared_memory is None:
+            raise RuntimeError("Forcefield worker processes require python >= 3.8")
+
+        self.nworkers = nworkers
+        self.shm = None
+        self.shmdata = np.zeros(0, np.float64)
+        self._assigned = {}
+        self._pipes = []
+        self._procs = []
+
+        if threading.active_count() > 1:
+            warning(
+                " @ForceField: Forking worker processes while other threads are "
+                "running. The workers may hang on locks held by those threads.",
+                verbosity.low,
+            )
+        ctx = multiprocessing.get_context("fork")
+        for k in range(nworkers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_loop, args=(ff, child), name="ffworker_%d" % k
+            )
+            proc.daemon = True
+            proc.start()
+            child.close()
+            self._pipes.append(parent)
+            self._procs.append(proc)
+
+    def evaluate(self, requests):
+        """Evaluates a list of requests, splitting them among the workers,
+        and stores the results in the requests.
+
+        Args:
+           requests: A list of the requests to be evaluated.
+
+        Raises:
+           RuntimeError: Raised if the evaluation failed in a worker.
+        """
+
+        offsets = np.cumsum([0] + [2 * len(r["pos"]) + 10 for r in requests])
+        self._setup(offsets[-1])
+
+        tasks = [[] for k in range(self.nworkers)]
+        for k, r in enumerate(requests):
+            n3 = len(r["pos"])
+            self.shmdata[offsets[k] : offsets[k] + n3] = r["pos"]
+            if r["id"] not in self._assigned:
+                self._assigned[r["id"]] = len(self._assigned) % self.nworkers
+            tasks[self._assigned[r["id"]]].append(
+                (k, offsets[k], n3, r["id"], r["cell"])
+            )
+
+        for w in range(self.nworkers):
+            if len(tasks[w]) > 0:
+                self._pipes[w].send((self.shm.name, len(self.shmdata), tasks[w]))
+
+        errors = []
+        extras = {}
+        for w in range(self.nworkers):
+            if len(tasks[w]) > 0:
+                status, reply = self._pipes[w].recv()
+                if status == "error":
+                    errors.append(reply)
+                else:
+                    extras.update(reply)
+        if len(errors) > 0:
+            raise RuntimeError("Forcefield worker failed:\n" + errors[0])
+
+        for k, r in enumerate(requests):
+            n3 = len(r["pos"])
+            block = self.shmdata[offsets[k] : offsets[k + 1]]
+            ForceField._finish(
+                r,
+                [
+                    block[n3],
+                    block[n3 + 10 :].copy(),
+                    block[n3 + 1 : n3 + 10].reshape((3, 3)).copy(),
+                    extras[k],
+                ],
+            )
+
+    def _setup(self, size):
+        """Makes sure that the shared memory segment holds at least size
+        numbers, creating a new one if needed."""
+
+        if len(self.shmdata) >= size:
+            return
+
+        self._release()
+        self.shm = shared_memory.SharedMemory(create=True, size=8 * size)
+        self.shmdata = np.ndarray(size, np.float64, buffer=self.shm.buf)
+
+    def _release(self):
+        """Detaches from the shared memory segment and removes it."""
+
+        if self.shm is None:
+            return
+
+        self.shmdata = np.zeros(0, np.float64)
+        try:
+            self.shm.close()
+        except BufferError:
+            # an array still refers to the segment: it will be unmapped
+            # when it gets garbage collected
+            pass
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+    def close(self):
+        """Stops the workers and removes the shared memory segment."""
+
+        for pipe in self._pipes:
+            try:
+                pipe.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(1.0)
+            if proc.is_alive():
+                proc.terminate()
+        self._pipes = []
+        self._procs = []
+        self._release()
+
+
+def _worker_loop(ff, pipe):
+    """Main loop of a forcefield worker process.
+
+    Receives the name of the shared memory segment and the layout of the
+    requests, evaluates them with ff.evaluate_batch and writes the results
+    back to the segment, until None is received.
+
+    Args:
+       ff: The copy of the forcefield held by the worker.
+       pipe: The connection to the main process.
+    """
+
+    shm = None
+    while True:
+        try:
+            msg = pipe.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+
+        name, size, tasks = msg
+        try:
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                # the segment belongs to the main process, which removes it.
+                # forked workers share its resource tracker, so registering
+                # the segment again before python 3.13 is harmless
+                try:
+                    shm = shared_memory.SharedMemory(name=name, track=False)
+                except TypeError:
+                    shm = shared_memory.SharedMemory(name=name)
+            data = np.ndarray(size, np.float64, buffer=shm.buf)
+
+            requests = [
+                ForceRequest(
+                    {
+                        "id": reqid,
+                        "pos": data[offset : offset + n3].copy(),
+                        "cell": cell,
+                        "result": None,
+                        "status": "Running",
+                    }
+                )
+                for k, offset, n3, reqid, cell in tasks
+            ]
+            ff.evaluate_batch(requests)
+
+            extras = {}
+            for (k, offset, n3, reqid, cell), r in zip(tasks, requests):
+                v, f, vir, extra = r["result"]
+                data[offset + n3] = v
+                data[offset + n3 + 1 : offset + n3 + 10] = np.reshape(vir, 9)
+                data[offset + n3 + 10 : offset + 2 * n3 + 10] = f
+                extras[k] = extra
+            del data
+            pipe.send(("ok", extras))
+        except Exception:
+            pipe.send(("error", traceback.format_exc()))
+
+    if shm is not None:
+        shm.close()
+
 
 class ForceField(dobject):
 
@@ -57,6 +318,10 @@ class ForceField(dobject):
         name: The name of the forcefield.
         latency: A float giving the number of seconds the socket will wait
             before updating the client list.
+        polling: A string, either 'latency' (the polling loop sleeps for
+            latency seconds between passes) or 'event' (the polling loop is
+            woken up as soon as a request is queued or completed, and latency
+            only sets the maximum time between passes).
         requests: A list of all the jobs to be given to the client codes.
         dopbc: A boolean giving whether or not to apply the periodic boundary
             conditions before sending the positions to the client code.
@@ -64,6 +329,10 @@ class ForceField(dobject):
         _doloop: A list of booleans. Used to decide when to stop running the
             polling loop.
         _threadlock: Python handle used to lock the thread held in _thread.
+        _wakeup: Event used to wake up the polling loop in event mode.
+        nworkers: The number of worker processes used to evaluate the
+            requests, or 0 to evaluate them in the i-PI process.
+        _workers: The ForceWorkers pool, once the forcefield is started.
     """
 
     def __init__(
@@ -74,6 +343,8 @@ class ForceField(dobject):
         dopbc=True,
         active=np.array([-1]),
         threaded=False,
+        polling="latency",
+        nworkers=0,
     ):
         """Initialises ForceField.
 
@@ -86,8 +357,17 @@ class ForceField(dobject):
             dopbc: Decides whether or not to apply the periodic boundary conditions
                 before sending the positions to the client code.
             active: Indexes of active atoms in this forcefield
+            polling: Whether the polling loop should sleep for latency seconds
+                between passes ('latency') or wait for events ('event').
+            nworkers: The number of worker processes used to evaluate the
+                requests. Defaults to 0, i.e. evaluation in the i-PI process.
         """
 
+        if polling not in ["latency", "event"]:
+            raise ValueError("Invalid polling mode '" + str(polling) + "'")
+        if nworkers < 0:
+            raise ValueError("Negative number of forcefield workers specified.")
+
         if pars is None:
             self.pars = {}
         else:
@@ -100,11 +380,15 @@ class ForceField(dobject):
         self.active = active
         self.iactive = None
         self.threaded = threaded
+        self.polling = polling
         self._thread = None
         self._doloop = [False]
         self._threadlock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.nworkers = nworkers
+        self._workers = None
 
-    def queue(self, atoms, cell, reqid=-1):
+    def queue(self, atoms, cell, reqid=-1, poll=True):
         """Adds a request.
 
         Note that the pars dictionary need to be sent as a string of a
@@ -117,6 +401,9 @@ class ForceField(dobject):
                 driver for initialisation. Defaults to {}.
             reqid: An optional integer that identifies requests of the same type,
                e.g. the bead index
+            poll: Whether a serial forcefield should evaluate the request right
+               away. If False, the request is left in the queue, so that many
+               requests can be evaluated together by a later call to poll().
 
         Returns:
             A list giving the status of the request of the form {'pos': An array
@@ -157,6 +444,13 @@ class ForceField(dobject):
                 raise ValueError("There are more active atoms than atoms!")
 
             self.iactive = activehere
+            if (
+                len(activehere) == len(pbcpos)
+                and (activehere == np.arange(len(pbcpos))).all()
+            ):
+                # if all atoms are active, a slice gives views rather than copies
+                # of the positions, and lets the socket receive the forces in place
+                self.iactive = slice(None)
 
         if self.dopbc:
             cell.array_pbc(pbcpos)
@@ -181,25 +475,73 @@ class ForceField(dobject):
             self.requests.append(newreq)
 
         if not self.threaded:
-            self.poll()
+            if poll:
+                self.poll()
+        else:
+            self.wakeup()
 
         return newreq
 
     def poll(self):
-        """Polls the forcefield object to check if it has finished."""
+        """Polls the forcefield checking if there are requests that should
+        be answered, and evaluates all of them with a single call to
+        evaluate_batch."""
 
+        # we have to be thread-safe, as in multi-system mode this might get
+        # called by many threads at once
         with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["t_dispatched"] = time.time()
-                    r["result"] = [
-                        0.0,
-                        np.zeros(len(r["pos"]), float),
-                        np.zeros((3, 3), float),
-                        "",
-                    ]
-                    r["status"] = "Done"
-                    r["t_finished"] = time.time()
+            batch = [r for r in self.requests if r["status"] == "Queued"]
+            for r in batch:
+                r["status"] = "Running"
+                r["t_dispatched"] = time.time()
+            if len(batch) > 0:
+                if self._workers is not None:
+                    self._workers.evaluate(batch)
+                else:
+                    self.evaluate_batch(batch)
+
+    def evaluate_batch(self, requests):
+        """Evaluates energy, forces and virial for a list of requests.
+
+        Forcefields that can compute many configurations at once (e.g. all the
+        beads of a ring polymer) should override this, stacking the positions
+        in a (nrequests, natoms, 3) array. The default just calls evaluate
+        on each request in turn.
+
+        Args:
+            requests: A list of the requests to be evaluated.
+        """
+
+        for r in requests:
+            self.evaluate(r)
+
+    def evaluate(self, r):
+        """Evaluates a single request. The base class returns zero energy,
+        forces and virial."""
+
+        r["result"] = [
+            0.0,
+            np.zeros(len(r["pos"]), float),
+            np.zeros((3, 3), float),
+            "",
+        ]
+        r["t_finished"] = time.time()
+        r["status"] = "Done"
+
+    @staticmethod
+    def _stack(requests):
+        """Returns the positions of a list of requests, as a
+        (nrequests, natoms, 3) array."""
+
+        return np.array([r["pos"] for r in requests]).reshape((len(requests), -1, 3))
+
+    @staticmethod
+    def _finish(r, result):
+        """Stores the result of a request and marks it as done."""
+
+        r["result"] = result
+        r["t_finished"] = time.time()
+        r["status"] = "Done"
 
     def _poll_loop(self):
         """Polling loop.
@@ -210,10 +552,30 @@ class ForceField(dobject):
 
         info(" @ForceField: Starting the polling thread main loop.", verbosity.low)
         while self._doloop[0]:
-            time.sleep(self.latency)
+            self.wait()
             if len(self.requests) > 0:
                 self.poll()
 
+    def wait(self):
+        """Waits before the next pass of the polling loop.
+
+        In 'latency' mode just sleeps for latency seconds. In 'event' mode
+        returns as soon as wakeup() is called, but anyway after at most latency
+        seconds, so that timeouts and exit requests are still checked.
+        """
+
+        if self.polling == "event":
+            self._wakeup.wait(self.latency)
+            self._wakeup.clear()
+        else:
+            time.sleep(self.latency)
+
+    def wakeup(self):
+        """Wakes up the polling loop, if it is waiting for events."""
+
+        if self.polling == "event":
+            self._wakeup.set()
+
     def release(self, request):
         """Shuts down the client code interface thread.
 
@@ -240,6 +602,10 @@ class ForceField(dobject):
         self._doloop[0] = False
         for r in self.requests:
             r["status"] = "Exit"
+        self.wakeup()
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
 
     def start(self):
         """Spawns a new thread.
@@ -254,6 +620,9 @@ class ForceField(dobject):
         if self._thread is not None:
             raise NameError("Polling thread already started")
 
+        # the workers are forked before starting any thread of this forcefield
+        self.start_workers()
+
         if self.threaded:
             self._doloop[0] = True
             self._thread = threading.Thread(
@@ -264,6 +633,21 @@ class ForceField(dobject):
             softexit.register_thread(self._thread, self._doloop)
         softexit.register_function(self.softexit)
 
+    def start_workers(self):
+        """Forks the worker processes, if the forcefield uses them and they
+        have not been started yet. Forking a process that runs other threads
+        can leave the children stuck on locks held by those threads, so this
+        must be called for all the forcefields before any of them is started,
+        and before the output threads are created."""
+
+        if self.nworkers > 0 and self._workers is None:
+            info(
+                " @ForceField: Starting %d worker processes for %s."
+                % (self.nworkers, self.name),
+                verbosity.low,
+            )
+            self._workers = ForceWorkers(self, self.nworkers)
+
     def softexit(self):
         """ Takes care of cleaning up upon softexit """
 
@@ -298,6 +682,7 @@ class FFSocket(ForceField):
         active=np.array([-1]),
         threaded=True,
         interface=None,
+        polling="latency",
     ):
         """Initialises FFSocket.
 
@@ -311,10 +696,14 @@ class FFSocket(ForceField):
               before sending the positions to the client code.
            interface: The object used to create the socket used to interact
               with the client codes.
+           polling: Whether the polling loop should sleep for latency seconds
+              between passes ('latency') or wait for socket events ('event').
         """
 
         # a socket to the communication library is created or linked
-        super(FFSocket, self).__init__(latency, name, pars, dopbc, active, threaded)
+        super(FFSocket, self).__init__(
+            latency, name, pars, dopbc, active, threaded, polling
+        )
         if interface is None:
             self.socket = InterfaceSocket()
         else:
@@ -326,6 +715,21 @@ class FFSocket(ForceField):
 
         self.socket.poll()
 
+    def wait(self):
+        """In event mode, waits on the socket interface, so that the loop is
+        woken up by new requests, finished jobs and new connections."""
+
+        if self.polling == "event":
+            self.socket.wait(self.latency)
+        else:
+            super(FFSocket, self).wait()
+
+    def wakeup(self):
+        """Wakes up the socket interface, if it is waiting for events."""
+
+        if self.polling == "event":
+            self.socket.wakeup()
+
     def start(self):
         """Spawns a new thread."""
 
@@ -346,8 +750,12 @@ class FFLennardJones(ForceField):
 
     """Basic fully pythonic force provider.
 
-    Computes LJ interactions without minimum image convention, cutoffs or
-    neighbour lists. Parallel evaluation with threads.
+    Computes LJ interactions with vectorised numpy operations. If a cutoff is
+    given, the potential is shifted to be zero at the cutoff, and the pairs of
+    interacting atoms are found with a Verlet neighbour list (one per bead),
+    so that periodic boundary conditions with general cells can be used.
+    Without a cutoff all pairs are computed, and periodic boundary conditions
+    are not supported.
 
     Attributes:
         parameters: A dictionary of the parameters used by the driver. Of the
@@ -357,67 +765,152 @@ class FFLennardJones(ForceField):
             Of the form {'atoms': atoms, 'cell': cell, 'pars': parameters,
                          'status': status, 'result': result, 'id': bead id,
                          'start': starting time}.
+        cutoff: The cutoff distance, or None.
+        skin: The width of the skin of the neighbour lists.
+        nlists: A dictionary with the neighbour list of each request id.
     """
 
-    def __init__(self, latency=1.0e-3, name="", pars=None, dopbc=False, threaded=False):
+    def __init__(
+        self,
+        latency=1.0e-3,
+        name="",
+        pars=None,
+        dopbc=False,
+        threaded=False,
+        nworkers=0,
+    ):
         """Initialises FFLennardJones.
 
         Args:
            pars: Optional dictionary, giving the parameters needed by the driver.
+              Must contain eps and sigma, and can contain cutoff and skin.
         """
 
-        # check input - PBCs are not implemented here
-        if dopbc:
-            raise ValueError(
-                "Periodic boundary conditions are not supported by FFLennardJones."
-            )
-
         # a socket to the communication library is created or linked
         super(FFLennardJones, self).__init__(
-            latency, name, pars, dopbc=dopbc, threaded=threaded
+            latency, name, pars, dopbc=dopbc, threaded=threaded, nworkers=nworkers
         )
         self.epsfour = float(self.pars["eps"]) * 4
         self.sixepsfour = 6 * self.epsfour
         self.sigma2 = float(self.pars["sigma"]) * float(self.pars["sigma"])
 
-    def poll(self):
-        """Polls the forcefield checking if there are requests that should
-        be answered, and if necessary evaluates the associated forces and energy."""
+        if "cutoff" in self.pars:
+            self.cutoff = float(self.pars["cutoff"])
+            x6 = (self.sigma2 / self.cutoff ** 2) ** 3
+            self.vshift = self.epsfour * (x6 ** 2 - x6)
+        else:
+            self.cutoff = None
+            self.vshift = 0.0
+        self.skin = float(self.pars["skin"]) if "skin" in self.pars else None
+        self.nlists = {}
 
-        # We have to be thread-safe, as in multi-system mode this might get
-        # called by many threads at once.
-        with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["status"] = "Running"
-                    r["t_dispatched"] = time.time()
-                    self.evaluate(r)
+        # check input - PBCs need a finite range of the interactions
+        if dopbc and self.cutoff is None:
+            raise ValueError(
+                "Periodic boundary conditions need a cutoff in FFLennardJones."
+            )
 
-    def evaluate(self, r):
-        """Just a silly function evaluating a non-cutoffed, non-pbc and
-        non-neighbour list LJ potential."""
+    def evaluate_batch(self, requests):
+        """Evaluates the LJ potential, forces and virial for a list of
+        requests, computing the pairs of all of them with the same vectorised
+        operations."""
 
-        q = r["pos"].reshape((-1, 3))
-        nat = len(q)
+        q = self._stack(requests)
+        nb, nat = q.shape[:2]
 
-        v = 0.0
-        f = np.zeros(q.shape)
-        for i in range(1, nat):
-            dij = q[i] - q[:i]
-            rij2 = (dij ** 2).sum(axis=1)
+        v = np.zeros(nb)
+        f = np.zeros((nb * nat, 3))
+        vir = np.zeros((nb, 3, 3))
+        if self.cutoff is None:
+            pairs = self._all_pairs(q)
+        else:
+            pairs = [self._list_pairs(requests, q)]
 
+        for b, i, j, dij in pairs:
+            rij2 = (dij ** 2).sum(axis=1)
             x6 = (self.sigma2 / rij2) ** 3
             x12 = x6 ** 2
+            v += np.bincount(b, self.epsfour * (x12 - x6) - self.vshift, nb)
 
-            v += (x12 - x6).sum()
-            dij *= (self.sixepsfour * (2.0 * x12 - x6) / rij2)[:, np.newaxis]
-            f[i] += dij.sum(axis=0)
-            f[:i] -= dij
+            # fij is the force on atom j due to atom i
+            fij = (self.sixepsfour * (2.0 * x12 - x6) / rij2)[:, np.newaxis] * dij
+            for k in range(3):
+                f[:, k] += np.bincount(j, fij[:, k], nb * nat)
+                f[:, k] -= np.bincount(i, fij[:, k], nb * nat)
 
-        v *= self.epsfour
+            # the pairs are sorted by configuration
+            bounds = np.searchsorted(b, np.arange(nb + 1))
+            for k in range(nb):
+                sel = slice(bounds[k], bounds[k + 1])
+                vir[k] += np.dot(fij[sel].T, dij[sel])
 
-        r["result"] = [v, f.reshape(nat * 3), np.zeros((3, 3), float), ""]
-        r["status"] = "Done"
+        f = f.reshape((nb, nat * 3))
+        for k, r in enumerate(requests):
+            self._finish(r, [v[k], f[k], vir[k], ""])
+
+    def _list_pairs(self, requests, q):
+        """Returns the pairs within the cutoff for all the configurations,
+        using the neighbour list of each request id.
+
+        Args:
+           requests: A list of requests.
+           q: A (nrequests, natoms, 3) array with the positions.
+
+        Returns:
+           A tuple (b, i, j, d), as for _all_pairs.
+        """
+
+        nat = q.shape[1]
+        blist, ilist, jlist, dlist = [], [], [], []
+        for k, r in enumerate(requests):
+            if r["id"] not in self.nlists:
+                self.nlists[r["id"]] = NeighbourList(self.cutoff, self.skin)
+            h, ih = r["cell"] if self.dopbc else (None, None)
+            i, j, d = self.nlists[r["id"]].pairs(q[k], h, ih)
+            blist.append(np.full(len(i), k))
+            ilist.append(i + k * nat)
+            jlist.append(j + k * nat)
+            dlist.append(d)
+
+        return (
+            np.concatenate(blist),
+            np.concatenate(ilist),
+            np.concatenate(jlist),
+            np.concatenate(dlist),
+        )
+
+    @staticmethod
+    def _all_pairs(q, chunk=2 ** 20):
+        """Yields all the pairs of atoms of a stack of configurations, in
+        blocks of about chunk pairs.
+
+        Args:
+           q: A (nconfs, natoms, 3) array with the positions.
+           chunk: The approximate number of pairs in each block.
+
+        Returns:
+           A generator of (b, i, j, d) tuples, in which b is the index of the
+           configuration, i and j are the indices of the atoms in the stacked
+           configurations (i.e. offset by natoms times b) and d = q[j] - q[i].
+        """
+
+        nb, nat = q.shape[:2]
+        chunk = max(1, chunk // nb)
+        i0 = 1
+        while i0 < nat:
+            # the rows from i0 to i1 contain about chunk pairs with j < i
+            i1 = min(nat, int(np.sqrt(i0 ** 2 + 2 * chunk)) + 1)
+            i, j = np.nonzero(np.tri(i1 - i0, i1, i0 - 1, dtype=bool))
+            i += i0
+            d = q[:, j] - q[:, i]
+            offset = nat * np.arange(nb)[:, np.newaxis]
+            yield (
+                np.repeat(np.arange(nb), len(i)),
+                (i + offset).flatten(),
+                (j + offset).flatten(),
+                d.reshape((-1, 3)),
+            )
+            i0 = i1
 
 
 class FFDebye(ForceField):
@@ -446,6 +939,7 @@ class FFDebye(ForceField):
         pars=None,
         dopbc=False,
         threaded=False,
+        nworkers=0,
     ):
         """Initialises FFDebye.
 
@@ -455,7 +949,9 @@ class FFDebye(ForceField):
 
         # a socket to the communication library is created or linked
         # NEVER DO PBC -- forces here are computed without.
-        super(FFDebye, self).__init__(latency, name, pars, dopbc=False)
+        super(FFDebye, self).__init__(
+            latency, name, pars, dopbc=False, threaded=threaded, nworkers=nworkers
+        )
 
         if H is None:
             raise ValueError("Must provide the Hessian for the Debye crystal.")
@@ -474,38 +970,23 @@ class FFDebye(ForceField):
             verbosity.medium,
         )
 
-    def poll(self):
-        """Polls the forcefield checking if there are requests that should
-        be answered, and if necessary evaluates the associated forces and energy."""
-
-        # we have to be thread-safe, as in multi-system mode this might get called by many threads at once
-        with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["status"] = "Running"
-                    self.evaluate(r)
-
-    def evaluate(self, r):
-        """ A simple evaluator for a harmonic Debye crystal potential. """
+    def evaluate_batch(self, requests):
+        """A simple evaluator for a harmonic Debye crystal potential, that
+        computes all the requests with a single matrix product."""
 
-        q = r["pos"]
-        n3 = len(q)
+        q = np.array([r["pos"] for r in requests])
+        n3 = q.shape[1]
         if self.H.shape != (n3, n3):
             raise ValueError("Hessian size mismatch")
         if self.xref.shape != (n3,):
             raise ValueError("Reference structure size mismatch")
 
         d = q - self.xref
-        mf = np.dot(self.H, d)
+        mf = np.dot(d, self.H.T)
+        v = self.vref + 0.5 * (d * mf).sum(axis=1)
 
-        r["result"] = [
-            self.vref + 0.5 * np.dot(d, mf),
-            -mf,
-            np.zeros((3, 3), float),
-            "",
-        ]
-        r["status"] = "Done"
-        r["t_finished"] = time.time()
+        for k, r in enumerate(requests):
+            self._finish(r, [v[k], -mf[k], np.zeros((3, 3), float), ""])
 
 
 class FFPlumed(ForceField):
@@ -582,20 +1063,6 @@ class FFPlumed(ForceField):
         self.masses = dstrip(myatoms.m)
         self.lastq = np.zeros(3 * self.natoms)
 
-    def poll(self):
-        """Polls the forcefield checking if there are requests that should
-        be answered, and if necessary evaluates the associated forces and energy."""
-
-        # We have to be thread-safe, as in multi-system mode this might get
-        # called by many threads at once.
-        with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["status"] = "Running"
-                    r["t_dispatched"] = time.time()
-                    self.evaluate(r)
-                    r["t_finished"] = time.time()
-
     def evaluate(self, r):
         """A wrapper function to call the PLUMED evaluation routines
         and return forces."""
@@ -631,8 +1098,7 @@ class FFPlumed(ForceField):
         v = bias[0]
         vir *= -1
 
-        r["result"] = [v, f, vir, ""]
-        r["status"] = "Done"
+        self._finish(r, [v, f, vir, ""])
 
     def mtd_update(self, pos, cell):
         """Makes updates to the potential that only need to be triggered
@@ -676,6 +1142,7 @@ class FFYaff(ForceField):
         reci_ei="ewald",
         pars=None,
         dopbc=False,
+        nworkers=0,
     ):
         """Initialises FFYaff and enables a basic Yaff force field.
 
@@ -700,7 +1167,9 @@ class FFYaff(ForceField):
         import atexit
 
         # a socket to the communication library is created or linked
-        super(FFYaff, self).__init__(latency, name, pars, dopbc, threaded=threaded)
+        super(FFYaff, self).__init__(
+            latency, name, pars, dopbc, threaded=threaded, nworkers=nworkers
+        )
 
         # A bit weird to use keyword argument for a required argument, but this
         # is also done in the code above.
@@ -742,22 +1211,11 @@ class FFYaff(ForceField):
 
         log._active = False
 
-    def poll(self):
-        """Polls the forcefield checking if there are requests that should
-        be answered, and if necessary evaluates the associated forces and energy."""
-
-        # we have to be thread-safe, as in multi-system mode this might get called by many threads at once
-        with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["status"] = "Running"
-                    self.evaluate(r)
-
     def evaluate(self, r):
         """ Evaluate the energy and forces with the Yaff force field. """
 
         q = r["pos"]
-        nat = len(q) / 3
+        nat = len(q) // 3
         rvecs = r["cell"][0]
 
         self.ff.update_rvecs(np.ascontiguousarray(rvecs.T, dtype=np.float64))
@@ -766,9 +1224,7 @@ class FFYaff(ForceField):
         vtens = np.zeros((3, 3))
         e = self.ff.compute(gpos, vtens)
 
-        r["result"] = [e, -gpos.ravel(), -vtens, ""]
-        r["status"] = "Done"
-        r["t_finished"] = time.time()
+        self._finish(r, [e, -gpos.ravel(), -vtens, ""])
 
 
 class FFsGDML(ForceField):
@@ -787,6 +1243,7 @@ class FFsGDML(ForceField):
         sGDML_model=None,
         pars=None,
         dopbc=False,
+        nworkers=0,
     ):
         """Initialises FFsGDML
 
@@ -797,7 +1254,9 @@ class FFsGDML(ForceField):
         """
 
         # a socket to the communication library is created or linked
-        super(FFsGDML, self).__init__(latency, name, pars, dopbc, threaded=threaded)
+        super(FFsGDML, self).__init__(
+            latency, name, pars, dopbc, threaded=threaded, nworkers=nworkers
+        )
 
         # --- Load sGDML package ---
         try:
@@ -855,33 +1314,26 @@ class FFsGDML(ForceField):
         # --- Creates predictor ---
         self.predictor = GDMLPredict(self.model)
 
-        info(
-            " @ForceField: Optimizing parallelization settings for sGDML FF.",
-            verbosity.medium,
-        )
-        self.predictor.prepare_parallel(n_bulk=1)
-
-    def poll(self):
-        """Polls the forcefield checking if there are requests that should
-        be answered, and if necessary evaluates the associated forces and energy."""
+        # the parallelization settings are optimized for the number of
+        # geometries that are predicted together, once it is known
+        self.n_bulk = 0
 
-        # we have to be thread-safe, as in multi-system mode this might get called by many threads at once
-        with self._threadlock:
-            for r in self.requests:
-                if r["status"] == "Queued":
-                    r["status"] = "Running"
-                    self.evaluate(r)
+    def evaluate_batch(self, requests):
+        """Evaluate the energy and forces of all the requests with a single
+        prediction."""
 
-    def evaluate(self, r):
-        """ Evaluate the energy and forces. """
+        if len(requests) != self.n_bulk:
+            info(
+                " @ForceField: Optimizing parallelization settings for sGDML FF.",
+                verbosity.medium,
+            )
+            self.predictor.prepare_parallel(n_bulk=len(requests))
+            self.n_bulk = len(requests)
 
-        E, F = self.predictor.predict(r["pos"] * self.bohr_to_ang)
+        q = np.array([r["pos"] for r in requests])
+        E, F = self.predictor.predict(q * self.bohr_to_ang)
+        E = E * self.kcalmol_to_hartree
+        F = F.reshape(q.shape) * self.kcalmolang_to_hartreebohr
 
-        r["result"] = [
-            E[0] * self.kcalmol_to_hartree,
-            F.flatten() * self.kcalmolang_to_hartreebohr,
-            np.zeros((3, 3), float),
-            "",
-        ]
-        r["status"] = "Done"
-        r["t_finished"] = time.time()
+        for k, r in enumerate(requests):
+            self._finish(r, [E[k], F[k], np.zeros((3, 3), float), ""])
@@ -21,13 +21,14 @@ import numpy as np
 
 from ipi.utils.softexit import softexit
 from ipi.utils.messages import verbosity, warning, info
+from ipi.utils.timing import timings
 from ipi.utils.depend import *
 from ipi.utils.nmtransform import nm_rescale
 from ipi.utils.xtratools import listDict
 from ipi.engine.beads import Beads
 
 
-__all__ = ["Forces", "ForceComponent"]
+__all__ = ["Forces", "ForceComponent", "ForceBatch"]
 
 
 fbuid = 0
@@ -137,18 +138,26 @@ class ForceBead(dobject):
         dcopy(dself.f, dself.fy)
         dcopy(dself.f, dself.fz)
 
-    def queue(self):
+    def queue(self, poll=True):
         """Sends the job to the interface queue directly.
 
         Allows the ForceBead object to ask for the ufvx list of each replica
         directly without going through the get_all function. This allows
         all the jobs to be sent at once, allowing them to be parallelized.
+
+        Args:
+           poll: Whether a serial forcefield should evaluate the job right
+              away, or leave it in the queue to be evaluated together with
+              those of the other replicas.
         """
 
         with self._threadlock:
             if self.request is None and dd(self).ufvx.tainted():
-                self.request = self.ff.queue(self.atoms, self.cell, reqid=self.uid)
+                self.request = self.ff.queue(
+                    self.atoms, self.cell, reqid=self.uid, poll=poll
+                )
 
+    @timings.timed("forces")
     def get_all(self):
         """Driver routine.
 
@@ -170,7 +179,11 @@ class ForceBead(dobject):
         # this is converting the distribution library requests into [ u, f, v ]  lists
         # t_start = time.time()
         if self.request is None:
-            self.request = self.queue()
+            self.queue()
+
+        # a serial forcefield only evaluates the requests when polled
+        if self.request["status"] == "Queued" and not self.ff.threaded:
+            self.ff.poll()
 
         # sleeps until the request has been evaluated
         while self.request["status"] != "Done":
@@ -183,7 +196,9 @@ class ForceBead(dobject):
                 while softexit.exiting:
                     time.sleep(self.ff.latency)
                 sys.exit()
-            time.sleep(self.ff.latency)
+            # wakes up as soon as the request is done, or after latency
+            # seconds to check again for exit conditions
+            self.request.wait(self.ff.latency)
         # print diagnostics about the elapsed time
         info(
             "# forcefield %s evaluated in %f (queue) and %f (dispatched) sec."
@@ -399,9 +414,12 @@ class ForceComponent(dobject):
 
         # this should be called in functions which access u,v,f for ALL the beads,
         # before accessing them. it is basically pre-queueing so that the
-        # distributed-computing magic can work
+        # distributed-computing magic can work. serial forcefields evaluate
+        # all the beads at once, after they have been queued
         for b in range(self.nbeads):
-            self._forces[b].queue()
+            self._forces[b].queue(poll=False)
+        if not self.ff.threaded:
+            self.ff.poll()
 
     def pot_gather(self):
         """Obtains the potential energy for each replica.
@@ -1419,3 +1437,115 @@ class Forces(dobject):
         rc[0::2] = self.alpha / self.omegan2 / 9.0
         rc[1::2] = (1.0 - self.alpha) / self.omegan2 / 9.0
         return np.asmatrix(rc).T
+
+
+class ForceBatch(object):
+
+    """Computes the forces for a set of independent configurations.
+
+    Used to evaluate the displaced configurations of finite-difference
+    hessians and the samples of self-consistent phonons. The configurations
+    are split into batches of (at most) size configurations, which are held as
+    the replicas of a temporary Beads object. The forces are computed by a
+    copy of a Forces object, in which no component acts on a contracted ring
+    polymer (which would mix the configurations), so that all the replicas of
+    a batch are queued before waiting for any of the results, and computed
+    concurrently by all the clients of the forcefields.
+
+    Attributes:
+       size: The largest number of configurations evaluated at once.
+       natoms: The number of atoms.
+    """
+
+    def __init__(self, forces, beads, cell, size):
+        """Initializes ForceBatch.
+
+        Args:
+           forces: The (bound) Forces object used to compute the forces.
+           beads: A Beads object, giving the masses and names of the atoms.
+           cell: The cell object of the system.
+           size: The number of configurations evaluated at once.
+        """
+
+        self.size = max(1, size)
+        self.natoms = beads.natoms
+        self._forces = forces
+        self._m = dstrip(beads.m).copy()
+        self._names = dstrip(beads.names).copy()
+        self._cell = cell
+        self._replicas = {}
+
+    def _bind(self, nconf):
+        """Returns the beads and forces objects used for batches of nconf
+        configurations, creating them the first time they are needed."""
+
+        if nconf not in self._replicas:
+            beads = Beads(self.natoms, nconf)
+            beads.m[:] = self._m
+            beads.names[:] = self._names
+            fcomp = [
+                ForceComponent(
+                    ffield=fc.ffield,
+                    nbeads=0,
+                    weight=fc.weight,
+                    name=fc.name,
+                    mts_weights=fc.mts_weights,
+                    epsilon=fc.epsilon,
+                )
+                for fc in self._forces.fcomp
+            ]
+            forces = Forces()
+            forces.bind(
+                beads,
+                self._cell.copy(),
+                fcomp,
+                self._forces.ff,
+                self._forces.open_paths,
+            )
+            self._replicas[nconf] = (beads, forces)
+        return self._replicas[nconf]
+
+    def evaluate(self, qs):
+        """Computes the potential and the forces for a list of configurations.
+
+        Args:
+           qs: An array of shape (nconf, 3*natoms) with the positions.
+
+        Returns:
+           The potential energies, of shape (nconf,), and the forces, of shape
+           (nconf, 3*natoms).
+        """
+
+        qs = np.asarray(qs).reshape((-1, 3 * self.natoms))
+        pots = np.zeros(len(qs))
+        f = np.zeros(qs.shape)
+        for start in range(0, len(qs), self.size):
+            end = min(start + self.size, len(qs))
+            beads, forces = self._bind(end - start)
+            beads.q = qs[start:end]
+            f[start:end] = dstrip(forces.f)
+            pots[start:end] = dstrip(forces.pots)
+        return pots, f
+
+    def fd_derivatives(self, q0, devs):
+        """Computes the derivatives of the forces by central finite differences.
+
+        Args:
+           q0: The reference positions, of shape (3*natoms,), or of shape
+              (ndevs, 3*natoms) to use a different reference for each
+              displacement.
+           devs: An array of shape (ndevs, 3*natoms), giving the displacements.
+
+        Returns:
+           An array of shape (ndevs, 3*natoms), in which row k is
+           (f(q0 - devs[k]) - f(q0 + devs[k])) / 2, i.e. the product of the
+           hessian with devs[k], to second order in the displacement.
+        """
+
+        q0 = np.asarray(q0).reshape((-1, 3 * self.natoms))
+        devs = np.asarray(devs).reshape((-1, 3 * self.natoms))
+        qs = np.empty((2 * len(devs), 3 * self.natoms))
+        qs[0::2] = q0 + devs
+        qs[1::2] = q0 - devs
+        f = self.evaluate(qs)[1]
+        return 0.5 * (f[1::2] - f[0::2])
@@ -18,7 +18,7 @@ from ipi.engine.normalmodes import NormalModes
 from ipi.engine.ensembles import Ensemble
 from ipi.engine.motion import Motion
 from ipi.utils.io import read_file
-from ipi.utils.io.inputs.io_xml import xml_parse_file
+from ipi.utils.io.inputs.io_npz import xml_parse_checkpoint
 from ipi.utils.depend import dobject
 from ipi.utils.units import Constants, unit_to_internal
 from ipi.utils.nmtransform import nm_rescale
@@ -154,9 +154,8 @@ def init_chk(filename):
        checkpoint file.
     """
 
-    # reads configuration from a checkpoint file
-    rfile = open(filename, "r")
-    xmlchk = xml_parse_file(rfile)  # Parses the file.
+    # reads configuration from a checkpoint file (xml or binary)
+    xmlchk = xml_parse_checkpoint(filename)
 
     from ipi.inputs.simulation import InputSimulation
 
@@ -224,7 +223,7 @@ def init_vector(
 
     mode = iif.mode
     value = iif.value
-    if mode == "xyz" or mode == "pdb":
+    if mode == "xyz" or mode == "pdb" or mode == "bintraj":
         rq = init_beads(iif, nbeads, dimension, units, cell_units).q
     elif mode == "chk":
         if momenta:
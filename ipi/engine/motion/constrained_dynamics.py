@@ -22,6 +22,7 @@ from ipi.engine.thermostats import Thermostat
 from ipi.engine.barostats import Barostat
 
 from ipi.utils.messages import verbosity, warning
+from ipi.utils.timing import timings
 
 
 # tries to import scipy to do the cholesky decomposition solver,
@@ -374,9 +375,11 @@ class ConstrainedIntegrator(DummyIntegrator):
         dd(self).csolver = motion.csolver
         dpipe(dself.qdt, dd(self.csolver).dt)
 
+    @timings.timed("constraints")
     def proj_cotangent(self):
         self.csolver.proj_cotangent()
 
+    @timings.timed("constraints")
     def proj_manifold(self):
         self.csolver.proj_manifold()
 
@@ -509,7 +512,8 @@ class NVTConstrainedIntegrator(NVEConstrainedIntegrator):
 
         m3 = dstrip(self.beads.m3)
         for i in range(self.nsteps_o):
-            self.thermostat.step()
+            with timings.section("thermostat"):
+                self.thermostat.step()
 
             # accumulates conserved quantity
             p = dstrip(self.beads.p)
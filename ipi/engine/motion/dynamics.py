@@ -17,6 +17,7 @@ from ipi.utils.depend import *
 from ipi.engine.thermostats import Thermostat
 from ipi.engine.barostats import Barostat
 from ipi.utils.softexit import softexit
+from ipi.utils.timing import timings
 
 
 # __all__ = ['Dynamics', 'NVEIntegrator', 'NVTIntegrator', 'NPTIntegrator', 'NSTIntegrator', 'SCIntegrator`']
@@ -342,6 +343,7 @@ class DummyIntegrator(dobject):
         """Dummy simulation time step which does nothing."""
         pass
 
+    @timings.timed("constraints")
     def pconstraints(self):
         """This removes the centre of mass contribution to the kinetic energy.
 
@@ -513,6 +515,7 @@ class NVTIntegrator(NVEIntegrator):
         thermostat: A thermostat object to keep the temperature constant.
     """
 
+    @timings.timed("thermostat")
     def tstep(self):
         """Velocity Verlet thermostat step"""
 
@@ -565,7 +568,8 @@ class NVTCCIntegrator(NVTIntegrator):
     def step(self, step=None):
         """Does one simulation time step."""
 
-        self.thermostat.step()
+        with timings.section("thermostat"):
+            self.thermostat.step()
         self.pconstraints()
         # NB we only have to take into account the energy balance of zeroing centroid velocity when we had added energy through the thermostat
         self.ensemble.eens += 0.5 * np.dot(
@@ -584,7 +588,8 @@ class NVTCCIntegrator(NVTIntegrator):
         self.nm.pnm[0, :] = 0.0
         self.pconstraints()
 
-        self.thermostat.step()
+        with timings.section("thermostat"):
+            self.thermostat.step()
         self.ensemble.eens += 0.5 * np.dot(
             self.nm.pnm[0], self.nm.pnm[0] / self.nm.dynm3[0]
         )
@@ -611,15 +616,18 @@ class NPTIntegrator(NVTIntegrator):
             raise ValueError(
                 "Seems like no stress tensor was computed by the client. Stopping barostat!"
             )
-        self.barostat.pstep(level)
+        with timings.section("barostat"):
+            self.barostat.pstep(level)
         super(NPTIntegrator, self).pstep(level)
         # self.pconstraints()
 
+    @timings.timed("barostat")
     def qcstep(self):
         """Velocity Verlet centroid position propagator."""
 
         self.barostat.qcstep()
 
+    @timings.timed("thermostat")
     def tstep(self):
         """Velocity Verlet thermostat step"""
 
@@ -750,14 +758,17 @@ class SCNPTIntegrator(SCIntegrator):
                 "Seems like no stress tensor was computed by the client. Stopping barostat!"
             )
 
-        self.barostat.pstep(level)
+        with timings.section("barostat"):
+            self.barostat.pstep(level)
         super(SCNPTIntegrator, self).pstep(level)
 
+    @timings.timed("barostat")
     def qcstep(self):
         """Velocity Verlet centroid position propagator."""
 
         self.barostat.qcstep()
 
+    @timings.timed("thermostat")
     def tstep(self):
         """Velocity Verlet thermostat step"""
 
@@ -775,10 +786,12 @@ class SCNPTIntegrator(SCIntegrator):
             self.pconstraints()
 
             # forces are integerated for dt with MTS.
-            self.barostat.pscstep()
+            with timings.section("barostat"):
+                self.barostat.pscstep()
             self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
             self.mtsprop(0)
-            self.barostat.pscstep()
+            with timings.section("barostat"):
+                self.barostat.pscstep()
             self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
 
             # thermostat is applied for dt/2
@@ -787,12 +800,14 @@ class SCNPTIntegrator(SCIntegrator):
 
         elif self.splitting == "baoab":
 
-            self.barostat.pscstep()
+            with timings.section("barostat"):
+                self.barostat.pscstep()
             self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
             self.mtsprop_ba(0)
             # thermostat is applied for dt
             self.tstep()
             self.pconstraints()
             self.mtsprop_ab(0)
-            self.barostat.pscstep()
+            with timings.section("barostat"):
+                self.barostat.pscstep()
             self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
@@ -30,6 +30,7 @@ from ipi.utils.instools import (
 from ipi.utils.instools import print_instanton_hess, diag_banded, ms_pathway
 from ipi.utils.hesstools import get_hessian, clean_hessian, get_dynmat
 from ipi.engine.beads import Beads
+from ipi.engine.forces import ForceBatch
 
 __all__ = ["InstantonMotion"]
 
@@ -64,6 +65,8 @@ class InstantonMotion(Motion):
         hessian: Stored  Hessian matrix
         hessian_update: The way to update the hessian after each movement
         hessian_asr: Removes the zero frequency vibrational modes depending on the symmerty of the system.
+        hessian_nparallel: Number of rows of the finite-difference hessians whose displaced configurations
+        are evaluated at once.
         glist_lbfgs: List of previous gradients (g_n+1 - g_n) for L-BFGS. Number of entries = corrections_lbfgs
         qlist_lbfgs: List of previous positions (x_n+1 - x_n) for L-BFGS. Number of entries = corrections_lbfgs
         scale_lbfgs: Scale choice for the initial hessian.
@@ -94,6 +97,7 @@ class InstantonMotion(Motion):
         hessian=np.eye(0, 0, 0, float),
         hessian_update=None,
         hessian_asr=None,
+        hessian_nparallel=1,
         qlist_lbfgs=np.zeros(0, float),
         glist_lbfgs=np.zeros(0, float),
         scale_lbfgs=1,
@@ -121,6 +125,7 @@ class InstantonMotion(Motion):
         self.options["save"] = alt_out
         self.options["prefix"] = prefix
         self.options["hessian_final"] = hessian_final
+        self.options["hessian_nparallel"] = hessian_nparallel
 
         self.options["max_e"] = max_e
         self.options["max_ms"] = max_ms
@@ -757,6 +762,7 @@ class DummyOptimizer(dobject):
         self.options["prefix"] = geop.options["prefix"]
         self.optarrays["delta"] = geop.optarrays["delta"]
         self.options["hessian_final"] = geop.options["hessian_final"]
+        self.options["hessian_nparallel"] = geop.options["hessian_nparallel"]
         self.optarrays["energy_shift"] = geop.optarrays["energy_shift"]
 
         self.gm.bind(
@@ -768,6 +774,19 @@ class DummyOptimizer(dobject):
         self.im.bind(self, self.options["discretization"])
         self.fix = Fix(geop.beads.natoms, geop.fixatoms, geop.beads.nbeads)
 
+        # Evaluates the displaced configurations of the finite-difference hessians
+        # for hessian_nparallel rows at once. When the forces are interpolated along
+        # the path (max_ms or max_e > 0) the hessians are computed through the mapper.
+        if self.gm.spline:
+            self.fbatch = None
+        else:
+            self.fbatch = ForceBatch(
+                self.forces,
+                self.beads,
+                self.cell,
+                2 * self.beads.nbeads * self.options["hessian_nparallel"],
+            )
+
     def initial_geo(self):
         # TODO : add linear interpolation
 
@@ -868,6 +887,7 @@ class DummyOptimizer(dobject):
                     self.beads.natoms,
                     self.beads.nbeads,
                     self.fixatoms,
+                    batch=self.fbatch,
                 )
                 self.optarrays["hessian"][:] = self.fix.get_full_vector(
                     active_hessian, 2
@@ -1059,6 +1079,7 @@ class HessianOptimizer(DummyOptimizer):
                 self.beads.natoms,
                 self.beads.nbeads,
                 self.fixatoms,
+                batch=self.fbatch,
             )
             self.optarrays["hessian"][:] = self.fix.get_full_vector(active_hessian, 2)
 
@@ -1084,7 +1105,12 @@ class HessianOptimizer(DummyOptimizer):
 
         elif update == "recompute":
             active_hessian = get_hessian(
-                self.gm, new_x, self.beads.natoms, self.beads.nbeads, self.fixatoms
+                self.gm,
+                new_x,
+                self.beads.natoms,
+                self.beads.nbeads,
+                self.fixatoms,
+                batch=self.fbatch,
             )
 
         self.optarrays["hessian"][:] = self.fix.get_full_vector(active_hessian, 2)
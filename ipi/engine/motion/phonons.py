@@ -23,6 +23,7 @@ import numpy as np
 
 
 from ipi.engine.motion import Motion
+from ipi.engine.forces import ForceBatch
 from ipi.utils.depend import *
 from ipi.utils.softexit import softexit
 from ipi.utils.messages import verbosity, info
@@ -44,6 +45,7 @@ class DynMatrixMover(Motion):
         refdynmat=np.zeros(0, float),
         prefix="",
         asr="none",
+        nparallel=1,
     ):
         """Initialises DynMatrixMover.
         Args:
@@ -51,6 +53,9 @@ class DynMatrixMover(Motion):
                   motion will be constrained or not. Defaults to False.
         dynmatrix : A 3Nx3N array that stores the dynamic matrix.
         refdynmatrix : A 3Nx3N array that stores the refined dynamic matrix.
+        nparallel : The number of rows of the dynamic matrix computed at each
+                    step, whose 2*nparallel displaced configurations are
+                    evaluated concurrently.
         """
 
         super(DynMatrixMover, self).__init__(fixcom=fixcom, fixatoms=fixatoms)
@@ -74,6 +79,7 @@ class DynMatrixMover(Motion):
         self.V = None
         self.prefix = prefix
         self.asr = asr
+        self.nparallel = nparallel
 
         if self.prefix == "":
             self.prefix = "phonons"
@@ -100,13 +106,11 @@ class DynMatrixMover(Motion):
         self.m = dstrip(self.beads.m)
         self.phcalc.bind(self)
 
-        self.dbeads = self.beads.copy()
-        self.dcell = self.cell.copy()
-        self.dforces = self.forces.copy(self.dbeads, self.dcell)
+        self.fbatch = ForceBatch(self.forces, self.beads, self.cell, 2 * self.nparallel)
 
     def step(self, step=None):
         """Executes one step of phonon computation. """
-        if step < 3 * self.beads.natoms:
+        if step * self.nparallel < 3 * self.beads.natoms:
             self.phcalc.step(step)
         else:
             self.phcalc.transform()
@@ -340,27 +344,47 @@ class FDPhononCalculator(DummyPhononCalculator):
                 ((self.dm.beads.q.size, self.dm.beads.q.size))
             )
 
+    def rows(self, step):
+        """Returns the rows of the dynamic matrix computed at a given step."""
+
+        first = step * self.dm.nparallel
+        rows = []
+        for k in range(first, min(first + self.dm.nparallel, len(self.dm.ism))):
+            if k in self.dm.fixdof:
+                info(" We have skipped the dof # {}.".format(k), verbosity.low)
+            else:
+                rows.append(k)
+        return rows
+
+    def displacement(self, k):
+        """Returns the finite deviation used to compute the kth row."""
+
+        dev = np.zeros(3 * self.dm.beads.natoms, float)
+        dev[k] = self.dm.deltax
+        return dev
+
     def step(self, step=None):
-        """Computes one row of the dynamic matrix."""
-
-        if step not in self.dm.fixdof:
-            # initializes the finite deviation
-            dev = np.zeros(3 * self.dm.beads.natoms, float)
-            dev[step] = self.dm.deltax
-            # displaces kth d.o.f by delta.
-            self.dm.dbeads.q = self.dm.beads.q + dev
-            plus = -dstrip(self.dm.dforces.f).copy()
-            # displaces kth d.o.f by -delta.
-            self.dm.dbeads.q = self.dm.beads.q - dev
-            minus = -dstrip(self.dm.dforces.f).copy()
-            # computes a row of force-constant matrix
-            dmrow = (
-                (plus - minus) / (2 * self.dm.deltax) * self.dm.ism[step] * self.dm.ism
-            )
-            self.dm.dynmatrix[step] = dmrow
-            self.dm.refdynmatrix[step] = dmrow
-        else:
-            info(" We have skipped the dof # {}.".format(step), verbosity.low)
+        """Computes nparallel rows of the dynamic matrix, displacing the
+        system by +delta and -delta along all the corresponding directions at
+        once."""
+
+        rows = self.rows(step)
+        if len(rows) == 0:
+            return
+        devs = np.array([self.displacement(k) for k in rows])
+        # derivatives of the forces along the displacements
+        dfs = self.dm.fbatch.fd_derivatives(dstrip(self.dm.beads.q)[0], devs)
+        for k, dev, df in zip(rows, devs, dfs):
+            self.store_row(k, df / np.sqrt(np.dot(dev, dev)))
+
+    def store_row(self, k, df):
+        """Stores the kth row of the dynamic matrix, given the derivative of
+        the forces along the kth displacement."""
+
+        # computes a row of force-constant matrix
+        dmrow = df * self.dm.ism[k] * self.dm.ism
+        self.dm.dynmatrix[k] = dmrow
+        self.dm.refdynmatrix[k] = dmrow
 
     def transform(self):
         dm = self.dm.dynmatrix.copy()
@@ -398,21 +422,18 @@ class NMFDPhononCalculator(FDPhononCalculator):
         for i in range(len(self.dm.V)):
             self.dm.V[:, i] *= self.dm.ism
 
-    def step(self, step=None):
-        """Computes one row of the dynamic matrix."""
-
-        # initializes the finite deviation
-        vknorm = np.sqrt(np.dot(self.dm.V[:, step], self.dm.V[:, step]))
-        dev = np.real(self.dm.V[:, step] / vknorm) * self.dm.deltax
-        # displaces by -delta along kth normal mode.
-        self.dm.dbeads.q = self.dm.beads.q + dev
-        plus = -dstrip(self.dm.dforces.f).copy().flatten()
-        # displaces by -delta along kth normal mode.
-        self.dm.dbeads.q = self.dm.beads.q - dev
-        minus = -dstrip(self.dm.dforces.f).copy().flatten()
-        # computes a row of the refined dynmatrix, in the basis of the eigenvectors of the first dynmatrix
-        dmrowk = (plus - minus) / (2 * self.dm.deltax / vknorm)
-        self.dm.refdynmatrix[step] = np.dot(self.dm.V.T, dmrowk)
+    def displacement(self, k):
+        """Returns the finite deviation along the kth normal mode."""
+
+        vknorm = np.sqrt(np.dot(self.dm.V[:, k], self.dm.V[:, k]))
+        return np.real(self.dm.V[:, k] / vknorm) * self.dm.deltax
+
+    def store_row(self, k, df):
+        """Stores the kth row of the refined dynmatrix, in the basis of the
+        eigenvectors of the first dynmatrix."""
+
+        vknorm = np.sqrt(np.dot(self.dm.V[:, k], self.dm.V[:, k]))
+        self.dm.refdynmatrix[k] = np.dot(self.dm.V.T, df * vknorm)
 
     def transform(self):
         self.dm.refdynmatrix = np.dot(
@@ -426,21 +447,12 @@ class ENMFDPhononCalculator(NMFDPhononCalculator):
 
     """Energy scaled normal mode finite difference phonon evaluator."""
 
-    def step(self, step=None):
-        """Computes one row of the dynamic matrix."""
+    def displacement(self, k):
+        """Returns the finite deviation along the kth normal mode, scaled so
+        that it corresponds to an energy change of deltae."""
 
-        # initializes the finite deviation
-        vknorm = np.sqrt(np.dot(self.dm.V[:, step], self.dm.V[:, step]))
-        edelta = vknorm * np.sqrt(self.dm.deltae * 2.0 / abs(self.dm.w2[step]))
+        vknorm = np.sqrt(np.dot(self.dm.V[:, k], self.dm.V[:, k]))
+        edelta = vknorm * np.sqrt(self.dm.deltae * 2.0 / abs(self.dm.w2[k]))
         if edelta > 100 * self.dm.deltax:
             edelta = 100 * self.dm.deltax
-        dev = np.real(self.dm.V[:, step] / vknorm) * edelta
-        # displaces by -delta along kth normal mode.
-        self.dm.dbeads.q = self.dm.beads.q + dev
-        plus = -dstrip(self.dm.dforces.f).copy().flatten()
-        # displaces by -delta along kth normal mode.
-        self.dm.dbeads.q = self.dm.beads.q - dev
-        minus = -dstrip(self.dm.dforces.f).copy().flatten()
-        # computes a row of the refined dynmatrix, in the basis of the eigenvectors of the first dynmatrix
-        dmrowk = (plus - minus) / (2 * edelta / vknorm)
-        self.dm.refdynmatrix[step] = np.dot(self.dm.V.T, dmrowk)
+        return np.real(self.dm.V[:, k] / vknorm) * edelta
@@ -14,6 +14,7 @@ from fnmatch import fnmatch
 from ipi.engine.motion import Motion
 from ipi.utils.softexit import softexit
 from ipi.utils.io import read_file, read_file_raw
+from ipi.utils.io.backends.io_bintraj import BinaryTrajectory
 from ipi.utils.io.inputs.io_xml import xml_parse_file
 from ipi.utils.units import unit_to_internal
 from ipi.utils.messages import verbosity, info
@@ -59,7 +60,7 @@ class Replay(Motion):
         self.intraj = intraj
         if intraj.mode == "manual":
             raise ValueError(
-                "Replay can only read from PDB or XYZ files -- or a single frame from a CHK file"
+                "Replay can only read from PDB, XYZ or binary trajectory files -- or a single frame from a CHK file"
             )
         # Posibility to read beads from separate XYZ files by a wildcard
         if any(char in self.intraj.value for char in "*?[]"):
@@ -91,9 +92,15 @@ class Replay(Motion):
             infilelist_sorted, _ = zip(
                 *sorted(zip(infilelist, bead_map_list), key=lambda t: t[1])
             )
-            self.rfile = [open(f, "r") for f in infilelist_sorted]
+            if self.intraj.mode == "bintraj":
+                self.rfile = [BinaryTrajectory(f) for f in infilelist_sorted]
+            else:
+                self.rfile = [open(f, "r") for f in infilelist_sorted]
         else:  # no wildcard
-            self.rfile = open(self.intraj.value, "r")
+            if self.intraj.mode == "bintraj":
+                self.rfile = BinaryTrajectory(self.intraj.value)
+            else:
+                self.rfile = open(self.intraj.value, "r")
         self.rstep = 0
 
     def step(self, step=None):
@@ -137,6 +144,31 @@ class Replay(Motion):
                         myatoms.q *= unit_to_internal("length", self.intraj.units, 1.0)
                         mycell.h *= unit_to_internal("length", self.intraj.units, 1.0)
                         b.q[:] = myatoms.q
+                elif self.intraj.mode == "bintraj":
+                    # frames are accessed at random, so skipped steps are not read
+                    if step is not None and self.rstep <= step:
+                        continue
+                    # late import is needed to break an import cycle
+                    from ipi.utils.io.io_units import process_units
+
+                    for bindex, b in enumerate(self.beads):
+                        if wildcard_used:
+                            traj = self.rfile[bindex]
+                            iframe = self.rstep - 1
+                        else:
+                            traj = self.rfile
+                            iframe = (self.rstep - 1) * len(self.beads) + bindex
+                        if iframe >= len(traj):
+                            raise EOFError
+                        comment, cell, data, names, masses = traj[iframe]
+                        myframe = process_units(
+                            comment, cell, data, names, masses, len(names)
+                        )
+                        myatoms = myframe["atoms"]
+                        mycell = myframe["cell"]
+                        myatoms.q *= unit_to_internal("length", self.intraj.units, 1.0)
+                        mycell.h *= unit_to_internal("length", self.intraj.units, 1.0)
+                        b.q[:] = myatoms.q
                 elif self.intraj.mode == "chk" or self.intraj.mode == "checkpoint":
                     # TODO: Adapt the new `Simulation.load_from_xml`?
                     # reads configuration from a checkpoint file
@@ -23,6 +23,7 @@ __all__ = ["SCPhononsMover"]
 import os
 import numpy as np
 from ipi.engine.motion.motion import Motion
+from ipi.engine.forces import ForceBatch
 from ipi.utils.depend import *
 
 # from ipi.utils import units
@@ -132,11 +133,9 @@ class SCPhononsMover(Motion):
         self.dynmatrix = self.dynmatrix.reshape((beads.q.size, beads.q.size))
         self.atol = self.chop
 
-        # Creates duplicate classes to simplify computation of forces.
+        # Evaluates the forces of nparallel sampled configurations at once.
         self.dof = 3 * self.beads.natoms
-        self.dbeads = self.beads.copy(nbeads=self.nparallel)
-        self.dcell = self.cell.copy()
-        self.dforces = self.forces.copy(self.dbeads, self.dcell)
+        self.fbatch = ForceBatch(self.forces, self.beads, self.cell, self.nparallel)
 
         # Sets temperature.
         self.temp = self.ensemble.temp
@@ -402,10 +401,7 @@ class SCPhononator(DummyPhononator):
             imcmax = self.dm.imc - 1 + self.dm.nparallel
 
             x = self.x[self.dm.isc, imcmin:imcmax]
-            self.dm.dbeads.q = x
-
-            v = dstrip(self.dm.dforces.pots).copy()
-            f = dstrip(self.dm.dforces.f).copy()
+            v, f = self.dm.fbatch.evaluate(x)
 
             self.v[self.dm.isc, imcmin:imcmax] = v[:]
             self.f[self.dm.isc, imcmin:imcmax] = f[:]
@@ -19,6 +19,7 @@ from ipi.utils import units
 from ipi.utils import nmtransform
 from ipi.utils.messages import verbosity, warning, info
 from ipi.utils.exchange import *
+from ipi.utils.tensortools import kinetic_stress
 
 __all__ = ["NormalModes"]
 
@@ -116,6 +117,7 @@ class NormalModes(dobject):
         )
         dself.propagator = depend_value(name="propagator", value=propagator)
         dself.nm_freqs = depend_array(name="nm_freqs", value=np.asarray(freqs, float))
+        self._prop_work = None
 
     def copy(self, freqs=None):
         """Creates a new beads object from the original.
@@ -179,6 +181,10 @@ class NormalModes(dobject):
             self.transform = nmtransform.nm_fft(
                 nbeads=self.nbeads, natoms=self.natoms, open_paths=self.open_paths
             )
+        elif self.transform_method == "rfft":
+            self.transform = nmtransform.nm_rfft(
+                nbeads=self.nbeads, natoms=self.natoms, open_paths=self.open_paths
+            )
         elif self.transform_method == "matrix":
             self.transform = nmtransform.nm_trans(
                 nbeads=self.nbeads, open_paths=self.open_paths
@@ -714,17 +720,17 @@ class NormalModes(dobject):
         if len(self.bosons) == 0:
             pass
         else:
-            (E_k_N, V) = Evaluate_VB(self)
-
             P = self.nbeads
+            m = dstrip(self.beads.m)[self.bosons[0]]  # Take mass of first boson
+            betaP = 1.0 / (P * units.Constants.kb * self.ensemble.temp)
 
-            F = np.zeros((P, 3 * self.natoms), float)
+            q = dstrip(self.beads.q).reshape((P, self.natoms, 3))[:, self.bosons]
+            V, FB = exchange_vspring_and_fspring(q, m, self.omegan2, betaP)
 
-            for ind, l in enumerate(self.bosons):
-                for j in range(P):
-                    F[j, 3 * l : 3 * (l + 1)] = Evaluate_dVB(self, E_k_N, V, ind, j)
+            F = np.zeros((P, self.natoms, 3), float)
+            F[:, self.bosons] = FB
 
-            return [V[-1], F]
+            return [V, F.reshape((P, 3 * self.natoms))]
 
     def get_fspring(self):
         """
@@ -809,48 +815,62 @@ class NormalModes(dobject):
                     "@Normalmodes : Bosonic forces not compatible right now with the exact or Cayley propagators."
                 )
 
-            pq = np.zeros((2, self.natoms * 3), float)
-            sm = dstrip(self.beads.sm3)
-            prop_pq = dstrip(self.prop_pq)
-            o_prop_pq = dstrip(self.o_prop_pq)
-            pnm = dstrip(self.pnm) / sm
-            qnm = dstrip(self.qnm) * sm
-
-            for k in range(1, self.nbeads):
-                pq[0, :] = pnm[k]
-                pq[1, :] = qnm[k]
-                pq = np.dot(prop_pq[k], pq)
-                qnm[k] = pq[1, :]
-                pnm[k] = pq[0, :]
-
-            for k in range(1, self.nbeads):
-                pq[0, :] = pnm[k]
-                pq[1, :] = qnm[k]
-                qnm[k] = pq[1, :]
-                pnm[k] = pq[0, :]
-
-            # now for open paths we recover the initial conditions (that have not yet been overwritten)
-            # and do open path propagation
-            pq = np.zeros(2)
-            for j in self.open_paths:
-                for a in range(3 * j, 3 * (j + 1)):
-                    for k in range(1, self.nbeads):
-                        pq[0] = self.pnm[k, a] / sm[k, a]
-                        pq[1] = self.qnm[k, a] * sm[k, a]
-                        pq = np.dot(o_prop_pq[k], pq)
-                        qnm[k, a] = pq[1]
-                        pnm[k, a] = pq[0]
-            self.pnm = pnm * sm
-            self.qnm = qnm / sm
-            # pq = np.zeros((2,self.natoms*3),float)
-            # sm = dstrip(self.beads.sm3)[0]
-            # prop_pq = dstrip(self.prop_pq)
-            # for k in range(1,self.nbeads):
-            #   pq[0,:] = dstrip(self.pnm)[k]/sm
-            #   pq[1,:] = dstrip(self.qnm)[k]*sm
-            #   pq = np.dot(prop_pq[k],pq)
-            #   self.qnm[k] = pq[1,:]/sm
-            #   self.pnm[k] = pq[0,:]*sm
+            # the propagator works on mass-scaled momenta p/sqrt(m) and positions
+            # q*sqrt(m): in terms of the actual p and q, all the modes of all
+            # the atoms are propagated together as p' = A00 p + A01 m q and
+            # q' = A10 p / m + A11 q, updating qnm and pnm in place.
+            m3 = dstrip(self.beads.m3)[1:]
+            qnm = dstrip(self.qnm)[1:]
+            pnm = dstrip(self.pnm)[1:]
+
+            # open paths use a different propagator: keep the initial conditions
+            if len(self.open_paths) > 0:
+                iopen = nmtransform.open_columns(self.open_paths)
+                qopen = qnm[:, iopen]
+                popen = pnm[:, iopen]
+
+            if self._prop_work is None or self._prop_work[0].shape != qnm.shape:
+                self._prop_work = (np.zeros(qnm.shape), np.zeros(qnm.shape))
+            self._propagate(dstrip(self.prop_pq)[1:], qnm, pnm, m3, *self._prop_work)
+
+            if len(self.open_paths) > 0:
+                self._propagate(
+                    dstrip(self.o_prop_pq)[1:],
+                    qopen,
+                    popen,
+                    m3[:, iopen],
+                    np.zeros(qopen.shape),
+                    np.zeros(qopen.shape),
+                )
+                qnm[:, iopen] = qopen
+                pnm[:, iopen] = popen
+
+            dd(self).qnm.update_man()
+            dd(self).pnm.update_man()
+
+    @staticmethod
+    def _propagate(prop, q, p, m, w1, w2):
+        """Applies the (nmodes, 2, 2) propagator matrices prop to the rows of
+        the (nmodes, ncolumns) arrays of positions and momenta, in place.
+
+        Args:
+           prop: The propagator of each mode, acting on mass-scaled momenta
+              and positions.
+           q: The positions.
+           p: The momenta.
+           m: The masses.
+           w1, w2: Work arrays with the same shape as q.
+        """
+
+        a = prop[:, :, :, np.newaxis]
+        np.multiply(q, m, out=w1)
+        w1 *= a[:, 0, 1]
+        np.divide(p, m, out=w2)
+        w2 *= a[:, 1, 0]
+        q *= a[:, 1, 1]
+        q += w2
+        p *= a[:, 0, 0]
+        p += w1
 
     def get_kins(self):
         """Gets the MD kinetic energy for all the normal modes.
@@ -887,22 +907,9 @@ class NormalModes(dobject):
            The sum of the MD kinetic stress tensor contributions from each NM.
         """
 
-        kmd = np.zeros((3, 3), float)
-        sm = dstrip(self.beads.sm3[0])
-        pnm = dstrip(self.pnm)
-        nmf = dstrip(self.nm_factor)
-
-        for b in range(self.nbeads):
-            sp = pnm[b] / sm  # mass-scaled momentum of b-th NM
-
-            for i in range(3):
-                for j in range(3):
-                    # computes the outer product of the p of various normal modes
-                    # singling out Cartesian components to build the tensor
-                    # also takes care of the possibility of having non-RPMD masses
-                    kmd[i, j] += (
-                        np.dot(sp[i : 3 * self.natoms : 3], sp[j : 3 * self.natoms : 3])
-                        / nmf[b]
-                    )
-
-        return kmd
+        # also takes care of the possibility of having non-RPMD masses
+        return kinetic_stress(
+            dstrip(self.pnm),
+            dstrip(self.beads.m3)[0],
+            1.0 / dstrip(self.nm_factor),
+        )
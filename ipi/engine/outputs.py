@@ -10,22 +10,28 @@ and the restart files.
 
 
 import os
+import copy
+import queue
+import threading
 
 import numpy as np
 
 from ipi.utils.messages import verbosity, info, warning
 from ipi.utils.units import unit_to_user
 from ipi.utils.softexit import softexit
+from ipi.utils.timing import timings
 from ipi.utils.depend import *
 import ipi.utils.io as io
 from ipi.utils.io.inputs.io_xml import *
 from ipi.utils.io import open_backup
+from ipi.utils.io.inputs.io_npz import xml_write_npz
 from ipi.engine.properties import getkey
 from ipi.engine.atoms import *
 from ipi.engine.cell import *
 import json
 
 __all__ = [
+    "OutputQueue",
     "PropertyOutput",
     "TrajectoryOutput",
     "CheckpointOutput",
@@ -36,12 +42,122 @@ __all__ = [
 
 
 class OutputList(list):
-    """A simple decorated list to save the output prefix and bring it
-    back to the initialization phase of the simulation"""
+    """A simple decorated list to save the output prefix and the size of the
+    output queue, and bring them back to the initialization phase of the
+    simulation"""
 
-    def __init__(self, prefix, olist):
+    def __init__(self, prefix, olist, queue=0):
         super(OutputList, self).__init__(olist)
         self.prefix = prefix
+        self.queue = queue
+
+
+class OutputQueue(object):
+
+    """Formats and writes output frames in a separate thread.
+
+    The outputs take a snapshot of the data they need in the thread that
+    calls their write method -- the main thread, or one thread per output
+    when the simulation runs with threading='True', in which case the
+    snapshots of the different outputs are taken in parallel -- and put a
+    task that formats and writes it in a bounded queue, that is emptied by a
+    single writer thread. The simulation can then proceed with the next step
+    while the previous frames are written to disk, and only waits when the
+    queue is full. The frames of each output are written in the order in
+    which they were produced.
+
+    Attributes:
+       maxsize: The maximum number of tasks waiting in the queue.
+       error: The first exception raised by a task, that is raised again
+          in the thread that makes the next call to put or flush.
+    """
+
+    def __init__(self, maxsize=16):
+        """Initialises the queue and starts the writer thread.
+
+        Args:
+           maxsize: The maximum number of tasks waiting in the queue.
+        """
+
+        self.maxsize = maxsize
+        self.error = None
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="output")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """Executes the tasks in the order in which they have been queued."""
+
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            try:
+                with timings.section("output"):
+                    task()
+            except Exception as err:
+                if self.error is None:
+                    self.error = err
+                warning("Error while writing output: " + str(err), verbosity.low)
+
+    def _check(self):
+        """Raises the error of a failed task, if there is one."""
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def put(self, task):
+        """Adds a task to the queue, waiting if the queue is full.
+
+        Args:
+           task: A function without arguments, that writes a frame.
+        """
+
+        self._check()
+        if not self._thread.is_alive():
+            task()
+            return
+        while True:
+            try:
+                # a timeout so that the main thread can still receive signals
+                self._queue.put(task, timeout=2.0)
+                return
+            except queue.Full:
+                pass
+
+    def flush(self):
+        """Waits until all the tasks in the queue have been executed."""
+
+        if self._thread.is_alive():
+            done = threading.Event()
+            self.put(done.set)
+            while not done.wait(2.0):
+                if not self._thread.is_alive():
+                    break
+        self._check()
+
+    def softexit(self):
+        """Writes the frames that are still queued, before the output streams
+        are closed."""
+
+        try:
+            self.flush()
+        except Exception as err:
+            warning("Error while flushing the outputs: " + str(err), verbosity.low)
+
+    def stop(self):
+        """Writes the frames that are still queued and stops the thread.
+
+        Tasks that are put after the thread has stopped are executed
+        directly by the caller.
+        """
+
+        self.flush()
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
 
 
 class OutputMaker(dobject):
@@ -77,6 +193,7 @@ class BaseOutput(object):
 
         self.filename = filename
         self.out = None
+        self.queue = None
 
     def softexit(self):
         """Emergency call when i-pi must exit quickly"""
@@ -122,6 +239,20 @@ class BaseOutput(object):
         if self.out is not None:
             return self.out.write(data)
 
+    def submit(self, task):
+        """Executes a task that writes a frame, or hands it to the output
+        queue if there is one.
+
+        Args:
+           task: A function without arguments, that only uses data that
+              will not be modified by the following steps.
+        """
+
+        if self.queue is None:
+            task()
+        else:
+            self.queue.put(task)
+
 
 class PropertyOutput(BaseOutput):
 
@@ -204,6 +335,7 @@ class PropertyOutput(BaseOutput):
                 ohead += ": " + prop["help"]
             self.out.write(ohead + "\n")
 
+    @timings.timed("output")
     def write(self):
         """Outputs the required properties of the system.
 
@@ -220,7 +352,8 @@ class PropertyOutput(BaseOutput):
 
         if not (self.system.simul.step + 1) % self.stride == 0:
             return
-        self.out.write("  ")
+
+        values = []
         for what in self.outlist:
             try:
                 quantity, dimension, unit = self.system.properties[what]
@@ -228,13 +361,27 @@ class PropertyOutput(BaseOutput):
                     quantity = unit_to_user(dimension, unit, quantity)
             except KeyError:
                 raise KeyError(what + " is not a recognized property")
+            if hasattr(quantity, "__len__"):
+                quantity = np.array(quantity)  # snapshot of the current value
+            values.append(quantity)
+
+        self.submit(lambda: self.write_values(values))
+
+    def write_values(self, values):
+        """Writes a line with the values of the properties.
+
+        Args:
+           values: A list with the value of each property, in user units.
+        """
+
+        line = "  "
+        for quantity in values:
             if not hasattr(quantity, "__len__"):
-                self.out.write(write_type(float, quantity) + "   ")
+                line += write_type(float, quantity) + "   "
             else:
                 for el in quantity:
-                    self.out.write(write_type(float, el) + " ")
-
-        self.out.write("\n")
+                    line += write_type(float, el) + " "
+        self.out.write(line + "\n")
 
         self.nout += 1
         if self.flush > 0 and self.nout >= self.flush:
@@ -385,6 +532,7 @@ class TrajectoryOutput(BaseOutput):
                 "Exception while closing output stream " + str(self.out), verbosity.low
             )
 
+    @timings.timed("output")
     def write(self):
         """Writes out the required trajectories."""
 
@@ -406,31 +554,9 @@ class TrajectoryOutput(BaseOutput):
         # Checks to see if there is a list of files or just a single file.
         if hasattr(self.out, "__getitem__"):
             if self.ibead < 0:
-                for b in range(len(self.out)):
-                    if self.out[b] is not None:
-                        self.write_traj(
-                            data,
-                            self.what,
-                            self.out[b],
-                            b,
-                            format=self.format,
-                            dimension=dimension,
-                            units=units,
-                            cell_units=self.cell_units,
-                            flush=doflush,
-                        )
+                beads = [b for b in range(len(self.out)) if self.out[b] is not None]
             elif self.ibead < len(self.out):
-                self.write_traj(
-                    data,
-                    self.what,
-                    self.out[self.ibead],
-                    self.ibead,
-                    format=self.format,
-                    dimension=dimension,
-                    units=units,
-                    cell_units=self.cell_units,
-                    flush=doflush,
-                )
+                beads = [self.ibead]
             else:
                 raise ValueError(
                     "Selected bead index "
@@ -438,18 +564,37 @@ class TrajectoryOutput(BaseOutput):
                     + " does not exist for trajectory "
                     + self.what
                 )
+            what, streams = self.what, [(self.out[b], b) for b in beads]
         else:
-            self.write_traj(
-                data,
-                getkey(self.what),
-                self.out,
-                b=0,
-                format=self.format,
-                dimension=dimension,
-                units=units,
-                cell_units=self.cell_units,
-                flush=doflush,
-            )
+            what, streams = getkey(self.what), [(self.out, 0)]
+
+        # takes a snapshot of everything that is needed to print the frame
+        if getkey(self.what) == "extras":
+            data = copy.deepcopy(data)
+        else:
+            data = np.array(data)
+        snapshot = dict(
+            step=self.system.simul.step + 1,
+            names=dstrip(self.system.beads.names).copy(),
+            h=dstrip(self.system.cell.h).copy(),
+        )
+
+        def write_frame():
+            for stream, b in streams:
+                self.write_traj(
+                    data,
+                    what,
+                    stream,
+                    b,
+                    format=self.format,
+                    dimension=dimension,
+                    units=units,
+                    cell_units=self.cell_units,
+                    flush=doflush,
+                    **snapshot
+                )
+
+        self.submit(write_frame)
 
     def write_traj(
         self,
@@ -462,6 +607,9 @@ class TrajectoryOutput(BaseOutput):
         units="automatic",
         cell_units="automatic",
         flush=True,
+        step=None,
+        names=None,
+        h=None,
     ):
         """Prints out a frame of a trajectory for the specified quantity and bead.
 
@@ -473,14 +621,20 @@ class TrajectoryOutput(BaseOutput):
            cell_units: The units used to specify the cell parameters.
            flush: A boolean which specifies whether to flush the output buffer
               after each write to file or not.
+           step, names, h: The step number, the atom names and the cell matrix
+              of the frame. Default to the current values.
         """
 
+        if step is None:
+            step = self.system.simul.step + 1
+        if names is None:
+            names = dstrip(self.system.beads.names)
+        if h is None:
+            h = dstrip(self.system.cell.h)
+
         key = getkey(what)
         if key in ["extras"]:
-            stream.write(
-                " #*EXTRAS*# Step:  %10d  Bead:  %5d  \n"
-                % (self.system.simul.step + 1, b)
-            )
+            stream.write(" #*EXTRAS*# Step:  %10d  Bead:  %5d  \n" % (step, b))
             try:
                 index = 0
                 for el, item in enumerate(data):
@@ -488,8 +642,8 @@ class TrajectoryOutput(BaseOutput):
                         index = el
                     try:
                         if self.xtratype == "friction":
-                            fatom = Atoms(self.system.beads.natoms)
-                            fatom.names[:] = self.system.beads.names
+                            fatom = Atoms(len(names))
+                            fatom.names[:] = names
                             stream.write(
                                 "#     %s\n"
                                 % "      ".join(
@@ -504,7 +658,7 @@ class TrajectoryOutput(BaseOutput):
                                     ]
                                 )
                             )
-                            for na in range(self.system.beads.natoms):
+                            for na in range(len(names)):
                                 stream.write(
                                     "%3s      %s\n"
                                     % (
@@ -557,16 +711,16 @@ class TrajectoryOutput(BaseOutput):
             "forces_sc",
             "momenta",
         ]:
-            fatom = Atoms(self.system.beads.natoms)
-            fatom.names[:] = self.system.beads.names
+            fatom = Atoms(len(names))
+            fatom.names[:] = names
             fatom.q[:] = data[b]
         else:
-            fatom = Atoms(self.system.beads.natoms)
-            fatom.names[:] = self.system.beads.names
+            fatom = Atoms(len(names))
+            fatom.names[:] = names
             fatom.q[:] = data
 
         fcell = Cell()
-        fcell.h = self.system.cell.h
+        fcell.h = h
 
         if units == "":
             units = "automatic"
@@ -577,7 +731,7 @@ class TrajectoryOutput(BaseOutput):
             fatom,
             fcell,
             stream,
-            title=("Step:  %10d  Bead:   %5d " % (self.system.simul.step + 1, b)),
+            title=("Step:  %10d  Bead:   %5d " % (step, b)),
             key=key,
             dimension=dimension,
             units=units,
@@ -604,9 +758,12 @@ class CheckpointOutput(dobject):
           on whether 'filename_step' exists already.
        simul: The simulation object to get the data to be output from.
        status: An input simulation object used to write out the checkpoint file.
+       format: The format of the checkpoint file, 'xml' or 'npz'.
     """
 
-    def __init__(self, filename="restart", stride=1000, overwrite=True, step=0):
+    def __init__(
+        self, filename="restart", stride=1000, overwrite=True, step=0, format="xml"
+    ):
         """Initializes a checkpoint output proxy.
 
         Args:
@@ -617,9 +774,12 @@ class CheckpointOutput(dobject):
               If False, will output to 'filename_step'. Note that no check is done
               on whether 'filename_step' exists already.
            step: The number of checkpoint files that have been created so far.
+           format: 'xml' to write the checkpoint as text, 'npz' to write a
+              binary archive (see ipi.utils.io.inputs.io_npz).
         """
 
         self.filename = filename
+        self.format = format
         self.step = depend_value(name="step", value=step)
         self.stride = stride
         self.overwrite = overwrite
@@ -639,19 +799,31 @@ class CheckpointOutput(dobject):
         self.status = isimulation.InputSimulation()
         self.status.store(simul)
 
-    def store(self):
+    @timings.timed("checkpoint")
+    def store(self, full=False):
         """Stores the current simulation status.
 
         Used so that, if halfway through a step a kill signal is received,
         we can output a checkpoint file corresponding to the beginning of the
         current step, which is the last time that both the velocities and
-        positions would have been consistent.
+        positions would have been consistent. Unless full is True, only the
+        dynamical state (positions, momenta, cell, thermostat and barostat
+        states, random number state and step) is copied into the buffers of
+        the stored status, and the rest of it is the one stored by bind() or
+        by the last full store. The xml file is only generated by write().
+
+        Args:
+           full: If True, the whole simulation status is stored again.
         """
 
         self._storing = True
-        self.status.store(self.simul)
+        if full:
+            self.status.store(self.simul)
+        else:
+            self.status.store_state(self.simul)
         self._storing = False
 
+    @timings.timed("checkpoint")
     def write(self, store=True):
         """Writes out the required trajectories.
 
@@ -679,6 +851,10 @@ class CheckpointOutput(dobject):
         if not (self.simul.step + 1) % self.stride == 0:
             return
 
+        # the trajectories must be up to date with the checkpoint
+        if self.simul.output_queue is not None:
+            self.simul.output_queue.flush()
+
         # function to use to open files
         open_function = open_backup
 
@@ -692,11 +868,20 @@ class CheckpointOutput(dobject):
         # Advance the step counter before saving, so next time the correct index will be loaded.
         if store:
             self.step += 1
-            self.store()
+            self.store(full=True)
             self.status.step.store(self.simul.step + 1)
 
-        with open_function(filename, "w") as check_file:
-            check_file.write(self.status.write(name="simulation"))
+        if self.format == "npz":
+            # the archive is written to a temporary file and then renamed, so
+            # that an existing checkpoint is only replaced by a complete one
+            with open(filename + ".tmp", "wb") as check_file:
+                xml_write_npz(self.status, check_file, name="simulation")
+            if open_function is open_backup:
+                open_backup(filename, "wb").close()
+            os.replace(filename + ".tmp", filename)
+        else:
+            with open_function(filename, "w") as check_file:
+                check_file.write(self.status.write(name="simulation"))
 
         # Do not use backed up file open on subsequent writes.
         self._continued = True
@@ -11,8 +11,17 @@ import numpy as np
 
 from ipi.utils.messages import verbosity, info, warning
 from ipi.utils.depend import *
+from ipi.utils.timing import timings, PHASES
+from ipi.interfaces.sockets import ClientStats
 from ipi.utils.units import Constants, unit_to_internal
 from ipi.utils.mathtools import logsumlog, h2abc_deg
+from ipi.utils.tensortools import (
+    atom_view,
+    atom_kinetic,
+    centroid_virial_tensor,
+    gyration,
+    tensor_upper,
+)
 from ipi.utils.io.inputs import io_xml
 from ipi.engine.atoms import *
 from ipi.engine.cell import *
@@ -822,6 +831,72 @@ class Properties(dobject):
             },
         }
 
+        # wall-clock timings of the phases of the previous step
+        for phase, what in list(PHASES.items()) + [("step", "in the whole step")]:
+            self.property_dict["timing_" + phase] = {
+                "dimension": "undefined",
+                "help": "The wall-clock time (in seconds) spent %s during the previous step."
+                % what,
+                "longhelp": """The wall-clock time (in seconds) spent %s during the
+                          previous step. Times spent in other threads (e.g. by several systems, or
+                          by the forcefields sending and receiving data) are summed, and nested
+                          phases are only counted once, e.g. waiting for the forces during a
+                          barostat step is not counted as barostat time."""
+                % what,
+                "func": (lambda phase=phase: timings.last.get(phase, 0.0)),
+            }
+
+        # statistics of the clients connected to the socket forcefields
+        self.property_dict.update(
+            {
+                "ffsocket_latency": {
+                    "dimension": "undefined",
+                    "help": "A percentile of the round-trip time (in seconds) of the requests evaluated by the clients of a socket forcefield.",
+                    "longhelp": """A percentile of the round-trip time (in seconds), from sending
+                          the positions to receiving the forces, of the most recent requests evaluated
+                          by the clients of a socket forcefield. Takes one mandatory argument 'ffield',
+                          the name of the forcefield, and the optional arguments 'percentile' (defaults
+                          to 50, the median) and 'client', the index of one of the connected clients
+                          (defaults to -1, all the clients).""",
+                    "func": self.get_ffsocket_latency,
+                },
+                "ffsocket_completed": {
+                    "dimension": "number",
+                    "help": "The number of requests evaluated by the clients of a socket forcefield.",
+                    "longhelp": """The number of requests evaluated by the clients of a socket
+                          forcefield since the start of the run. Takes one mandatory argument 'ffield',
+                          the name of the forcefield, and the optional argument 'client', the index of
+                          one of the connected clients (defaults to -1, all the clients).""",
+                    "func": (
+                        lambda ffield, client="-1": self.get_ffsocket_stats(
+                            ffield, client
+                        ).ncompleted
+                    ),
+                },
+                "ffsocket_bytes": {
+                    "dimension": "number",
+                    "size": 2,
+                    "help": "The number of bytes sent to and received from the clients of a socket forcefield.",
+                    "longhelp": """The number of bytes sent to and received from the clients of a
+                          socket forcefield since the start of the run. Data exchanged through shared
+                          memory is not counted. Takes one mandatory argument 'ffield', the name of the
+                          forcefield, and the optional argument 'client', the index of one of the
+                          connected clients (defaults to -1, all the clients).""",
+                    "func": self.get_ffsocket_bytes,
+                },
+                "ffsocket_idle": {
+                    "dimension": "undefined",
+                    "help": "The fraction of time the clients of a socket forcefield have been idle.",
+                    "longhelp": """The fraction of time the clients of a socket forcefield have
+                          not been evaluating requests, since they connected. Takes one mandatory
+                          argument 'ffield', the name of the forcefield, and the optional argument
+                          'client', the index of one of the connected clients (defaults to -1, the
+                          average over all the clients).""",
+                    "func": self.get_ffsocket_idle,
+                },
+            }
+        )
+
     def bind(self, system):
         """Binds the necessary objects from the system to calculate the
         required properties.
@@ -906,6 +981,25 @@ class Properties(dobject):
             ]
         )
 
+    def atom_mask(self, atom, iatom=-1, latom=""):
+        """Selects the atoms that match an atom index or label.
+
+        Args:
+           atom: The argument of the property. If empty, all atoms are selected.
+           iatom: The index of the atom to be selected, or -1.
+           latom: The label of the atoms to be selected, or an empty string.
+
+        Returns:
+           A boolean array with one element for each atom.
+        """
+
+        if atom == "":
+            return np.ones(self.beads.natoms, bool)
+        mask = dstrip(self.beads.names) == latom
+        if iatom >= 0:
+            mask[iatom] = True
+        return mask
+
     def get_atom_vec(self, prop_vec, atom="", bead="-1"):
         """Gives a vector for one atom.
 
@@ -940,6 +1034,74 @@ class Properties(dobject):
         else:
             return prop_vec[bead, 3 * atom : 3 * (atom + 1)]
 
+    def get_ffsocket(self, ffield):
+        """Returns the socket interface of a forcefield.
+
+        Args:
+           ffield: The name of the forcefield.
+        """
+
+        if ffield not in self.simul.fflist:
+            raise KeyError("There is no forcefield named '%s'" % ffield)
+        ff = self.simul.fflist[ffield]
+        if not hasattr(ff, "socket"):
+            raise TypeError("The forcefield '%s' is not a socket forcefield" % ffield)
+        return ff.socket
+
+    def get_ffsocket_stats(self, ffield, client="-1"):
+        """Returns the statistics of a client of a socket forcefield, or of
+        all of them if client is negative. A client that is not connected
+        (anymore) has empty statistics.
+
+        Args:
+           ffield: The name of the forcefield.
+           client: The index of the client.
+        """
+
+        socket = self.get_ffsocket(ffield)
+        client = int(client)
+        if client >= len(socket.clients):
+            return ClientStats()
+        return socket.client_stats(client)
+
+    def get_ffsocket_latency(self, ffield, percentile="50", client="-1"):
+        """Returns a percentile of the round-trip time of the requests
+        evaluated by a client of a socket forcefield, or by all of them if
+        client is negative.
+
+        Args:
+           ffield: The name of the forcefield.
+           percentile: The percentile, between 0 and 100.
+           client: The index of the client.
+        """
+
+        return self.get_ffsocket_stats(ffield, client).latency(float(percentile))
+
+    def get_ffsocket_bytes(self, ffield, client="-1"):
+        """Returns the number of bytes sent to and received from a client of
+        a socket forcefield, or all of them if client is negative.
+
+        Args:
+           ffield: The name of the forcefield.
+           client: The index of the client.
+        """
+
+        stats = self.get_ffsocket_stats(ffield, client)
+        return np.array([stats.nbytes_sent, stats.nbytes_recv])
+
+    def get_ffsocket_idle(self, ffield, client="-1"):
+        """Returns the idle fraction of a client of a socket forcefield, or
+        the average over all of them if client is negative.
+
+        Args:
+           ffield: The name of the forcefield.
+           client: The index of the client.
+        """
+
+        if int(client) < 0:
+            return self.get_ffsocket(ffield).telemetry()["interface"]["idle"]
+        return self.get_ffsocket_stats(ffield, client).idle()
+
     def get_temp(self, atom="", bead="", nm=""):
         """Calculates the MD kinetic temperature.
 
@@ -1311,6 +1473,7 @@ class Properties(dobject):
             raise ValueError(
                 "Cannot specify both NM and bead for classical kinetic energy estimator"
             )
+        iatom, latom = -1, ""
         if atom != "":
             try:
                 # iatom gives the index of the atom to be studied
@@ -1354,45 +1517,24 @@ class Properties(dobject):
         dm3 = dstrip(self.nm.dynm3)
         p = dstrip(self.beads.p)
         m3 = dstrip(self.beads.m3)
-        kmd = 0.0
-        ncount = 0
 
+        nbeads = 1
         if ibead > -1:
-            nbeads = 1
-            for i in range(self.beads.natoms):
-                if atom != "" and iatom != i and latom != self.beads.names[i]:
-                    continue
-                k = 3 * i
-                kmd += (
-                    p[ibead, k] ** 2 + p[ibead, k + 1] ** 2 + p[ibead, k + 2] ** 2
-                ) / (2.0 * m3[ibead, k])
-                ncount += 1
+            kat = atom_kinetic(p[ibead], m3[ibead])
         elif inm > -1:
-            nbeads = 1
-            for i in range(self.beads.natoms):
-                if atom != "" and iatom != i and latom != self.beads.names[i]:
-                    continue
-                k = 3 * i
-                kmd += (
-                    pnm[inm, k] ** 2 + pnm[inm, k + 1] ** 2 + pnm[inm, k + 2] ** 2
-                ) / (2.0 * dm3[inm, k])
-                ncount += 1
+            kat = atom_kinetic(pnm[inm], dm3[inm])
         else:
             nbeads = self.beads.nbeads
-            ncount = 0
-            if atom == "":
-                kmd = self.nm.kin
-                ncount = self.beads.natoms
-            else:
-                for i in range(self.beads.natoms):
-                    if atom != "" and iatom != i and latom != self.beads.names[i]:
-                        continue
-                    k = 3 * i
-                    for b in range(self.beads.nbeads):
-                        kmd += (
-                            pnm[b, k] ** 2 + pnm[b, k + 1] ** 2 + pnm[b, k + 2] ** 2
-                        ) / (2.0 * dm3[b, k])
-                    ncount += 1
+            if atom != "":
+                kat = atom_kinetic(pnm, dm3)
+
+        if ibead > -1 or inm > -1 or atom != "":
+            mask = self.atom_mask(atom, iatom, latom)
+            kmd = kat.sum(axis=0)[mask].sum()
+            ncount = np.count_nonzero(mask)
+        else:
+            kmd = self.nm.kin
+            ncount = self.beads.natoms
 
         if ncount == 0:
             warning(
@@ -1429,14 +1571,13 @@ class Properties(dobject):
             iatom = -1
             latom = atom
 
-        tkcv = np.zeros((6), float)
-        ncount = 0
-        for i in range(self.beads.natoms):
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
-
-            tkcv += self.get_kij(str(i), str(i))
-            ncount += 1
+        mask = self.atom_mask(atom, iatom, latom)
+        ncount = np.count_nonzero(mask)
+        kcv = centroid_virial_tensor(
+            dstrip(self.beads.q), dstrip(self.beads.qc), dstrip(self.forces.f)
+        )
+        tkcv = tensor_upper(kcv[mask]).sum(axis=0)
+        tkcv[0:3] += ncount * 0.5 * Constants.kb * self.ensemble.temp
 
         if ncount == 0:
             warning(
@@ -1491,40 +1632,15 @@ class Properties(dobject):
             )
         mi = self.beads.m[i]
         mj = self.beads.m[j]
-        ai = 3 * i
-        aj = 3 * j
 
-        q = dstrip(self.beads.q)
-        qc = dstrip(self.beads.qc)
-        f = dstrip(self.forces.f)
+        dq = atom_view(dstrip(self.beads.q) - dstrip(self.beads.qc))
+        f = atom_view(dstrip(self.forces.f))
 
         # I implement this for the most general case. In practice T_ij = <p_i p_j>/(2sqrt(m_i m_j))
-        kcv = np.zeros((6), float)
-        for b in range(self.beads.nbeads):
-            kcv[0] += (
-                mi * (q[b, ai] - qc[ai]) * f[b, aj]
-                + mj * (q[b, aj] - qc[aj]) * f[b, ai]
-            )  # Txx
-            kcv[1] += (
-                mi * (q[b, ai + 1] - qc[ai + 1]) * f[b, aj + 1]
-                + mj * (q[b, aj + 1] - qc[aj + 1]) * f[b, ai + 1]
-            )  # Tyy
-            kcv[2] += (
-                mi * (q[b, ai + 2] - qc[ai + 2]) * f[b, aj + 2]
-                + mj * (q[b, aj + 2] - qc[aj + 2]) * f[b, ai + 2]
-            )  # Tzz
-            kcv[3] += (
-                mi * (q[b, ai] - qc[ai]) * f[b, aj + 1]
-                + mj * (q[b, aj + 1] - qc[aj + 1]) * f[b, ai]
-            )  # Txy
-            kcv[4] += (
-                mi * (q[b, ai] - qc[ai]) * f[b, aj + 2]
-                + mj * (q[b, aj + 2] - qc[aj + 2]) * f[b, ai]
-            )  # Txz
-            kcv[5] += (
-                mi * (q[b, ai + 1] - qc[ai + 1]) * f[b, aj + 2]
-                + mj * (q[b, aj + 2] - qc[aj + 2]) * f[b, ai + 1]
-            )  # Tyz
+        # T_kl = sum_b m_i (q_ik - qc_ik) f_jl + m_j (q_jl - qc_jl) f_ik
+        kcv = mi * np.einsum("bk,bl->kl", dq[:, i], f[:, j])
+        kcv += mj * np.einsum("bl,bk->kl", dq[:, j], f[:, i])
+        kcv = tensor_upper(kcv)
 
         kcv *= -0.5 / (self.beads.nbeads * 2 * np.sqrt(mi * mj))
         if i == j:
@@ -1554,22 +1670,10 @@ class Properties(dobject):
             iatom = -1
             latom = atom
 
-        q = dstrip(self.beads.q)
-        qc = dstrip(self.beads.qc)
-        nat = self.beads.natoms
-        nb = self.beads.nbeads
-        rg_tot = 0.0
-        ncount = 0
-        for i in range(nat):
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
-
-            rg_at = 0.0
-            for j in range(nb):
-                dq = q[j, 3 * i : 3 * (i + 1)] - qc[3 * i : 3 * (i + 1)]
-                rg_at += np.dot(dq, dq)
-            ncount += 1
-            rg_tot += np.sqrt(rg_at / float(nb))
+        mask = self.atom_mask(atom, iatom, latom)
+        ncount = np.count_nonzero(mask)
+        rg = np.sqrt(gyration(dstrip(self.beads.q), dstrip(self.beads.qc)).sum(axis=1))
+        rg_tot = rg[mask].sum()
 
         if ncount == 0:
             raise IndexError(
@@ -2740,12 +2844,12 @@ class Trajectories(dobject):
         of freedom.
         """
 
-        rv = np.zeros(self.system.beads.natoms * 3)
-        for b in range(self.system.beads.nbeads):
-            rv[:] += (
-                self.system.beads.q[b] - self.system.beads.qc
-            ) * self.system.forces.f[b]
-        rv *= -0.5 / self.system.beads.nbeads
+        kcv = centroid_virial_tensor(
+            dstrip(self.system.beads.q),
+            dstrip(self.system.beads.qc),
+            dstrip(self.system.forces.f),
+        )
+        rv = tensor_upper(kcv)[:, 0:3].flatten()
         rv += 0.5 * Constants.kb * self.system.ensemble.temp
         return rv
 
@@ -2754,22 +2858,12 @@ class Trajectories(dobject):
         due to each atom.
         """
 
-        rv = np.zeros((self.system.beads.natoms, 3))
-        # helper arrays to make it more obvious what we are computing
-        dq = np.zeros((self.system.beads.natoms, 3))
-        f = np.zeros((self.system.beads.natoms, 3))
-        for b in range(self.system.beads.nbeads):
-            dq[:] = (self.system.beads.q[b] - self.system.beads.qc).reshape(
-                (self.system.beads.natoms, 3)
-            )
-            f[:] = self.system.forces.f[b].reshape((self.system.beads.natoms, 3))
-            rv[:, 0] += dq[:, 0] * f[:, 1] + dq[:, 1] * f[:, 0]
-            rv[:, 1] += dq[:, 0] * f[:, 2] + dq[:, 2] * f[:, 0]
-            rv[:, 2] += dq[:, 1] * f[:, 2] + dq[:, 2] * f[:, 1]
-        rv *= 0.5
-        rv *= -0.5 / self.system.beads.nbeads
-
-        return rv.reshape(self.system.beads.natoms * 3)
+        kcv = centroid_virial_tensor(
+            dstrip(self.system.beads.q),
+            dstrip(self.system.beads.qc),
+            dstrip(self.system.forces.f),
+        )
+        return tensor_upper(kcv)[:, 3:6].flatten()
 
     def get_rg(self):
         """Calculates the radius of gyration of the ring polymers.
@@ -2780,14 +2874,7 @@ class Trajectories(dobject):
 
         q = dstrip(self.system.beads.q)
         qc = dstrip(self.system.beads.qc)
-        nat = self.system.beads.natoms
-        nb = self.system.beads.nbeads
-        rg = np.zeros(3 * nat)
-        for i in range(nb):
-            for j in range(nat):
-                dq = q[i, 3 * j : 3 * (j + 1)] - qc[3 * j : 3 * (j + 1)]
-                rg[3 * j : 3 * (j + 1)] += dq * dq
-        return np.sqrt(rg / float(nb))
+        return np.sqrt(gyration(q, qc).flatten())
 
     def get_isotope_zetatd(self, alpha="1.0", atom=""):
         """Get the thermodynamic isotope ratio direct estimator for each atom.
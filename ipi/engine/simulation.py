@@ -14,12 +14,14 @@ import tracemalloc
 import os
 import threading
 import time
+import zipfile
 from copy import deepcopy
 
-from ipi.utils.depend import depend_value, dobject, dd, dpipe
-from ipi.utils.io.inputs.io_xml import xml_parse_file
+from ipi.utils.depend import depend_value, dobject, dd, dpipe, dcompile, dprofile_step
+from ipi.utils.io.inputs.io_npz import xml_parse_checkpoint
 from ipi.utils.messages import verbosity, info, warning, banner
 from ipi.utils.softexit import softexit
+from ipi.utils.timing import timings
 import ipi.engine.outputs as eoutputs
 import ipi.inputs.simulation as isimulation
 
@@ -71,8 +73,8 @@ class Simulation(dobject):
                 if verbosity is higher than 'quiet'.
         """
 
-        # parse the file
-        xmlrestart = xml_parse_file(open(fn_input))
+        # parse the file (an xml input, or a binary checkpoint)
+        xmlrestart = xml_parse_checkpoint(fn_input)
 
         # prepare the simulation input object
         input_simulation = isimulation.InputSimulation()
@@ -99,7 +101,7 @@ class Simulation(dobject):
         # echo the input file if verbose enough
         if verbosity.level > 0:
             print(" # i-PI loaded input file: ", fn_input)
-        if verbosity.level > 1:
+        if verbosity.level > 1 and not zipfile.is_zipfile(fn_input):
             print(" --- begin input file content ---")
             ifile = open(fn_input, "r")
             for line in ifile.readlines():
@@ -121,6 +123,7 @@ class Simulation(dobject):
         tsteps=1000,
         ttime=0,
         threads=False,
+        depend_graph="dynamic",
     ):
         """Initialises Simulation class.
 
@@ -137,12 +140,16 @@ class Simulation(dobject):
                 to 1000.
             ttime: The simulation running time. Used on restart, to keep a
                 cumulative total.
+            threads: Whether the systems should be evolved in parallel threads.
+            depend_graph: Whether the dependency graph should be frozen
+                ("compiled") once the simulation has been bound.
         """
 
         info(" # Initializing simulation object ", verbosity.low)
         self.prng = prng
         self.mode = mode
         self.threading = threads
+        self.depend_graph = depend_graph
         dself = dd(self)
 
         self.syslist = syslist
@@ -170,6 +177,7 @@ class Simulation(dobject):
         self.smotion = smotion
 
         self.chk = None
+        self.output_queue = None
         self.rollback = True
 
     def bind(self, read_only=False):
@@ -197,7 +205,10 @@ class Simulation(dobject):
             return
 
         # start forcefields here so we avoid having a shitload of files printed
-        # out only to find the socket is busy or whatever prevented starting the threads
+        # out only to find the socket is busy or whatever prevented starting the threads.
+        # worker processes are forked first, while no other thread is running
+        for k, f in self.fflist.items():
+            f.start_workers()
         for k, f in self.fflist.items():
             f.start()
 
@@ -208,6 +219,11 @@ class Simulation(dobject):
                 "Output filenames are not unique. Modify filename attributes."
             )
 
+        # the queue must be flushed on exit before the output streams are closed
+        if self.outtemplate.queue > 0:
+            self.output_queue = eoutputs.OutputQueue(self.outtemplate.queue)
+            softexit.register_function(self.output_queue.softexit)
+
         self.outputs = []
         for o in self.outtemplate:
             dco = deepcopy(o)  # avoids overwriting the actual filename
@@ -228,17 +244,30 @@ class Simulation(dobject):
                     if s.prefix != "":
                         no.filename = s.prefix + "_" + no.filename
                     no.bind(s, mode)
+                    no.queue = self.output_queue
                     self.outputs.append(no)
                     if f_start:  # starting of simulation, print headers (if any)
                         no.print_header()
                     isys += 1
 
-        self.chk = eoutputs.CheckpointOutput("RESTART", 1, True, 0)
+        # the soft exit checkpoint is written in the same format as the others
+        chkformat = [
+            o.format for o in self.outtemplate if type(o) is eoutputs.CheckpointOutput
+        ]
+        self.chk = eoutputs.CheckpointOutput(
+            "RESTART", 1, True, 0, format=(chkformat + ["xml"])[0]
+        )
         self.chk.bind(self)
 
         if self.smotion is not None:
             self.smotion.bind(self.syslist, self.prng, self.output_maker)
 
+        # the dependencies are all in place, so the graph can be frozen. the
+        # locks are only needed if systems and outputs run in separate threads
+        if self.depend_graph == "compiled":
+            info(" # Using the compiled dependency graph", verbosity.low)
+            dcompile(threadsafe=self.threading)
+
     def softexit(self):
         """Deals with a soft exit request.
 
@@ -250,8 +279,10 @@ class Simulation(dobject):
             self.step += 1
         if not self.rollback:
             info("SOFTEXIT: Saving the latest status at the end of the step")
-            self.chk.store()
+            self.chk.store(full=True)
 
+        if self.output_queue is not None:
+            self.output_queue.softexit()
         self.chk.write(store=False)
 
     def run(self):
@@ -303,10 +334,12 @@ class Simulation(dobject):
         # main MD loop
         for self.step in range(self.step, self.tsteps):
             # stores the state before doing a step.
-            # this is a bit time-consuming but makes sure that we can honor soft
-            # exit requests without screwing the trajectory
+            # this only copies the arrays into the buffers of the checkpoint,
+            # and makes sure that we can honor soft exit requests without
+            # screwing the trajectory
 
             steptime = -time.time()
+            timings.step()
             if softexit.triggered:
                 break
 
@@ -366,6 +399,7 @@ class Simulation(dobject):
             steptime += time.time()
             ttot += steptime
             cstep += 1
+            dprofile_step()
 
             if (
                 verbosity.high
@@ -400,4 +434,7 @@ class Simulation(dobject):
                 info(" # Wall clock time expired! Bye bye!", verbosity.low)
                 break
 
+        if self.output_queue is not None:
+            self.output_queue.stop()
+
         self.rollback = False
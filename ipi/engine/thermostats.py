@@ -89,6 +89,8 @@ class Thermostat(dobject):
               from.
            pm: An optional tuple containing a single momentum value and its
               conjugate mass.
+           nm: An optional normal modes object, whose (nbeads, 3*natoms)
+              momentum and dynamical mass arrays are bound as a whole.
            prng: An optional pseudo random number generator object. Defaults to
               Random().
            fixdof: An optional integer which can specify the number of constraints
@@ -120,19 +122,23 @@ class Thermostat(dobject):
                 0
             ].flatten()  # MR this should allow to simply pass the cell momenta in the anisotropic barostat
             dself.m = pm[1].flatten()
+        elif nm is not None:
+            # binds to all the normal modes at once, as (nbeads, 3*natoms) arrays
+            dself.p = dd(nm).pnm
+            dself.m = dd(nm).dynm3
         else:
             raise TypeError(
                 "Thermostat.bind expects either Beads, Atoms, NormalModes, or a (p,m) tuple to bind to"
             )
 
         if fixdof is None:
-            self.ndof = len(self.p)
+            self.ndof = self.p.size
         else:
-            self.ndof = float(len(self.p) - fixdof)
+            self.ndof = float(self.p.size - fixdof)
 
         dself.sm = depend_array(
             name="sm",
-            value=np.zeros(len(dself.m)),
+            value=np.zeros(dself.m.shape),
             func=self.get_sm,
             dependencies=[dself.m],
         )
@@ -224,9 +230,15 @@ class ThermoPILE_L(Thermostat):
 
     """Represents a PILE thermostat with a local centroid thermostat.
 
+    All the normal modes are thermostatted together: the momenta of the
+    different modes are stacked in a single (nbeads, 3*natoms) array, and are
+    propagated with one vectorized Langevin step, using a different friction
+    for each mode.
+
     Attributes:
-       _thermos: The list of the different thermostats for all the ring polymer
-          normal modes.
+       _thermos: The list of additional thermostats that act on individual
+          normal modes, e.g. the global thermostat on the centroid for PILE_G.
+       bindcentroid: Whether the Langevin thermostat also acts on the centroid.
        nm: A normal modes object to attach the thermostat to.
        prng: Random number generator used in the stochastic integration
           algorithms.
@@ -239,6 +251,11 @@ class ThermoPILE_L(Thermostat):
           temperature.
        pilescale: A float used to reduce the intensity of the PILE thermostat if
           required.
+       T: The drift coefficients of the normal modes. Depends on tau, tauk and
+          the time step.
+       S: The noise coefficients of the normal modes. Depends on T and the
+          temperature.
+       ethermo_nm: The energy exchanged with the bath by the Langevin step.
     """
 
     def __init__(self, temp=1.0, dt=1.0, tau=1.0, ethermo=0.0, scale=1.0):
@@ -307,21 +324,15 @@ class ThermoPILE_L(Thermostat):
             raise TypeError(
                 "ThermoPILE_L.bind expects a NormalModes argument to bind to"
             )
-        if prng is None:
-            self.prng = Random()
-        else:
-            self.prng = prng
 
         prev_ethermo = self.ethermo
-
-        # creates a set of thermostats to be applied to individual normal modes
-        self._thermos = [ThermoLangevin(temp=1, dt=1, tau=1) for b in range(nm.nbeads)]
-        # optionally does not bind the centroid, so we can re-use all of this
-        # in the PILE_G case
-        if not bindcentroid:
-            self._thermos[0] = None
+        super(ThermoPILE_L, self).bind(nm=nm, prng=prng, fixdof=fixdof)
 
         self.nm = nm
+        self.bindcentroid = bindcentroid
+        # optionally does not thermostat the centroid, so we can re-use all of
+        # this in the PILE_G case
+        self._thermos = []
 
         dself.tauk = depend_array(
             name="tauk",
@@ -329,49 +340,24 @@ class ThermoPILE_L(Thermostat):
             func=self.get_tauk,
             dependencies=[dself.pilescale, dd(nm).dynomegak],
         )
+        dself.T = depend_array(
+            name="T",
+            value=np.zeros(nm.nbeads, float),
+            func=self.get_T,
+            dependencies=[dself.tau, dself.tauk, dself.dt],
+        )
+        dself.S = depend_array(
+            name="S",
+            value=np.zeros(nm.nbeads, float),
+            func=self.get_S,
+            dependencies=[dself.temp, dself.T],
+        )
 
-        # must pipe all the dependencies in such a way that values for the nm thermostats
-        # are automatically updated based on the "master" thermostat
-        def make_taugetter(k):
-            return lambda: self.tauk[k - 1]
-
-        it = 0
-        nm.pnm.hold()
-        for t in self._thermos:
-            if t is None:
-                it += 1
-                continue
-            if it > 0:
-                fixdof = None  # only the centroid thermostat may have constraints
-
-            # bind thermostat t to the it-th bead
-
-            t.bind(pm=(nm.pnm[it, :], nm.dynm3[it, :]), prng=self.prng, fixdof=fixdof)
-            # pipes temp and dt
-            dpipe(dself.temp, dd(t).temp)
-            dpipe(dself.dt, dd(t).dt)
-
-            # for tau it is slightly more complex
-            if it == 0:
-                dpipe(dself.tau, dd(t).tau)
-            else:
-                # Here we manually connect _thermos[i].tau to tauk[i].
-                # Simple and clear.
-                dd(t).tau.add_dependency(dself.tauk)
-                dd(t).tau._func = make_taugetter(it)
-            dself.ethermo.add_dependency(dd(t).ethermo)
-            dself.ethermo.hold()  # will manually update ethermo when needed!
-            it += 1
-
-        # since the ethermo will be "delegated" to the normal modes thermostats,
-        # one has to split
-        # any previously-stored value between the sub-thermostats
-        if bindcentroid:
-            for t in self._thermos:
-                t.ethermo = prev_ethermo / nm.nbeads
-            dself.ethermo._func = self.get_ethermo
-            # if we are not binding the centroid just yet, this bit of the piping
-            # is delegated to the function which is actually calling this
+        # the total ethermo is the one of the Langevin step, plus those of the
+        # additional thermostats, so any previously-stored value goes here
+        dself.ethermo_nm = depend_value(name="ethermo_nm", value=prev_ethermo)
+        dself.ethermo.add_dependency(dself.ethermo_nm)
+        dself.ethermo._func = self.get_ethermo
 
     def get_tauk(self):
         """Computes the thermostat damping time scale for the non-centroid
@@ -382,19 +368,24 @@ class ThermoPILE_L(Thermostat):
         """
 
         # Also include an optional scaling factor to reduce the intensity of NM thermostats
-        return np.array(
-            [
-                1.0 / (2 * self.pilescale * self.nm.dynomegak[k])
-                for k in range(1, len(self._thermos))
-            ]
-        )
+        return 1.0 / (2 * self.pilescale * dstrip(self.nm.dynomegak)[1:])
+
+    def get_T(self):
+        """Calculates the drift coefficients of all the normal modes."""
+
+        return np.exp(-self.dt / np.concatenate(([self.tau], dstrip(self.tauk))))
+
+    def get_S(self):
+        """Calculates the white noise coefficients of all the normal modes."""
+
+        return np.sqrt(Constants.kb * self.temp * (1 - dstrip(self.T) ** 2))
 
     def get_ethermo(self):
         """Computes the total energy transferred to the heat bath for all the
         thermostats.
         """
 
-        et = 0.0
+        et = self.ethermo_nm
         for t in self._thermos:
             et += t.ethermo
         return et
@@ -402,12 +393,22 @@ class ThermoPILE_L(Thermostat):
     def step(self):
         """Updates the bound momentum vector with a PILE thermostat."""
 
-        self.nm.pnm.hold()
-        # super-cool! just loop over the thermostats! it's as easy as that!
         for t in self._thermos:
             t.step()
-        self.nm.pnm.resume()
-        dd(self).ethermo.resume()
+
+        # the Langevin step on all the (thermostatted) modes at once
+        k = 0 if self.bindcentroid else 1
+        sm = dstrip(self.sm)[k:]
+        p = dstrip(self.p)[k:] / sm
+
+        et = np.vdot(p, p) * 0.5
+        p *= dstrip(self.T)[k:, np.newaxis]
+        p += dstrip(self.S)[k:, np.newaxis] * self.prng.gvec(p.shape)
+        et -= np.vdot(p, p) * 0.5
+
+        p *= sm
+        self.p[k:] = p
+        self.ethermo_nm += et
 
 
 class ThermoSVR(Thermostat):
@@ -532,27 +533,20 @@ class ThermoPILE_G(ThermoPILE_L):
 
         """
 
-        # first binds as a local PILE, then substitutes the thermostat on the centroid
-        prev_ethermo = self.ethermo
+        # first binds as a local PILE, then adds the thermostat on the centroid
         super(ThermoPILE_G, self).bind(
             nm=nm, prng=prng, bindcentroid=False, fixdof=fixdof
         )
         dself = dd(self)
 
         # centroid thermostat
-        self._thermos[0] = ThermoSVR(temp=1, dt=1, tau=1)
-
-        t = self._thermos[0]
+        t = ThermoSVR(temp=1, dt=1, tau=1)
         t.bind(pm=(nm.pnm[0, :], nm.dynm3[0, :]), prng=self.prng, fixdof=fixdof)
         dpipe(dself.temp, dd(t).temp)
         dpipe(dself.dt, dd(t).dt)
         dpipe(dself.tau, dd(t).tau)
         dself.ethermo.add_dependency(dd(t).ethermo)
-
-        # splits any previous ethermo between the thermostats, and finishes to bind ethermo to the sum function
-        for t in self._thermos:
-            t.ethermo = prev_ethermo / nm.nbeads
-        dself.ethermo._func = self.get_ethermo
+        self._thermos.append(t)
 
 
 class ThermoGLE(Thermostat):
@@ -721,13 +715,17 @@ class ThermoNMGLE(Thermostat):
 
     An extension to the GLE thermostat which is applied in the
     normal modes representation, and which allows to use a different
-    GLE for each normal mode
+    GLE for each normal mode. The momenta of all the modes, together with
+    their auxiliary momenta, are kept in a single stacked array, so that
+    the propagation is done for all the modes at once.
 
     Attributes:
        ns: The number of auxilliary degrees of freedom.
        nb: The number of beads.
-       s: An array holding all the momenta, including the ones for the
-          auxilliary degrees of freedom.
+       s: An array of shape (nb, ns+1, 3*natoms) holding all the momenta,
+          including the ones for the auxilliary degrees of freedom.
+       _thermos: The list of additional thermostats that act on individual
+          normal modes, e.g. the global thermostat on the centroid for NMGLEG.
 
     Depend objects:
        A: Drift matrix giving the damping time scales for all the different
@@ -737,6 +735,11 @@ class ThermoNMGLE(Thermostat):
           diffusion matrix, giving the strength of the coupling of the system
           with the heat bath, and thus the size of the stochastic
           contribution of the thermostat.
+       T: Matrices for the diffusive contribution of the thermostat, one for
+          each normal mode. Depends on A and the time step.
+       S: Matrices for the stochastic contribution of the thermostat, one for
+          each normal mode. Depends on C and T.
+       ethermo_nm: The energy exchanged with the bath by the GLE step.
     """
 
     def get_C(self):
@@ -747,6 +750,20 @@ class ThermoNMGLE(Thermostat):
             rv[b] = np.identity(self.ns + 1, float) * self.temp
         return rv[:]
 
+    def get_T(self):
+        """Calculates the drift matrices of all the normal modes."""
+
+        return np.array([matrix_exp(-self.dt * A) for A in self.A])
+
+    def get_S(self):
+        """Calculates the coloured noise matrices of all the normal modes."""
+
+        T = self.T
+        C = self.C
+        SST = Constants.kb * (C - np.matmul(T, np.matmul(C, T.transpose(0, 2, 1))))
+        # Uses a symetric decomposition rather than Cholesky, since it is more stable
+        return np.array([root_herm(x) for x in SST])
+
     def __init__(self, temp=1.0, dt=1.0, A=None, C=None, ethermo=0.0):
         """Initialises ThermoGLE.
 
@@ -767,7 +784,7 @@ class ThermoNMGLE(Thermostat):
         dself = dd(self)
 
         if A is None:
-            A = np.identity(1, float)
+            A = np.identity(1, float)[np.newaxis]
         dself.A = depend_value(value=A.copy(), name="A")
 
         self.nb = len(self.A)
@@ -781,6 +798,15 @@ class ThermoNMGLE(Thermostat):
         else:
             dself.C = depend_value(value=C.copy(), name="C")
 
+        dself.T = depend_value(
+            name="T", func=self.get_T, dependencies=[dself.A, dself.dt]
+        )
+        dself.S = depend_value(
+            name="S", func=self.get_S, dependencies=[dself.C, dself.T]
+        )
+
+        self.s = np.zeros(0)
+
     def bind(self, beads=None, atoms=None, pm=None, nm=None, prng=None, fixdof=None):
         """Binds the appropriate degrees of freedom to the thermostat.
 
@@ -809,11 +835,6 @@ class ThermoNMGLE(Thermostat):
                 "ThermoNMGLE.bind expects a NormalModes argument to bind to"
             )
 
-        if prng is None:
-            self.prng = Random()
-        else:
-            self.prng = prng
-
         if nm.nbeads != self.nb:
             raise IndexError(
                 "The parameters in nm_gle options correspond to a bead number "
@@ -822,6 +843,9 @@ class ThermoNMGLE(Thermostat):
                 + str(nm.nbeads)
             )
 
+        prev_ethermo = self.ethermo
+        super(ThermoNMGLE, self).bind(nm=nm, prng=prng, fixdof=fixdof)
+
         # allocates, initializes or restarts an array of s's
         if self.s.shape != (self.nb, self.ns + 1, nm.natoms * 3):
             if len(self.s) > 0:
@@ -836,59 +860,41 @@ class ThermoNMGLE(Thermostat):
                 " GLE additional DOFs initialised to the free-particle limit.",
                 verbosity.low,
             )
-            for b in range(self.nb):
-                SC = stab_cholesky(self.C[b] * Constants.kb)
-                self.s[b] = np.dot(SC, self.prng.gvec(self.s[b].shape))
+            SC = np.array([stab_cholesky(C * Constants.kb) for C in self.C])
+            self.s[:] = np.matmul(SC, self.prng.gvec(self.s.shape))
         else:
             info("GLE additional DOFs initialised from input.", verbosity.medium)
 
-        prev_ethermo = self.ethermo
-
-        # creates a set of thermostats to be applied to individual normal modes
-        self._thermos = [
-            ThermoGLE(temp=1, dt=1, A=self.A[b], C=self.C[b]) for b in range(self.nb)
-        ]
-
-        # must pipe all the dependencies in such a way that values for the nm
-        # thermostats are automatically updated based on the "master" thermostat
-        def make_Agetter(k):
-            return lambda: self.A[k]
-
-        def make_Cgetter(k):
-            return lambda: self.C[k]
-
-        it = 0
-        for t in self._thermos:
-            t.s = self.s[it]  # gets the s's as a slice of self.s
-            t.bind(
-                pm=(nm.pnm[it, :], nm.dynm3[it, :]), prng=self.prng
-            )  # bind thermostat t to the it-th normal mode
-
-            # pipes temp and dt
-            dpipe(dself.temp, dd(t).temp)
-            dpipe(dself.dt, dd(t).dt)
-
-            # here we pipe the A and C of individual NM to the "master" arrays
-            dd(t).A.add_dependency(dself.A)
-            dd(t).A._func = make_Agetter(it)
-            dd(t).C.add_dependency(dself.C)
-            dd(t).C._func = make_Cgetter(it)
-            dself.ethermo.add_dependency(dd(t).ethermo)
-            it += 1
-
-        # since the ethermo will be "delegated" to the normal modes thermostats,
-        # one has to split
-        # any previously-stored value between the sub-thermostats
-        for t in self._thermos:
-            t.ethermo = prev_ethermo / self.nb
+        self._thermos = []
 
+        # the total ethermo is the one of the GLE step, plus those of the
+        # additional thermostats, so any previously-stored value goes here
+        dself.ethermo_nm = depend_value(name="ethermo_nm", value=prev_ethermo)
+        dself.ethermo.add_dependency(dself.ethermo_nm)
         dself.ethermo._func = self.get_ethermo
 
     def step(self):
-        """Updates the thermostat in NM representation by looping over the
-        individual DOFs.
+        """Updates the thermostat in NM representation, propagating all the
+        normal modes at once.
         """
 
+        s = self.s
+        sm = dstrip(self.sm)
+        p = dstrip(self.p) / sm
+
+        et = np.vdot(p, p) * 0.5
+        s[:, 0] = p
+        # one batched product applies the matrices of each normal mode
+        drift = np.matmul(self.T, s)
+        np.matmul(self.S, self.prng.gvec(s.shape), out=s)
+        s += drift
+        p[:] = s[:, 0]
+        et -= np.vdot(p, p) * 0.5
+
+        p *= sm
+        self.p = p
+        self.ethermo_nm += et
+
         for t in self._thermos:
             t.step()
 
@@ -897,7 +903,7 @@ class ThermoNMGLE(Thermostat):
         thermostats.
         """
 
-        et = 0.0
+        et = self.ethermo_nm
         for t in self._thermos:
             et += t.ethermo
         return et
@@ -919,7 +925,7 @@ class ThermoNMGLEG(ThermoNMGLE):
     def __init__(self, temp=1.0, dt=1.0, A=None, C=None, tau=1.0, ethermo=0.0):
 
         super(ThermoNMGLEG, self).__init__(temp, dt, A, C, ethermo)
-        dself.tau = depend_value(value=tau, name="tau")
+        dd(self).tau = depend_value(value=tau, name="tau")
 
     def bind(self, beads=None, atoms=None, pm=None, nm=None, prng=None, fixdof=None):
         """Binds the appropriate degrees of freedom to the thermostat.
@@ -940,6 +946,7 @@ class ThermoNMGLEG(ThermoNMGLE):
         """
 
         super(ThermoNMGLEG, self).bind(nm=nm, prng=prng, fixdof=fixdof)
+        dself = dd(self)
 
         t = ThermoSVR(self.temp, self.dt, self.tau)
 
@@ -952,7 +959,7 @@ class ThermoNMGLEG(ThermoNMGLE):
         dpipe(dself.dt, dd(t).dt)
         dpipe(dself.tau, dd(t).tau)
 
-        dd(self).ethermo.add_dependency(dd(t).ethermo)
+        dself.ethermo.add_dependency(dd(t).ethermo)
         self._thermos.append(t)
 
 
@@ -136,6 +136,18 @@ class InputBaro(Input):
                 "The type " + type(baro).__name__ + " is not a valid barostat type"
             )
 
+    def store_state(self, baro):
+        """Stores the momentum of a barostat instance and the state of its
+        thermostat.
+
+        Args:
+           baro: A barostat object, that has already been stored.
+        """
+
+        self.thermostat.store_state(baro.thermostat)
+        if type(baro) is not Barostat:
+            self.p.store(baro.p)
+
     def fetch(self):
         """Creates a barostat object.
 
@@ -109,6 +109,16 @@ class InputBeads(Input):
         self.m.store(dstrip(beads.m))
         self.names.store(dstrip(beads.names))
 
+    def store_state(self, beads):
+        """Stores the positions and momenta of a Beads instance.
+
+        Args:
+           beads: A Beads object, that has already been stored.
+        """
+
+        self.q.store(dstrip(beads.q))
+        self.p.store(dstrip(beads.p))
+
     def fetch(self):
         """Creates a beads object.
 
@@ -127,6 +127,16 @@ class InputEnsemble(Input):
         self.hamiltonian_weights.store(ens.hweights)
         self.time.store(ens.time)
 
+    def store_state(self, ens):
+        """Stores the conserved energy and the time of an ensemble instance.
+
+        Args:
+           ens: An ensemble object, that has already been stored.
+        """
+
+        self.eens.store(ens.eens)
+        self.time.store(ens.time)
+
     def fetch(self):
         """Creates an ensemble object.
 
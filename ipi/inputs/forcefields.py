@@ -50,8 +50,21 @@ class InputForceField(Input):
        latency: The number of seconds to sleep between looping over the requests.
        parameters: A dictionary containing the forcefield parameters.
        activelist: A list of indexes (starting at 0) of the atoms that will be active in this force field.
+
+    Forcefields that are evaluated in the i-PI process can also add the
+    nworkers attribute, giving the number of worker processes used to
+    evaluate the requests.
     """
 
+    nworkers_attrib = (
+        InputAttribute,
+        {
+            "dtype": int,
+            "default": 0,
+            "help": "The number of worker processes used to evaluate the forces. Each worker holds a copy of the forcefield, created when the simulation starts, and the beads are split among the workers, exchanging positions and forces through shared memory. With the default, 0, all the beads are evaluated in the i-PI process.",
+        },
+    )
+
     attribs = {
         "name": (
             InputAttribute,
@@ -145,7 +158,8 @@ class InputFFSocket(InputForceField):
     Handles generating one instance of a socket interface forcefield class.
 
     Attributes:
-       mode: Describes whether the socket will be a unix or an internet socket.
+       mode: Describes whether the socket will be a unix or an internet socket,
+          or a unix socket used together with shared memory.
 
     Fields:
        address: The server socket binding address.
@@ -154,6 +168,12 @@ class InputFFSocket(InputForceField):
           time.
        timeout: The number of seconds that the socket will wait before assuming
           that the client code has died. If 0 there is no timeout.
+       status_file: The name of a file where the statistics of the clients
+          are written periodically.
+       status_period: The number of seconds between two updates of the
+          status file.
+       redispatch: The multiple of the median round-trip time after which a
+          request is also sent to a free client. If 0 this is never done.
     """
 
     fields = {
@@ -197,24 +217,57 @@ class InputFFSocket(InputForceField):
                 "help": "This gives the number of seconds before assuming a calculation has died. If 0 there is no timeout.",
             },
         ),
+        "status_file": (
+            InputValue,
+            {
+                "dtype": str,
+                "default": "",
+                "help": "The name of a file where the statistics of the clients (round-trip time percentiles, bytes sent and received, requests completed, idle fraction) are written in JSON format, and rewritten every 'status_period' seconds. If empty, no file is written.",
+            },
+        ),
+        "status_period": (
+            InputValue,
+            {
+                "dtype": float,
+                "default": 10.0,
+                "help": "The number of seconds between two updates of the status file.",
+            },
+        ),
+        "redispatch": (
+            InputValue,
+            {
+                "dtype": float,
+                "default": 0.0,
+                "help": "If positive, a request that has been running for more than this multiple of the median round-trip time is also sent to a free client, and the first result that comes back is used. If 0 requests are never sent twice.",
+            },
+        ),
     }
     attribs = {
         "mode": (
             InputAttribute,
             {
                 "dtype": str,
-                "options": ["unix", "inet"],
+                "options": ["unix", "inet", "shm"],
                 "default": "inet",
-                "help": "Specifies whether the driver interface will listen onto a internet socket [inet] or onto a unix socket [unix].",
+                "help": "Specifies whether the driver interface will listen onto a internet socket [inet] or onto a unix socket [unix]. With [shm] a unix socket is used for control messages, while positions and forces are exchanged through shared memory: this requires clients that run on the same node and support this protocol, such as the python client in ipi/clients.",
             },
         ),
         "matching": (
             InputAttribute,
             {
                 "dtype": str,
-                "options": ["auto", "any"],
+                "options": ["auto", "any", "cost"],
                 "default": "auto",
-                "help": "Specifies whether requests should be dispatched to any client, or automatically matched to the same client when possible [auto].",
+                "help": "Specifies whether requests should be dispatched to any client, or automatically matched to the same client when possible [auto]. With [cost] the speed of each client is learned from the time it took to evaluate previous requests, and the most expensive requests are sent first to the clients that are expected to finish them first, keeping a replica on the same client only if that is not much slower.",
+            },
+        ),
+        "polling": (
+            InputAttribute,
+            {
+                "dtype": str,
+                "options": ["latency", "event"],
+                "default": "latency",
+                "help": "Specifies whether the polling loop should sleep for 'latency' seconds between passes [latency], or be woken up as soon as requests are queued, completed or new clients connect [event]. In event mode 'latency' is only the maximum time between two passes.",
             },
         ),
     }
@@ -256,6 +309,10 @@ class InputFFSocket(InputForceField):
         self.mode.store(ff.socket.mode)
         self.matching.store(ff.socket.match_mode)
         self.exit_on_disconnect.store(ff.socket.exit_on_disconnect)
+        self.status_file.store(ff.socket.status_file)
+        self.status_period.store(ff.socket.status_period)
+        self.redispatch.store(ff.socket.redispatch)
+        self.polling.store(ff.polling)
         self.threaded.store(True)  # hard-coded
 
     def fetch(self):
@@ -275,6 +332,7 @@ class InputFFSocket(InputForceField):
             dopbc=self.pbc.fetch(),
             active=self.activelist.fetch(),
             threaded=self.threaded.fetch(),
+            polling=self.polling.fetch(),
             interface=InterfaceSocket(
                 address=self.address.fetch(),
                 port=self.port.fetch(),
@@ -283,6 +341,9 @@ class InputFFSocket(InputForceField):
                 timeout=self.timeout.fetch(),
                 match_mode=self.matching.fetch(),
                 exit_on_disconnect=self.exit_on_disconnect.fetch(),
+                status_file=self.status_file.fetch(),
+                status_period=self.status_period.fetch(),
+                redispatch=self.redispatch.fetch(),
             ),
         )
 
@@ -308,19 +369,28 @@ class InputFFSocket(InputForceField):
             raise ValueError("Negative latency parameter specified.")
         if self.timeout.fetch() < 0.0:
             raise ValueError("Negative timeout parameter specified.")
+        if self.status_period.fetch() <= 0.0:
+            raise ValueError("Non-positive status_period parameter specified.")
+        if self.redispatch.fetch() < 0.0:
+            raise ValueError("Negative redispatch parameter specified.")
 
 
 class InputFFLennardJones(InputForceField):
 
     attribs = {}
     attribs.update(InputForceField.attribs)
+    attribs["nworkers"] = InputForceField.nworkers_attrib
 
-    default_help = """Simple, internal LJ evaluator without cutoff, neighbour lists or minimal image convention.
-                   Expects standard LJ parameters, e.g. { eps: 0.1, sigma: 1.0 }. """
+    default_help = """Simple, internal LJ evaluator. Expects standard LJ parameters, e.g. { eps: 0.1, sigma: 1.0 },
+                   and optionally a cutoff, e.g. { eps: 0.1, sigma: 1.0, cutoff: 8.5 }, beyond which the potential
+                   is zero, and the width of the skin of the Verlet neighbour lists (default 0.2*cutoff). A cutoff
+                   is needed to use periodic boundary conditions (pbc='True', the default); without a cutoff all
+                   pairs of atoms interact and pbc must be 'False'. """
     default_label = "FFLJ"
 
     def store(self, ff):
         super(InputFFLennardJones, self).store(ff)
+        self.nworkers.store(ff.nworkers)
 
     def fetch(self):
         super(InputFFLennardJones, self).fetch()
@@ -331,6 +401,7 @@ class InputFFLennardJones(InputForceField):
             latency=self.latency.fetch(),
             dopbc=self.pbc.fetch(),
             threaded=self.threaded.fetch(),
+            nworkers=self.nworkers.fetch(),
         )
 
         if self.slots.fetch() < 1 or self.slots.fetch() > 5:
@@ -381,12 +452,14 @@ class InputFFDebye(InputForceField):
 
     attribs = {}
     attribs.update(InputForceField.attribs)
+    attribs["nworkers"] = InputForceField.nworkers_attrib
 
     default_help = """Harmonic energy calculator """
     default_label = "FFDEBYE"
 
     def store(self, ff):
         super(InputFFDebye, self).store(ff)
+        self.nworkers.store(ff.nworkers)
         self.hessian.store(ff.H)
         self.x_reference.store(ff.xref)
         self.v_reference.store(ff.vref)
@@ -402,6 +475,7 @@ class InputFFDebye(InputForceField):
             latency=self.latency.fetch(),
             dopbc=self.pbc.fetch(),
             threaded=self.threaded.fetch(),
+            nworkers=self.nworkers.fetch(),
         )
 
 
@@ -543,12 +617,14 @@ class InputFFYaff(InputForceField):
 
     attribs = {}
     attribs.update(InputForceField.attribs)
+    attribs["nworkers"] = InputForceField.nworkers_attrib
 
     default_help = """Uses a Yaff force field to compute the forces."""
     default_label = "FFYAFF"
 
     def store(self, ff):
         super(InputFFYaff, self).store(ff)
+        self.nworkers.store(ff.nworkers)
         self.yaffpara.store(ff.yaffpara)
         self.yaffsys.store(ff.yaffsys)
         self.yafflog.store(ff.yafflog)
@@ -576,6 +652,7 @@ class InputFFYaff(InputForceField):
             latency=self.latency.fetch(),
             dopbc=self.pbc.fetch(),
             threaded=self.threaded.fetch(),
+            nworkers=self.nworkers.fetch(),
         )
 
 
@@ -596,12 +673,14 @@ class InputFFsGDML(InputForceField):
 
     attribs = {}
     attribs.update(InputForceField.attribs)
+    attribs["nworkers"] = InputForceField.nworkers_attrib
 
     default_help = """A SGDML energy calculator """
     default_label = "FFsGDML"
 
     def store(self, ff):
         super(InputFFsGDML, self).store(ff)
+        self.nworkers.store(ff.nworkers)
         self.sGDML_model.store(ff.sGDML_model)
 
     def fetch(self):
@@ -613,4 +692,5 @@ class InputFFsGDML(InputForceField):
             latency=self.latency.fetch(),
             dopbc=self.pbc.fetch(),
             threaded=self.threaded.fetch(),
+            nworkers=self.nworkers.fetch(),
         )
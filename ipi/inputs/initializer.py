@@ -163,10 +163,10 @@ class InputInitFile(InputInitBase):
 
     attribs = deepcopy(InputInitBase.attribs)
     attribs["mode"][1]["default"] = "chk"
-    attribs["mode"][1]["options"] = ["xyz", "pdb", "chk"]
+    attribs["mode"][1]["options"] = ["xyz", "pdb", "bintraj", "chk"]
     attribs["mode"][1][
         "help"
-    ] = "The input data format. 'xyz' and 'pdb' stand for xyz and pdb input files respectively. 'chk' stands for initialization from a checkpoint file."
+    ] = "The input data format. 'xyz' and 'pdb' stand for xyz and pdb input files respectively. 'bintraj' stands for a binary trajectory file. 'chk' stands for initialization from a checkpoint file."
 
     attribs["bead"] = (
         InputAttribute,
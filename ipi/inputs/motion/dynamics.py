@@ -121,6 +121,19 @@ class InputDynamics(InputDictionary):
         self.nmts.store(dyn.nmts)
         self.splitting.store(dyn.splitting)
 
+    def store_state(self, dyn):
+        """Stores the state of the thermostat and of the barostat.
+
+        Args:
+            dyn: An integrator object, that has already been stored.
+        """
+
+        if dyn == {}:
+            return
+
+        self.thermostat.store_state(dyn.thermostat)
+        self.barostat.store_state(dyn.barostat)
+
     def fetch(self):
         """Creates an ensemble object.
 
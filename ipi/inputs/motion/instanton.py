@@ -200,6 +200,14 @@ class InputInst(InputDictionary):
                 "help": "Removes the zero frequency vibrational modes depending on the symmetry of the system.",
             },
         ),
+        "hessian_nparallel": (
+            InputValue,
+            {
+                "dtype": int,
+                "default": 1,
+                "help": "The number of rows of the finite-difference hessians computed at once. The 2*nbeads*hessian_nparallel displaced configurations are sent to the forcefield together, so they can be evaluated concurrently by several clients.",
+            },
+        ),
         # L-BFGS
         "qlist_lbfgs": (
             InputArray,
@@ -308,6 +316,7 @@ class InputInst(InputDictionary):
         self.prefix.store(options["prefix"])
         self.delta.store(optarrays["delta"])
         self.hessian_final.store(options["hessian_final"])
+        self.hessian_nparallel.store(options["hessian_nparallel"])
         self.old_pot.store(optarrays["old_u"])
         self.old_force.store(optarrays["old_f"])
         self.energy_shift.store(optarrays["energy_shift"])
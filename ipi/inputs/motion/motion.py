@@ -291,6 +291,20 @@ class InputMotionBase(Input):
             self.fixcom.store(sc.fixcom)
             self.fixatoms.store(sc.fixatoms)
 
+    def store_state(self, sc):
+        """Stores the state of the thermostat and barostat of a dynamics
+        class. The other motion classes keep a state of their own, that is
+        stored again entirely.
+
+        Args:
+           sc: A motion calculation class, that has already been stored.
+        """
+
+        if type(sc) is Dynamics:
+            self.dynamics.store_state(sc)
+        elif type(sc) is not Motion:
+            self.store(sc)
+
     def fetch(self):
         """Creates a motion calculator object.
 
@@ -430,6 +444,18 @@ class InputMotion(InputMotionBase):
         else:
             super(InputMotion, self).store(motion)
 
+    def store_state(self, motion):
+
+        if type(motion) is MultiMotion:
+            if len(self.extra) != len(motion.mlist) or 0 in self.extra:
+                self.store(motion)
+                return
+
+            for ii, m in enumerate(motion.mlist):
+                self.extra[ii][1].store_state(m)
+        else:
+            super(InputMotion, self).store_state(motion)
+
     def fetch(self):
 
         if self.mode.fetch() == "multi":
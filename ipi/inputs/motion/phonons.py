@@ -89,6 +89,14 @@ class InputDynMatrix(InputDictionary):
                 "help": "Removes the zero frequency vibrational modes depending on the symmerty of the system.",
             },
         ),
+        "nparallel": (
+            InputValue,
+            {
+                "dtype": int,
+                "default": 1,
+                "help": "The number of rows of the dynamical matrix computed at each step. The 2*nparallel displaced configurations are sent to the forcefield at once, so they can be evaluated concurrently by several clients.",
+            },
+        ),
         "dynmat": (
             InputArray,
             {
@@ -121,6 +129,7 @@ class InputDynMatrix(InputDictionary):
         self.output_shift.store(phonons.deltaw)
         self.prefix.store(phonons.prefix)
         self.asr.store(phonons.asr)
+        self.nparallel.store(phonons.nparallel)
         self.dynmat.store(phonons.dynmatrix)
         self.refdynmat.store(phonons.refdynmatrix)
 
@@ -93,8 +93,8 @@ class InputNormalModes(Input):
             {
                 "dtype": str,
                 "default": "fft",
-                "help": "Specifies whether to calculate the normal mode transform using a fast Fourier transform or a matrix multiplication. For small numbers of beads the matrix multiplication may be faster.",
-                "options": ["fft", "matrix"],
+                "help": "Specifies whether to calculate the normal mode transform using a fast Fourier transform or a matrix multiplication. For small numbers of beads the matrix multiplication may be faster. 'rfft' uses a real-input fast Fourier transform that works in double precision on preallocated arrays, avoiding the allocation of temporary arrays at each step.",
+                "options": ["fft", "rfft", "matrix"],
             },
         ),
         "propagator": (
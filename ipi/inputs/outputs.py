@@ -142,8 +142,8 @@ class InputTrajectory(InputValue):
         {
             "dtype": str,
             "default": "xyz",
-            "help": "The output file format.",
-            "options": ["xyz", "pdb"],
+            "help": "The output file format. 'bintraj' and 'bintraj32' are fixed-stride binary trajectories, in double and single precision.",
+            "options": ["xyz", "pdb", "bintraj", "bintraj32"],
         },
     )
     attribs["cell_units"] = (
@@ -241,6 +241,7 @@ class InputCheckpoint(InputValue):
           data to file.
        overwrite: whether checkpoints should be overwritten, or multiple
           files output.
+       format: whether checkpoints are written as xml or as binary npz files.
     """
 
     default_help = """This class defines how a checkpoint file should be output. Optionally, between the checkpoint tags, you can specify one integer giving the current step of the simulation. By default this integer will be zero."""
@@ -271,6 +272,15 @@ class InputCheckpoint(InputValue):
             "help": "This specifies whether or not each consecutive checkpoint file will overwrite the old one.",
         },
     )
+    attribs["format"] = (
+        InputAttribute,
+        {
+            "dtype": str,
+            "default": "xml",
+            "options": ["xml", "npz"],
+            "help": "The format of the checkpoint file. 'npz' writes an (uncompressed) npz archive, that contains the xml checkpoint in which the large arrays are replaced by references to binary entries of the archive. It is much faster to write and read for large systems, and can be used as an input file in the same way as an xml checkpoint. The RESTART file written on a soft exit uses the format of the first checkpoint output.",
+        },
+    )
 
     def __init__(self, help=None, default=None, dtype=None, dimension=None):
         """Initializes InputCheckpoint.
@@ -291,6 +301,7 @@ class InputCheckpoint(InputValue):
             self.stride.fetch(),
             self.overwrite.fetch(),
             step=step,
+            format=self.format.fetch(),
         )
 
     def parse(self, xml=None, text=""):
@@ -319,6 +330,7 @@ class InputCheckpoint(InputValue):
         self.stride.store(chk.stride)
         self.filename.store(chk.filename)
         self.overwrite.store(chk.overwrite)
+        self.format.store(chk.format)
 
     def check(self):
         """Checks for optional parameters."""
@@ -342,6 +354,8 @@ class InputOutputs(Input):
     Attributes:
        prefix: A string that will be appended to all output files from this
           simulation.
+       queue: The maximum number of output frames waiting to be written by
+          the output thread. Zero for synchronous output.
 
     Dynamic fields:
        trajectory: Specifies a trajectory to be output
@@ -357,7 +371,15 @@ class InputOutputs(Input):
                 "default": "i-pi",
                 "help": "A string that will be prepended to each output file name. The file name is given by 'prefix'.'filename' + format_specifier. The format specifier may also include a number if multiple similar files are output.",
             },
-        )
+        ),
+        "queue": (
+            InputAttribute,
+            {
+                "dtype": int,
+                "default": 0,
+                "help": "If positive, properties and trajectories are formatted and written by a separate thread, so that the simulation does not wait for the disk. Gives the maximum number of output frames that can be waiting to be written: when the queue is full, the simulation waits for the writer. Zero means that the outputs are written synchronously.",
+            },
+        ),
     }
 
     dynamic = {
@@ -430,7 +452,9 @@ class InputOutputs(Input):
 
         super(InputOutputs, self).fetch()
         outlist = eoutputs.OutputList(
-            self.prefix.fetch(), [p.fetch() for (n, p) in self.extra]
+            self.prefix.fetch(),
+            [p.fetch() for (n, p) in self.extra],
+            self.queue.fetch(),
         )
 
         return outlist
@@ -448,6 +472,7 @@ class InputOutputs(Input):
         super(InputOutputs, self).store()
 
         self.prefix.store(plist.prefix)
+        self.queue.store(plist.queue)
 
         if len(self.extra) != len(plist):
             self.extra = [0] * len(plist)
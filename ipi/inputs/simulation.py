@@ -124,6 +124,15 @@ class InputSimulation(Input):
                 "options": ["md", "paratemp", "static"],
             },
         ),
+        "depend_graph": (
+            InputAttribute,
+            {
+                "dtype": str,
+                "default": "dynamic",
+                "help": "How the dependencies between the quantities of the simulation are tracked. 'compiled' freezes the dependency graph once the simulation has been set up, which reduces the overhead of the bookkeeping for small systems. The results are the same in both modes.",
+                "options": ["dynamic", "compiled"],
+            },
+        ),
     }
 
     dynamic = {
@@ -174,6 +183,7 @@ class InputSimulation(Input):
         self.total_time.store(simul.ttime)
         self.smotion.store(simul.smotion)
         self.threading.store(simul.threading)
+        self.depend_graph.store(simul.depend_graph)
 
         # this we pick from the messages class. kind of a "global" but it seems to
         # be the best way to pass around the (global) information on the level of output.
@@ -232,6 +242,32 @@ class InputSimulation(Input):
             else:
                 self.extra[_ii][1].store(_obj)
 
+    def store_state(self, simul):
+        """Stores the random number generator, the step and the dynamical
+        state of the systems, i.e. what changes from one step to the next.
+
+        The forcefields and the other settings are only stored by store().
+        Replica exchange and metadynamics change the ensembles and keep a
+        state of their own, so in that case everything is stored again.
+
+        Args:
+           simul: A simulation object, that has already been stored.
+        """
+
+        _fflist = [v for k, v in sorted(simul.fflist.items())]
+        if (
+            not (simul.smotion is None or type(simul.smotion) is Smotion)
+            or len(self.extra) != len(_fflist) + len(simul.syslist)
+            or 0 in self.extra
+        ):
+            self.store(simul)
+            return
+
+        self.prng.store(simul.prng)
+        self.step.store(simul.step)
+        for _ii, _obj in enumerate(simul.syslist):
+            self.extra[len(_fflist) + _ii][1].store_state(_obj)
+
     def fetch(self):
         """Creates a simulation object.
 
@@ -285,6 +321,7 @@ class InputSimulation(Input):
             tsteps=self.total_steps.fetch(),
             ttime=self.total_time.fetch(),
             threads=self.threading.fetch(),
+            depend_graph=self.depend_graph.fetch(),
         )
 
         return rsim
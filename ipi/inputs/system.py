@@ -200,6 +200,19 @@ class InputSystem(Input):
         self.normal_modes.store(psys.nm)
         self.cell.store(psys.cell)
 
+    def store_state(self, psys):
+        """Stores the dynamical state of a System instance, i.e. the beads,
+        the cell and the state of the ensemble and of the motion classes.
+
+        Args:
+           psys: A physical system object, that has already been stored.
+        """
+
+        self.ensemble.store_state(psys.ensemble)
+        self.motion.store_state(psys.motion)
+        self.beads.store_state(psys.beads)
+        self.cell.store(psys.cell)
+
     def fetch(self):
         """Creates a physical system object.
 
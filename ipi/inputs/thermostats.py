@@ -227,6 +227,22 @@ class InputThermoBase(Input):
             raise TypeError("Unknown thermostat mode " + type(thermo).__name__)
         self.ethermo.store(thermo.ethermo)
 
+    def store_state(self, thermo):
+        """Stores the energy exchanged by a thermostat instance and, for the
+        GLE thermostats, the additional momenta.
+
+        Args:
+           thermo: A thermostat object, that has already been stored.
+        """
+
+        if type(thermo) in [
+            ethermostats.ThermoGLE,
+            ethermostats.ThermoNMGLE,
+            ethermostats.ThermoNMGLEG,
+        ]:
+            self.s.store(thermo.s)
+        self.ethermo.store(thermo.ethermo)
+
     def fetch(self):
         """Creates a thermostat object.
 
@@ -359,6 +375,19 @@ class InputThermo(InputThermoBase):
         else:
             super(InputThermo, self).store(thermo)
 
+    def store_state(self, thermo):
+        if type(thermo) is ethermostats.MultiThermo:
+            if len(self.extra) != len(thermo.tlist) or 0 in self.extra:
+                self.store(thermo)
+                return
+
+            for ii, t in enumerate(thermo.tlist):
+                self.extra[ii][1].store_state(t)
+
+            self.ethermo.store(thermo.ethermo)
+        else:
+            super(InputThermo, self).store_state(thermo)
+
     def fetch(self):
 
         if self.mode.fetch() == "multi":
@@ -13,14 +13,23 @@ calculation.
 import os
 import socket
 import select
+import selectors
 import time
 import threading
+import queue
+from collections import deque
 
 import numpy as np
 import json
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
 from ipi.utils.messages import verbosity, warning, info
 from ipi.utils.softexit import softexit
+from ipi.utils.timing import timings
 
 
 __all__ = ["InterfaceSocket"]
@@ -31,6 +40,11 @@ UPDATEFREQ = 10
 TIMEOUT = 0.02
 SERVERTIMEOUT = 5.0 * TIMEOUT
 NTIMEOUT = 20
+SHMHDR = 28  # cell (9), inverse cell (9), potential (1) and virial (9)
+STATSWINDOW = 1000  # number of latencies kept to compute percentiles
+MINSAMPLES = 10  # latencies needed before looking for stragglers
+SPEEDMEMORY = 0.2  # weight of the last dispatch in the estimated client speed
+AFFINITY = 1.5  # slowdown accepted to keep a replica on the same client
 
 
 def Message(mystr):
@@ -92,6 +106,138 @@ class Status(object):
     Timeout = 32
 
 
+def request_natoms(r):
+    """Returns the number of active atoms of a request."""
+
+    if isinstance(r["active"], slice):
+        return len(r["pos"][r["active"]]) // 3
+    return len(r["active"]) // 3
+
+
+_claim_lock = threading.Lock()
+
+
+def claim_request(r):
+    """Reserves a running request for the client that has just evaluated it.
+
+    A request that has been sent to a second client (see
+    InterfaceSocket.dispatch_stragglers) can be evaluated by both at the same
+    time, but only the first of them to claim it can set its result. A copy
+    claims the original request, and "claimed" is set to the dictionary
+    (the original or the copy) whose result must be used.
+
+    Args:
+       r: The request, or a copy of it.
+
+    Returns:
+       True if the request was claimed, False if another client was first.
+    """
+
+    orig = r.get("copy_of", r)
+    with _claim_lock:
+        if orig["status"] != "Running" or orig.get("claimed") is not None:
+            return False
+        orig["claimed"] = r
+    return True
+
+
+class ClientStats(object):
+
+    """Keeps statistics on the requests evaluated by a client, or by all the
+    clients of an interface.
+
+    Attributes:
+       latencies: The round-trip times of the most recent dispatches, i.e. the
+          time from sending the positions to having received the forces.
+       ncompleted: The number of requests that have been evaluated.
+       nbytes_sent: The number of bytes sent through the socket.
+       nbytes_recv: The number of bytes received through the socket.
+       tbusy: The total time spent dealing with requests, from the moment
+          they are dispatched to the moment the results are received.
+       tstart: The time at which the statistics started being collected.
+       tperatom: A running average of the time spent per atom dealing with a
+          request, or None if nothing has been evaluated yet.
+       parent: Another ClientStats object (e.g. the one of the interface) to
+          which everything that is recorded is also added.
+    """
+
+    def __init__(self, parent=None):
+        """Initialises ClientStats."""
+
+        self.latencies = deque(maxlen=STATSWINDOW)
+        self.ncompleted = 0
+        self.nbytes_sent = 0
+        self.nbytes_recv = 0
+        self.tbusy = 0.0
+        self.tstart = time.time()
+        self.tperatom = None
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    def record(self, nreq, latency, busy, nsent, nrecv, natoms=0):
+        """Records the evaluation of a batch of requests.
+
+        Args:
+           nreq: The number of requests in the batch.
+           latency: The round-trip time of the batch.
+           busy: The time spent dealing with the batch.
+           nsent: The number of bytes sent since the last record.
+           nrecv: The number of bytes received since the last record.
+           natoms: The total number of atoms in the batch.
+        """
+
+        with self._lock:
+            if natoms > 0:
+                tperatom = busy / natoms
+                if self.tperatom is None:
+                    self.tperatom = tperatom
+                else:
+                    self.tperatom += SPEEDMEMORY * (tperatom - self.tperatom)
+            self.latencies.append(latency)
+            self.ncompleted += nreq
+            self.tbusy += busy
+            self.nbytes_sent += nsent
+            self.nbytes_recv += nrecv
+        if self.parent is not None:
+            self.parent.record(nreq, latency, busy, nsent, nrecv, natoms)
+
+    def latency(self, percentile=50.0):
+        """Returns a percentile of the recent round-trip times, or zero if
+        nothing has been evaluated yet."""
+
+        latencies = list(self.latencies)
+        if len(latencies) == 0:
+            return 0.0
+        return float(np.percentile(latencies, percentile))
+
+    def idle(self):
+        """Returns the fraction of time that was not spent dealing with
+        requests."""
+
+        elapsed = time.time() - self.tstart
+        if elapsed <= 0.0:
+            return 1.0
+        return max(0.0, 1.0 - self.tbusy / elapsed)
+
+    def summary(self):
+        """Returns a dictionary with the statistics."""
+
+        elapsed = time.time() - self.tstart
+        return {
+            "completed": self.ncompleted,
+            "throughput": self.ncompleted / elapsed if elapsed > 0.0 else 0.0,
+            "bytes_sent": self.nbytes_sent,
+            "bytes_recv": self.nbytes_recv,
+            "latency": {
+                "p50": self.latency(50),
+                "p90": self.latency(90),
+                "p99": self.latency(99),
+                "max": self.latency(100),
+            },
+            "idle": self.idle(),
+        }
+
+
 class DriverSocket(socket.socket):
 
     """Deals with communication between the client and driver code.
@@ -103,7 +249,11 @@ class DriverSocket(socket.socket):
     specific needs of i-PI communication pattern.
 
     Attributes:
-       _buf: A string buffer to hold the reply from the other connection.
+       nbytes_sent: The number of bytes sent through the socket.
+       nbytes_recv: The number of bytes received through the socket.
+       _buf: A small buffer to receive scalars from the other connection.
+       _fbuf: A buffer, reused between calls, to receive force arrays that
+          cannot be read directly into their final destination.
     """
 
     def __init__(self, sock):
@@ -117,12 +267,35 @@ class DriverSocket(socket.socket):
             sock.family, sock.type, sock.proto, fileno=socket.dup(sock.fileno())
         )
         self.settimeout(sock.gettimeout())
-        self._buf = np.zeros(0, np.byte)
+        self._buf = np.zeros(8, np.uint8)
+        self._fbuf = np.zeros(0, np.float64)
+        self.nbytes_sent = 0
+        self.nbytes_recv = 0
         if socket:
             self.peername = self.getpeername()
         else:
             self.peername = "no_socket"
 
+    def sendall(self, data):
+        """Sends data through the socket, counting the bytes."""
+
+        super(DriverSocket, self).sendall(data)
+        self.nbytes_sent += memoryview(data).nbytes
+
+    def recv(self, bufsize):
+        """Receives data from the socket, counting the bytes."""
+
+        data = super(DriverSocket, self).recv(bufsize)
+        self.nbytes_recv += len(data)
+        return data
+
+    def recv_into(self, buffer, nbytes=0):
+        """Receives data from the socket into a buffer, counting the bytes."""
+
+        nread = super(DriverSocket, self).recv_into(buffer, nbytes)
+        self.nbytes_recv += nread
+        return nread
+
     def send_msg(self, msg):
         """Send the next message through the socket.
 
@@ -142,35 +315,36 @@ class DriverSocket(socket.socket):
     def recvall(self, dest):
         """Gets the potential energy, force and virial from the driver.
 
+        Data is read directly into the memory of dest with recv_into, so
+        arrays are filled in place without intermediate copies. Scalars are
+        read into a small internal buffer.
+
         Args:
-           dest: Object to be read into.
+           dest: Object to be read into. Must be a numpy scalar or a
+              C-contiguous numpy array.
 
         Raises:
            Disconnected: Raised if client is disconnected.
 
         Returns:
-           The data read from the socket to be read into dest.
+           The data read from the socket to be read into dest. For arrays,
+           this is dest itself.
         """
 
-        blen = dest.itemsize * dest.size
-        if blen > len(self._buf):
-            self._buf.resize(blen)
+        if np.isscalar(dest):
+            target = self._buf[: dest.itemsize]
+        else:
+            target = dest
+        view = memoryview(target).cast("B")
+        blen = len(view)
         bpos = 0
         ntimeout = 0
 
         while bpos < blen:
-            timeout = False
-
-            # pre-2.5 version.
             try:
-                bpart = ""
-                bpart = self.recv(blen - bpos)
-                if len(bpart) == 0:
-                    raise socket.timeout  # if this keeps returning no data, we are in trouble....
-                self._buf[bpos : bpos + len(bpart)] = np.fromstring(bpart, np.byte)
+                bpart = self.recv_into(view[bpos:], blen - bpos)
             except socket.timeout:
                 # warning(" @SOCKET:   Timeout in recvall, trying again!", verbosity.low)
-                timeout = True
                 ntimeout += 1
                 if ntimeout > NTIMEOUT:
                     warning(
@@ -179,29 +353,16 @@ class DriverSocket(socket.socket):
                         verbosity.low,
                     )
                     raise Disconnected()
-                pass
-            if not timeout and len(bpart) == 0:
+                continue
+            if bpart == 0:
+                # the other side has closed the connection
                 raise Disconnected()
-            bpos += len(bpart)
-
-            # post-2.5 version: slightly more compact for modern python versions
-            # try:
-            #   bpart = 1
-            #   bpart = self.recv_into(self._buf[bpos:], blen-bpos)
-            # except socket.timeout:
-            #   print " @SOCKET:   Timeout in status recvall, trying again!"
-            #   timeout = True
-            #   pass
-            # if (not timeout and bpart == 0):
-            #   raise Disconnected()
-            # bpos += bpart
-            # TODO this Disconnected() exception currently just causes the program to hang.
-            # This should do something more graceful
+            bpos += bpart
 
         if np.isscalar(dest):
-            return np.fromstring(self._buf[0:blen], dest.dtype)[0]
+            return np.frombuffer(target, dest.dtype)[0]
         else:
-            return np.fromstring(self._buf[0:blen], dest.dtype).reshape(dest.shape)
+            return dest
 
 
 class Driver(DriverSocket):
@@ -217,13 +378,23 @@ class Driver(DriverSocket):
        status: Keeps track of the status of the driver.
        lastreq: The ID of the last request processed by the client.
        locked: Flag to mark if the client has been working consistently on one image.
+       batch: Flag to mark if the client has declared (by replying READYBATCH
+          to a status query) that it can evaluate several configurations
+          sent in a single POSDATABATCH message.
+       jobq: The queue of requests waiting to be dispatched by the worker.
+       worker: A persistent thread that takes care of all the communication
+          related to the requests put in jobq.
+       busy: Flag to mark if the worker is dealing with a list of requests.
+       stats: A ClientStats object with the statistics of the client.
     """
 
-    def __init__(self, sock):
+    def __init__(self, sock, stats=None):
         """Initialises Driver.
 
         Args:
            socket: A socket through which the communication should be done.
+           stats: An optional ClientStats object to which the statistics of
+              this client are also added, e.g. those of the whole interface.
         """
 
         super(Driver, self).__init__(sock)
@@ -231,7 +402,14 @@ class Driver(DriverSocket):
         self.status = Status.Up
         self.lastreq = None
         self.locked = False
+        self.batch = False
         self.exit_on_disconnect = False
+        self.jobq = queue.Queue()
+        self.worker = None
+        self.busy = False
+        self.stats = ClientStats(parent=stats)
+        self._nbytes = [0, 0]
+        self._notify = None
 
     def shutdown(self, how=socket.SHUT_RDWR):
         """Tries to send an exit message to clients to let them exit gracefully."""
@@ -284,6 +462,9 @@ class Driver(DriverSocket):
             return Status.Disconnected
         elif reply == Message("ready"):
             return Status.Up | Status.Ready
+        elif reply == Message("readybatch"):
+            self.batch = True
+            return Status.Up | Status.Ready
         elif reply == Message("needinit"):
             return Status.Up | Status.NeedsInit
         elif reply == Message("havedata"):
@@ -351,9 +532,48 @@ class Driver(DriverSocket):
         else:
             raise InvalidStatus("Status in sendpos was " + self.status)
 
-    def getforce(self):
+    def sendpos_batch(self, rids, poslist, h_ihlist):
+        """Sends the positions and cells of several configurations to the
+        driver, with a single POSDATABATCH message.
+
+        The message contains the number of configurations, and then for each
+        of them the request id, the cell, the inverse cell, the number of atoms
+        and the positions, in the same format used by POSDATA.
+
+        Args:
+           rids: A list with the ids of the requests.
+           poslist: A list of arrays containing the atom positions.
+           h_ihlist: A list of (cell, inverse cell) tuples.
+
+        Raises:
+           InvalidStatus: Raised if the status is not Ready.
+        """
+
+        if self.status & Status.Ready:
+            msg = [Message("posdatabatch"), np.int32(len(poslist)).tobytes()]
+            for rid, pos, h_ih in zip(rids, poslist, h_ihlist):
+                msg.append(np.int32(rid).tobytes())
+                msg.append(h_ih[0].tobytes())
+                msg.append(h_ih[1].tobytes())
+                msg.append(np.int32(len(pos) // 3).tobytes())
+                msg.append(pos.tobytes())
+            try:
+                self.sendall(b"".join(msg))
+                self.status = Status.Up | Status.Busy
+            except:
+                print("Error in sendall, resetting status")
+                self.get_status()
+                return
+        else:
+            raise InvalidStatus("Status in sendpos_batch was " + self.status)
+
+    def getforce(self, dest=None):
         """Gets the potential energy, force and virial from the driver.
 
+        Args:
+           dest: An optional array into which the forces are read, if it has
+              the right size.
+
         Raises:
            InvalidStatus: Raised if the status is not HasData.
            Disconnected: Raised if the driver has disconnected.
@@ -362,6 +582,46 @@ class Driver(DriverSocket):
            A list of the form [potential, force, virial, extra].
         """
 
+        self._waitforce()
+        return self._recvforce(dest)
+
+    def getforce_batch(self, nconf, dests=None):
+        """Gets the potential energies, forces and virials of several
+        configurations from the driver. The client replies with a single
+        FORCEREADY, followed by the results for each configuration in the
+        same format used for a single one, and in the order in which they
+        were sent by sendpos_batch.
+
+        Args:
+           nconf: The number of configurations that have been sent.
+           dests: An optional list of nconf arrays (or None) into which the
+              forces are read.
+
+        Returns:
+           A list of nconf lists of the form [potential, force, virial, extra].
+        """
+
+        if dests is None:
+            dests = [None] * nconf
+        self._waitforce()
+        results = []
+        for dest in dests:
+            result = self._recvforce(dest)
+            if result[1] is not dest:
+                # the internal buffer is reused for the next configuration
+                result[1] = result[1].copy()
+            results.append(result)
+        return results
+
+    def _waitforce(self):
+        """Asks the driver for the results, and waits until it is ready to
+        send them.
+
+        Raises:
+           InvalidStatus: Raised if the status is not HasData.
+           Disconnected: Raised if the driver has disconnected.
+        """
+
         if self.status & Status.HasData:
             self.sendall(Message("getforce"))
             reply = ""
@@ -391,26 +651,56 @@ class Driver(DriverSocket):
         else:
             raise InvalidStatus("Status in getforce was " + str(self.status))
 
+    def _recvforce(self, dest=None):
+        """Reads the potential energy, force, virial and extra string for one
+        configuration from the socket.
+
+        Args:
+           dest: An optional array into which the forces are read, if it has
+              the right size. Otherwise forces are read into an internal
+              buffer, and the array that is returned is only valid until
+              the next call.
+
+        Returns:
+           A list of the form [potential, force, virial, extra].
+        """
+
         mu = np.float64()
         mu = self.recvall(mu)
 
         mlen = np.int32()
         mlen = self.recvall(mlen)
-        mf = np.zeros(3 * mlen, np.float64)
+        if dest is not None and len(dest) == 3 * mlen:
+            mf = dest
+        else:
+            if len(self._fbuf) < 3 * mlen:
+                self._fbuf = np.zeros(3 * mlen, np.float64)
+            mf = self._fbuf[: 3 * mlen]
         mf = self.recvall(mf)
 
         mvir = np.zeros((3, 3), np.float64)
         mvir = self.recvall(mvir)
 
+        return [mu, mf, mvir, self._recvextra()]
+
+    def _recvextra(self):
+        """Reads the "extra" string that follows the results of a configuration,
+        and converts it to a dictionary.
+
+        Returns:
+           The decoded JSON dictionary or, if the string is not valid JSON, a
+           dictionary of the form {"info": string}.
+        """
+
         # Machinery to return a string as an "extra" field.
         # Comment if you are using a ancient patched driver that does not return anything!
         # Actually, you should really update your driver, you're like half a decade behind.
         mlen = np.int32()
         mlen = self.recvall(mlen)
         if mlen > 0:
-            mxtra = np.zeros(mlen, np.character)
+            mxtra = np.zeros(mlen, np.uint8)
             mxtra = self.recvall(mxtra)
-            mxtra = bytearray(mxtra).decode("utf-8")
+            mxtra = mxtra.tobytes().decode("utf-8")
         else:
             mxtra = ""
         mxtradict = {}
@@ -422,7 +712,7 @@ class Driver(DriverSocket):
                 mxtradict["info"] = mxtra
                 info("mxtradict traditional string has been loaded.", verbosity.debug)
 
-        return [mu, mf, mvir, mxtradict]
+        return mxtradict
 
     def dispatch(self, r):
         """Dispatches a request r and looks after it setting results
@@ -431,6 +721,15 @@ class Driver(DriverSocket):
         the request.
         """
 
+        self.dispatch_batch([r])
+
+    def dispatch_batch(self, rlist):
+        """Dispatches a list of requests and looks after them, setting the
+        results once they have been evaluated. If there is more than one
+        request, the positions are sent with a single POSDATABATCH message,
+        so this should only be done if the client has declared it supports it.
+        """
+
         if not self.status & Status.Up:
             warning(
                 " @SOCKET:   Inconsistent client state in dispatch thread! (I)",
@@ -438,11 +737,13 @@ class Driver(DriverSocket):
             )
             return
 
-        r["t_dispatched"] = time.time()
+        t = time.time()
+        for r in rlist:
+            r["t_dispatched"] = t
 
         self.get_status()
         if self.status & Status.NeedsInit:
-            self.initialize(r["id"], r["pars"])
+            self.initialize(rlist[0]["id"], rlist[0]["pars"])
             self.status = self.get_status()
 
         if not (self.status & Status.Ready):
@@ -452,8 +753,17 @@ class Driver(DriverSocket):
             )
             return
 
-        r["start"] = time.time()
-        self.sendpos(r["pos"][r["active"]], r["cell"])
+        t = time.time()
+        for r in rlist:
+            r["start"] = t
+        if len(rlist) == 1:
+            self.sendpos(rlist[0]["pos"][rlist[0]["active"]], rlist[0]["cell"])
+        else:
+            self.sendpos_batch(
+                [r["id"] for r in rlist],
+                [r["pos"][r["active"]] for r in rlist],
+                [r["cell"] for r in rlist],
+            )
 
         self.get_status()
         if not (self.status & Status.HasData):
@@ -463,27 +773,383 @@ class Driver(DriverSocket):
             )
             return
 
+        # if the whole system is active forces are read directly into the
+        # final array, otherwise they are read in a buffer and then scattered
+        dests = [
+            np.zeros(len(r["pos"]), np.float64)
+            if isinstance(r["active"], slice)
+            else None
+            for r in rlist
+        ]
         try:
-            r["result"] = self.getforce()
+            if len(rlist) == 1:
+                results = [self.getforce(dests[0])]
+            else:
+                results = self.getforce_batch(len(rlist), dests)
         except Disconnected:
             self.status = Status.Disconnected
             return
 
-        if len(r["result"][1]) != len(r["pos"][r["active"]]):
-            raise InvalidSize
+        t = time.time()
+        self.stats.record(
+            len(rlist),
+            t - rlist[0]["start"],
+            t - rlist[0]["t_dispatched"],
+            self.nbytes_sent - self._nbytes[0],
+            self.nbytes_recv - self._nbytes[1],
+            sum(request_natoms(r) for r in rlist),
+        )
+        self._nbytes = [self.nbytes_sent, self.nbytes_recv]
 
-        # If only a piece of the system is active, resize forces and reassign
-        rftemp = r["result"][1]
-        r["result"][1] = np.zeros(len(r["pos"]), dtype=np.float64)
-        r["result"][1][r["active"]] = rftemp
-        r["t_finished"] = time.time()
-        self.lastreq = r["id"]  #
+        # a request may also have been evaluated by another client (see
+        # InterfaceSocket.redispatch): the first one to claim it wins
+        claimed = [claim_request(r) for r in rlist]
+        for r, result, dest, claim in zip(rlist, results, dests, claimed):
+            if not claim:
+                continue
+            if len(result[1]) != len(r["pos"][r["active"]]):
+                raise InvalidSize
+
+            # If only a piece of the system is active, resize forces and reassign
+            if result[1] is not dest:
+                rftemp = result[1]
+                result[1] = np.zeros(len(r["pos"]), dtype=np.float64)
+                result[1][r["active"]] = rftemp
+            r["result"] = result
+            r["t_finished"] = t
+        self.lastreq = rlist[-1]["id"]
 
         # updates the status of the client before leaving
         self.get_status()
 
-        # marks the request as done as the very last thing
-        r["status"] = "Done"
+        # marks the requests as done as the very last thing. a copy is
+        # marked as done even if it was not claimed, so that it is cleared
+        for r, claim in zip(rlist, claimed):
+            if claim or "copy_of" in r:
+                r["status"] = "Done"
+
+    def start_worker(self, notify=None):
+        """Starts the thread that dispatches the requests submitted to the
+        client. The thread lives as long as the client is connected, so there
+        is no need to create a new thread for each request.
+
+        Args:
+           notify: A function that is called every time a request has
+              been dealt with.
+        """
+
+        self._notify = notify
+        self.worker = threading.Thread(target=self._work, name="DISPATCH")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def stop_worker(self, timeout=None):
+        """Asks the worker thread to finish, and waits for it.
+
+        Args:
+           timeout: The maximum number of seconds to wait for the thread.
+        """
+
+        if self.worker is not None:
+            self.jobq.put(None)
+            self.worker.join(timeout)
+
+    def submit(self, rlist):
+        """Queues a list of requests, that will be dispatched together by the
+        worker thread."""
+
+        self.jobq.put(rlist)
+
+    def _work(self):
+        """Main loop of the worker thread. Dispatches lists of requests one at
+        a time, until it finds None in the queue."""
+
+        while True:
+            rlist = self.jobq.get()
+            if rlist is None:
+                break
+            self.busy = True
+            try:
+                self.dispatch_batch(rlist)
+            except Exception as e:
+                warning(
+                    " @SOCKET:   Error while dispatching to client "
+                    + str(self.peername)
+                    + ": "
+                    + repr(e)
+                    + ". Will disconnect it.",
+                    verbosity.low,
+                )
+                self.status = Status.Disconnected
+            self.busy = False
+            if self._notify is not None:
+                self._notify()
+
+
+class ShmDriver(Driver):
+
+    """Deals with communication with a driver running on the same node,
+    exchanging the positions and the results through shared memory.
+
+    The socket is only used for control messages, following the same pattern
+    as for a standard driver. Before the first configuration is sent, and
+    whenever a larger one is sent, i-PI creates a shared memory segment and
+    sends its name and size to the client with a SHMINIT message. The segment
+    holds an array of float64 containing the cell, the inverse cell, the
+    potential, the virial, the positions and the forces, in this order.
+    POSDATASHM is only followed by the number of atoms, and FORCEREADY by the
+    number of atoms and the extra string, while the actual data is written
+    to and read from the segment.
+
+    Attributes:
+       shm: The shared memory segment, or None if it has not been created yet.
+       shmdata: An array wrapping the content of the segment.
+    """
+
+    def __init__(self, sock, stats=None):
+        """Initialises ShmDriver.
+
+        Args:
+           socket: A socket through which the control messages are exchanged.
+           stats: An optional ClientStats object to which the statistics of
+              this client are also added.
+        """
+
+        super(ShmDriver, self).__init__(sock, stats)
+        self.shm = None
+        self.shmdata = np.zeros(0, np.float64)
+
+    def close(self):
+        """Closes the socket and removes the shared memory segment."""
+
+        super(ShmDriver, self).close()
+        self.shm_release()
+
+    def _getstatus(self):
+        """Gets driver status. Batches of configurations cannot be sent
+        through shared memory, so READYBATCH is treated as READY."""
+
+        status = super(ShmDriver, self)._getstatus()
+        self.batch = False
+        return status
+
+    def shm_setup(self, natoms):
+        """Makes sure that the shared memory segment can hold a configuration
+        with natoms atoms. If needed, creates a new segment and sends its
+        name to the client.
+
+        Args:
+           natoms: The number of atoms of the configuration.
+        """
+
+        size = SHMHDR + 6 * natoms
+        if len(self.shmdata) >= size:
+            return
+
+        self.shm_release()
+        self.shm = shared_memory.SharedMemory(create=True, size=8 * size)
+        self.shmdata = np.ndarray(size, np.float64, buffer=self.shm.buf)
+        name = self.shm.name.encode()
+        self.sendall(
+            b"".join(
+                [
+                    Message("shminit"),
+                    np.int32(len(name)).tobytes(),
+                    name,
+                    np.int32(natoms).tobytes(),
+                ]
+            )
+        )
+        info(
+            " @SOCKET:   Created shared memory segment %s for client %s"
+            % (self.shm.name, str(self.peername)),
+            verbosity.medium,
+        )
+
+    def shm_release(self):
+        """Detaches from the shared memory segment and removes it."""
+
+        if self.shm is None:
+            return
+
+        self.shmdata = np.zeros(0, np.float64)
+        try:
+            self.shm.close()
+        except BufferError:
+            # an array still refers to the segment: it will be unmapped
+            # when it gets garbage collected
+            pass
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+    def sendpos(self, pos, h_ih):
+        """Writes the position and cell data to the shared memory segment,
+        and tells the driver they are ready.
+
+        Args:
+           pos: An array containing the atom positions.
+           cell: A cell object giving the system box.
+
+        Raises:
+           InvalidStatus: Raised if the status is not Ready.
+        """
+
+        if self.status & Status.Ready:
+            try:
+                natoms = len(pos) // 3
+                self.shm_setup(natoms)
+                self.shmdata[0:9] = h_ih[0].reshape(9)
+                self.shmdata[9:18] = h_ih[1].reshape(9)
+                self.shmdata[SHMHDR : SHMHDR + 3 * natoms] = pos
+                self.sendall(Message("posdatashm") + np.int32(natoms).tobytes())
+                self.status = Status.Up | Status.Busy
+            except:
+                print("Error in sendall, resetting status")
+                self.get_status()
+                return
+        else:
+            raise InvalidStatus("Status in sendpos was " + self.status)
+
+    def _recvforce(self, dest=None):
+        """Reads the potential energy, force and virial for one configuration
+        from the shared memory segment, and the extra string from the socket.
+
+        Args:
+           dest: An optional array into which the forces are copied, if it has
+              the right size. Otherwise the array that is returned points to
+              the shared memory segment, and is only valid until the next call.
+
+        Raises:
+           InvalidSize: Raised if the number of atoms does not fit the segment.
+
+        Returns:
+           A list of the form [potential, force, virial, extra].
+        """
+
+        mlen = np.int32()
+        mlen = self.recvall(mlen)
+        if SHMHDR + 6 * mlen > len(self.shmdata):
+            raise InvalidSize
+
+        mu = self.shmdata[18]
+        mvir = self.shmdata[19:SHMHDR].reshape((3, 3)).copy()
+        mf = self.shmdata[SHMHDR + 3 * mlen : SHMHDR + 6 * mlen]
+        if dest is not None and len(dest) == 3 * mlen:
+            dest[:] = mf
+            mf = dest
+
+        return [mu, mf, mvir, self._recvextra()]
+
+
+class CostScheduler(object):
+
+    """Assigns the pending requests of an interface to its free clients,
+    using the speed of each client measured on the previous requests.
+
+    The requests are taken from the most to the least expensive (the cost of
+    a request is its number of active atoms), and each one is given to the
+    free client that is expected to finish it first, unless the client that
+    evaluated the same replica last time is free and at most AFFINITY times
+    slower, so that it can reuse e.g. its wavefunction. A request is held
+    back if a busy client is expected to become free and finish it earlier
+    than any of the free clients, so that slow clients do not keep the fast
+    ones waiting at the end of a step.
+
+    Clients that accept batches get an even share of the pending requests,
+    as in the other matching modes.
+    """
+
+    def estimate(self, iface, c, natoms):
+        """Returns the expected round-trip time of a request with natoms atoms
+        on client c, or None if the speed of the clients is not known yet.
+        Clients that have not evaluated anything yet are assumed to be as fast
+        as the average."""
+
+        tperatom = c.stats.tperatom
+        if tperatom is None:
+            tperatom = iface.stats.tperatom
+        if tperatom is None:
+            return None
+        return tperatom * natoms
+
+    def distribute(self, iface, freec):
+        """Dispatches the pending requests of an interface.
+
+        Args:
+           iface: The InterfaceSocket object.
+           freec: The list of free clients. The clients that get a request
+              are removed from it.
+
+        Returns:
+           The number of clients that got a request.
+        """
+
+        pending = [r for r in iface.requests if r["status"] == "Queued"]
+        availc = [fc for fc in freec if iface.client_free(fc)]
+        if len(pending) == 0 or len(availc) == 0:
+            return 0
+        natoms = {id(r): request_natoms(r) for r in pending}
+        pending.sort(key=lambda r: -natoms[id(r)])
+
+        # when each of the busy clients is expected to be done
+        now = time.time()
+        tstart = {}
+        work = {}
+        for [r, c] in iface.jobs.values():
+            start = r["start"] if r["start"] > 0 else now
+            tstart[c] = min(tstart.get(c, start), start)
+            work[c] = work.get(c, 0) + request_natoms(r)
+        tfree = {}
+        for c in work:
+            t = self.estimate(iface, c, work[c])
+            if t is not None:
+                tfree[c] = max(now, tstart[c] + t)
+
+        ndispatch = 0
+        while len(pending) > 0 and len(availc) > 0:
+            r = pending.pop(0)
+            n = natoms[id(r)]
+
+            # the free client that would be done first
+            best, tbest = availc[0], None
+            for fc in availc:
+                t = self.estimate(iface, fc, n)
+                if t is not None and (tbest is None or t < tbest):
+                    best, tbest = fc, t
+
+            # keeps the replica on the same client, if it is not much slower
+            for fc in availc:
+                if fc.lastreq == r["id"]:
+                    t = self.estimate(iface, fc, n)
+                    if tbest is None or (t is not None and t <= AFFINITY * tbest):
+                        best, tbest = fc, t
+                    break
+
+            # waits for a busy client, if it would be done earlier
+            if tbest is not None and len(tfree) > 0:
+                c = min(tfree, key=lambda c: tfree[c] + self.estimate(iface, c, n))
+                tbusy = tfree[c] + self.estimate(iface, c, n)
+                if tbusy < now + tbest:
+                    tfree[c] = tbusy
+                    continue
+
+            rlist = [r]
+            if best.batch:
+                nbatch = len(pending) // len(availc) + 1
+                rlist += pending[: nbatch - 1]
+                del pending[: nbatch - 1]
+            iface.assign(best, rlist, "cost")
+            availc.remove(best)
+            freec.remove(best)
+            ndispatch += 1
+            if tbest is not None:
+                tfree[best] = now + self.estimate(
+                    iface, best, sum(natoms[id(r)] for r in rlist)
+                )
+        return ndispatch
 
 
 class InterfaceSocket(object):
@@ -499,15 +1165,38 @@ class InterfaceSocket(object):
        address: A string giving the name of the host network.
        port: An integer giving the port the socket will be using.
        slots: An integer giving the maximum allowed backlog of queued clients.
-       mode: A string giving the type of socket used.
+       mode: A string giving the type of socket used. In 'shm' mode a unix
+          socket is used for control messages, and the data is exchanged
+          through shared memory (see ShmDriver).
        latency: A float giving the number of seconds the interface will wait
           before updating the client list.
        timeout: A float giving a timeout limit for considering a calculation dead
           and dropping the connection.
+       match_mode: A string giving how requests are matched to clients:
+          'auto' tries to keep each replica on the same client, 'any' sends
+          requests to any free client, and 'cost' uses a CostScheduler.
+       scheduler: The CostScheduler used in 'cost' mode, or None.
        server: The socket used for data transmission.
        clients: A list of the driver clients connected to the server.
        requests: A list of all the jobs required in the current PIMD step.
-       jobs: A list of all the jobs currently running.
+       jobs: A dictionary of all the jobs currently running, of the form
+          {id(request): [request, client]}.
+       stats: A ClientStats object with the statistics of all the clients
+          that have been connected to the interface.
+       status_file: The name of a file where the statistics of the clients
+          are written periodically, in JSON format, or '' to write nothing.
+       status_period: The number of seconds between two updates of
+          status_file.
+       redispatch: If positive, a request that has been running for more
+          than redispatch times the median round-trip time is sent also to
+          a free client, and the first result that comes back is used.
+       stragglers: A list of [request, client] pairs for requests that have
+          been evaluated by another client, while their original client is
+          still working on them.
+       _selector: A selector watching the server socket and the wake-up
+          socket, used to block the polling loop until something happens.
+       _wakeup_pair: A pair of connected sockets; writing to the second
+          wakes up whoever is waiting on the selector.
        _poll_thread: The thread the poll loop is running on.
        _prev_kill: Holds the signals to be sent to clean up the main thread
           when a kill signal is sent.
@@ -527,6 +1216,9 @@ class InterfaceSocket(object):
         timeout=1.0,
         match_mode="auto",
         exit_on_disconnect=False,
+        status_file="",
+        status_period=10.0,
+        redispatch=0.0,
     ):
         """Initialises interface.
 
@@ -536,14 +1228,24 @@ class InterfaceSocket(object):
            port: An optional integer giving the port number. Defaults to 31415.
            slots: An optional integer giving the maximum allowed backlog of
               queueing clients. Defaults to 4.
-           mode: An optional string giving the type of socket. Defaults to 'unix'.
+           mode: An optional string giving the type of socket ('unix', 'inet'
+              or 'shm'). Defaults to 'unix'.
            latency: An optional float giving the time in seconds the socket will
               wait before updating the client list. Defaults to 1e-3.
            timeout: Length of time waiting for data from a client before we assume
               the connection is dead and disconnect the client.
+           match_mode: How requests are matched to clients ('auto', 'any'
+              or 'cost'). Defaults to 'auto'.
+           status_file: The name of a file where the statistics of the
+              clients are written periodically. Defaults to '', no file.
+           status_period: The number of seconds between two updates of
+              the status file. Defaults to 10.
+           redispatch: The multiple of the median round-trip time after
+              which a request is also sent to a free client. Defaults to 0,
+              i.e. requests are never sent twice.
 
         Raises:
-           NameError: Raised if mode is not 'unix' or 'inet'.
+           NameError: Raised if mode is not 'unix', 'inet' or 'shm'.
         """
 
         self.address = address
@@ -554,8 +1256,15 @@ class InterfaceSocket(object):
         self.poll_iter = UPDATEFREQ  # triggers pool_update at first poll
         self.prlist = []  # list of pending requests
         self.match_mode = match_mode  # heuristics to match jobs and active clients
+        if match_mode == "cost":
+            self.scheduler = CostScheduler()
+        else:
+            self.scheduler = None
         self.requests = None  # these will be linked to the request list of the FFSocket object using the interface
         self.exit_on_disconnect = exit_on_disconnect
+        self.status_file = status_file
+        self.status_period = status_period
+        self.redispatch = redispatch
 
     def open(self):
         """Creates a new socket.
@@ -564,7 +1273,13 @@ class InterfaceSocket(object):
         create the associated socket object.
         """
 
-        if self.mode == "unix":
+        if self.mode == "shm" and shared_memory is None:
+            raise RuntimeError(
+                "Communication through shared memory requires python >= 3.8"
+            )
+
+        if self.mode == "unix" or self.mode == "shm":
+            # in shm mode the unix socket only carries control messages
             self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             try:
                 self.server.bind("/tmp/ipi_" + self.address)
@@ -593,15 +1308,27 @@ class InterfaceSocket(object):
             raise NameError(
                 "InterfaceSocket mode "
                 + self.mode
-                + " is not implemented (should be unix/inet)"
+                + " is not implemented (should be unix/inet/shm)"
             )
 
         self.server.listen(self.slots)
         self.server.settimeout(SERVERTIMEOUT)
 
+        # the selector allows to wait for new connections or for a wake-up
+        # call (new requests, finished jobs) rather than sleeping blindly
+        self._wakeup_pair = socket.socketpair()
+        for s in self._wakeup_pair:
+            s.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.server, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_pair[0], selectors.EVENT_READ)
+
         # these are the two main objects the socket interface should worry about and manage
         self.clients = []  # list of active clients (working or ready to compute)
-        self.jobs = []  # list of jobs
+        self.jobs = {}  # running jobs, indexed by the id of the request
+        self.stragglers = []  # clients still working on requests done by others
+        self.stats = ClientStats()
+        self._tstatus = time.time()
 
     def close(self):
         """Closes down the socket."""
@@ -614,10 +1341,15 @@ class InterfaceSocket(object):
                 c.close()
             except:
                 pass
+            c.stop_worker(0.1)
+
+        if self.status_file:
+            self.write_status()
 
         # flush it all down the drain
         self.clients = []
-        self.jobs = []
+        self.jobs = {}
+        self.stragglers = []
 
         try:
             self.server.shutdown(socket.SHUT_RDWR)
@@ -627,9 +1359,43 @@ class InterfaceSocket(object):
                 " @SOCKET: Problem shutting down the server socket. Will just continue and hope for the best.",
                 verbosity.low,
             )
-        if self.mode == "unix":
+        if self.mode == "unix" or self.mode == "shm":
             os.unlink("/tmp/ipi_" + self.address)
 
+        self._selector.close()
+        for s in self._wakeup_pair:
+            s.close()
+
+    def wait(self, timeout):
+        """Blocks until a new client tries to connect, someone calls wakeup(),
+        or timeout seconds have passed.
+
+        Args:
+           timeout: The maximum number of seconds to wait.
+        """
+
+        for key, mask in self._selector.select(timeout):
+            if key.fileobj is self.server:
+                # a client is knocking: accept it right away
+                self.poll_iter = 0
+                self.pool_update()
+            else:
+                try:
+                    while self._wakeup_pair[0].recv(1024):
+                        pass
+                except (BlockingIOError, socket.error):
+                    pass
+
+    def wakeup(self):
+        """Wakes up the thread that is waiting on the interface (if any)."""
+
+        try:
+            self._wakeup_pair[1].send(b"\0")
+        except (BlockingIOError, socket.error):
+            # either the buffer is full, and so a wake-up is pending anyway,
+            # or the interface has been closed
+            pass
+
     def poll(self):
         """Called in the main thread loop.
 
@@ -650,6 +1416,54 @@ class InterfaceSocket(object):
         self.poll_iter += 1
         self.pool_distribute()
 
+        if self.status_file and time.time() - self._tstatus > self.status_period:
+            self.write_status()
+
+    def telemetry(self):
+        """Returns a dictionary with the statistics of the interface as a
+        whole, and of each of the clients that are connected. The idle
+        fraction of the interface is the average over the clients."""
+
+        clients = []
+        for i, c in enumerate(self.clients):
+            summary = c.stats.summary()
+            summary["index"] = i
+            summary["peername"] = str(c.peername)
+            clients.append(summary)
+
+        total = self.stats.summary()
+        if len(clients) > 0:
+            total["idle"] = float(np.mean([c["idle"] for c in clients]))
+        total["clients"] = len(clients)
+        total["running"] = len(self.jobs)
+        return {"interface": total, "clients": clients}
+
+    def client_stats(self, index=-1):
+        """Returns the ClientStats of a client, or those of the whole
+        interface if index is negative."""
+
+        if index < 0:
+            return self.stats
+        return self.clients[index].stats
+
+    def write_status(self):
+        """Rewrites the status file with the current statistics. The file is
+        replaced in one go, so that it can be read at any time."""
+
+        status = self.telemetry()
+        status["time"] = time.strftime("%y/%m/%d-%H:%M:%S")
+        status["address"] = self.address
+        try:
+            with open(self.status_file + ".tmp", "w") as f:
+                json.dump(status, f, indent=1)
+            os.replace(self.status_file + ".tmp", self.status_file)
+        except OSError as e:
+            warning(
+                " @SOCKET:   Could not write the status file: " + str(e),
+                verbosity.low,
+            )
+        self._tstatus = time.time()
+
     def pool_update(self):
         """Deals with keeping the pool of client drivers up-to-date during a
         force calculation step.
@@ -675,17 +1489,12 @@ class InterfaceSocket(object):
                     pass
                 c.status = Status.Disconnected
                 self.clients.remove(c)
+                c.stop_worker(2)
                 # requeue jobs that have been left hanging
-                for [k, j, tc] in self.jobs[:]:
-                    if tc.is_alive():
-                        tc.join(2)
+                for jid, [k, j] in list(self.jobs.items()):
                     if j is c:
-                        self.jobs = [
-                            w for w in self.jobs if not (w[0] is k and w[1] is j)
-                        ]  # removes pair in a robust way
-
-                        k["status"] = "Queued"
-                        k["start"] = -1
+                        del self.jobs[jid]
+                        self.requeue(k)
 
         if len(self.clients) == 0:
             searchtimeout = SERVERTIMEOUT
@@ -700,7 +1509,10 @@ class InterfaceSocket(object):
             if self.server in readable:
                 client, address = self.server.accept()
                 client.settimeout(TIMEOUT)
-                driver = Driver(client)
+                if self.mode == "shm":
+                    driver = ShmDriver(client, self.stats)
+                else:
+                    driver = Driver(client, self.stats)
                 info(
                     " @SOCKET:   Client asked for connection from "
                     + str(address)
@@ -710,6 +1522,7 @@ class InterfaceSocket(object):
                 driver.get_status()
                 if driver.status | Status.Up:
                     driver.exit_on_disconnect = self.exit_on_disconnect
+                    driver.start_worker(notify=self.wakeup)
                     self.clients.append(driver)
                     info(
                         " @SOCKET:   Handshaking was successful. Added to the client list.",
@@ -737,39 +1550,25 @@ class InterfaceSocket(object):
         clients.
         """
 
-        ttotal = tdispatch = tcheck = 0
-        ttotal -= time.time()
-
         # get clients that are still free
-        freec = self.clients[:]
-        for [r2, c, ct] in self.jobs:
-            freec.remove(c)
-
-        # fills up list of pending requests if empty, or if clients are abundant
-        if len(self.prlist) == 0 or len(freec) > len(self.prlist):
-            self.prlist = [r for r in self.requests if r["status"] == "Queued"]
-
-        if self.match_mode == "auto":
-            match_seq = ["match", "none", "free", "any"]
-        elif self.match_mode == "any":
-            match_seq = ["any"]
+        self.stragglers = [
+            [r, c] for [r, c] in self.stragglers if c.busy and c.status & Status.Up
+        ]
+        busyc = set(c for [r2, c] in self.jobs.values())
+        busyc.update(c for [r2, c] in self.stragglers)
+        freec = [c for c in self.clients if c not in busyc]
 
         # first: dispatches jobs to free clients (if any!)
-        # tries first to match previous replica<>driver association, then to get new clients, and only finally send the a new replica to old drivers
         ndispatch = 0
-        tdispatch -= time.time()
-        while len(freec) > 0 and len(self.prlist) > 0:
-            for match_ids in match_seq:
-                for fc in freec[:]:
-                    if self.dispatch_free_client(fc, match_ids):
-                        freec.remove(fc)
-                        ndispatch += 1
-
-                    if len(self.prlist) == 0:
-                        break
-            if len(freec) > 0:
-                self.prlist = [r for r in self.requests if r["status"] == "Queued"]
-        tdispatch += time.time()
+        tdispatch = -time.perf_counter()
+        if self.scheduler is not None:
+            ndispatch += self.scheduler.distribute(self, freec)
+        else:
+            ndispatch += self.match_distribute(freec)
+        if self.redispatch > 0 and len(freec) > 0 and len(self.jobs) > 0:
+            ndispatch += self.dispatch_stragglers(freec)
+        if ndispatch > 0:
+            timings.add("dispatch", tdispatch + time.perf_counter())
 
         # now check for client status
         if len(self.jobs) == 0:
@@ -783,29 +1582,93 @@ class InterfaceSocket(object):
         # check for finished jobs
         nchecked = 0
         nfinished = 0
-        tcheck -= time.time()
-        for [r, c, ct] in self.jobs[:]:
-            chk = self.check_job_finished(r, c, ct)
+        tcheck = -time.perf_counter()
+        for [r, c] in list(self.jobs.values()):
+            if id(r) not in self.jobs:
+                continue  # has just been evaluated by another client
+            chk = self.check_job_finished(r, c)
             if chk == 1:
                 nfinished += 1
             elif chk == 0:
                 self.poll_iter = UPDATEFREQ  # client disconnected. force a pool_update
             nchecked += 1
-        tcheck += time.time()
-
-        ttotal += time.time()
-        # info("POLL TOTAL: %10.4f  Dispatch(N,t):  %4i, %10.4f   Check(N,t):   %4i, %10.4f" % (ttotal, ndispatch, tdispatch, nchecked, tcheck), verbosity.debug)
+        if nchecked > 0:
+            timings.add("poll", tcheck + time.perf_counter())
 
         if nfinished > 0:
             # don't wait, just try again to distribute
             self.pool_distribute()
 
-    def dispatch_free_client(self, fc, match_ids="any", send_threads=[]):
+    def match_distribute(self, freec):
+        """Dispatches the pending requests to the free clients, trying first
+        to match previous replica<>driver association, then to get new
+        clients, and only finally send the a new replica to old drivers.
+
+        Args:
+           freec: The list of free clients. The clients that get a request
+              are removed from it.
+
+        Returns:
+           The number of clients that got a request.
         """
-        Tries to find a request to match a free client.
+
+        # fills up list of pending requests if empty, or if clients are abundant
+        if len(self.prlist) == 0 or len(freec) > len(self.prlist):
+            self.prlist = [r for r in self.requests if r["status"] == "Queued"]
+
+        if self.match_mode == "auto":
+            match_seq = ["match", "none", "free", "any"]
+        elif self.match_mode == "any":
+            match_seq = ["any"]
+
+        ndispatch = 0
+        while len(freec) > 0 and len(self.prlist) > 0:
+            # clients that accept batches get an even share of the pending requests
+            nbatch = (len(self.prlist) - 1) // len(freec) + 1
+            for match_ids in match_seq:
+                for fc in freec[:]:
+                    if self.dispatch_free_client(fc, match_ids, nbatch=nbatch):
+                        freec.remove(fc)
+                        ndispatch += 1
+
+                    if len(self.prlist) == 0:
+                        break
+            if len(freec) > 0:
+                self.prlist = [r for r in self.requests if r["status"] == "Queued"]
+        return ndispatch
+
+    def dispatch_free_client(self, fc, match_ids="any", send_threads=[], nbatch=1):
+        """
+        Tries to find a request to match a free client. If the client accepts
+        batches of configurations, up to nbatch pending requests are sent to it
+        in one go.
         """
 
         # first, makes sure that the client is REALLY free
+        if not self.client_free(fc):
+            return False
+
+        for r in self.prlist[:]:
+            if match_ids == "match" and fc.lastreq is not r["id"]:
+                continue
+            elif match_ids == "none" and fc.lastreq is not None:
+                continue
+            elif match_ids == "free" and fc.locked:
+                continue
+
+            self.prlist.remove(r)
+            rlist = [r]
+            if fc.batch:
+                rlist += self.prlist[: nbatch - 1]
+                del self.prlist[: nbatch - 1]
+            self.assign(fc, rlist, match_ids)
+            return True
+
+        return False
+
+    def client_free(self, fc):
+        """Checks that a client that has no job assigned can take a new one."""
+
         if not (fc.status & Status.Up):
             return False
         if fc.status & Status.HasData:
@@ -820,53 +1683,130 @@ class InterfaceSocket(object):
                 verbosity.low,
             )
             return False
+        return True
 
-        for r in self.prlist[:]:
-            if match_ids == "match" and fc.lastreq is not r["id"]:
-                continue
-            elif match_ids == "none" and fc.lastreq is not None:
-                continue
-            elif match_ids == "free" and fc.locked:
-                continue
+    def assign(self, fc, rlist, match_ids):
+        """Marks a list of requests as running on a client, and submits them.
 
-            # makes sure the request is marked as running and the client included in the jobs list
-            fc.locked = fc.lastreq is r["id"]
+        Args:
+           fc: The client.
+           rlist: The list of requests.
+           match_ids: A label saying how the requests have been matched to
+              the client, for the log.
+        """
+
+        # makes sure the request is marked as running and the client included in the jobs list
+        r = rlist[0]
+        fc.locked = fc.lastreq is r["id"]
+        info(
+            " @SOCKET: %s Assigning [%5s] request id %4s to client with last-id %4s (% 3d/% 3d : %s)"
+            % (
+                time.strftime("%y/%m/%d-%H:%M:%S"),
+                match_ids,
+                str(r["id"]),
+                str(fc.lastreq),
+                self.clients.index(fc),
+                len(self.clients),
+                str(fc.peername),
+            ),
+            verbosity.high,
+        )
+        for r in rlist:
             r["status"] = "Running"
-            self.prlist.remove(r)
+            self.jobs[id(r)] = [r, fc]
+        fc.submit(rlist)
+
+    def dispatch_stragglers(self, freec):
+        """Sends a copy of the requests that have been running for much
+        longer than usual to free clients. The copy is a separate dictionary,
+        and its result is transferred to the original request by
+        check_job_finished, unless the original client is faster.
+
+        Args:
+           freec: The list of free clients. The clients that get a copy
+              of a request are removed from it.
+
+        Returns:
+           The number of copies that have been dispatched.
+        """
+
+        if len(self.stats.latencies) < MINSAMPLES:
+            return 0
+        tmax = self.redispatch * self.stats.latency(50)
+        now = time.time()
+
+        ndispatch = 0
+        for [r, c] in sorted(self.jobs.values(), key=lambda rc: rc[0]["start"]):
+            if len(freec) == 0:
+                break
+            if "copy" in r or "copy_of" in r or r["start"] <= 0:
+                continue
+            if now - r["start"] < tmax:
+                break
+            for fc in freec:
+                if fc.status & Status.Up and not fc.status & Status.HasData:
+                    break
+            else:
+                break
             info(
-                " @SOCKET: %s Assigning [%5s] request id %4s to client with last-id %4s (% 3d/% 3d : %s)"
-                % (
-                    time.strftime("%y/%m/%d-%H:%M:%S"),
-                    match_ids,
-                    str(r["id"]),
-                    str(fc.lastreq),
-                    self.clients.index(fc),
-                    len(self.clients),
-                    str(fc.peername),
-                ),
-                verbosity.high,
+                " @SOCKET:   Request id %4s has been running on client %s for %f "
+                "sec. Sending it also to client %s."
+                % (str(r["id"]), str(c.peername), now - r["start"], str(fc.peername)),
+                verbosity.medium,
             )
-            fc_thread = threading.Thread(
-                target=fc.dispatch, name="DISPATCH", kwargs={"r": r}
+            rcopy = {
+                k: r[k] for k in ["id", "pos", "active", "cell", "pars", "t_queued"]
+            }
+            rcopy.update(
+                {"result": None, "status": "Running", "start": -1, "copy_of": r}
             )
-            self.jobs.append([r, fc, fc_thread])
-            fc_thread.daemon = True
-            fc_thread.start()
-            return True
-
-        return False
+            r["copy"] = rcopy
+            freec.remove(fc)
+            fc.locked = False
+            self.jobs[id(rcopy)] = [rcopy, fc]
+            fc.submit([rcopy])
+            ndispatch += 1
+        return ndispatch
+
+    def requeue(self, r):
+        """Puts back in the queue a request whose client has been
+        disconnected, unless a copy of it is still being evaluated. If r is
+        itself a copy, the original request is requeued if needed."""
+
+        if "copy_of" in r:
+            r = r["copy_of"]
+            del r["copy"]
+            if id(r) in self.jobs or r["status"] != "Running":
+                return
+        elif "copy" in r and id(r["copy"]) in self.jobs:
+            return
+        r.pop("copy", None)
+        r["status"] = "Queued"
+        r["start"] = -1
 
-    def check_job_finished(self, r, c, ct):
+    def check_job_finished(self, r, c):
         """
         Checks if a job has been completed, and retrieves the results
         """
 
         if r["status"] == "Done":
-            while ct.is_alive():  # we can wait for end of thread
-                ct.join()
-            self.jobs = [
-                w for w in self.jobs if not (w[0] is r and w[1] is c)
-            ]  # removes pair in a robust way
+            # the request is marked as done as the very last thing by the
+            # worker thread, so the client is free to take a new job
+            del self.jobs[id(r)]
+            orig = r.get("copy_of")
+            if orig is not None and orig.get("claimed") is r:
+                # the copy has been faster than the original: the client of
+                # the original is kept busy until it gives up on it
+                info(
+                    " @SOCKET:   Copy of request id %4s evaluated first by client %s."
+                    % (str(r["id"]), str(c.peername)),
+                    verbosity.medium,
+                )
+                if id(orig) in self.jobs:
+                    self.stragglers.append(self.jobs.pop(id(orig)))
+                orig["result"] = r["result"]
+                orig["t_finished"] = r["t_finished"]
+                orig["status"] = "Done"
             return 1
 
         if (
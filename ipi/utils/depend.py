@@ -24,6 +24,8 @@ For a more detailed discussion, see the reference manual.
 # See the "licenses" directory for full license information.
 
 
+import json
+import time
 import weakref
 import threading
 
@@ -44,6 +46,12 @@ __all__ = [
     "dcopy",
     "dstrip",
     "depraise",
+    "dcompile",
+    "ddynamic",
+    "dprofile",
+    "dprofile_step",
+    "dprofile_stats",
+    "dprofile_write",
 ]
 
 
@@ -158,6 +166,8 @@ class depend_base(object):
         self._threadlock = threading.RLock()
         self._dependants = []
         self._synchro = None
+        self._children = None
+        self._views = None
 
         self.add_synchro(synchro)
 
@@ -185,7 +195,7 @@ class depend_base(object):
         newone = type(self)(None)
 
         for member in newone.__dict__:
-            if member == "_threadlock":
+            if member in ["_threadlock", "_children", "_views"]:
                 continue
             setattr(newone, member, deepcopy(getattr(self, member), memo))
 
@@ -194,10 +204,12 @@ class depend_base(object):
     def hold(self):
         """ Sets depend object as on hold. """
         self._active[:] = False
+        _graph_changed()
 
     def resume(self):
         """ Sets depend object as active again. """
         self._active[:] = True
+        _graph_changed()
         if self._func is None:
             self.taint(taintme=False)
         else:
@@ -214,6 +226,7 @@ class depend_base(object):
         if self._synchro is not None and self._name not in self._synchro.synced:
             self._synchro.synced[self._name] = self
             self._synchro.manual = self._name
+            _graph_changed()
 
     def add_dependant(self, newdep, tainted=True):
         """Adds a dependant property.
@@ -236,6 +249,7 @@ class depend_base(object):
         """
 
         newdep._dependants.append(weakref.ref(self))
+        _graph_changed()
         if tainted:
             self.taint(taintme=True)
 
@@ -827,6 +841,7 @@ def dcopy(dfrom, dto):
     dto._func = dfrom._func
     if hasattr(dfrom, "_bval"):
         dto._bval = dfrom._bval
+    _graph_changed()
 
 
 def depraise(exception):
@@ -924,3 +939,457 @@ class ddirect(object):
         member objects."""
 
         return object.__setattr__(object.__getattribute__(self, "dobj"), name, value)
+
+
+# BEGINS COMPILED MODE
+# After a simulation has been bound, the structure of the dependency graph
+# hardly ever changes, and most of the cost of the depend machinery goes into
+# walking it again and again. In the compiled mode a few methods are replaced
+# by versions that cache what can be cached:
+#  - every object keeps the list of the taint flags of the objects that
+#    depend on it, so that tainting is a loop that checks the flags directly
+#    instead of a recursion through weak references and method calls;
+#  - the views returned when slicing a depend_array are cached, instead of
+#    creating a new depend_array at every access;
+#  - the values of dobject attributes are fetched without taking any lock
+#    unless they have to be recomputed, and writes take no lock at all
+#    unless several threads may use the graph.
+# The caches are checked against a counter that is increased whenever a
+# dependency is added, so the graph can still be modified, at the price of
+# rebuilding the lists of the objects involved.
+
+_graph_version = 0
+_compiled = {}  # the dynamic methods replaced in compiled mode
+
+# largest number of views cached for each depend_array
+VIEW_CACHE_SIZE = 256
+
+
+def _graph_changed():
+    """Invalidates the lists of children cached in compiled mode."""
+
+    global _graph_version
+    _graph_version += 1
+
+
+def _taint_children(dobj):
+    """Returns the taint flags of the active objects that are tainted
+    together with dobj (the objects that depend on it and the other
+    members of its synchronizer), with weak references to the objects."""
+
+    children = [d() for d in dobj._dependants]
+    if dobj._synchro is not None:
+        children += list(dobj._synchro.synced.values())
+    return [(d._tainted, weakref.ref(d)) for d in children if d._active[0]]
+
+
+def _taint_compiled(self, taintme=True):
+    """Compiled version of depend_base.taint.
+
+    Walks down the dependency tree without recursion, using the cached lists
+    of the flags of the children of each object, and stops at the objects
+    that are already tainted. Synchronized objects that have been changed
+    manually are left untainted, as in the dynamic version.
+    """
+
+    if not self._active[0]:
+        return
+
+    self._tainted[0] = True
+    synced = []
+    stack = [self]
+    while len(stack) > 0:
+        item = stack.pop()
+        children = item._children
+        if children is None or children[0] != _graph_version:
+            children = item._children = (_graph_version, _taint_children(item))
+        for t, d in children[1]:
+            if not t[0]:
+                t[0] = True
+                d = d()
+                stack.append(d)
+                if d._synchro is not None:
+                    synced.append(d)
+    for d in synced:
+        if d._name == d._synchro.manual:
+            d._tainted[0] = False
+    if self._synchro is not None:
+        self._tainted[0] = taintme and (not self._name == self._synchro.manual)
+    else:
+        self._tainted[0] = taintme
+
+
+def _update_compiled(self):
+    """Recomputes a tainted value, taking the lock only in this case."""
+
+    with self._threadlock:
+        if self._tainted[0]:
+            self.update_auto()
+            self.taint(taintme=False)
+
+
+def _get_value_compiled(self):
+    """Compiled version of depend_value.get."""
+
+    if self._tainted[0]:
+        _update_compiled(self)
+    return self._value
+
+
+def _set_value_nolock(self, value, manual=True):
+    """Version of depend_value.set that does not take the lock."""
+
+    self._value = value
+    if manual:
+        self.update_man()
+
+
+def _get_array_compiled(self, instance, owner):
+    """Compiled version of depend_array.__get__."""
+
+    if self._tainted[0]:
+        _update_compiled(self)
+    return self
+
+
+def _view_key(index):
+    """Returns a hashable version of a (basic) index, or None if the index
+    cannot be used to cache a view."""
+
+    if isinstance(index, tuple):
+        key = tuple(_view_key(i) for i in index)
+        return None if None in key else key
+    if isinstance(index, slice):
+        return (index.start, index.stop, index.step)
+    if isinstance(index, bool):
+        return None
+    if isinstance(index, (int, np.integer)) or index is Ellipsis:
+        return index
+    return None
+
+
+def _getitem_compiled(self, index):
+    """Compiled version of depend_array.__getitem__, that caches the views."""
+
+    if self._tainted[0]:
+        _update_compiled(self)
+
+    if self._depend_array__scalarindex(index, self.ndim):
+        return dstrip(self)[index]
+
+    key = _view_key(index)
+    if key is not None and self._views is not None:
+        view = self._views.get(key)
+        if (
+            view is not None
+            and view._tainted is self._tainted
+            and view._dependants is self._dependants
+            and view._func is self._func
+            and view._synchro is self._synchro
+            and view._bval is self._bval
+        ):
+            return view
+
+    view = depend_array(
+        dstrip(self)[index],
+        name=self._name,
+        synchro=self._synchro,
+        func=self._func,
+        dependants=self._dependants,
+        tainted=self._tainted,
+        base=self._bval,
+        active=self._active,
+    )
+    if key is not None:
+        if self._views is None or len(self._views) >= VIEW_CACHE_SIZE:
+            self._views = {}
+        self._views[key] = view
+    return view
+
+
+def _setitem_nolock(self, index, value, manual=True):
+    """Version of depend_array.__setitem__ that does not take the lock."""
+
+    if manual:
+        self.view(np.ndarray)[index] = value
+        self.update_man()
+    elif index == slice(None, None, None):
+        self._bval[index] = value
+        self.taint(taintme=False)
+    else:
+        raise IndexError("Automatically computed arrays should span the whole parent")
+
+
+def _getattribute_compiled(self, name):
+    """Compiled version of dobject.__getattribute__."""
+
+    value = object.__getattribute__(self, name)
+    cls = value.__class__
+    if cls is depend_array:
+        if value._tainted[0]:
+            _update_compiled(value)
+        return value
+    elif cls is depend_value:
+        if value._tainted[0]:
+            _update_compiled(value)
+        return value._value
+    elif isinstance(value, depend_base):
+        return value.__get__(self, self.__class__)
+    return value
+
+
+def dcompile(threadsafe=True):
+    """Switches the depend machinery to the compiled mode.
+
+    Should be called once the dependency graph has been built, i.e. after
+    the simulation has been bound. The results are the same as in the
+    dynamic mode.
+
+    Args:
+        threadsafe: If False, values are set without taking the locks, which
+            is only safe when the depend objects are never used by more than
+            one thread at a time.
+    """
+
+    ddynamic()
+    replace = [
+        (depend_base, "taint", _taint_compiled),
+        (depend_value, "get", _get_value_compiled),
+        (depend_array, "__get__", _get_array_compiled),
+        (depend_array, "__getitem__", _getitem_compiled),
+        (dobject, "__getattribute__", _getattribute_compiled),
+    ]
+    if not threadsafe:
+        replace += [
+            (depend_value, "set", _set_value_nolock),
+            (depend_array, "__setitem__", _setitem_nolock),
+        ]
+    for cls, name, method in replace:
+        _compiled[(cls, name)] = cls.__dict__[name]
+        setattr(cls, name, method)
+
+
+def ddynamic():
+    """Switches the depend machinery back to the (default) dynamic mode."""
+
+    for (cls, name), method in _compiled.items():
+        setattr(cls, name, method)
+    _compiled.clear()
+
+
+# ENDS COMPILED MODE
+
+
+# BEGINS PROFILER
+# The profiler replaces the update_auto and taint methods of the depend
+# objects with versions that record, for each object, how many times its
+# value has been recomputed and how long it took, and how many objects have
+# been tainted because it has been changed or recomputed. This makes it
+# possible to find the quantities that are recomputed more often than needed,
+# e.g. because of a dcopy or of synchronized quantities that are set in turn.
+
+_profile = None  # the statistics collected by the profiler
+_profile_local = threading.local()  # the state of the current thread
+
+
+def _profile_node(dobj):
+    """Returns the statistics of a depend object (and of its views)."""
+
+    key = id(dobj._tainted)
+    stats = _profile["nodes"].get(key)
+    if stats is None or stats["node"]() is None:
+        stats = _profile["nodes"][key] = {
+            "node": weakref.ref(dobj),
+            "recomputes": 0,
+            "time": 0.0,
+            "self_time": 0.0,
+            "taints": 0,
+            "tainted": 0,
+        }
+    return stats
+
+
+def _update_auto_profiled(self):
+    """Version of depend_base.update_auto that records the number and the
+    time of the recomputations. The time spent recomputing the values this
+    one depends on is excluded from its self time."""
+
+    stats = _profile_node(self)
+    stack = _profile_local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        _profile["update_auto"](self)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if len(stack) > 0:
+            stack[-1] += elapsed
+        stats["recomputes"] += 1
+        stats["time"] += elapsed
+        stats["self_time"] += elapsed - nested
+
+
+def _taint_profiled(self, taintme=True):
+    """Version of depend_base.taint that counts the objects tainted by each
+    call. Tainting uses the recursion of the dynamic mode, so the count is
+    the same also when the dependency graph is compiled."""
+
+    if not self._active[0]:
+        return
+    if getattr(_profile_local, "ntainted", None) is None:
+        _profile_local.ntainted = 0
+        try:
+            _profile["taint"](self, taintme)
+        finally:
+            stats = _profile_node(self)
+            stats["taints"] += 1
+            stats["tainted"] += _profile_local.ntainted
+            _profile_local.ntainted = None
+    else:
+        _profile_local.ntainted += 1
+        _profile["taint"](self, taintme)
+
+
+def dprofile(enable=True):
+    """Starts or stops profiling the depend objects.
+
+    Starting the profiler clears the statistics collected so far. If the
+    dependency graph is to be compiled, dcompile should be called first.
+
+    Args:
+        enable: Whether the profiler should be started or stopped.
+    """
+
+    global _profile
+
+    if _profile is not None and _profile["enabled"]:
+        depend_base.update_auto = _profile["update_auto"]
+        depend_base.taint = _profile["installed"]
+        _profile["enabled"] = False
+    if enable:
+        _profile = {
+            "enabled": True,
+            "nodes": {},
+            "nsteps": 0,
+            "update_auto": depend_base.__dict__["update_auto"],
+            "installed": depend_base.__dict__["taint"],
+            "taint": _compiled.get((depend_base, "taint"), depend_base.taint),
+        }
+        depend_base.update_auto = _update_auto_profiled
+        depend_base.taint = _taint_profiled
+
+
+def dprofile_step():
+    """Marks the end of a step, so that the statistics can be reported per
+    step. Does nothing if the profiler has not been started."""
+
+    if _profile is not None and _profile["enabled"]:
+        _profile["nsteps"] += 1
+
+
+def _node_label(dobj):
+    """Returns the name of a depend object, preceded by the name of the class
+    of the object that computes it, when it is known."""
+
+    owner = getattr(dobj._func, "__self__", None)
+    if owner is None:
+        return dobj._name
+    return type(owner).__name__ + "." + dobj._name
+
+
+def dprofile_stats():
+    """Returns the statistics collected by the profiler.
+
+    Returns:
+        A dictionary with the number of steps, the list of the nodes of the
+        dependency graph that have been recomputed or tainted (and of all
+        the objects that depend on them), the edges from each node to the
+        nodes that depend on it, and the groups of synchronized nodes.
+        Times are in seconds.
+    """
+
+    if _profile is None:
+        raise ValueError("The depend profiler has never been started")
+
+    index = {}
+    objects = []
+    stack = [s["node"]() for s in _profile["nodes"].values()]
+    while len(stack) > 0:
+        dobj = stack.pop()
+        if dobj is None or id(dobj._tainted) in index:
+            continue
+        index[id(dobj._tainted)] = len(objects)
+        objects.append(dobj)
+        stack += [d() for d in dobj._dependants]
+        if dobj._synchro is not None:
+            stack += list(dobj._synchro.synced.values())
+
+    nodes = []
+    edges = []
+    synchros = {}
+    for i, dobj in enumerate(objects):
+        stats = _profile["nodes"].get(id(dobj._tainted), {})
+        node = {"id": i, "name": dobj._name, "label": _node_label(dobj)}
+        for k in ["recomputes", "time", "self_time", "taints", "tainted"]:
+            node[k] = stats.get(k, 0)
+        nodes.append(node)
+        for d in dobj._dependants:
+            if d() is not None:
+                edges.append([i, index[id(d()._tainted)]])
+        if dobj._synchro is not None:
+            synchros.setdefault(id(dobj._synchro), []).append(i)
+
+    return {
+        "nsteps": _profile["nsteps"],
+        "nodes": nodes,
+        "edges": edges,
+        "synchro": list(synchros.values()),
+    }
+
+
+def dprofile_write(filename):
+    """Writes the statistics collected by the profiler to a file.
+
+    Args:
+        filename: The name of the file. If it ends with '.dot' the dependency
+            graph is written in the graphviz format, with the nodes annotated
+            with their statistics (per step, if the steps have been counted)
+            and colored according to their self time. Otherwise all the
+            statistics are written in JSON format.
+    """
+
+    stats = dprofile_stats()
+    with open(filename, "w") as f:
+        if not filename.endswith(".dot"):
+            json.dump(stats, f, indent=1)
+            return
+
+        nsteps = max(stats["nsteps"], 1)
+        unit = "/step" if stats["nsteps"] > 0 else ""
+        tmax = max([n["self_time"] for n in stats["nodes"]] + [1e-300])
+        f.write("digraph depend {\n  node [shape=box, style=filled];\n")
+        for n in stats["nodes"]:
+            label = n["label"]
+            if n["recomputes"] > 0:
+                label += "\\n%.3g recomputes%s, %.3g ms%s" % (
+                    n["recomputes"] / nsteps,
+                    unit,
+                    n["self_time"] / nsteps * 1e3,
+                    unit,
+                )
+            if n["tainted"] > 0:
+                label += "\\nfan-out %.3g%s" % (n["tainted"] / nsteps, unit)
+            f.write(
+                '  n%d [label="%s", fillcolor="0.0 %.3f 1.0"];\n'
+                % (n["id"], label, n["self_time"] / tmax)
+            )
+        for i, j in stats["edges"]:
+            f.write("  n%d -> n%d;\n" % (i, j))
+        for group in stats["synchro"]:
+            for i, j in zip(group[:-1], group[1:]):
+                f.write("  n%d -> n%d [style=dashed, dir=none];\n" % (i, j))
+        f.write("}\n")
+
+
+# ENDS PROFILER
@@ -1,5 +1,11 @@
 """Contains all methods to evalaute potential energy and forces for indistinguishable particles.
 Used in /engine/normalmodes.py
+
+exchange_vspring_and_fspring evaluates the bosonic spring potential and the
+forces on all beads with O(N^2 + NP) operations, using the recursion of
+arXiv:1905.09053 for the potential and the backward recursion of
+arXiv:2305.18025 for the forces. The Evaluate_* functions follow the original
+formulation, and are kept as a (much slower) reference implementation.
 """
 
 # This file is part of i-PI.
@@ -11,6 +17,102 @@ from ipi.utils.depend import *
 import numpy as np
 
 
+def exchange_vspring_and_fspring(q, m, omegaP_sq, betaP):
+    """
+    Returns the spring potential V_B^{(N)} of N bosons, and the spring forces
+    acting on all their beads.
+
+    Args:
+       q: A (P, N, 3) array with the positions of the beads of the bosons.
+       m: The mass of the bosons.
+       omegaP_sq: The square of the frequency of the ring polymer springs.
+       betaP: The inverse temperature of the ring polymer, 1/(P kB T).
+
+    Returns:
+       A tuple (V, F), in which F is a (P, N, 3) array of forces.
+    """
+
+    P, N = q.shape[:2]
+    k = m * omegaP_sq
+    E = cycle_energies(q, k)
+
+    # forward recursion, V[m] being the potential of the first m bosons.
+    # a ring closing with boson v carries a factor 1/(v+1)
+    V = np.zeros(N + 1, float)
+    for v in range(N):
+        V[v + 1] = _logsumexp(-betaP * (E[: v + 1, v] + V[: v + 1])) / (-betaP)
+        V[v + 1] += np.log(v + 1) / betaP
+
+    # backward recursion, G[u] being the potential of bosons u ... N-1
+    G = np.zeros(N + 1, float)
+    lognorm = np.log(np.arange(1, N + 1))
+    for u in range(N - 1, -1, -1):
+        G[u] = _logsumexp(-betaP * (E[u, u:] + G[u + 1 :]) - lognorm[u:]) / (-betaP)
+
+    # probability that bosons u ... v form a ring, for u <= v
+    prob = np.zeros((N, N), float)
+    iu, iv = np.triu_indices(N)
+    prob[iu, iv] = np.exp(-betaP * (V[iu] + E[iu, iv] + G[iv + 1] - V[N]) - lognorm[iv])
+
+    # probability that the last bead of boson a is connected to the first
+    # bead of boson b: either b = a+1 in the same ring, or b <= a closes it
+    conn = prob.T.copy()
+    conn[np.arange(N - 1), np.arange(1, N)] = 1.0 - prob.sum(axis=0)[:-1]
+
+    F = np.zeros(q.shape, float)
+    d = q[1:] - q[:-1]
+    F[:-1] += d
+    F[1:] -= d
+    F[0] -= q[0] - np.dot(conn.T, q[-1])
+    F[-1] -= q[-1] - np.dot(conn, q[0])
+    F *= k
+
+    return V[N], F
+
+
+def cycle_energies(q, k):
+    """
+    Returns a (N, N) array whose element [u, v] is the spring energy of
+    bosons u, ..., v connected sequentially into a single ring polymer, i.e.
+    E_{v+1}^{(v-u+1)} in the notation of arXiv:1905.09053 (for u <= v).
+    The elements below the diagonal are undefined.
+
+    Args:
+       q: A (P, N, 3) array with the positions of the beads of the bosons.
+       k: The spring constant, m omega_P^2.
+    """
+
+    N = q.shape[1]
+
+    # springs within each boson, and between consecutive bosons
+    intra = ((q[1:] - q[:-1]) ** 2).sum(axis=(0, 2))
+    inter = ((q[0, 1:] - q[-1, :-1]) ** 2).sum(axis=1)
+    cintra = np.concatenate(([0.0], np.cumsum(intra)))
+    cinter = np.concatenate(([0.0], np.cumsum(inter)))
+
+    # spring closing the ring, from the last bead of v to the first of u
+    close = ((q[0, :, np.newaxis] - q[-1, np.newaxis, :]) ** 2).sum(axis=2)
+
+    u = np.arange(N)[:, np.newaxis]
+    v = np.arange(N)[np.newaxis, :]
+    E = (
+        cintra[v + 1]
+        - cintra[u]
+        + cinter[np.maximum(u, v)]
+        - cinter[np.minimum(u, v)]
+        + close
+    )
+
+    return 0.5 * k * E
+
+
+def _logsumexp(x):
+    """Returns log(sum(exp(x))), avoiding overflows."""
+
+    xmax = x.max()
+    return xmax + np.log(np.exp(x - xmax).sum())
+
+
 def Evaluate_EkN(self, N, k):
     """
     Returns E_N^{(k)} as defined in Equation 5 of arXiv:1905.09053.
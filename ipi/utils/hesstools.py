@@ -175,9 +175,9 @@ def clean_hessian(h, q, natoms, nbeads, m, m3, asr, mofi=False):
         return d, w
 
 
-def get_hessian(gm, x0, natoms, nbeads=1, fixatoms=[], d=0.001):
+def get_hessian(gm, x0, natoms, nbeads=1, fixatoms=[], d=0.001, batch=None):
     """Compute the physical hessian given a function to evaluate energy and forces (gm).
-    The intermediate steps are written as a temporary files so the full hessian calculations is only ONE step.
+    The intermediate steps are written as a temporary binary file so the full hessian calculations is only ONE step.
 
     IN     gm       = gradient mapper
            x0       = position vector
@@ -185,6 +185,9 @@ def get_hessian(gm, x0, natoms, nbeads=1, fixatoms=[], d=0.001):
            nbeads   = number of beads
            fixatoms = indexes of fixed atoms
            d        = displacement
+           batch    = ForceBatch object used to evaluate the displaced configurations of
+                      batch.size // (2*nbeads) rows at once. If None, they are
+                      evaluated one row at a time through gm.
 
     OUT    h       = physical hessian ( (natoms-len(fixatoms) )*3 , nbeads*( natoms-len(fixatoms) )*3)
     """
@@ -192,58 +195,71 @@ def get_hessian(gm, x0, natoms, nbeads=1, fixatoms=[], d=0.001):
     # TODO What about the case you have numerical gradients?
 
     info(" @get_hessian: Computing hessian", verbosity.low)
-    ii = (natoms - len(fixatoms)) * 3
+    fixatoms = np.asarray(fixatoms, int)
+    active = np.delete(
+        np.arange(3 * natoms),
+        np.concatenate((3 * fixatoms, 3 * fixatoms + 1, 3 * fixatoms + 2)),
+    )
+    ii = len(active)
     if x0.size != natoms * 3 * nbeads:
         raise ValueError(
             "The position vector is not consistent with the number of atoms/beads."
         )
+    x0 = np.asarray(x0).reshape((nbeads, 3 * natoms))
 
     h = np.zeros((ii, ii * nbeads), float)
 
     # Check if there is a temporary file:
-    i0 = -1
-
-    for i in range(ii, -1, -1):
-        try:
-            b = np.loadtxt("hessian_" + str(i) + ".tmp")
-        except IOError:
-            pass
-        else:
-            h[:, :] = b[:, :]
-            i0 = i
-            print(("We have found a temporary file ( hessian_" + str(i) + ".tmp). "))
-            if (
-                b.shape == h.shape
-            ):  # Check that the last temporary file was properly written
-                break
-            else:
-                continue
+    i0 = 0
+    tmpfile = "hessian.tmp.npz"
+    try:
+        with np.load(tmpfile) as b:
+            if b["h"].shape == h.shape:
+                h[:] = b["h"]
+                i0 = int(b["rows"])
+                print(("We have found a temporary file ( %s ). " % tmpfile))
+    except (IOError, KeyError, ValueError):
+        pass
 
     # Start calculation:
-    for j in range(i0 + 1, ii):
+    nrows = 1
+    if batch is not None:
+        nrows = max(1, batch.size // (2 * nbeads))
+    for j in range(i0, ii, nrows):
+        rows = active[j : j + nrows]
         info(
-            " @get_hessian: Computing hessian: %d of %d" % ((j + 1), ii), verbosity.low
+            " @get_hessian: Computing hessian: %d of %d" % ((j + len(rows)), ii),
+            verbosity.low,
         )
-        x = x0.copy()
+        if batch is None:
+            x = x0.copy()
 
-        x[:, j] = x0[:, j] + d
-        e, f1 = gm(x, new_disc=False)
-        x[:, j] = x0[:, j] - d
-        e, f2 = gm(x, new_disc=False)
-        g = (f1 - f2) / (2 * d)
+            x[:, rows[0]] = x0[:, rows[0]] + d
+            e, f1 = gm(x, new_disc=False)
+            x[:, rows[0]] = x0[:, rows[0]] - d
+            e, f2 = gm(x, new_disc=False)
+            g = (f1 - f2) / (2 * d)
 
-        h[j, :] = g.flatten()
-
-        f = open("hessian_" + str(j) + ".tmp", "w")
-        np.savetxt(f, h)
-        f.close()
+            h[j, :] = g.flatten()
+        else:
+            # displaces all the beads along each of the rows
+            devs = np.zeros((len(rows), nbeads, 3 * natoms), float)
+            for k, r in enumerate(rows):
+                devs[k, :, r] = d
+            q0 = np.tile(x0, (len(rows), 1))
+            g = batch.fd_derivatives(q0, devs.reshape(q0.shape)) / d
+            g = g.reshape((len(rows), nbeads, 3 * natoms))[:, :, active]
+            h[j : j + len(rows), :] = g.reshape((len(rows), -1))
+
+        with open(tmpfile + ".part", "wb") as f:
+            np.savez(f, h=h, rows=j + len(rows))
+        os.replace(tmpfile + ".part", tmpfile)
 
     u, g = gm(x0)  # Keep the mapper updated
 
-    for i in range(ii):
-        try:
-            os.remove("hessian_" + str(i) + ".tmp")
-        except OSError:
-            pass
+    try:
+        os.remove(tmpfile)
+    except OSError:
+        pass
 
     return h
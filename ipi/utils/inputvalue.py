@@ -213,6 +213,16 @@ class Input(object):
         self._explicit = True
         pass
 
+    def store_state(self, value):
+        """Stores only the part of the data that changes as the simulation
+        proceeds, into an object that has already been filled by store().
+
+        Used to take a cheap snapshot of the state of the simulation at every
+        step. By default all of the data are stored again.
+        """
+
+        self.store(value)
+
     def fetch(self):
         """Dummy function to retrieve data that returns all fields as a dictionary."""
 
@@ -1097,8 +1107,8 @@ class InputArray(InputValue):
         {
             "dtype": str,
             "default": "manual",
-            "options": ["manual", "file"],
-            "help": "If 'mode' is 'manual', then the array is read in directly, then reshaped according to the 'shape' specified in a row-major manner. If 'mode' is 'file' then the array is read in from the file given.",
+            "options": ["manual", "file", "npz"],
+            "help": "If 'mode' is 'manual', then the array is read in directly, then reshaped according to the 'shape' specified in a row-major manner. If 'mode' is 'file' then the array is read in from the file given. The mode 'npz' is used by binary checkpoints, in which the array is stored in the npz archive under the given key.",
         },
     )
 
@@ -1112,6 +1122,7 @@ class InputArray(InputValue):
            dtype: An optional data type. Defaults to None.
         """
 
+        self._buffer = None
         super(InputArray, self).__init__(help, default, dtype, dimension=dimension)
 
     def store(self, value, units=""):
@@ -1124,9 +1135,32 @@ class InputArray(InputValue):
               in.
         """
 
-        super(InputArray, self).store(
-            value=np.array(value, dtype=self.type).flatten().copy(), units=units
-        )
+        Input.store(self, value)
+        if units != "":
+            self.units.store(units)
+
+        data = np.asarray(value, dtype=self.type).reshape(-1)
+        if self._dimension != "undefined":
+            factor = unit_to_user(self._dimension, units, 1.0)
+        else:
+            factor = 1.0
+
+        # the array allocated by the previous call is overwritten if the data
+        # have the same size and type, so that storing the state of the
+        # simulation at every step (see CheckpointOutput) only copies the data
+        buffer = self._buffer
+        if (
+            buffer is None
+            or self.value is not buffer
+            or buffer.shape != data.shape
+            or buffer.dtype != data.dtype
+        ):
+            buffer = np.empty_like(data)
+        if factor == 1.0:
+            np.copyto(buffer, data)
+        else:
+            buffer[:] = data * factor
+        self.value = self._buffer = buffer
         self.shape.store(value.shape)
 
         # if the shape is not specified, assume the array is linear.
@@ -1167,6 +1201,11 @@ class InputArray(InputValue):
            A string giving the stored value in the appropriate xml format.
         """
 
+        if self.mode.fetch() == "npz":
+            # the data are written separately, see io_npz
+            text = " %s " % self._text
+            return Input.write(self, name=name, indent=indent, text=text)
+
         rstr = ""
         if len(self.value) > ELPERLINE:
             rstr += "\n" + indent + " [ "
@@ -1204,6 +1243,13 @@ class InputArray(InputValue):
             self.value = np.loadtxt(
                 self._text.strip(), comments="#", dtype=self.type
             ).flatten()
+        elif mode == "npz":
+            # the text has been replaced by the data when reading the archive
+            if not isinstance(self._text, np.ndarray):
+                raise ValueError(
+                    "Arrays with mode='npz' can only be read from a binary checkpoint"
+                )
+            self.value = np.asarray(self._text, dtype=self.type).reshape(-1)
         else:
             raise ValueError("Unsupported array reading mode")
 
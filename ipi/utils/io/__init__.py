@@ -35,6 +35,11 @@ mode_map = {
     "bin": "binary",
 }
 
+# modes that are implemented in the backend of another mode
+backend_map = {
+    "bintraj32": "bintraj",
+}
+
 
 io_map = {
     "print_path": "print_%s_path",
@@ -60,7 +65,9 @@ def _get_io_function(mode, io):
         mode = mode[mode.find(".") + 1 :]
         if mode in mode_map:
             mode = mode_map[mode]
-        module = importlib.import_module("ipi.utils.io.backends.io_%s" % mode)
+        module = importlib.import_module(
+            "ipi.utils.io.backends.io_%s" % backend_map.get(mode, mode)
+        )
     except ImportError:
         print("Error: mode %s is not supported." % mode)
         sys.exit()
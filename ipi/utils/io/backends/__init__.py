@@ -1,5 +1,5 @@
 """Contains the different backends for writing/reading atomic positions such as
-binary format, pdb and xyz.
+binary formats, pdb and xyz.
 """
 
 # This file is part of i-PI.
@@ -7,4 +7,4 @@ binary format, pdb and xyz.
 # See the "licenses" directory for full license information.
 
 
-__all__ = ["io_pdb", "io_xyz", "io_binary"]
+__all__ = ["io_pdb", "io_xyz", "io_binary", "io_bintraj"]
@@ -0,0 +1,382 @@
+"""Functions used to print and read trajectories in a self-describing,
+fixed-stride binary format.
+
+A file starts with a header, that contains the number of atoms, their names,
+the precision of the data and the size of the title field, followed by a
+sequence of frames that all have the same size. Each frame holds a title
+(that contains the step, the bead index and the units, as in the comment line
+of the xyz files), the cell in double precision and the 3*natoms values of the
+data, in single or double precision. All quantities are little-endian. The
+offset of frame i is header size + i * frame size, so that frames can be
+accessed at random, and BinaryTrajectory maps the whole file in memory as a
+(nframes,) array of records. A frame that has only been partially written
+(e.g. because the simulation was killed) is ignored when reading, and is
+removed before new frames are appended to the file.
+
+The mode 'bintraj' writes in double precision, 'bintraj32' in single
+precision. Both are read by read_bintraj.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import sys
+import weakref
+
+import numpy as np
+
+from ipi.utils.messages import verbosity, warning
+
+
+__all__ = [
+    "print_bintraj_path",
+    "print_bintraj",
+    "print_bintraj32_path",
+    "print_bintraj32",
+    "read_bintraj",
+    "read_bintraj32",
+    "BinaryTrajectory",
+]
+
+
+MAGIC = b"iPI-TRAJ"
+VERSION = 1
+
+header_dtype = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<i4"),
+        ("itemsize", "<i4"),
+        ("natoms", "<i8"),
+        ("namelen", "<i4"),
+        ("titlelen", "<i4"),
+    ]
+)
+
+# layout of the files that have been opened for reading or writing, so that
+# the header is only parsed once
+_layouts = weakref.WeakKeyDictionary()
+
+
+def _align(n):
+    """Rounds n up to a multiple of 8 bytes."""
+
+    return 8 * ((n + 7) // 8)
+
+
+class _Layout(object):
+
+    """Describes the layout of a binary trajectory file.
+
+    Attributes:
+        natoms: The number of atoms in each frame.
+        names: The names of the atoms.
+        itemsize: The size in bytes of the data, 4 or 8.
+        titlelen: The number of bytes of the title of each frame.
+        size: The size in bytes of the header.
+        frame_dtype: The structured dtype of a frame.
+    """
+
+    def __init__(self, natoms, names, itemsize, titlelen):
+        self.natoms = natoms
+        self.names = list(names)
+        self.itemsize = itemsize
+        self.titlelen = titlelen
+        self.namelen = max([8] + [_align(len(n.encode())) for n in self.names])
+        self.size = _align(header_dtype.itemsize + natoms * self.namelen)
+        self.frame_dtype = np.dtype(
+            [
+                ("title", "S%d" % titlelen),
+                ("cell", "<f8", (3, 3)),
+                ("data", "<f%d" % itemsize, (3 * natoms,)),
+            ]
+        )
+
+    def header(self):
+        """Returns the header as a string of bytes."""
+
+        head = np.zeros(1, header_dtype)
+        head["magic"] = MAGIC
+        head["version"] = VERSION
+        head["itemsize"] = self.itemsize
+        head["natoms"] = self.natoms
+        head["namelen"] = self.namelen
+        head["titlelen"] = self.titlelen
+        names = np.asarray([n.encode() for n in self.names], "S%d" % self.namelen)
+        data = head.tobytes() + names.tobytes()
+        return data + b"\0" * (self.size - len(data))
+
+    @classmethod
+    def parse(cls, stream):
+        """Reads the header from a binary stream positioned at its start."""
+
+        data = stream.read(header_dtype.itemsize)
+        if len(data) < header_dtype.itemsize:
+            raise EOFError
+        head = np.frombuffer(data, header_dtype)[0]
+        if head["magic"] != MAGIC:
+            raise ValueError("Not a binary i-PI trajectory file")
+        if head["version"] > VERSION:
+            raise ValueError(
+                "Binary trajectory version %d is not supported" % head["version"]
+            )
+        natoms, namelen = int(head["natoms"]), int(head["namelen"])
+        names = np.frombuffer(stream.read(natoms * namelen), "S%d" % namelen)
+        layout = cls(
+            natoms,
+            [n.decode() for n in names],
+            int(head["itemsize"]),
+            int(head["titlelen"]),
+        )
+        stream.read(layout.size - header_dtype.itemsize - natoms * namelen)
+        return layout
+
+
+def _binary(filedesc):
+    """Returns the binary stream underlying a (text or binary) file."""
+
+    return getattr(filedesc, "buffer", filedesc)
+
+
+def _write_frame(stream, names, q, h, title, itemsize):
+    """Appends a frame to a binary stream, writing the header if the stream
+    is at the beginning of the file. When appending to an existing file, a
+    partially written frame at its end is removed, so that the new frames
+    are aligned with the old ones."""
+
+    layout = _layouts.get(stream)
+    if layout is None:
+        if stream.tell() > 0:
+            # appends to an existing file: checks that it is compatible
+            with open(stream.name, "rb") as f:
+                layout = _Layout.parse(f)
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stride = layout.frame_dtype.itemsize
+            end = layout.size + stride * ((size - layout.size) // stride)
+            if end < size:
+                warning(
+                    "Removing a partially written frame (%d bytes) from the end of %s"
+                    % (size - end, stream.name),
+                    verbosity.low,
+                )
+                stream.truncate(end)
+                stream.seek(end)
+        else:
+            titlelen = max(128, _align(len(title.encode())))
+            layout = _Layout(len(names), names, itemsize, titlelen)
+            stream.write(layout.header())
+        _layouts[stream] = layout
+
+    if len(q) != 3 * layout.natoms:
+        raise ValueError(
+            "Cannot write %d atoms to a binary trajectory with %d atoms"
+            % (len(q) // 3, layout.natoms)
+        )
+    if len(title.encode()) > layout.titlelen:
+        raise ValueError(
+            "Title '%s' is too long for a binary trajectory with %d-byte titles"
+            % (title, layout.titlelen)
+        )
+    frame = np.zeros(1, layout.frame_dtype)
+    frame["title"] = title.encode()
+    frame["cell"] = h
+    frame["data"] = q
+    stream.write(frame.tobytes())
+
+
+def _print_path(beads, cell, filedesc, cell_conv, atoms_conv, itemsize):
+    """Writes the beads as consecutive frames, with data of size itemsize."""
+
+    stream = _binary(filedesc)
+    h = cell.h * cell_conv
+    qs = np.asarray(beads.q) * atoms_conv
+    for j in range(beads.nbeads):
+        _write_frame(stream, beads.names, qs[j], h, "Bead: %d" % j, itemsize)
+
+
+def print_bintraj_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1.0):
+    """Prints all the bead configurations, as consecutive frames of a binary
+    trajectory in double precision.
+
+    Args:
+        beads: A beads object giving the bead positions.
+        cell: A cell object giving the system box.
+        filedesc: An open writable file object.
+    """
+
+    _print_path(beads, cell, filedesc, cell_conv, atoms_conv, 8)
+
+
+def print_bintraj32_path(
+    beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1.0
+):
+    """Prints all the bead configurations, as consecutive frames of a binary
+    trajectory in single precision.
+
+    Args:
+        beads: A beads object giving the bead positions.
+        cell: A cell object giving the system box.
+        filedesc: An open writable file object.
+    """
+
+    _print_path(beads, cell, filedesc, cell_conv, atoms_conv, 4)
+
+
+def print_bintraj(
+    atoms, cell, filedesc=sys.stdout, title="", cell_conv=1.0, atoms_conv=1.0
+):
+    """Appends an atomic configuration to a binary trajectory in double
+    precision.
+
+    Args:
+        atoms: An atoms object giving the centroid positions.
+        cell: A cell object giving the system box.
+        filedesc: An open writable file object.
+        title: The title of the frame, that contains the units of the data.
+    """
+
+    _write_frame(
+        _binary(filedesc),
+        atoms.names,
+        np.asarray(atoms.q) * atoms_conv,
+        cell.h * cell_conv,
+        title,
+        8,
+    )
+
+
+def print_bintraj32(
+    atoms, cell, filedesc=sys.stdout, title="", cell_conv=1.0, atoms_conv=1.0
+):
+    """Appends an atomic configuration to a binary trajectory in single
+    precision.
+
+    Args:
+        atoms: An atoms object giving the centroid positions.
+        cell: A cell object giving the system box.
+        filedesc: An open writable file object.
+        title: The title of the frame, that contains the units of the data.
+    """
+
+    _write_frame(
+        _binary(filedesc),
+        atoms.names,
+        np.asarray(atoms.q) * atoms_conv,
+        cell.h * cell_conv,
+        title,
+        4,
+    )
+
+
+def read_bintraj(filedesc):
+    """Reads the next frame of a binary trajectory.
+
+    Args:
+        filedesc: An open readable file object, positioned at the beginning of
+            the file or after the last frame that has been read.
+
+    Returns:
+        The title, the cell, the data (in double precision), the names and the
+        (zero) masses of the atoms.
+    """
+
+    stream = _binary(filedesc)
+    layout = _layouts.get(stream)
+    if layout is None or stream.tell() == 0:
+        layout = _Layout.parse(stream)
+        _layouts[stream] = layout
+
+    data = stream.read(layout.frame_dtype.itemsize)
+    if len(data) < layout.frame_dtype.itemsize:
+        raise EOFError
+    frame = np.frombuffer(data, layout.frame_dtype)[0]
+    return (
+        frame["title"].decode(),
+        frame["cell"].astype(float),
+        frame["data"].astype(float),
+        list(layout.names),
+        np.zeros(layout.natoms),
+    )
+
+
+# the precision is stored in the header, so both modes are read in the same way
+read_bintraj32 = read_bintraj
+
+
+class BinaryTrajectory(object):
+
+    """Random access to the frames of a binary trajectory file.
+
+    The file is mapped in memory, so that the data of all the frames can be
+    used as arrays without reading the whole file, e.g.
+    BinaryTrajectory("out.pos_0.bintraj").data[::10] gives the coordinates of
+    every tenth frame as a (nframes/10, 3*natoms) array.
+
+    Attributes:
+        filename: The name of the file.
+        natoms: The number of atoms.
+        names: The names of the atoms.
+        frames: A (nframes,) memory-mapped record array, with fields 'title',
+            'cell' and 'data'.
+        cells: A (nframes, 3, 3) view of the cells.
+        data: A (nframes, 3*natoms) view of the data, in the precision in which
+            it is stored.
+        offsets: The offset in bytes of each frame in the file.
+    """
+
+    def __init__(self, filename):
+        """Maps a file in memory.
+
+        Args:
+            filename: The name of the binary trajectory file.
+        """
+
+        self.filename = filename
+        with open(filename, "rb") as f:
+            layout = _Layout.parse(f)
+        self.natoms = layout.natoms
+        self.names = layout.names
+        stride = layout.frame_dtype.itemsize
+        nframes = (os.path.getsize(filename) - layout.size) // stride
+        self.offsets = layout.size + stride * np.arange(nframes)
+        if nframes > 0:
+            self.frames = np.memmap(
+                filename,
+                dtype=layout.frame_dtype,
+                mode="r",
+                offset=layout.size,
+                shape=(nframes,),
+            )
+        else:
+            self.frames = np.zeros(0, layout.frame_dtype)
+
+    @property
+    def cells(self):
+        return self.frames["cell"]
+
+    @property
+    def data(self):
+        return self.frames["data"]
+
+    def title(self, i):
+        """Returns the title of frame i."""
+
+        return self.frames["title"][i].decode()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        """Returns frame i in the same format as read_bintraj."""
+
+        return (
+            self.title(i),
+            np.array(self.frames["cell"][i], float),
+            np.array(self.frames["data"][i], float),
+            list(self.names),
+            np.zeros(self.natoms),
+        )
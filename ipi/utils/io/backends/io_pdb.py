@@ -15,11 +15,21 @@ import numpy as np
 import ipi.utils.mathtools as mt
 from ipi.utils.depend import dstrip
 from ipi.utils.units import Elements
+from ipi.utils.io.textformat import format_columns
 
 
 __all__ = ["print_pdb_path", "print_pdb", "read_pdb"]
 
 
+def _format_atoms(fmt_atom, serial, lab, qs):
+    """Returns the ATOM records of a frame, with the serial numbers serial,
+    the names lab and the positions qs."""
+
+    data = [serial, lab, " ", "  1", " ", 1, " "]
+    data += [qs[0::3], qs[1::3], qs[2::3], 0.0, 0.0, "  ", 0]
+    return format_columns(fmt_atom, data)
+
+
 def print_pdb_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1.0):
     """Prints all the bead configurations, into a pdb formatted file.
 
@@ -46,36 +56,24 @@ def print_pdb_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1
 
     natoms = beads.natoms
     nbeads = beads.nbeads
+    qs = dstrip(beads.q) * atoms_conv
+    lab = dstrip(beads.names)
     for j in range(nbeads):
-        for i in range(natoms):
-            qs = dstrip(beads.q) * atoms_conv
-            lab = dstrip(beads.names)
-            data = (
-                j * natoms + i + 1,
-                lab[i],
-                " ",
-                "  1",
-                " ",
-                1,
-                " ",
-                qs[j][3 * i],
-                qs[j][3 * i + 1],
-                qs[j][3 * i + 2],
-                0.0,
-                0.0,
-                "  ",
-                0,
-            )
-            filedesc.write(fmt_atom % data)
+        filedesc.write(
+            _format_atoms(fmt_atom, j * natoms + np.arange(1, natoms + 1), lab, qs[j])
+        )
 
     if nbeads > 1:
-        for i in range(natoms):
-            filedesc.write(fmt_conect % (i + 1, (nbeads - 1) * natoms + i + 1))
-        for j in range(nbeads - 1):
-            for i in range(natoms):
-                filedesc.write(
-                    fmt_conect % (j * natoms + i + 1, (j + 1) * natoms + i + 1)
-                )
+        serial = np.arange(1, nbeads * natoms + 1)
+        filedesc.write(
+            format_columns(
+                fmt_conect,
+                [
+                    np.concatenate([serial[:natoms], serial[:-natoms]]),
+                    np.concatenate([serial[-natoms:], serial[natoms:]]),
+                ],
+            )
+        )
 
     filedesc.write("END\n")
 
@@ -111,24 +109,7 @@ def print_pdb(
     natoms = atoms.natoms
     qs = dstrip(atoms.q) * atoms_conv
     lab = dstrip(atoms.names)
-    for i in range(natoms):
-        data = (
-            i + 1,
-            lab[i],
-            " ",
-            "  1",
-            " ",
-            1,
-            " ",
-            qs[3 * i],
-            qs[3 * i + 1],
-            qs[3 * i + 2],
-            0.0,
-            0.0,
-            "  ",
-            0,
-        )
-        filedesc.write(fmt_atom % data)
+    filedesc.write(_format_atoms(fmt_atom, np.arange(1, natoms + 1), lab, qs))
 
     filedesc.write("END\n")
 
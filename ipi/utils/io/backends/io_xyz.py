@@ -15,12 +15,21 @@ import numpy as np
 import ipi.utils.mathtools as mt
 from ipi.utils.depend import dstrip
 from ipi.utils.units import Elements
+from ipi.utils.io.textformat import format_columns
 
 
 __all__ = ["print_xyz_path", "print_xyz", "read_xyz"]
 
 deg2rad = np.pi / 180.0
 
+fmt_atom = "%8s %12.5e %12.5e %12.5e\n"
+
+
+def _format_atoms(lab, qs):
+    """Returns the lines of a frame, for the names lab and the positions qs."""
+
+    return format_columns(fmt_atom, [lab, qs[0::3], qs[1::3], qs[2::3]])
+
 
 def print_xyz_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1.0):
     """Prints all the bead configurations into a XYZ formatted file.
@@ -41,15 +50,13 @@ def print_xyz_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1
     )
     natoms = beads.natoms
     nbeads = beads.nbeads
+    qs = dstrip(beads.q) * atoms_conv
+    lab = dstrip(beads.names)
     for j in range(nbeads):
-        filedesc.write(fmt_header % (natoms, j, a, b, c, alpha, beta, gamma))
-        for i in range(natoms):
-            qs = dstrip(beads.q) * atoms_conv
-            lab = dstrip(beads.names)
-            filedesc.write(
-                "%8s %12.5e %12.5e %12.5e\n"
-                % (lab[i], qs[j][3 * i], qs[j][3 * i + 1], qs[j][3 * i + 2])
-            )
+        filedesc.write(
+            fmt_header % (natoms, j, a, b, c, alpha, beta, gamma)
+            + _format_atoms(lab, qs[j])
+        )
 
 
 def print_xyz(
@@ -70,15 +77,13 @@ def print_xyz(
     fmt_header = (
         "%d\n# CELL(abcABC): %10.5f  %10.5f  %10.5f  %10.5f  %10.5f  %10.5f  %s\n"
     )
-    filedesc.write(fmt_header % (natoms, a, b, c, alpha, beta, gamma, title))
     # direct access to avoid unnecessary slow-down
     qs = dstrip(atoms.q) * atoms_conv
     lab = dstrip(atoms.names)
-    for i in range(natoms):
-        filedesc.write(
-            "%8s %12.5e %12.5e %12.5e\n"
-            % (lab[i], qs[3 * i], qs[3 * i + 1], qs[3 * i + 2])
-        )
+    filedesc.write(
+        fmt_header % (natoms, a, b, c, alpha, beta, gamma, title)
+        + _format_atoms(lab, qs)
+    )
 
 
 # Cell type patterns
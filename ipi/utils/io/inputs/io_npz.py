@@ -0,0 +1,137 @@
+"""Functions used to read and write checkpoint files in a binary format.
+
+A binary checkpoint is an (uncompressed) npz archive, that contains the text
+of the xml checkpoint under the key 'xml', and one entry for each of the large
+arrays of the simulation. These arrays are written in the xml with
+mode='npz', and with the key of the entry that holds their data instead of
+the list of values, e.g.
+
+    <q mode='npz' shape='(32, 300000)'> simulation.system0.beads.q </q>
+
+so that positions, momenta and thermostat states are saved and loaded
+without converting them to text. The small arrays are written in the xml as
+usual, so that the same fields as in the xml checkpoint are written.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import zipfile
+
+import numpy as np
+
+from ipi.utils.io.inputs.io_xml import xml_parse_file, xml_parse_string
+from ipi.utils.inputvalue import InputArray
+
+
+__all__ = ["xml_write_npz", "xml_parse_npz", "xml_parse_checkpoint"]
+
+
+# integer and string arrays with fewer elements are written as text
+NPZ_MINSIZE = 100
+
+
+def _is_binary(iarray, name):
+    """Decides whether an array should be written in binary form: all the
+    large arrays, and the arrays of floats (that would lose precision when
+    written as text), unless they have their default value and are not
+    written at all."""
+
+    value = iarray.value
+    if not isinstance(value, np.ndarray) or value.dtype.kind not in "biufU":
+        return False
+    if value.size >= NPZ_MINSIZE:
+        return True
+    return value.dtype.kind == "f" and iarray.write(name) != iarray._defwrite.replace(
+        "%%NAME%%", name
+    )
+
+
+def _binary_arrays(inp, path):
+    """Yields the arrays held by an input object (and its children) that
+    should be written in binary form, together with their keys."""
+
+    for f in inp.instancefields:
+        child = inp.__dict__[f]
+        if isinstance(child, InputArray):
+            if _is_binary(child, f):
+                yield path + "." + f, child
+        else:
+            for a in _binary_arrays(child, path + "." + f):
+                yield a
+    for i, (f, child) in enumerate(inp.extra):
+        for a in _binary_arrays(child, "%s.%s%d" % (path, f, i)):
+            yield a
+
+
+def xml_write_npz(inp, filedesc, name="simulation"):
+    """Writes an input object as a binary checkpoint.
+
+    Args:
+        inp: The input object, usually an InputSimulation holding the status
+            of the simulation.
+        filedesc: An open file object, in binary mode.
+        name: The tag name of the root of the xml.
+    """
+
+    binary = list(_binary_arrays(inp, name))
+    arrays = {}
+    for key, iarray in binary:
+        arrays[key] = iarray.value
+        iarray.mode.store("npz")
+        iarray._text = key
+    try:
+        xml = inp.write(name=name)
+    finally:
+        for key, iarray in binary:
+            iarray.mode.store("manual")
+
+    np.savez(filedesc, xml=np.array(xml), **arrays)
+
+
+def _resolve(node, archive):
+    """Replaces the text of the nodes with mode='npz' by the corresponding
+    arrays of the archive."""
+
+    binary = node.attribs.get("mode", "").strip() == "npz"
+    for i, (f, v) in enumerate(node.fields):
+        if f == "_text":
+            if binary:
+                node.fields[i] = (f, archive[v.strip()])
+        else:
+            _resolve(v, archive)
+
+
+def xml_parse_npz(filename):
+    """Parses a binary checkpoint file.
+
+    Args:
+        filename: The name of the npz file.
+
+    Returns:
+        A xml_node for the root node of the xml, in which the text of the
+        binary arrays has been replaced by their data.
+    """
+
+    with np.load(filename, allow_pickle=False) as archive:
+        root = xml_parse_string(str(archive["xml"]))
+        _resolve(root, archive)
+    return root
+
+
+def xml_parse_checkpoint(filename):
+    """Parses an input or checkpoint file, either in xml or in binary format.
+
+    Args:
+        filename: The name of the file.
+
+    Returns:
+        A xml_node for the root node of the file.
+    """
+
+    if zipfile.is_zipfile(filename):
+        return xml_parse_npz(filename)
+    with open(filename, "r") as f:
+        return xml_parse_file(f)
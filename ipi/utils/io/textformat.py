@@ -0,0 +1,246 @@
+"""Vectorised printf-style formatting of columns of data.
+
+Used by the writers of the text trajectory formats, that have to print one
+fixed-format line per atom. format_columns builds all the lines of a frame at
+once in a character array, rather than applying the % operator line by line,
+and returns exactly the same text. The conversions that are understood are
+%Ns, %Ni, %Nd, %W.Pe and %W.Pf, without flags: any other template, and any line
+in which a value does not fit in its field, or whose rounding is ambiguous in
+double precision, is formatted with the % operator instead.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import re
+
+import numpy as np
+
+
+__all__ = ["format_columns"]
+
+
+_spec_re = re.compile(r"%(\d*)(?:\.(\d+))?([sdief%])")
+
+# relative error on the scaled values: lines where the fractional part is
+# closer than this to 1/2 are rounded by the % operator, that uses the
+# exact binary value
+_TIE = 1e-13
+
+
+def _parse(fmt):
+    """Splits a template in literal strings and (width, precision, type)
+    conversion specifications. Returns None if the template contains
+    conversions that are not handled here."""
+
+    literals, specs = [], []
+    pos = 0
+    for m in _spec_re.finditer(fmt):
+        if m.group(3) == "%" or m.group(1) == "":
+            return None
+        literals.append(fmt[pos : m.start()])
+        prec = m.group(2)
+        if m.group(3) in "ef" and prec is None:
+            return None
+        if m.group(3) in "sdi" and prec is not None:
+            return None
+        prec = None if prec is None else int(prec)
+        specs.append((int(m.group(1)), prec, m.group(3)))
+        pos = m.end()
+    tail = fmt[pos:]
+    if "%" in tail or any("%" in l for l in literals):
+        return None
+    literals.append(tail)
+    return literals, specs
+
+
+def _digits(out, start, value, ndig):
+    """Writes the ndig least significant decimal digits of the integer array
+    value in the columns start, ..., start + ndig - 1 of out."""
+
+    for k in range(ndig):
+        value, digit = np.divmod(value, 10)
+        out[:, start + ndig - 1 - k] = digit
+        out[:, start + ndig - 1 - k] += 48
+
+
+def _format_int(x, width, bad):
+    """Formats integers right-aligned in a field of given width."""
+
+    x = np.asarray(x, np.int64)
+    a = np.abs(x)
+    neg = x < 0
+    nd = np.ones(len(x), int)
+    for k in range(1, 19):
+        nd[a >= 10 ** k] = k + 1
+    bad |= nd + neg > width
+
+    out = np.full((len(x), width), 32, np.uint8)
+    for k in range(width):
+        col = width - 1 - k
+        out[:, col] = np.where(k < nd, 48 + (a // 10 ** min(k, 18)) % 10, 32)
+        out[:, col] = np.where(neg & (k == nd), 45, out[:, col])
+    return out
+
+
+def _format_fixed(x, width, prec, bad):
+    """Formats floats as %width.precf."""
+
+    x = np.asarray(x, float)
+    neg = np.signbit(x)
+    a = np.abs(x)
+    ok = np.isfinite(a) & (a < 1e15 / 10 ** prec)
+    a = np.where(ok, a, 0.0)
+
+    s = a * 10.0 ** prec
+    d = np.rint(s)
+    bad |= ~ok | (np.abs(s - np.floor(s) - 0.5) < _TIE * (s + 1))
+    d = d.astype(np.int64)
+    ipart = d // 10 ** prec
+    nd = np.ones(len(x), int)
+    for k in range(1, 16):
+        nd[ipart >= 10 ** k] = k + 1
+    bad |= neg + nd + 1 + prec > width
+
+    if prec + 1 + (1 if prec > 0 else 0) > width:
+        raise ValueError("Field too narrow")
+    out = np.full((len(x), width), 32, np.uint8)
+    if prec > 0:
+        _digits(out, width - prec, d % 10 ** prec, prec)
+        out[:, width - prec - 1] = 46
+    iend = width - prec - (1 if prec > 0 else 0)
+    for k in range(min(iend, 16)):
+        col = iend - 1 - k
+        out[:, col] = np.where(k < nd, 48 + (ipart // 10 ** k) % 10, 32)
+        out[:, col] = np.where(neg & (k == nd), 45, out[:, col])
+    return out
+
+
+def _format_exp(x, width, prec, bad):
+    """Formats floats as %width.prece."""
+
+    x = np.asarray(x, float)
+    neg = np.signbit(x)
+    a = np.abs(x)
+    ok = np.isfinite(a) & ((a == 0) | ((a > 1e-98) & (a < 1e98)))
+    a = np.where(ok, a, 1.0)
+    nz = a > 0
+
+    e = np.zeros(len(x), np.int64)
+    e[nz] = np.floor(np.log10(a[nz]))
+    # corrects the exponent when log10 is off by one, or rounding carries over
+    for i in range(2):
+        s = a * 10.0 ** (prec - e)
+        d = np.rint(s)
+        e = np.where(d >= 10 ** (prec + 1), e + 1, e)
+        e = np.where(nz & (d < 10 ** prec), e - 1, e)
+    s = a * 10.0 ** (prec - e)
+    d = np.rint(s)
+    bad |= ~ok | (np.abs(s - np.floor(s) - 0.5) < _TIE * (s + 1))
+    bad |= (d >= 10 ** (prec + 1)) | (nz & (d < 10 ** prec))
+    bad |= np.abs(e) > 99
+    d = np.where(bad, 0, d).astype(np.int64)
+    e = np.where(bad, 0, e)
+
+    nlen = prec + 5 + (1 if prec > 0 else 0)  # d.ddddde+xx
+    if nlen > width:
+        raise ValueError("Field too narrow")
+    bad |= neg + nlen > width
+
+    out = np.full((len(x), width), 32, np.uint8)
+    start = width - nlen
+    out[:, start] = 48 + d // 10 ** prec
+    if prec > 0:
+        out[:, start + 1] = 46
+        _digits(out, start + 2, d % 10 ** prec, prec)
+    out[:, width - 4] = 101
+    out[:, width - 3] = np.where(e < 0, 45, 43)
+    _digits(out, width - 2, np.abs(e), 2)
+    if start > 0:
+        out[:, start - 1] = np.where(neg, 45, 32)
+    return out
+
+
+def _format_str(x, width, bad):
+    """Formats strings right-aligned in a field of given width."""
+
+    x = np.asarray(x, str)
+    bad |= np.char.str_len(x) > width
+    out = np.char.rjust(x, width).astype("S%d" % width)
+    out = np.frombuffer(out.tobytes(), np.uint8).reshape((len(x), -1))
+    if out.shape[1] < width:
+        pad = np.full((len(x), width - out.shape[1]), 32, np.uint8)
+        out = np.concatenate([out, pad], axis=1)
+    return out[:, :width]
+
+
+def _format_column(col, spec, n, bad):
+    """Formats one column, broadcasting scalars to n lines."""
+
+    width, prec, kind = spec
+    if np.ndim(col) == 0:
+        one = np.zeros(1, bool)
+        out = _format_column(np.asarray([col]), spec, 1, one)
+        bad |= one[0]
+        return np.broadcast_to(out, (n, out.shape[1]))
+
+    if kind == "s":
+        return _format_str(col, width, bad)
+    elif kind in "di":
+        return _format_int(col, width, bad)
+    elif kind == "f":
+        return _format_fixed(col, width, prec, bad)
+    else:
+        return _format_exp(col, width, prec, bad)
+
+
+def _literal(text, n):
+    """Returns a constant string repeated on n lines, as a character array."""
+
+    return np.broadcast_to(np.frombuffer(text.encode(), np.uint8), (n, len(text)))
+
+
+def format_columns(fmt, columns):
+    """Formats a set of columns of data with a printf-style template.
+
+    Args:
+        fmt: The template of one line, e.g. "%8s %12.5e %12.5e %12.5e\\n".
+        columns: A list with one item for each conversion in fmt, that can be
+            an array with one element for each line, or a scalar that is
+            repeated on all the lines.
+
+    Returns:
+        The text of all the lines, the same as "".join(fmt % row for row
+        in zip(*columns)).
+    """
+
+    n = max([len(c) for c in columns if np.ndim(c) > 0] or [1])
+    rows = [c if np.ndim(c) > 0 else [c] * n for c in columns]
+    parsed = _parse(fmt)
+    if parsed is None or len(parsed[1]) != len(columns):
+        return "".join(fmt % tuple(c[i] for c in rows) for i in range(n))
+
+    literals, specs = parsed
+    bad = np.zeros(n, bool)
+    try:
+        pieces = []
+        for lit, spec, col in zip(literals, specs, columns):
+            pieces.append(_literal(lit, n))
+            pieces.append(_format_column(col, spec, n, bad))
+        pieces.append(_literal(literals[-1], n))
+        table = np.concatenate(pieces, axis=1)
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return "".join(fmt % tuple(c[i] for c in rows) for i in range(n))
+
+    text = table.tobytes().decode()
+    if not bad.any():
+        return text
+
+    # formats the lines that could not be handled one by one
+    width = table.shape[1]
+    lines = [text[i * width : (i + 1) * width] for i in range(n)]
+    for i in np.flatnonzero(bad):
+        lines[i] = fmt % tuple(c[i] for c in rows)
+    return "".join(lines)
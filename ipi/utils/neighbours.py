@@ -0,0 +1,256 @@
+"""Vectorised search of the pairs of atoms within a cutoff distance.
+
+Used by the python potentials that are implemented in i-PI itself. Positions
+are given as (natoms, 3) arrays and cells as matrices whose columns are the
+lattice vectors, following the conventions of Cell. neighbour_pairs does a
+single search with linked cells, while NeighbourList keeps a Verlet list with
+a skin, that is only rebuilt when the atoms have moved enough.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import itertools
+
+import numpy as np
+
+
+__all__ = ["neighbour_pairs", "NeighbourList"]
+
+
+# offsets of the neighbouring cells, including the cell itself, such that each
+# pair of neighbouring cells is only considered once
+_HALF_SHELL = np.array(
+    [d for d in itertools.product([-1, 0, 1], repeat=3) if d >= (0, 0, 0)]
+)
+
+
+def neighbour_pairs(pos, h, ih, rc):
+    """Finds all the pairs of atoms that are closer than a cutoff, taking into
+    account periodic boundary conditions.
+
+    Uses a linked cell list when the box is at least three cutoffs wide in all
+    directions, and otherwise loops explicitly over all the periodic images
+    that can be within the cutoff. Both work for general triclinic cells,
+    and each pair is returned once.
+
+    Args:
+       pos: A (natoms, 3) array with the atomic positions.
+       h: The cell matrix, with the lattice vectors as columns, or None for
+          open boundary conditions.
+       ih: The inverse of the cell matrix (ignored if h is None).
+       rc: The cutoff distance.
+
+    Returns:
+       A tuple (i, j, d), where i and j are arrays with the indices of the
+       atoms in each pair, and d is a (npairs, 3) array with the separation
+       vectors from atom i to the closest image of atom j.
+    """
+
+    pos = np.asarray(pos).reshape((-1, 3))
+    if h is None:
+        h, ih = _open_box(pos, rc)
+
+    # scaled coordinates, wrapped inside the box
+    s = np.dot(pos, ih.T)
+    s -= np.floor(s)
+    wpos = np.dot(s, h.T)
+
+    # distance between opposite faces of the box
+    widths = 1.0 / np.sqrt((ih ** 2).sum(axis=1))
+    ncell = np.floor(widths / rc).astype(int)
+    if (ncell < 3).any():
+        return _image_pairs(wpos, h, widths, rc)
+
+    # in dilute systems, use fewer (larger) cells rather than many empty ones
+    nmax = max(len(pos), 27)
+    if np.prod(ncell) > nmax:
+        ncell = np.floor(ncell * (nmax / np.prod(ncell)) ** (1.0 / 3.0))
+        ncell = np.maximum(ncell.astype(int), 3)
+    return _cell_pairs(wpos, s, h, ncell, rc)
+
+
+def _open_box(pos, rc):
+    """Returns an orthorhombic box that contains all the atoms, and is large
+    enough that no periodic image is within rc of another atom."""
+
+    h = np.diag(np.ptp(pos, axis=0) + 2 * rc)
+    return h, np.diag(1.0 / h.diagonal())
+
+
+def _cell_pairs(wpos, s, h, ncell, rc):
+    """Finds the pairs within rc using a linked cell list, with at least
+    three cells per direction."""
+
+    natoms = len(wpos)
+    cidx = np.minimum(np.floor(s * ncell).astype(int), ncell - 1)
+    cflat = np.ravel_multi_index(cidx.T, ncell)
+
+    # table of the atoms in each cell, padded with -1
+    order = np.argsort(cflat, kind="stable")
+    counts = np.bincount(cflat, minlength=np.prod(ncell))
+    first = np.cumsum(counts) - counts
+    table = -np.ones((len(counts), max(counts.max(), 1)), int)
+    table[cflat[order], np.arange(natoms) - first[cflat[order]]] = order
+
+    cgrid = np.array(np.unravel_index(np.arange(len(counts)), ncell)).T
+    rc2 = rc * rc
+    ilist, jlist, dlist = [], [], []
+    for offset in _HALF_SHELL:
+        # neighbouring cells, and the lattice translation needed to reach them
+        ngrid = cgrid + offset
+        shift = np.floor_divide(ngrid, ncell)
+        nflat = np.ravel_multi_index((ngrid - shift * ncell).T, ncell)
+
+        i = np.broadcast_to(table[:, :, np.newaxis], table.shape + table.shape[1:])
+        j = np.broadcast_to(table[nflat, np.newaxis, :], i.shape)
+        mask = (i >= 0) & (j >= 0)
+        if not offset.any():
+            mask &= i < j
+        cell = np.broadcast_to(
+            np.arange(len(counts))[:, np.newaxis, np.newaxis], i.shape
+        )
+        i, j, cell = i[mask], j[mask], cell[mask]
+
+        d = wpos[j] - wpos[i] + np.dot(shift[cell], h.T)
+        close = (d ** 2).sum(axis=1) < rc2
+        ilist.append(i[close])
+        jlist.append(j[close])
+        dlist.append(d[close])
+
+    return np.concatenate(ilist), np.concatenate(jlist), np.concatenate(dlist)
+
+
+def _image_pairs(wpos, h, widths, rc):
+    """Finds the pairs within rc by looping over all the periodic images that
+    can be closer than rc. Only meant for small boxes."""
+
+    natoms = len(wpos)
+    nimg = np.ceil(rc / widths).astype(int)
+    rc2 = rc * rc
+    ilist, jlist, dlist = [], [], []
+    for t in itertools.product(*[range(-n, n + 1) for n in nimg]):
+        if t < (0, 0, 0):
+            # the pair (i, j + t) is the same as (j, i - t)
+            continue
+        i, j = np.meshgrid(np.arange(natoms), np.arange(natoms), indexing="ij")
+        if t == (0, 0, 0):
+            mask = i < j
+        else:
+            # this also includes the interactions of an atom with its images
+            mask = np.ones(i.shape, bool)
+        i, j = i[mask], j[mask]
+
+        d = wpos[j] - wpos[i] + np.dot(h, t)
+        close = (d ** 2).sum(axis=1) < rc2
+        ilist.append(i[close])
+        jlist.append(j[close])
+        dlist.append(d[close])
+
+    return np.concatenate(ilist), np.concatenate(jlist), np.concatenate(dlist)
+
+
+class NeighbourList(object):
+
+    """Verlet list of the pairs of atoms within a cutoff.
+
+    The list contains all the pairs within the cutoff plus a skin, and is
+    only rebuilt (using linked cells) when the atoms might have moved, or the
+    cell might have been deformed, enough for a pair that was outside of it
+    to come within the cutoff. Atoms that are wrapped back in the box between
+    two calls are dealt with correctly.
+
+    Attributes:
+       rc: The cutoff distance.
+       skin: The width of the skin.
+       nbuild: The number of times the list has been built.
+    """
+
+    def __init__(self, rc, skin=None):
+        """Initialises NeighbourList.
+
+        Args:
+           rc: The cutoff distance.
+           skin: The width of the skin. Defaults to 0.2*rc.
+        """
+
+        self.rc = float(rc)
+        self.skin = 0.2 * self.rc if skin is None else float(skin)
+        self.nbuild = 0
+        self._s = None
+
+    def pairs(self, pos, h, ih):
+        """Returns all the pairs of atoms that are closer than the cutoff.
+
+        Args:
+           pos: A (natoms, 3) array with the atomic positions.
+           h: The cell matrix, with the lattice vectors as columns, or None for
+              open boundary conditions.
+           ih: The inverse of the cell matrix (ignored if h is None).
+
+        Returns:
+           A tuple (i, j, d), as for neighbour_pairs.
+        """
+
+        pos = np.asarray(pos).reshape((-1, 3))
+        if h is None:
+            # without periodic images, the positions play the role of the
+            # scaled coordinates
+            if self._rebuild(pos, None):
+                self._build(pos, None, None, pos)
+            d = pos[self._j] - pos[self._i]
+        else:
+            s = np.dot(pos, ih.T)
+            if self._rebuild(s, h):
+                self._build(pos, h, ih, s)
+
+            # integer jumps of the atoms that have been wrapped in the box
+            k = np.round(s - self._s).astype(int)
+            ds = s[self._j] - s[self._i] + self._n + k[self._i] - k[self._j]
+            d = np.dot(ds, h.T)
+
+        close = (d ** 2).sum(axis=1) < self.rc ** 2
+        return self._i[close], self._j[close], d[close]
+
+    def _rebuild(self, s, h):
+        """Checks whether the list needs to be rebuilt.
+
+        Args:
+           s: The scaled positions (or the positions if h is None).
+           h: The cell matrix, or None.
+        """
+
+        if (
+            self._s is None
+            or len(s) != len(self._s)
+            or (h is None) != (self._h is None)
+        ):
+            return True
+
+        if h is None:
+            disp = s - self._s
+            strain = 0.0
+        else:
+            ds = s - self._s
+            disp = np.dot(ds - np.round(ds), h.T)
+            # a deformation of the cell changes the separations by up to
+            # strain times their length
+            strain = np.linalg.norm(np.dot(h, self._ih) - np.eye(3), 2)
+        maxdisp = np.sqrt((disp ** 2).sum(axis=1).max()) if len(s) > 0 else 0.0
+
+        rlist = self.rc + self.skin
+        return rlist * (1.0 - strain) - 2 * maxdisp <= self.rc
+
+    def _build(self, pos, h, ih, s):
+        """Builds the list of pairs within the cutoff plus the skin."""
+
+        self._i, self._j, d = neighbour_pairs(pos, h, ih, self.rc + self.skin)
+        self._s = s.copy()
+        self._h = h
+        if h is not None:
+            self._ih = ih.copy()
+            # the lattice translations that bring j next to i
+            self._n = np.round(np.dot(d, ih.T) - (s[self._j] - s[self._i])).astype(int)
+        self.nbuild += 1
@@ -9,6 +9,7 @@ import numpy as np
 
 from ipi.utils.depend import dstrip
 from ipi.utils.messages import verbosity, info
+from ipi.utils.timing import timings
 
 
 __all__ = [
@@ -16,6 +17,7 @@ __all__ = [
     "nm_trans",
     "nm_rescale",
     "nm_fft",
+    "nm_rfft",
     "mk_nm_matrix",
     "mk_o_nm_matrix",
     "nm_eva",
@@ -70,6 +72,17 @@ def mk_o_nm_matrix(nbeads):
     return b2o_nm / np.sqrt(nbeads)
 
 
+def open_columns(open_paths):
+    """Returns the indices of the columns of a (nbeads, 3*natoms) array that
+    correspond to the atoms with open paths.
+
+    Args:
+       open_paths: A list with the indices of the atoms with open paths.
+    """
+
+    return (3 * np.asarray(open_paths, int)[:, np.newaxis] + np.arange(3)).flatten()
+
+
 def mk_rs_matrix(nb1, nb2):
     """Makes a matrix that transforms a path with `nb1` beads to one with `nb2` beads.
 
@@ -180,10 +193,12 @@ class nm_trans(object):
         if open_paths is None:
             open_paths = []
         self._open = open_paths
+        self._iopen = open_columns(open_paths)
         # definition of the transformation also with the open path matrx
         self._b2o_nm = mk_o_nm_matrix(nbeads)
         self._o_nm2b = self._b2o_nm.T
 
+    @timings.timed("nmtransform")
     def b2nm(self, q):
         """Transforms a matrix to the normal mode representation.
 
@@ -193,17 +208,12 @@ class nm_trans(object):
 
         qnm = np.dot(self._b2nm, q)
         if len(self._open) > 0:
-            for (
-                io
-            ) in (
-                self._open
-            ):  # does separately the transformation for the atom that are marked as open paths
-                qnm[:, 3 * io] = np.dot(self._b2o_nm, q[:, 3 * io])
-                qnm[:, 3 * io + 1] = np.dot(self._b2o_nm, q[:, 3 * io + 1])
-                qnm[:, 3 * io + 2] = np.dot(self._b2o_nm, q[:, 3 * io + 2])
+            # does separately the transformation for the atom that are marked as open paths
+            qnm[:, self._iopen] = np.dot(self._b2o_nm, q[:, self._iopen])
 
         return qnm
 
+    @timings.timed("nmtransform")
     def nm2b(self, qnm):
         """Transforms a matrix to the bead representation.
 
@@ -213,10 +223,7 @@ class nm_trans(object):
 
         q = np.dot(self._nm2b, qnm)
         if len(self._open) > 0:
-            for io in self._open:
-                q[:, 3 * io] = np.dot(self._o_nm2b, qnm[:, 3 * io])
-                q[:, 3 * io + 1] = np.dot(self._o_nm2b, qnm[:, 3 * io + 1])
-                q[:, 3 * io + 2] = np.dot(self._o_nm2b, qnm[:, 3 * io + 2])
+            q[:, self._iopen] = np.dot(self._o_nm2b, qnm[:, self._iopen])
 
         return q
 
@@ -340,6 +347,7 @@ class nm_fft(
         if open_paths is None:
             open_paths = []
         self._open = open_paths
+        self._iopen = open_columns(open_paths)
         # for atoms with open path we still use the matrix transformation
         self._b2o_nm = mk_o_nm_matrix(nbeads)
         self._o_nm2b = self._b2o_nm.T
@@ -347,9 +355,9 @@ class nm_fft(
             import pyfftw
 
             info("Import of PyFFTW successful", verbosity.medium)
-            self.qdummy = pyfftw.n_byte_align_empty((nbeads, 3 * natoms), 16, "float32")
+            self.qdummy = pyfftw.n_byte_align_empty((nbeads, 3 * natoms), 16, "float64")
             self.qnmdummy = pyfftw.n_byte_align_empty(
-                (nbeads // 2 + 1, 3 * natoms), 16, "complex64"
+                (nbeads // 2 + 1, 3 * natoms), 16, "complex128"
             )
             self.fft = pyfftw.FFTW(
                 self.qdummy, self.qnmdummy, axes=(0,), direction="FFTW_FORWARD"
@@ -363,8 +371,8 @@ class nm_fft(
                 "Import of PyFFTW unsuccessful, using NumPy library instead",
                 verbosity.medium,
             )
-            self.qdummy = np.zeros((nbeads, 3 * natoms), dtype="float32")
-            self.qnmdummy = np.zeros((nbeads // 2 + 1, 3 * natoms), dtype="complex64")
+            self.qdummy = np.zeros((nbeads, 3 * natoms), dtype="float64")
+            self.qnmdummy = np.zeros((nbeads // 2 + 1, 3 * natoms), dtype="complex128")
 
             def dummy_fft(self):
                 self.qnmdummy = np.fft.rfft(self.qdummy, axis=0)
@@ -375,6 +383,7 @@ class nm_fft(
             self.fft = lambda: dummy_fft(self)
             self.ifft = lambda: dummy_ifft(self)
 
+    @timings.timed("nmtransform")
     def b2nm(self, q):
         """Transforms a matrix to the normal mode representation.
 
@@ -410,16 +419,12 @@ class nm_fft(
                 self.qnmdummy[1:, :].imag,
             )
 
-        for (
-            io
-        ) in (
-            self._open
-        ):  # does separately the transformation for the atom that are marked as open paths
-            qnm[:, 3 * io] = np.dot(self._b2o_nm, q[:, 3 * io])
-            qnm[:, 3 * io + 1] = np.dot(self._b2o_nm, q[:, 3 * io + 1])
-            qnm[:, 3 * io + 2] = np.dot(self._b2o_nm, q[:, 3 * io + 2])
+        if len(self._open) > 0:
+            # does separately the transformation for the atom that are marked as open paths
+            qnm[:, self._iopen] = np.dot(self._b2o_nm, q[:, self._iopen])
         return qnm
 
+    @timings.timed("nmtransform")
     def nm2b(self, qnm):
         """Transforms a matrix to the bead representation.
 
@@ -458,12 +463,164 @@ class nm_fft(
         self.ifft()
         q = np.zeros(qnm.shape)
         q = self.qdummy * np.sqrt(self.nbeads)
-        for (
-            io
-        ) in (
-            self._open
-        ):  # does separately the transformation for the atom that are marked as open paths
-            q[:, 3 * io] = np.dot(self._o_nm2b, qnm[:, 3 * io])
-            q[:, 3 * io + 1] = np.dot(self._o_nm2b, qnm[:, 3 * io + 1])
-            q[:, 3 * io + 2] = np.dot(self._o_nm2b, qnm[:, 3 * io + 2])
+        if len(self._open) > 0:
+            # does separately the transformation for the atom that are marked as open paths
+            q[:, self._iopen] = np.dot(self._o_nm2b, qnm[:, self._iopen])
         return q
+
+
+class nm_rfft(object):
+
+    """Uses real-input fast Fourier transforms to do normal mode
+    transformations, in double precision and without allocating memory.
+
+    The Fourier coefficients of the rfft are packed into the real normal
+    modes, i.e. the real parts give the cosine modes and the imaginary parts
+    the sine modes, so that the result is the same as for nm_trans. All the
+    work arrays are allocated once, and b2nm and nm2b return (and overwrite)
+    the same output arrays at each call: callers must copy the result if they
+    need to keep it, as a depend_array does when it is set.
+
+    Attributes:
+       nbeads: The number of beads.
+       natoms: The number of atoms.
+       qdummy: The real array of the bead representation used by the FFTs.
+       qnmdummy: The complex array of the Fourier coefficients.
+       qnm: The array returned by b2nm.
+       q: The array returned by nm2b.
+    """
+
+    def __init__(self, nbeads, natoms, open_paths=None):
+        """Initializes nm_rfft.
+
+        Args:
+           nbeads: The number of beads.
+           natoms: The number of atoms.
+           open_paths: A list with the indices of the atoms with open paths.
+        """
+
+        self.nbeads = nbeads
+        self.natoms = natoms
+        if open_paths is None:
+            open_paths = []
+        self._open = open_paths
+        self._iopen = open_columns(open_paths)
+        # for atoms with open path we still use the matrix transformation
+        self._b2o_nm = mk_o_nm_matrix(nbeads)
+        self._o_nm2b = self._b2o_nm.T
+
+        # k = 1 ... kmax are the modes with both a cosine and a sine component
+        self._kmax = (nbeads - 1) // 2
+        self._cnorm = np.sqrt(1.0 / nbeads)
+        self._knorm = np.sqrt(2.0 / nbeads)
+
+        self.qnm = np.zeros((nbeads, 3 * natoms), float)
+        self.q = np.zeros((nbeads, 3 * natoms), float)
+        try:
+            import pyfftw
+
+            info("Import of PyFFTW successful", verbosity.medium)
+            self.qdummy = pyfftw.empty_aligned((nbeads, 3 * natoms), "float64")
+            self.qnmdummy = pyfftw.empty_aligned(
+                (nbeads // 2 + 1, 3 * natoms), "complex128"
+            )
+            self.fft = pyfftw.FFTW(
+                self.qdummy, self.qnmdummy, axes=(0,), direction="FFTW_FORWARD"
+            )
+            self.ifft = pyfftw.FFTW(
+                self.qnmdummy, self.qdummy, axes=(0,), direction="FFTW_BACKWARD"
+            )
+        except ImportError:
+            info(
+                "Import of PyFFTW unsuccessful, using NumPy library instead",
+                verbosity.medium,
+            )
+            self.qdummy = np.zeros((nbeads, 3 * natoms), float)
+            self.qnmdummy = np.zeros((nbeads // 2 + 1, 3 * natoms), complex)
+            try:
+                # numpy >= 2.0 can write the transforms in place
+                np.fft.rfft(self.qdummy, axis=0, out=self.qnmdummy)
+                self.fft = lambda: np.fft.rfft(self.qdummy, axis=0, out=self.qnmdummy)
+                self.ifft = lambda: np.fft.irfft(
+                    self.qnmdummy, n=nbeads, axis=0, out=self.qdummy
+                )
+            except TypeError:
+
+                def dummy_fft():
+                    self.qnmdummy[:] = np.fft.rfft(self.qdummy, axis=0)
+
+                def dummy_ifft():
+                    self.qdummy[:] = np.fft.irfft(self.qnmdummy, n=nbeads, axis=0)
+
+                self.fft = dummy_fft
+                self.ifft = dummy_ifft
+
+    @timings.timed("nmtransform")
+    def b2nm(self, q):
+        """Transforms a matrix to the normal mode representation.
+
+        Args:
+           q: A matrix with nbeads rows and 3*natoms columns,
+              in the bead representation.
+
+        Returns:
+           The qnm array, which is overwritten at the next call.
+        """
+
+        if self.nbeads == 1:
+            return q
+
+        nb, kmax = self.nbeads, self._kmax
+        self.qdummy[:] = q
+        self.fft()
+        c = self.qnmdummy
+        qnm = self.qnm
+
+        np.multiply(c[0].real, self._cnorm, out=qnm[0])
+        np.multiply(c[1 : kmax + 1].real, self._knorm, out=qnm[1 : kmax + 1])
+        np.multiply(
+            c[1 : kmax + 1].imag, self._knorm, out=qnm[nb - 1 : nb - kmax - 1 : -1]
+        )
+        if nb % 2 == 0:
+            np.multiply(c[nb // 2].real, self._cnorm, out=qnm[nb // 2])
+
+        if len(self._open) > 0:
+            # does separately the transformation for the atom that are marked as open paths
+            qnm[:, self._iopen] = np.dot(self._b2o_nm, q[:, self._iopen])
+        return qnm
+
+    @timings.timed("nmtransform")
+    def nm2b(self, qnm):
+        """Transforms a matrix to the bead representation.
+
+        Args:
+           qnm: A matrix with nbeads rows and 3*natoms columns,
+              in the normal mode representation.
+
+        Returns:
+           The q array, which is overwritten at the next call.
+        """
+
+        if self.nbeads == 1:
+            return qnm
+
+        nb, kmax = self.nbeads, self._kmax
+        c = self.qnmdummy
+        # irfft divides by nbeads, so the normalization is the inverse of b2nm
+        c[0].real = qnm[0]
+        c[0].imag = 0.0
+        c[0] *= nb * self._cnorm
+        c[1 : kmax + 1].real = qnm[1 : kmax + 1]
+        c[1 : kmax + 1].imag = qnm[nb - 1 : nb - kmax - 1 : -1]
+        c[1 : kmax + 1] *= 0.5 * nb * self._knorm
+        if nb % 2 == 0:
+            c[nb // 2].real = qnm[nb // 2]
+            c[nb // 2].imag = 0.0
+            c[nb // 2] *= nb * self._cnorm
+        self.ifft()
+        self.q[:] = self.qdummy
+
+        if len(self._open) > 0:
+            # does separately the transformation for the atom that are marked as open paths
+            self.q[:, self._iopen] = np.dot(self._o_nm2b, qnm[:, self._iopen])
+        return self.q
@@ -0,0 +1,115 @@
+"""Vectorised kernels for the per-atom and tensorial estimators.
+
+Positions, momenta and forces of a ring polymer are stored as (nbeads, 3*natoms)
+arrays. The functions in this module reshape them as (nbeads, natoms, 3) views
+and contract the bead, atom and Cartesian indices with einsum, so that the
+estimators computed by NormalModes, Beads and Properties do not loop over atoms
+or beads in python.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+
+
+__all__ = [
+    "atom_view",
+    "kinetic_stress",
+    "atom_kinetic",
+    "centroid_virial_tensor",
+    "gyration",
+    "tensor_upper",
+]
+
+
+def atom_view(x):
+    """Returns a view of an array of (..., 3*natoms) Cartesian components as
+    a (..., natoms, 3) array.
+    """
+
+    x = np.asarray(x)
+    return x.reshape(x.shape[:-1] + (x.shape[-1] // 3, 3))
+
+
+def kinetic_stress(p, m3, weights=None):
+    """Computes the kinetic stress tensor, sum_b w_b sum_a p_ai p_aj / m_a.
+
+    Args:
+       p: The momenta, as a (nbeads, 3*natoms) array.
+       m3: The masses, as an array that broadcasts to p.
+       weights: An optional array with a weight for each bead. Defaults to 1.
+
+    Returns:
+       The (symmetric) 3x3 kinetic stress tensor.
+    """
+
+    p = np.atleast_2d(p)
+    sp = atom_view(p / np.sqrt(m3))
+    if weights is None:
+        return np.einsum("bai,baj->ij", sp, sp)
+    return np.einsum("b,bai,baj->ij", weights, sp, sp)
+
+
+def atom_kinetic(p, m3):
+    """Computes the kinetic energy of each atom in each bead.
+
+    Args:
+       p: The momenta, as a (nbeads, 3*natoms) array.
+       m3: The masses, as an array that broadcasts to p.
+
+    Returns:
+       A (nbeads, natoms) array with the kinetic energies p^2/2m.
+    """
+
+    p = np.atleast_2d(p)
+    return 0.5 * atom_view(p * p / m3).sum(axis=-1)
+
+
+def centroid_virial_tensor(q, qc, f):
+    """Computes the centroid-virial contribution of each atom to the kinetic
+    energy tensor, -1/2 <(q - qc) f> averaged over the beads.
+
+    Args:
+       q: The bead positions, as a (nbeads, 3*natoms) array.
+       qc: The centroid positions, as a 3*natoms array.
+       f: The forces on the beads, as a (nbeads, 3*natoms) array.
+
+    Returns:
+       A (natoms, 3, 3) array with the symmetrised tensor of each atom,
+       without the constant kT/2 contribution to the diagonal.
+    """
+
+    dq = atom_view(q - qc)
+    kcv = np.einsum("bai,baj->aij", dq, atom_view(f))
+    kcv += kcv.transpose(0, 2, 1)
+    kcv *= -0.25 / len(dq)
+    return kcv
+
+
+def gyration(q, qc):
+    """Computes the mean square deviation of the beads from the centroid,
+    separately for each atom and Cartesian component.
+
+    Args:
+       q: The bead positions, as a (nbeads, 3*natoms) array.
+       qc: The centroid positions, as a 3*natoms array.
+
+    Returns:
+       A (natoms, 3) array, whose sum over the last axis is the square of
+       the radius of gyration of each atom.
+    """
+
+    dq = atom_view(q - qc)
+    return np.einsum("bai,bai->ai", dq, dq) / len(dq)
+
+
+def tensor_upper(t):
+    """Returns the xx, yy, zz, xy, xz, yz components of (an array of) 3x3
+    tensors, in the order used for the output of the kinetic tensors.
+    """
+
+    t = np.asarray(t)
+    return t[..., [0, 1, 2, 0, 0, 1], [0, 1, 2, 1, 2, 2]]
@@ -0,0 +1,202 @@
+"""Classes to measure the time spent in the different phases of a step."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+import threading
+import time
+from functools import wraps
+
+
+__all__ = ["Timings", "timings", "PHASES"]
+
+
+# the phases that are timed in the simulation loop, and what is timed
+PHASES = {
+    "forces": "waiting for the forces to be computed",
+    "dispatch": "sending configurations to the socket clients",
+    "poll": "checking the socket clients and receiving the forces",
+    "nmtransform": "in normal-mode transformations",
+    "thermostat": "in thermostat steps",
+    "barostat": "in barostat steps",
+    "constraints": "applying constraints to positions and momenta",
+    "output": "computing and writing properties and trajectories",
+    "checkpoint": "storing and writing checkpoints",
+}
+
+
+class _Section(object):
+    """Context manager that times a section of code."""
+
+    __slots__ = ["registry", "name"]
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.registry._stack().append([time.perf_counter(), 0.0])
+
+    def __exit__(self, *args):
+        self.registry._close(self.name)
+
+
+class Timings(object):
+
+    """Accumulates the time spent in named sections of the code.
+
+    Sections are timed either with a context manager or with a decorator,
+
+        with timings.section("thermostat"):
+            ...
+
+        @timings.timed("output")
+        def write(self):
+            ...
+
+    and may be nested, in which case the time spent in the inner sections
+    is not counted in the outer ones, so the times of different sections
+    never overlap within one thread. Sections timed in different threads
+    (e.g. the socket dispatch, or the steps of several systems) are summed,
+    and may add up to more than the wall time.
+
+    The times are also collected per step: step() is called at the
+    beginning of each step of the simulation, and closes the previous one.
+
+    Attributes:
+        nsteps: The number of steps that have been closed.
+        last: A dictionary with the time spent in each section during the
+            last step that has been closed, and the total wall time of that
+            step under the key 'step'.
+        total: A dictionary with the time spent in each section since the
+            registry was created or reset, and the wall time of all the
+            closed steps under the key 'step'.
+        calls: A dictionary with the number of times each section was timed.
+    """
+
+    def __init__(self):
+        """Initialises Timings."""
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Clears all the timings."""
+
+        with self._lock:
+            self.nsteps = 0
+            self.current = {}
+            self.last = {}
+            self.total = {}
+            self.calls = {}
+            self._tstep = None
+
+    def _stack(self):
+        """Returns the stack of the sections open in the current thread."""
+
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _close(self, name):
+        """Closes the innermost section of the current thread."""
+
+        stack = self._stack()
+        start, nested = stack.pop()
+        elapsed = time.perf_counter() - start
+        if len(stack) > 0:
+            stack[-1][1] += elapsed
+        self.add(name, elapsed - nested)
+
+    def add(self, name, elapsed):
+        """Adds some time to a section.
+
+        Args:
+            name: The name of the section.
+            elapsed: The time spent in the section, in seconds.
+        """
+
+        with self._lock:
+            self.current[name] = self.current.get(name, 0.0) + elapsed
+            self.total[name] = self.total.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def section(self, name):
+        """Returns a context manager that times the code it encloses.
+
+        Args:
+            name: The name of the section.
+        """
+
+        return _Section(self, name)
+
+    def timed(self, name):
+        """Returns a decorator that times all the calls of a function.
+
+        Args:
+            name: The name of the section.
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def timed_f(*args, **kwargs):
+                self._stack().append([time.perf_counter(), 0.0])
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self._close(name)
+
+            return timed_f
+
+        return decorator
+
+    def step(self):
+        """Closes the current step, and starts a new one."""
+
+        now = time.perf_counter()
+        with self._lock:
+            if self._tstep is not None:
+                self.last = self.current
+                self.last["step"] = now - self._tstep
+                self.total["step"] = self.total.get("step", 0.0) + self.last["step"]
+                self.calls["step"] = self.calls.get("step", 0) + 1
+                self.nsteps += 1
+            self.current = {}
+            self._tstep = now
+
+    def summary(self):
+        """Returns a dictionary with the number of steps, and the total time,
+        the number of calls and the average time per step of each section."""
+
+        with self._lock:
+            nsteps = max(self.nsteps, 1)
+            return {
+                "nsteps": self.nsteps,
+                "sections": {
+                    name: {
+                        "total": t,
+                        "calls": self.calls[name],
+                        "per_step": t / nsteps,
+                    }
+                    for name, t in sorted(self.total.items())
+                },
+            }
+
+    def write_json(self, filename):
+        """Writes the summary of the timings to a file, in JSON format.
+
+        Args:
+            filename: The name of the file.
+        """
+
+        with open(filename, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+
+
+timings = Timings()
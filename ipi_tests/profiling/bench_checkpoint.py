@@ -0,0 +1,86 @@
+"""Measures the time needed to write and load checkpoint files, in the xml
+and in the binary npz format, and to store the snapshot of the state that is
+taken at every step.
+
+Builds a PIMD simulation of a random Lennard-Jones fluid with a PILE_L
+thermostat, writes its checkpoint in both formats to a temporary folder, and
+loads it back as an input file (which is what happens when restarting a
+simulation). Run as
+
+    python -m ipi_tests.profiling.bench_checkpoint --natoms 100000 --nbeads 32
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import os
+import tempfile
+import time
+
+from ipi.engine.outputs import CheckpointOutput
+from ipi.engine.simulation import Simulation
+from ipi_tests.profiling.benchtools import random_xyz, simulation_xml, print_table
+
+
+def load(filename):
+    """Loads a simulation without starting the forcefields."""
+
+    return Simulation.load_from_xml(filename, custom_verbosity="quiet", read_only=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, default=10000)
+    parser.add_argument("--nbeads", type=int, default=32)
+    args = parser.parse_args()
+
+    ffxml = (
+        "<fflj name='bench' pbc='true'><parameters>"
+        "{eps: 0.0004, sigma: 6.0, cutoff: 12.0}</parameters></fflj>"
+    )
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ipi_bench_") as tmpdir:
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+        try:
+            with open("init.xyz", "w") as f:
+                f.write(random_xyz(args.natoms))
+            with open("input.xml", "w") as f:
+                f.write(simulation_xml(ffxml, nbeads=args.nbeads, dynamics="pile_l"))
+            simul = load("input.xml")
+
+            # the snapshot taken at the beginning of every step
+            chk = CheckpointOutput("RESTART", stride=1)
+            chk.bind(simul)
+            nstore = 100
+            tstart = time.time()
+            for i in range(nstore):
+                chk.store()
+            tstore = (time.time() - tstart) / nstore
+
+            for fmt in ["xml", "npz"]:
+                filename = "restart." + fmt
+                chk = CheckpointOutput(filename, stride=1, format=fmt)
+                chk.bind(simul)
+
+                tstart = time.time()
+                chk.write()
+                twrite = time.time() - tstart
+                size = os.path.getsize(filename) / 1e6
+
+                tstart = time.time()
+                load(filename)
+                tload = time.time() - tstart
+
+                rows.append([fmt, "%.1f" % size, "%.3f" % twrite, "%.3f" % tload])
+        finally:
+            os.chdir(cwd)
+    print_table(["format", "size [MB]", "write [s]", "load [s]"], rows)
+    print("per-step store: %.3f ms" % (tstore * 1e3))
+
+
+if __name__ == "__main__":
+    main()
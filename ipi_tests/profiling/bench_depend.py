@@ -0,0 +1,125 @@
+"""Measures the overhead of the depend machinery, in the dynamic and in the
+compiled mode of the dependency graph.
+
+Sets up (without running it) a PIMD simulation of a random Lennard-Jones
+fluid with a PILE_L thermostat, and times the basic operations on the
+positions of its beads: reading them when they are up to date (get),
+assigning them (set, which taints everything that depends on them),
+tainting them without changing their value (taint), and taking the view of
+one of the beads (slice). Then runs a short simulation in both modes, and
+reports the average time per step. Run as
+
+    python -m ipi_tests.profiling.bench_depend --natoms 8 --nbeads 16
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ipi.engine.simulation import Simulation
+from ipi.utils.depend import dd, dstrip, dcompile, ddynamic
+from ipi_tests.profiling.benchtools import (
+    random_xyz,
+    simulation_xml,
+    run_ipi,
+    step_timings,
+    print_table,
+)
+
+
+ffxml = (
+    "<fflj name='bench' pbc='true'><parameters>"
+    "{eps: 0.0004, sigma: 6.0, cutoff: 12.0}</parameters></fflj>"
+)
+
+
+def timeit(f, nrep):
+    """Returns the average time of a call to f, in microseconds."""
+
+    f()
+    tstart = time.time()
+    for i in range(nrep):
+        f()
+    return (time.time() - tstart) / nrep * 1e6
+
+
+def micro(beads, nrep):
+    """Returns the time of the get, set, taint and slice operations."""
+
+    q = dstrip(beads.q).copy()
+    dq = dd(beads).q
+
+    def get():
+        beads.q
+
+    def set():
+        beads.q = q
+        beads.qc  # recomputes a dependant, so that set has to taint again
+
+    def taint():
+        dq.taint(taintme=False)
+        beads.qc
+
+    def slice():
+        beads.q[0]
+
+    return [timeit(f, nrep) for f in [get, set, taint, slice]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, default=8)
+    parser.add_argument("--nbeads", type=int, default=16)
+    parser.add_argument("--nsteps", type=int, default=500)
+    parser.add_argument(
+        "--nrep", type=int, default=10000, help="Number of timed operations."
+    )
+    args = parser.parse_args()
+
+    xyz = random_xyz(args.natoms)
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ipi_bench_") as tmpdir:
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+        try:
+            with open("init.xyz", "w") as f:
+                f.write(xyz)
+            with open("input.xml", "w") as f:
+                f.write(simulation_xml(ffxml, nbeads=args.nbeads, dynamics="pile_l"))
+            simul = Simulation.load_from_xml(
+                "input.xml", custom_verbosity="quiet", read_only=True
+            )
+            beads = simul.syslist[0].beads
+            for mode in ["dynamic", "compiled"]:
+                if mode == "compiled":
+                    dcompile(threadsafe=True)
+                try:
+                    rows.append([mode] + micro(beads, args.nrep))
+                finally:
+                    ddynamic()
+        finally:
+            os.chdir(cwd)
+
+    for row in rows:
+        inputxml = simulation_xml(
+            ffxml, nbeads=args.nbeads, nsteps=args.nsteps, dynamics="pile_l"
+        ).replace("<simulation ", "<simulation depend_graph='%s' " % row[0])
+        log = run_ipi(inputxml, files={"init.xyz": xyz})
+        row.append(np.mean(step_timings(log)) * 1e3)
+
+    print_table(
+        ["mode", "get [us]", "set [us]", "taint [us]", "slice [us]", "step [ms]"],
+        [[row[0]] + ["%.2f" % t for t in row[1:]] for row in rows],
+    )
+
+
+if __name__ == "__main__":
+    main()
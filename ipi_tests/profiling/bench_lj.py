@@ -0,0 +1,98 @@
+"""Measures the cost of the internal LJ forcefield as a function of system size.
+
+Evaluates FFLennardJones on a liquid-like configuration in a periodic box,
+with a cutoff, reporting separately the first call, that builds the Verlet
+list, and the following ones, in which the atoms move slightly and the list
+is reused. For comparison, also times the sum over all pairs (no cutoff,
+no periodic boundary conditions) for the smaller systems. Run as
+
+    python -m ipi_tests.profiling.bench_lj --natoms 1000 10000 100000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import time
+
+import numpy as np
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import FFLennardJones
+from ipi_tests.profiling.benchtools import print_table
+
+
+# LJ parameters of argon in atomic units, at the density of the liquid
+sigma, eps, density = 6.43, 3.8e-4, 0.0028
+
+
+def evaluate(ff, atoms, cell):
+    """Returns the time needed to compute the forces for one configuration."""
+
+    tstart = time.time()
+    r = ff.queue(atoms, cell, reqid=0)
+    t = time.time() - tstart
+    ff.release(r)
+    return t
+
+
+def bench(natoms, nsteps, allpairs):
+    """Returns the time for the first and the following evaluations, the
+    number of times the Verlet list was built, and the time for the sum over
+    all pairs."""
+
+    prng = np.random.RandomState(12345)
+    box = (natoms / density) ** (1.0 / 3.0)
+    ncell = int(np.ceil(natoms ** (1.0 / 3.0)))
+    grid = np.array(np.meshgrid(*[np.arange(ncell)] * 3)).reshape((3, -1)).T
+    atoms = Atoms(natoms)
+    atoms.q = (grid[:natoms] + prng.uniform(-0.1, 0.1, (natoms, 3))).flatten()
+    atoms.q *= box / ncell
+    cell = Cell(np.eye(3) * box)
+
+    ff = FFLennardJones(
+        pars={"eps": eps, "sigma": sigma, "cutoff": 2.5 * sigma}, dopbc=True
+    )
+    tfirst = evaluate(ff, atoms, cell)
+    times = []
+    for step in range(nsteps):
+        atoms.q += prng.normal(scale=0.01, size=3 * natoms)
+        times.append(evaluate(ff, atoms, cell))
+
+    nbuild = ff.nlists[0].nbuild
+
+    tall = np.nan
+    if allpairs:
+        ff = FFLennardJones(pars={"eps": eps, "sigma": sigma}, dopbc=False)
+        tall = evaluate(ff, atoms, cell)
+    return tfirst, np.mean(times), nbuild, tall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--nsteps", type=int, default=10)
+    parser.add_argument(
+        "--maxallpairs",
+        type=int,
+        default=10000,
+        help="Largest system for which the sum over all pairs is timed.",
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for natoms in args.natoms:
+        tfirst, tstep, nbuild, tall = bench(
+            natoms, args.nsteps, natoms <= args.maxallpairs
+        )
+        rows.append([natoms, "%.3e" % tfirst, "%.3e" % tstep, nbuild, "%.3e" % tall])
+    print_table(
+        ["natoms", "t first [s]", "t step [s]", "builds", "t all pairs [s]"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Measures the cost of the propagation of the free ring polymer.
+
+Times NormalModes.free_qstep, which propagates all the normal modes of all
+the atoms with broadcasted in-place operations, and compares it with the
+original implementation, that looped over the modes (and over atoms,
+components and modes for open paths). Run as
+
+    python -m ipi_tests.profiling.bench_nmprop --nbeads 256 --natoms 10000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import time
+
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.ensembles import Ensemble
+from ipi.engine.normalmodes import NormalModes
+from ipi.utils.depend import dobject, dd, depend_value, dstrip
+from ipi_tests.profiling.benchtools import print_table
+
+
+class Motion(dobject):
+
+    """A minimal motion object, that only holds the time step."""
+
+    def __init__(self, dt):
+        dd(self).dt = depend_value(name="dt", value=dt)
+
+
+def loop_qstep(nm):
+    """The original propagator, with a loop over the normal modes."""
+
+    pq = np.zeros((2, nm.natoms * 3), float)
+    sm = dstrip(nm.beads.sm3)
+    prop_pq = dstrip(nm.prop_pq)
+    o_prop_pq = dstrip(nm.o_prop_pq)
+    pnm = dstrip(nm.pnm) / sm
+    qnm = dstrip(nm.qnm) * sm
+
+    for k in range(1, nm.nbeads):
+        pq[0, :] = pnm[k]
+        pq[1, :] = qnm[k]
+        pq = np.dot(prop_pq[k], pq)
+        qnm[k] = pq[1, :]
+        pnm[k] = pq[0, :]
+
+    pq = np.zeros(2)
+    for j in nm.open_paths:
+        for a in range(3 * j, 3 * (j + 1)):
+            for k in range(1, nm.nbeads):
+                pq[0] = nm.pnm[k, a] / sm[k, a]
+                pq[1] = nm.qnm[k, a] * sm[k, a]
+                pq = np.dot(o_prop_pq[k], pq)
+                qnm[k, a] = pq[1]
+                pnm[k, a] = pq[0]
+    nm.pnm = pnm * sm
+    nm.qnm = qnm / sm
+
+
+def bench(nbeads, natoms, nopen, propagator, nsteps):
+    """Returns the time per step of the vectorised and of the looped
+    propagator."""
+
+    prng = np.random.RandomState(12345)
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = np.ones(natoms) * 1837.0
+
+    nm = NormalModes(
+        transform_method="fft", propagator=propagator, open_paths=range(nopen)
+    )
+    nm.bind(Ensemble(temp=1e-3), Motion(40.0), beads)
+    nm.qnm, nm.pnm
+
+    times = []
+    for step in [nm.free_qstep, lambda: loop_qstep(nm)]:
+        step()
+        tstart = time.time()
+        for i in range(nsteps):
+            step()
+        times.append((time.time() - tstart) / nsteps)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nbeads", type=int, nargs="+", default=[32, 256])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument(
+        "--nopen", type=int, default=0, help="Number of atoms with open paths."
+    )
+    parser.add_argument("--propagator", default="exact", choices=["exact", "cayley"])
+    parser.add_argument("--nsteps", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for nbeads in args.nbeads:
+        for natoms in args.natoms:
+            tvec, tloop = bench(
+                nbeads, natoms, args.nopen, args.propagator, args.nsteps
+            )
+            rows.append(
+                [nbeads, natoms, "%.3e" % tvec, "%.3e" % tloop, "%.1f" % (tloop / tvec)]
+            )
+    print_table(["nbeads", "natoms", "t vectorised [s]", "t loop [s]", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
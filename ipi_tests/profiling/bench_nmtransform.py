@@ -0,0 +1,78 @@
+"""Measures the cost of the normal mode transformations.
+
+Times a forward and a backward transformation with the matrix
+multiplication (nm_trans), the complex FFT (nm_fft) and the packed real FFT
+on preallocated arrays (nm_rfft), for a range of numbers of beads and atoms.
+Run as
+
+    python -m ipi_tests.profiling.bench_nmtransform --nbeads 8 32 128 --natoms 100 10000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import time
+
+import numpy as np
+
+from ipi.utils import nmtransform
+from ipi_tests.profiling.benchtools import print_table
+
+
+def bench(transform, q, nrep):
+    """Returns the average time of a b2nm followed by a nm2b, and the largest
+    error in the round trip."""
+
+    qnm = transform.b2nm(q)
+    tstart = time.time()
+    for i in range(nrep):
+        qnm = transform.b2nm(q)
+        qb = transform.nm2b(qnm)
+    t = (time.time() - tstart) / nrep
+    return t, np.abs(qb - q).max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nbeads", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument(
+        "--nrep", type=int, default=20, help="Number of timed transformations."
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for nbeads in args.nbeads:
+        for natoms in args.natoms:
+            q = np.random.RandomState(12345).normal(size=(nbeads, 3 * natoms))
+            transforms = [
+                nmtransform.nm_trans(nbeads),
+                nmtransform.nm_fft(nbeads, natoms),
+                nmtransform.nm_rfft(nbeads, natoms),
+            ]
+            row = [nbeads, natoms]
+            for transform in transforms:
+                t, err = bench(transform, q, args.nrep)
+                row += ["%.3e" % t, "%.1e" % err]
+            rows.append(row)
+
+    print_table(
+        [
+            "nbeads",
+            "natoms",
+            "t matrix [s]",
+            "err",
+            "t fft [s]",
+            "err",
+            "t rfft [s]",
+            "err",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
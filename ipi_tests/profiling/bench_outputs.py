@@ -0,0 +1,88 @@
+"""Measures the time per step spent writing outputs, with and without the
+asynchronous output queue.
+
+Runs a PIMD simulation of a Lennard-Jones fluid with socket drivers, printing
+the positions and forces of all the beads and a few properties at every step.
+The outputs are either written synchronously (queue='0'), or handed to the
+output thread, which formats and writes them while the drivers compute the
+next forces. A run without outputs gives the reference cost of a step. Run as
+
+    python -m ipi_tests.profiling.bench_outputs --natoms 1000 --nbeads 8
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+
+from ipi_tests.profiling.benchtools import (
+    call_driver,
+    call_pydriver,
+    random_xyz,
+    simulation_xml,
+    run_ipi,
+    step_timings,
+    print_table,
+    unique_address,
+)
+
+
+outputs = """
+    <trajectory filename='pos' stride='1'> positions </trajectory>
+    <trajectory filename='for' stride='1'> forces </trajectory>
+    <properties stride='1' filename='out'>
+      [ step, time, conserved, temperature, potential, kinetic_cv ]
+    </properties>
+"""
+
+
+def bench(queue, nbeads, natoms, ndrivers, nsteps, driver):
+    """Returns the average time per step, for a given size of the output
+    queue, or without outputs if queue is None."""
+
+    address = unique_address("outputs_%s" % queue)
+    ffxml = (
+        "<ffsocket name='bench' mode='unix' pbc='true'>"
+        "<address> %s </address><latency> 1e-4 </latency></ffsocket>" % address
+    )
+    xml = simulation_xml(
+        ffxml,
+        nbeads=nbeads,
+        nsteps=nsteps,
+        dynamics="pile_l",
+        outputs="" if queue is None else outputs,
+    )
+    if queue is not None:
+        xml = xml.replace(
+            "<output prefix='bench'>", "<output prefix='bench' queue='%d'>" % queue
+        )
+    drivers = [
+        driver + ["-u", "-h", address, "-m", "lj", "-o", "3.8e-4,6.43,12.0"]
+    ] * ndrivers
+    log = run_ipi(xml, files={"init.xyz": random_xyz(natoms)}, drivers=drivers)
+
+    return step_timings(log).mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nbeads", type=int, default=8)
+    parser.add_argument("--natoms", type=int, default=1000)
+    parser.add_argument("--ndrivers", type=int, default=4)
+    parser.add_argument("--nsteps", type=int, default=50)
+    parser.add_argument("--queue", type=int, nargs="+", default=[0, 4, 32])
+    parser.add_argument("--driver", choices=["fortran", "python"], default="fortran")
+    args = parser.parse_args()
+    driver = call_driver if args.driver == "fortran" else call_pydriver
+
+    rows = []
+    for queue in [None] + args.queue:
+        t = bench(queue, args.nbeads, args.natoms, args.ndrivers, args.nsteps, driver)
+        rows.append(["no output" if queue is None else queue, "%.3e" % t])
+    print_table(["queue", "t/step [s]"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measures the time needed to compute a dynamical matrix by finite
+differences, as a function of the number of rows computed at once.
+
+Runs a phonon calculation (<motion mode='vibrations'>) for a random
+Lennard-Jones system with several socket drivers. With <nparallel> N, the 2N
+displaced configurations of N rows are sent to the forcefield together and
+are computed concurrently by the drivers, instead of one at a time. Reports
+the time spent in the finite-difference steps, and the wall time of the run,
+that also includes starting i-PI and writing the final matrices. Run as
+
+    python -m ipi_tests.profiling.bench_phonons --natoms 64 --ndrivers 4
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import time
+
+import numpy as np
+
+from ipi_tests.profiling.benchtools import (
+    call_driver,
+    call_pydriver,
+    random_xyz,
+    run_ipi,
+    step_timings,
+    print_table,
+    unique_address,
+)
+
+
+template = """<simulation verbosity='high'>
+  <output prefix='bench'/>
+  <total_steps> 1000000 </total_steps>
+  <ffsocket name='bench' mode='unix' pbc='true'>
+    <address> %s </address><latency> 1e-4 </latency>
+  </ffsocket>
+  <system>
+    <initialize nbeads='1'><file mode='xyz'> init.xyz </file></initialize>
+    <forces><force forcefield='bench'> </force></forces>
+    <motion mode='vibrations'>
+      <vibrations mode='fd'>
+        <pos_shift> 0.01 </pos_shift>
+        <nparallel> %d </nparallel>
+      </vibrations>
+    </motion>
+    <ensemble><temperature units='kelvin'> 100 </temperature></ensemble>
+  </system>
+</simulation>
+"""
+
+
+def bench(nparallel, natoms, ndrivers, driver):
+    """Returns the number of steps, the total time of the steps and the wall
+    time of the phonon calculation."""
+
+    address = unique_address("phonons_%d" % nparallel)
+    drivers = [
+        driver + ["-u", "-h", address, "-m", "lj", "-o", "6.43,3.8e-4,15.0"]
+    ] * ndrivers
+    tstart = time.time()
+    log = run_ipi(
+        template % (address, nparallel),
+        files={"init.xyz": random_xyz(natoms, density=0.002)},
+        drivers=drivers,
+    )
+    if "Dynamic matrix is calculated" not in log:
+        raise RuntimeError("The phonon calculation did not complete:\n" + log)
+    twall = time.time() - tstart
+    t = step_timings(log, skip=0)
+    return len(t), np.sum(t), twall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, default=64)
+    parser.add_argument("--ndrivers", type=int, default=4)
+    parser.add_argument("--nparallel", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--driver", choices=["fortran", "python"], default="fortran")
+    args = parser.parse_args()
+    driver = call_driver if args.driver == "fortran" else call_pydriver
+
+    rows = []
+    for nparallel in args.nparallel:
+        nsteps, tsteps, twall = bench(nparallel, args.natoms, args.ndrivers, driver)
+        rows.append([nparallel, nsteps, "%.2f" % tsteps, "%.2f" % twall])
+    print_table(["nparallel", "steps", "steps [s]", "wall time [s]"], rows)
+
+
+if __name__ == "__main__":
+    main()
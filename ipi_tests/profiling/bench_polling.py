@@ -0,0 +1,79 @@
+"""Compares the throughput of the socket interface with the two polling modes.
+
+Runs a short PIMD simulation with a number of 'dummy' drivers, which
+return immediately, so that the time per step is dominated by the
+communication overhead. Run as
+
+    python -m ipi_tests.profiling.bench_polling --nbeads 16 --ndrivers 4
+
+By default uses the Fortran driver (bin/i-pi-driver, see the drivers/ folder);
+use --driver python to run the python driver in ipi/clients instead.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+
+from ipi_tests.profiling.benchtools import (
+    call_driver,
+    call_pydriver,
+    random_xyz,
+    simulation_xml,
+    run_ipi,
+    step_timings,
+    print_table,
+    unique_address,
+)
+
+
+def bench(polling, latency, nbeads, natoms, ndrivers, nsteps, driver):
+    """Returns the average time per step for one setup."""
+
+    address = unique_address("poll_" + polling)
+    ffxml = (
+        "<ffsocket name='bench' mode='unix' pbc='false' polling='%s'>"
+        "<address> %s </address><latency> %e </latency></ffsocket>"
+        % (polling, address, latency)
+    )
+    xml = simulation_xml(ffxml, nbeads=nbeads, nsteps=nsteps)
+    drivers = [driver + ["-u", "-h", address, "-m", "dummy"]] * ndrivers
+    log = run_ipi(xml, files={"init.xyz": random_xyz(natoms)}, drivers=drivers)
+
+    return step_timings(log).mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nbeads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--natoms", type=int, default=64)
+    parser.add_argument("--ndrivers", type=int, default=4)
+    parser.add_argument("--nsteps", type=int, default=200)
+    parser.add_argument("--latency", type=float, nargs="+", default=[1e-2, 1e-3])
+    parser.add_argument("--driver", choices=["fortran", "python"], default="fortran")
+    args = parser.parse_args()
+    driver = call_driver if args.driver == "fortran" else call_pydriver
+
+    rows = []
+    for nbeads in args.nbeads:
+        for latency in args.latency:
+            for polling in ["latency", "event"]:
+                t = bench(
+                    polling,
+                    latency,
+                    nbeads,
+                    args.natoms,
+                    args.ndrivers,
+                    args.nsteps,
+                    driver,
+                )
+                rows.append(
+                    [nbeads, "%.0e" % latency, polling, "%.3e" % t, "%.1f" % (1 / t)]
+                )
+    print_table(["nbeads", "latency", "polling", "t/step [s]", "steps/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Measures the cost of computing per-atom and tensorial properties.
+
+Runs a short PIMD simulation with the internal LJ forcefield, once without
+any output and once printing a set of properties at every step (by default
+the MD and centroid-virial kinetic energy tensors, the kinetic energy of a
+species and the gyration radius), and reports the difference in the time per
+step as a function of the number of atoms. Run as
+
+    python -m ipi_tests.profiling.bench_properties --natoms 100 1000 10000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+
+from ipi_tests.profiling.benchtools import (
+    random_xyz,
+    simulation_xml,
+    run_ipi,
+    step_timings,
+    print_table,
+)
+
+
+default_properties = [
+    "step",
+    "kstress_md",
+    "kinetic_md(Ar)",
+    "kinetic_tens(Ar)",
+    "r_gyration",
+]
+
+
+def bench(natoms, nbeads, nsteps, properties):
+    """Returns the average time per step without and with the output of
+    the properties."""
+
+    # LJ parameters of argon in atomic units, with a short cutoff
+    ffxml = (
+        "<fflj name='bench' pbc='true'>"
+        "<parameters>{eps: 3.8e-4, sigma: 6.43, cutoff: 10.0}</parameters>"
+        "</fflj>"
+    )
+    outputs = "<properties stride='1' filename='out'> [ %s ] </properties>" % (
+        ", ".join(properties)
+    )
+
+    times = []
+    for out in ["", outputs]:
+        xml = simulation_xml(ffxml, nbeads=nbeads, nsteps=nsteps, outputs=out)
+        log = run_ipi(xml, files={"init.xyz": random_xyz(natoms)})
+        times.append(step_timings(log).mean())
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--nbeads", type=int, default=16)
+    parser.add_argument("--nsteps", type=int, default=20)
+    parser.add_argument(
+        "--properties",
+        nargs="+",
+        default=default_properties,
+        help="The properties to be printed at every step.",
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for natoms in args.natoms:
+        tbare, tprop = bench(natoms, args.nbeads, args.nsteps, args.properties)
+        rows.append([natoms, "%.3e" % tbare, "%.3e" % tprop, "%.3e" % (tprop - tbare)])
+    print_table(
+        ["natoms", "t/step [s]", "t/step with output [s]", "t properties [s]"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measures the throughput of the receive path of the socket interface.
+
+A thread writes FORCEREADY replies for natoms atoms into one end of a
+socket pair, and the other end reads them with Driver._recvforce, as
+done by the i-PI server for every force evaluation. Run as
+
+    python -m ipi_tests.profiling.bench_recv --natoms 1000 100000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import socket
+import threading
+import time
+
+import numpy as np
+
+from ipi.interfaces.sockets import Driver
+from ipi_tests.profiling.benchtools import print_table
+
+
+def writer(sock, natoms, nrep):
+    """Sends nrep replies with the results for natoms atoms."""
+
+    msg = b"".join(
+        [
+            np.float64(1.0).tobytes(),
+            np.int32(natoms).tobytes(),
+            np.random.uniform(size=3 * natoms).tobytes(),
+            np.zeros(9).tobytes(),
+            np.int32(0).tobytes(),
+        ]
+    )
+    for i in range(nrep):
+        sock.sendall(msg)
+
+
+def bench(natoms, nrep, inplace):
+    """Returns the time needed to receive one reply."""
+
+    a, b = socket.socketpair()
+    reader = Driver(a)
+    reader.settimeout(1.0)
+    thread = threading.Thread(target=writer, args=(b, natoms, nrep))
+    thread.daemon = True
+
+    dest = np.zeros(3 * natoms) if inplace else None
+    thread.start()
+    tstart = time.time()
+    for i in range(nrep):
+        reader._recvforce(dest)
+    t = (time.time() - tstart) / nrep
+    thread.join()
+
+    for s in (reader, a, b):
+        s.close()
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--nrep", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = []
+    for natoms in args.natoms:
+        for inplace in [False, True]:
+            t = bench(natoms, args.nrep, inplace)
+            rows.append(
+                [
+                    natoms,
+                    "in place" if inplace else "buffer",
+                    "%.3e" % t,
+                    "%.1f" % (natoms * 24 / t / 1e6),
+                ]
+            )
+    print_table(["natoms", "destination", "t/reply [s]", "MB/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
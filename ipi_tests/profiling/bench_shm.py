@@ -0,0 +1,108 @@
+"""Compares the throughput of the socket interface in 'unix' and 'shm' mode.
+
+The i-PI side of the interface runs in this process, and repeatedly sends
+nbeads configurations to a number of python drivers (see ipi/clients) using
+the 'gas' potential, that returns zero forces, so that the time is dominated
+by the exchange of positions and forces. Run as
+
+    python -m ipi_tests.profiling.bench_shm --natoms 1000 100000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import os
+import subprocess as sp
+import time
+
+import numpy as np
+
+from ipi.engine.forcefields import ForceRequest
+from ipi.interfaces.sockets import InterfaceSocket
+from ipi_tests.profiling.benchtools import (
+    call_pydriver,
+    ipi_root,
+    print_table,
+    unique_address,
+)
+
+
+def bench(mode, natoms, nbeads, nclients, nsteps):
+    """Returns the average time needed to get the forces for all the beads."""
+
+    address = unique_address("shm_" + mode)
+    iface = InterfaceSocket(address=address, mode=mode, timeout=60.0)
+    iface.open()
+    env = dict(os.environ, PYTHONPATH=str(ipi_root))
+    driver = call_pydriver + ["-u", "-h", address, "-m", "gas"]
+    if mode == "shm":
+        driver.append("--shm")
+    clients = [sp.Popen(driver, env=env, stdout=sp.DEVNULL) for i in range(nclients)]
+
+    pos = np.random.uniform(size=(nbeads, 3 * natoms))
+    cell = (np.eye(3), np.eye(3))
+    times = []
+    try:
+        for step in range(nsteps + 2):
+            requests = [
+                ForceRequest(
+                    {
+                        "id": b,
+                        "pos": pos[b],
+                        "active": slice(None),
+                        "cell": cell,
+                        "pars": " ",
+                        "result": None,
+                        "status": "Queued",
+                        "start": -1,
+                        "t_queued": time.time(),
+                        "t_dispatched": 0,
+                        "t_finished": 0,
+                    }
+                )
+                for b in range(nbeads)
+            ]
+            tstart = time.time()
+            iface.requests = requests
+            while not all(r["status"] == "Done" for r in requests):
+                iface.poll()
+                iface.wait(1e-3)
+            times.append(time.time() - tstart)
+    finally:
+        iface.close()
+        for c in clients:
+            c.wait(10)
+
+    # the first steps include the connection of the clients
+    return np.mean(times[2:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--nbeads", type=int, default=8)
+    parser.add_argument("--nclients", type=int, default=2)
+    parser.add_argument("--nsteps", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = []
+    for natoms in args.natoms:
+        for mode in ["unix", "shm"]:
+            t = bench(mode, natoms, args.nbeads, args.nclients, args.nsteps)
+            rows.append(
+                [
+                    natoms,
+                    mode,
+                    "%.3e" % t,
+                    # positions and forces for each bead
+                    "%.1f" % (args.nbeads * natoms * 48 / t / 1e6),
+                ]
+            )
+    print_table(["natoms", "mode", "t/step [s]", "MB/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Measures the cost of the normal-mode thermostats.
+
+Times the step of the PILE_L and NM-GLE thermostats, that propagate all the
+normal modes at once on a stacked array, and compares it with the original
+implementation, that stepped one Langevin or GLE thermostat per normal mode.
+Run as
+
+    python -m ipi_tests.profiling.bench_thermostats --nbeads 64 --natoms 1000
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import time
+
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.ensembles import Ensemble
+from ipi.engine.normalmodes import NormalModes
+from ipi.engine.thermostats import (
+    ThermoLangevin,
+    ThermoGLE,
+    ThermoPILE_L,
+    ThermoNMGLE,
+)
+from ipi.utils.depend import dobject, dd, depend_value, dstrip
+from ipi.utils.prng import Random
+from ipi_tests.profiling.benchtools import print_table
+
+
+class Motion(dobject):
+
+    """A minimal motion object, that only holds the time step."""
+
+    def __init__(self, dt):
+        dd(self).dt = depend_value(name="dt", value=dt)
+
+
+def loop_thermos(thermo, nm):
+    """Builds the original set of thermostats, one for each normal mode."""
+
+    thermos = []
+    for b in range(nm.nbeads):
+        if isinstance(thermo, ThermoNMGLE):
+            t = ThermoGLE(temp=thermo.temp, dt=thermo.dt, A=thermo.A[b])
+            t.s = thermo.s[b].copy()
+        else:
+            tau = thermo.tau if b == 0 else thermo.tauk[b - 1]
+            t = ThermoLangevin(temp=thermo.temp, dt=thermo.dt, tau=tau)
+        t.bind(pm=(nm.pnm[b, :], nm.dynm3[b, :]), prng=thermo.prng)
+        thermos.append(t)
+    return thermos
+
+
+def bench(nbeads, natoms, mode, ns, nsteps):
+    """Returns the time per step of the stacked and of the looped
+    thermostats."""
+
+    prng = np.random.RandomState(12345)
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = np.ones(natoms) * 1837.0
+
+    nm = NormalModes(transform_method="fft")
+    nm.bind(Ensemble(temp=1e-3), Motion(40.0), beads)
+
+    if mode == "nm_gle":
+        A = np.identity(ns + 1) * 1e-3 + np.diag(np.ones(ns) * 1e-3, 1)
+        A = A + A.T
+        thermo = ThermoNMGLE(temp=1e-3, dt=20.0, A=np.array([A] * nbeads))
+    else:
+        thermo = ThermoPILE_L(temp=1e-3, dt=20.0, tau=100.0)
+    thermo.bind(nm=nm, prng=Random(seed=12345))
+    thermos = loop_thermos(thermo, nm)
+
+    def loop_step():
+        nm.pnm.hold()
+        for t in thermos:
+            t.step()
+        nm.pnm.resume()
+
+    times = []
+    for step in [thermo.step, loop_step]:
+        step()
+        dstrip(nm.pnm)
+        tstart = time.time()
+        for i in range(nsteps):
+            step()
+        times.append((time.time() - tstart) / nsteps)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nbeads", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--mode", default="nm_gle", choices=["pile_l", "nm_gle"])
+    parser.add_argument(
+        "--ns", type=int, default=4, help="Number of auxiliary momenta (nm_gle)."
+    )
+    parser.add_argument("--nsteps", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for nbeads in args.nbeads:
+        for natoms in args.natoms:
+            tvec, tloop = bench(nbeads, natoms, args.mode, args.ns, args.nsteps)
+            rows.append(
+                [nbeads, natoms, "%.3e" % tvec, "%.3e" % tloop, "%.1f" % (tloop / tvec)]
+            )
+    print_table(["nbeads", "natoms", "t stacked [s]", "t loop [s]", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Measures the throughput of the xyz and pdb trajectory writers.
+
+Writes all the beads of a random ring polymer with print_xyz_path, and each
+bead with print_xyz and print_pdb (as the trajectory outputs do), to a file in
+a temporary folder, and compares the speed in MB/s with a writer that applies
+the same template line by line. The original implementation of the path
+writers, that copied the positions once for every atom, is too slow to be
+timed at this size. Run as
+
+    python -m ipi_tests.profiling.bench_writers --natoms 100000 --nbeads 64
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.utils.depend import dstrip
+from ipi.utils.io.backends.io_xyz import print_xyz_path, print_xyz
+from ipi.utils.io.backends.io_pdb import print_pdb
+from ipi_tests.profiling.benchtools import print_table
+
+
+def loop_xyz_path(beads, cell, filedesc):
+    """Writes the beads one line at a time."""
+
+    qs = dstrip(beads.q)
+    lab = dstrip(beads.names)
+    for j in range(beads.nbeads):
+        filedesc.write("%d\n# bead: %d\n" % (beads.natoms, j))
+        for i in range(beads.natoms):
+            filedesc.write(
+                "%8s %12.5e %12.5e %12.5e\n"
+                % (lab[i], qs[j][3 * i], qs[j][3 * i + 1], qs[j][3 * i + 2])
+            )
+
+
+def each_bead(writer):
+    """Calls a single-frame writer on every bead."""
+
+    def write(beads, cell, filedesc):
+        for j in range(beads.nbeads):
+            writer(beads[j], cell, filedesc)
+
+    return write
+
+
+def throughput(writer, beads, cell, path):
+    """Returns the size of the output in MB and the write speed in MB/s."""
+
+    tstart = time.time()
+    with open(path, "w") as f:
+        writer(beads, cell, f)
+    elapsed = time.time() - tstart
+    size = os.path.getsize(path) / 1e6
+    os.unlink(path)
+    return size, size / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--natoms", type=int, default=100000)
+    parser.add_argument("--nbeads", type=int, default=64)
+    parser.add_argument(
+        "--noloop", action="store_true", help="Skip the line-by-line writer."
+    )
+    args = parser.parse_args()
+
+    prng = np.random.RandomState(12345)
+    beads = Beads(args.natoms, args.nbeads)
+    beads.q = prng.uniform(-50.0, 50.0, size=(args.nbeads, 3 * args.natoms))
+    beads.names = np.array(["O", "H", "H"] * args.natoms)[: args.natoms]
+    cell = Cell(np.diag([100.0, 100.0, 100.0]))
+
+    writers = [
+        ("xyz path", print_xyz_path),
+        ("xyz", each_bead(print_xyz)),
+        ("pdb", each_bead(print_pdb)),
+    ]
+    if not args.noloop:
+        writers.append(("xyz path, line by line", loop_xyz_path))
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ipi_bench_") as tmpdir:
+        path = os.path.join(tmpdir, "traj")
+        for name, writer in writers:
+            size, speed = throughput(writer, beads, cell, path)
+            rows.append([name, "%.1f" % size, "%.1f" % speed])
+    print_table(["writer", "size [MB]", "speed [MB/s]"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Helpers shared by the profiling scripts.
+
+Every script in this folder builds a small i-PI input on the fly, runs it in
+a temporary folder (possibly together with a number of driver processes) and
+reports the timings. Nothing here is run by pytest: these are meant to be
+launched by hand, e.g.  python -m ipi_tests.profiling.bench_polling -h
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import subprocess as sp
+from pathlib import Path
+
+import numpy as np
+
+
+__all__ = [
+    "random_xyz",
+    "simulation_xml",
+    "run_ipi",
+    "step_timings",
+    "print_table",
+    "unique_address",
+]
+
+
+ipi_root = Path(__file__).resolve().parents[2]
+call_ipi = [str(ipi_root / "bin" / "i-pi")]
+call_driver = [str(ipi_root / "bin" / "i-pi-driver")]
+call_pydriver = [sys.executable, "-m", "ipi.clients.driver"]
+
+
+def random_xyz(natoms, density=0.02, seed=12345):
+    """Returns the text of an xyz file containing a random configuration of
+    natoms atoms in a cubic box, with the given number density (in
+    atoms/angstrom^3)."""
+
+    box = (natoms / density) ** (1.0 / 3.0)
+    q = np.random.RandomState(seed).uniform(0, box, size=(natoms, 3))
+    lines = [
+        "%d" % natoms,
+        "# CELL(abcABC): %12.5f %12.5f %12.5f  90.0 90.0 90.0 positions{angstrom}"
+        % (box, box, box),
+    ]
+    lines += ["Ar %15.8f %15.8f %15.8f" % tuple(x) for x in q]
+    return "\n".join(lines) + "\n"
+
+
+def simulation_xml(
+    ffxml,
+    nbeads=1,
+    nsteps=100,
+    init="init.xyz",
+    dynamics="nve",
+    verbosity="high",
+    outputs="",
+):
+    """Returns the text of a minimal input file, running nsteps of dynamics
+    with the forcefield given by the xml fragment ffxml (whose name must be
+    'bench'), and without any output apart from a checkpoint at the end and
+    the (optional) xml fragment outputs."""
+
+    if dynamics == "nve":
+        thermo = ""
+    else:
+        thermo = (
+            "<thermostat mode='%s'><tau units='femtosecond'> 100 </tau></thermostat>"
+            % dynamics
+        )
+        dynamics = "nvt"
+
+    return """<simulation verbosity='%s'>
+  <output prefix='bench'>
+    <checkpoint stride='%d'/>
+    %s
+  </output>
+  <total_steps> %d </total_steps>
+  <prng><seed> 32345 </seed></prng>
+  %s
+  <system>
+    <initialize nbeads='%d'>
+      <file mode='xyz'> %s </file>
+      <velocities mode='thermal' units='kelvin'> 100 </velocities>
+    </initialize>
+    <forces><force forcefield='bench'> </force></forces>
+    <motion mode='dynamics'>
+      <dynamics mode='%s'>
+        <timestep units='femtosecond'> 1.0 </timestep>
+        %s
+      </dynamics>
+    </motion>
+    <ensemble><temperature units='kelvin'> 100 </temperature></ensemble>
+  </system>
+</simulation>
+""" % (
+        verbosity,
+        nsteps,
+        outputs,
+        nsteps,
+        ffxml,
+        nbeads,
+        init,
+        dynamics,
+        thermo,
+    )
+
+
+def run_ipi(inputxml, files=None, drivers=None, timeout=3600, keep=False):
+    """Runs i-PI on the given input text in a temporary folder.
+
+    Args:
+        inputxml: The text of the input file.
+        files: A dictionary {filename: text} of additional files to create.
+        drivers: A list of commands (lists of strings) to launch once i-PI
+            has started, e.g. [call_driver + ["-u", "-h", "bench", "-m", "dummy"]].
+            They are run with this copy of i-PI in the PYTHONPATH, so that
+            call_pydriver can be used as well.
+        timeout: Number of seconds after which the run is killed.
+        keep: If True, the temporary folder is not removed.
+
+    Returns:
+        The standard output of i-PI, as a string.
+    """
+
+    tmpdir = Path(tempfile.mkdtemp(prefix="ipi_bench_"))
+    try:
+        with open(tmpdir / "input.xml", "w") as f:
+            f.write(inputxml)
+        for name, text in (files or {}).items():
+            with open(tmpdir / name, "w") as f:
+                f.write(text)
+
+        with open(tmpdir / "ipi.log", "w") as log:
+            ipi = sp.Popen(
+                call_ipi + ["input.xml"], cwd=tmpdir, stdout=log, stderr=sp.STDOUT
+            )
+            time.sleep(2.0)  # gives i-PI some time to open the socket
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(
+                [str(ipi_root)] + [p for p in [env.get("PYTHONPATH")] if p]
+            )
+            clients = [
+                sp.Popen(d, cwd=tmpdir, env=env, stdout=sp.DEVNULL, stderr=sp.DEVNULL)
+                for d in drivers or []
+            ]
+            try:
+                ipi.wait(timeout)
+            finally:
+                for c in clients:
+                    if c.poll() is None:
+                        c.kill()
+                if ipi.poll() is None:
+                    ipi.kill()
+
+        with open(tmpdir / "ipi.log") as f:
+            return f.read()
+    finally:
+        if keep:
+            print("Run files kept in ", tmpdir)
+        else:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def step_timings(log, skip=2):
+    """Extracts the per-step timings printed by a simulation run at high
+    verbosity, discarding the first skip steps (that include start-up costs)."""
+
+    t = [
+        float(m)
+        for m in re.findall(
+            r"# Average timings at MD step\s+\d+\. t/step:\s+(\S+)", log
+        )
+    ]
+    if len(t) <= skip:
+        raise RuntimeError("Could not find enough step timings in the i-PI output")
+    return np.asarray(t[skip:])
+
+
+def print_table(header, rows):
+    """Prints a simple aligned table."""
+
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    fmt = "  ".join("%" + str(w) + "s" for w in widths)
+    print(fmt % tuple(header))
+    for r in rows:
+        print(fmt % tuple(r))
+
+
+def unique_address(tag):
+    """Returns a unix socket address that is unlikely to clash with other runs."""
+
+    return "%s_%d" % (tag, os.getpid())
@@ -0,0 +1,72 @@
+"""Runs the python driver from the command line against the socket
+interface."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import sys
+import time
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+from ipi.interfaces.sockets import InterfaceSocket
+from ipi.engine.forcefields import ForceRequest
+
+
+def test_harm3d():
+    """Evaluates a few configurations with the harm3d potential, and checks
+    the results and the timing summary."""
+
+    address = "test_driver_%d" % os.getpid()
+    iface = InterfaceSocket(address=address, mode="unix", timeout=10.0)
+    iface.open()
+
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parents[3]))
+    driver = subprocess.Popen(
+        [sys.executable, "-m", "ipi.clients.driver"]
+        + ["-u", "-h", address, "-m", "harm3d", "-o", "0.5", "-v"],
+        env=env,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    pos = np.random.RandomState(1).uniform(size=(4, 30))
+    requests = [
+        ForceRequest(
+            {
+                "id": i,
+                "pos": pos[i],
+                "active": slice(None),
+                "cell": (np.eye(3), np.eye(3)),
+                "pars": " ",
+                "result": None,
+                "status": "Queued",
+                "start": -1,
+                "t_queued": time.time(),
+                "t_dispatched": 0,
+                "t_finished": 0,
+            }
+        )
+        for i in range(len(pos))
+    ]
+    iface.requests = requests
+    try:
+        tstart = time.time()
+        while not all(r["status"] == "Done" for r in requests):
+            iface.poll()
+            iface.wait(1e-3)
+            assert time.time() - tstart < 30, "Requests were not completed in time"
+    finally:
+        iface.close()
+        output = driver.communicate(timeout=10)[0]
+
+    for i, r in enumerate(requests):
+        np.testing.assert_allclose(r["result"][0], 0.25 * (pos[i] ** 2).sum())
+        np.testing.assert_allclose(r["result"][1], -0.5 * pos[i])
+    assert output.count(" CLIENT - rid") == len(requests)
+    assert "Evaluated %d configurations" % len(requests) in output
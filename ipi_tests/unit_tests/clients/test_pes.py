@@ -0,0 +1,67 @@
+"""Tests the potentials of the python driver against finite differences."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import pytest
+import numpy as np
+
+from ipi.clients.pes import potentials
+
+
+cell = np.array([[14.0, 1.0, 0.5], [0.0, 13.0, 0.7], [0.0, 0.0, 15.0]])
+
+
+@pytest.mark.parametrize(
+    "name,params",
+    [
+        ("harm", [0.3]),
+        ("harm3d", [0.3]),
+        ("morse", [2.0, 0.1, 1.2]),
+        ("lj", [2.0, 0.01, 5.0]),
+    ],
+)
+def test_forces(name, params):
+    """Checks that the forces are the derivatives of the energy."""
+
+    pes = potentials[name](*params)
+    pos = np.random.RandomState(3).uniform(0, 14, size=(40, 3))
+    pot, force, vir, extra = pes(cell, pos)
+    assert force.shape == pos.shape
+
+    delta = 1e-5
+    for a in range(0, len(pos), 7):
+        for k in range(3):
+            dpos = np.zeros(pos.shape)
+            dpos[a, k] = delta
+            dv = pes(cell, pos + dpos)[0] - pes(cell, pos - dpos)[0]
+            assert force[a, k] == pytest.approx(-dv / (2 * delta), rel=1e-6, abs=1e-6)
+
+
+def test_lj_virial():
+    """Checks the pair part of the LJ virial against the derivative of the
+    energy with respect to a strain, with a cell large enough to make the
+    long-range correction negligible."""
+
+    pes = potentials["lj"](2.0, 0.01, 5.0)
+    pos = np.random.RandomState(4).uniform(0, 14, size=(40, 3))
+    bigcell = cell * 1e3
+    pos *= 1e3 ** (1.0 / 3.0)
+
+    vir = pes(bigcell, pos)[2]
+    delta = 1e-6
+    for a in range(3):
+        for b in range(3):
+            strain = np.eye(3)
+            strain[a, b] += delta
+            vp = pes(np.dot(strain, bigcell), np.dot(pos, strain.T))[0]
+            strain[a, b] -= 2 * delta
+            vm = pes(np.dot(strain, bigcell), np.dot(pos, strain.T))[0]
+            assert vir[a, b] == pytest.approx(-(vp - vm) / (2 * delta), abs=1e-6)
+
+
+def test_wrong_params():
+    with pytest.raises(ValueError):
+        potentials["lj"](1.0, 2.0)
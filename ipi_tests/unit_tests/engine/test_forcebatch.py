@@ -0,0 +1,103 @@
+"""Tests the evaluation of batches of independent configurations."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+
+import numpy as np
+import numpy.testing as npt
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import FFDebye
+from ipi.engine.forces import Forces, ForceComponent, ForceBatch
+from ipi.utils.hesstools import get_hessian
+
+
+natoms = 4
+prng = np.random.RandomState(12345)
+a = prng.normal(size=(3 * natoms, 3 * natoms))
+H = np.dot(a, a.T)
+xref = prng.normal(size=3 * natoms)
+
+
+def make_forces(nbeads, rpc_nbeads=0):
+    """Returns a harmonic system with nbeads replicas, whose forces may be
+    computed on a contracted ring polymer with rpc_nbeads beads."""
+
+    beads = Beads(natoms, nbeads)
+    beads.q = xref + prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = np.ones(natoms)
+    beads.names = ["H"] * natoms
+    cell = Cell(np.eye(3) * 100.0)
+    ff = FFDebye(H=H, xref=xref)
+    fcomp = ForceComponent("debye", nbeads=rpc_nbeads, mts_weights=[1.0])
+    forces = Forces()
+    forces.bind(beads, cell, [fcomp], {"debye": ff}, [])
+    return beads, cell, forces
+
+
+def test_evaluate():
+    # the batch must not contract the configurations, even if the system does
+    beads, cell, forces = make_forces(4, rpc_nbeads=1)
+    batch = ForceBatch(forces, beads, cell, size=3)
+
+    qs = xref + prng.normal(size=(7, 3 * natoms))
+    pots, f = batch.evaluate(qs)
+    d = qs - xref
+    npt.assert_allclose(f, -np.dot(d, H))
+    npt.assert_allclose(pots, 0.5 * (d * np.dot(d, H)).sum(axis=1))
+
+    # the positions of the system are left untouched
+    q = beads.q.copy()
+    batch.evaluate(qs[:2])
+    npt.assert_array_equal(beads.q, q)
+
+
+def test_fd_derivatives():
+    beads, cell, forces = make_forces(1)
+    batch = ForceBatch(forces, beads, cell, size=4)
+    devs = np.eye(3 * natoms)[:5] * 1e-3
+    df = batch.fd_derivatives(beads.q[0], devs)
+    npt.assert_allclose(df / 1e-3, H[:5], atol=1e-8)
+
+
+def test_get_hessian(tmp_path):
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        nbeads = 2
+        beads, cell, forces = make_forces(nbeads)
+        x0 = beads.q.copy()
+        fixatoms = [1]
+        active = np.array([0, 1, 2, 6, 7, 8, 9, 10, 11])
+
+        def gm(x, new_disc=True):
+            d = np.asarray(x).reshape((nbeads, -1)) - xref
+            g = np.dot(d, H)
+            return (0.5 * (d * g).sum(), g[:, active])
+
+        href = np.hstack([H[active][:, active]] * nbeads)
+        for size in [2, 8]:
+            batch = ForceBatch(forces, beads, cell, size)
+            h = get_hessian(gm, x0, natoms, nbeads, fixatoms, batch=batch)
+            npt.assert_allclose(h, href, atol=1e-6)
+            assert not os.path.exists("hessian.tmp.npz")
+
+        # computes the hessian one row at a time through the mapper
+        h = get_hessian(gm, x0, natoms, nbeads, fixatoms)
+        npt.assert_allclose(h, href, atol=1e-6)
+
+        # restarts from the rows found in the temporary file
+        hpart = href.copy()
+        hpart[3:] = 0.0
+        hpart[:3] *= 2.0
+        np.savez("hessian.tmp.npz", h=hpart, rows=3)
+        h = get_hessian(gm, x0, natoms, nbeads, fixatoms, batch=batch)
+        npt.assert_allclose(h[:3], 2.0 * href[:3])
+        npt.assert_allclose(h[3:], href[3:], atol=1e-6)
+    finally:
+        os.chdir(cwd)
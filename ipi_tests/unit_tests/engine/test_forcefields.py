@@ -0,0 +1,204 @@
+"""Tests the internal python forcefields."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import pytest
+import numpy as np
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import FFLennardJones, FFDebye
+
+
+h = np.array([[14.0, 1.0, 0.5], [0.0, 13.0, 0.7], [0.0, 0.0, 15.0]])
+
+
+def lattice(seed, shift=0.0):
+    """Returns the positions of 64 atoms on a distorted lattice, that can be
+    displaced by shift lattice vectors."""
+
+    grid = np.array(np.meshgrid(*[np.arange(4)] * 3)).reshape((3, -1)).T
+    s = (grid + np.random.RandomState(seed).uniform(-0.2, 0.2, grid.shape)) / 4
+    return np.dot(s + shift, h.T)
+
+
+def lj(pos, h, pars, dopbc, reqid=0, ff=None):
+    """Returns potential, forces and virial computed by FFLennardJones."""
+
+    if ff is None:
+        ff = FFLennardJones(pars=pars, dopbc=dopbc)
+    atoms = Atoms(len(pos))
+    atoms.q = pos.flatten()
+    r = ff.queue(atoms, Cell(h), reqid=reqid)
+    assert r["status"] == "Done"
+    return r["result"][0], r["result"][1].reshape(pos.shape), r["result"][2]
+
+
+def test_no_cutoff():
+    """Compares the sum over all pairs, done in blocks, with a direct loop."""
+
+    pos = lattice(0)
+    v, f, vir = lj(pos, h, {"eps": 0.1, "sigma": 2.0}, False)
+
+    # each pair appears in exactly one block
+    blocks = list(FFLennardJones._all_pairs(pos[np.newaxis], chunk=100))
+    assert len(blocks) > 5
+    b, i, j, d = [np.concatenate(x) for x in zip(*blocks)]
+    assert (b == 0).all()
+    assert sorted(zip(j, i)) == list(zip(*np.triu_indices(len(pos), 1)))
+    np.testing.assert_allclose(d, pos[j] - pos[i])
+
+    vref, fref, virref = 0.0, np.zeros(pos.shape), np.zeros((3, 3))
+    for i in range(len(pos)):
+        for j in range(i):
+            d = pos[j] - pos[i]
+            x6 = (4.0 / np.dot(d, d)) ** 3
+            vref += 0.4 * (x6 ** 2 - x6)
+            fij = 2.4 * (2 * x6 ** 2 - x6) / np.dot(d, d) * d
+            fref[j] += fij
+            fref[i] -= fij
+            virref += np.outer(fij, d)
+    assert v == pytest.approx(vref)
+    np.testing.assert_allclose(f, fref, atol=1e-12)
+    np.testing.assert_allclose(vir, virref, atol=1e-12)
+
+
+def test_pbc():
+    """Checks forces and virial against finite differences, with periodic
+    boundary conditions and a cutoff."""
+
+    pars = {"eps": 0.1, "sigma": 2.0, "cutoff": 5.0}
+    pos = lattice(1, shift=np.random.RandomState(1).randint(-1, 2, size=(64, 3)))
+    v, f, vir = lj(pos, h, pars, True)
+
+    delta = 1e-5
+    for a in range(0, len(pos), 7):
+        for k in range(3):
+            dpos = np.zeros(pos.shape)
+            dpos[a, k] = delta
+            dv = lj(pos + dpos, h, pars, True)[0] - lj(pos - dpos, h, pars, True)[0]
+            assert f[a, k] == pytest.approx(-dv / (2 * delta), rel=1e-6, abs=1e-8)
+
+    # Cell expects upper-triangular matrices, and the virial is symmetric
+    np.testing.assert_allclose(vir, vir.T)
+    for a in range(3):
+        for b in range(a, 3):
+            strain = np.eye(3)
+            strain[a, b] += delta
+            vp = lj(np.dot(pos, strain.T), np.dot(strain, h), pars, True)[0]
+            strain[a, b] -= 2 * delta
+            vm = lj(np.dot(pos, strain.T), np.dot(strain, h), pars, True)[0]
+            assert vir[a, b] == pytest.approx(-(vp - vm) / (2 * delta), abs=1e-8)
+
+
+def test_cutoff():
+    """Checks that a cutoff longer than all distances only shifts the energy,
+    and that the neighbour lists are reused across steps."""
+
+    pos = lattice(2)
+    pars = {"eps": 0.1, "sigma": 2.0}
+    v, f, vir = lj(pos, h, pars, False)
+
+    pars["cutoff"] = 30.0
+    ff = FFLennardJones(pars=pars, dopbc=False)
+    vc, fc, virc = lj(pos, h, pars, False, ff=ff)
+    npairs = len(pos) * (len(pos) - 1) // 2
+    assert vc == pytest.approx(v - npairs * ff.vshift)
+    np.testing.assert_allclose(fc, f)
+    np.testing.assert_allclose(virc, vir)
+
+    for step in range(5):
+        pos += 0.01
+        lj(pos, h, pars, False, reqid=1, ff=ff)
+    assert ff.nlists[0].nbuild == 1
+    assert ff.nlists[1].nbuild == 1
+
+    with pytest.raises(ValueError):
+        FFLennardJones(pars={"eps": 0.1, "sigma": 2.0}, dopbc=True)
+
+
+@pytest.mark.parametrize("cutoff", [None, 5.0])
+def test_batch(cutoff):
+    """Checks that requests evaluated together give the same results as
+    requests evaluated one at a time."""
+
+    pars = {"eps": 0.1, "sigma": 2.0}
+    if cutoff is not None:
+        pars["cutoff"] = cutoff
+    dopbc = cutoff is not None
+    ff = FFLennardJones(pars=pars, dopbc=dopbc)
+
+    cell = Cell(h)
+    configs = [lattice(seed) for seed in range(4)]
+    requests = []
+    for b, pos in enumerate(configs):
+        atoms = Atoms(len(pos))
+        atoms.q = pos.flatten()
+        requests.append(ff.queue(atoms, cell, reqid=b, poll=False))
+    assert all(r["status"] == "Queued" for r in requests)
+
+    ff.poll()
+    for b, r in enumerate(requests):
+        assert r["status"] == "Done"
+        v, f, vir = lj(configs[b], h, pars, dopbc)
+        assert r["result"][0] == pytest.approx(v)
+        np.testing.assert_allclose(r["result"][1], f.flatten(), atol=1e-12)
+        np.testing.assert_allclose(r["result"][2], vir, atol=1e-12)
+
+
+def test_debye_batch():
+    """Checks the batched evaluation of the Debye crystal."""
+
+    prng = np.random.RandomState(3)
+    a = prng.normal(size=(12, 12))
+    H = np.dot(a, a.T)
+    xref = prng.normal(size=12)
+    ff = FFDebye(H=H, xref=xref, vref=0.5)
+
+    cell = Cell(h)
+    requests = []
+    for b in range(3):
+        atoms = Atoms(4)
+        atoms.q = prng.normal(size=12)
+        requests.append(ff.queue(atoms, cell, reqid=b, poll=False))
+    ff.poll()
+
+    for r in requests:
+        d = r["pos"] - xref
+        assert r["result"][0] == pytest.approx(0.5 + 0.5 * np.dot(d, np.dot(H, d)))
+        np.testing.assert_allclose(r["result"][1], -np.dot(H, d))
+
+
+def test_workers():
+    """Checks that worker processes give the same results as the evaluation
+    in the i-PI process, and keep their state across steps."""
+
+    pars = {"eps": 0.1, "sigma": 2.0, "cutoff": 5.0}
+    ff = FFLennardJones(pars=pars, dopbc=True, nworkers=2)
+    ff.start()
+    try:
+        cell = Cell(h)
+        for step in range(3):
+            configs = [lattice(seed) + 0.01 * step for seed in range(5)]
+            requests = []
+            for b, pos in enumerate(configs):
+                atoms = Atoms(len(pos))
+                atoms.q = pos.flatten()
+                requests.append(ff.queue(atoms, cell, reqid=b, poll=False))
+            ff.poll()
+            for b, r in enumerate(requests):
+                assert r["status"] == "Done"
+                v, f, vir = lj(configs[b], h, pars, True)
+                assert r["result"][0] == pytest.approx(v)
+                np.testing.assert_allclose(r["result"][1], f.flatten(), atol=1e-12)
+                np.testing.assert_allclose(r["result"][2], vir, atol=1e-12)
+                ff.release(r)
+
+        # the neighbour lists live in the workers
+        assert len(ff.nlists) == 0
+    finally:
+        ff.stop()
+    assert ff._workers is None
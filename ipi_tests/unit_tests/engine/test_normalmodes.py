@@ -0,0 +1,74 @@
+"""Tests the propagation of the free ring polymer in normal modes."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import pytest
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.ensembles import Ensemble
+from ipi.engine.normalmodes import NormalModes
+from ipi.utils.depend import dobject, dd, depend_value, dstrip
+
+
+class Motion(dobject):
+
+    """A minimal motion object, that only holds the time step."""
+
+    def __init__(self, dt):
+        dd(self).dt = depend_value(name="dt", value=dt)
+
+
+def reference_step(nm):
+    """Propagates the normal modes one mode and one open-path atom at a time,
+    as done by the original implementation."""
+
+    sm = dstrip(nm.beads.sm3)
+    prop_pq = dstrip(nm.prop_pq)
+    o_prop_pq = dstrip(nm.o_prop_pq)
+    pnm = dstrip(nm.pnm) / sm
+    qnm = dstrip(nm.qnm) * sm
+    pnm0, qnm0 = pnm.copy(), qnm.copy()
+
+    for k in range(1, nm.nbeads):
+        pq = np.dot(prop_pq[k], np.array([pnm[k], qnm[k]]))
+        pnm[k], qnm[k] = pq
+    for j in nm.open_paths:
+        for a in range(3 * j, 3 * (j + 1)):
+            for k in range(1, nm.nbeads):
+                pq = np.dot(o_prop_pq[k], [pnm0[k, a], qnm0[k, a]])
+                pnm[k, a], qnm[k, a] = pq
+
+    return qnm / sm, pnm * sm
+
+
+@pytest.mark.parametrize("propagator", ["exact", "cayley"])
+@pytest.mark.parametrize("open_paths", [[], [1, 3]])
+def test_free_qstep(propagator, open_paths):
+    """Compares the vectorised propagator with the original loops, and checks
+    that the bead positions follow the normal modes."""
+
+    nbeads, natoms = 8, 5
+    prng = np.random.RandomState(0)
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = prng.uniform(1.0, 5.0, natoms)
+
+    nm = NormalModes(
+        transform_method="matrix", propagator=propagator, open_paths=open_paths
+    )
+    nm.bind(Ensemble(temp=0.01), Motion(5.0), beads)
+
+    for step in range(3):
+        qref, pref = reference_step(nm)
+        nm.free_qstep()
+        np.testing.assert_allclose(dstrip(nm.qnm), qref, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(dstrip(nm.pnm), pref, rtol=1e-12, atol=1e-12)
+
+    np.testing.assert_allclose(
+        dstrip(beads.q), nm.transform.nm2b(dstrip(nm.qnm)), atol=1e-12
+    )
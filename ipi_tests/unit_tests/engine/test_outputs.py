@@ -0,0 +1,148 @@
+"""Tests the queue used to write the outputs asynchronously."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import threading
+import time
+
+import pytest
+
+from ipi.engine.outputs import OutputQueue, BaseOutput, CheckpointOutput
+from ipi.engine.simulation import Simulation
+import ipi.inputs.simulation as isimulation
+
+
+def test_order_and_flush():
+    q = OutputQueue(4)
+    written = []
+    for i in range(100):
+        q.put(lambda i=i: written.append(i))
+    q.flush()
+    assert written == list(range(100))
+    q.stop()
+
+
+def test_backpressure():
+    q = OutputQueue(2)
+    release = threading.Event()
+    q.put(release.wait)  # blocks the writer
+    q.put(lambda: None)
+    q.put(lambda: None)
+
+    start = time.time()
+    threading.Timer(0.5, release.set).start()
+    q.put(lambda: None)  # must wait for the writer to make room
+    assert time.time() - start > 0.3
+    q.stop()
+
+
+def test_error():
+    q = OutputQueue(2)
+
+    def fail():
+        raise IOError("disk full")
+
+    q.put(fail)
+    with pytest.raises(IOError):
+        q.flush()
+    q.flush()  # the error is only raised once
+    q.stop()
+
+
+def test_submit(tmp_path):
+    out = BaseOutput(str(tmp_path / "out"))
+    out.bind("w")
+    out.queue = OutputQueue(2)
+    for i in range(10):
+        out.submit(lambda i=i: out.write("%d\n" % i))
+    out.queue.stop()
+    out.close_stream()
+    with open(str(tmp_path / "out")) as f:
+        assert f.read() == "".join("%d\n" % i for i in range(10))
+
+
+def test_stop():
+    q = OutputQueue(2)
+    written = []
+    q.put(lambda: written.append(0))
+    q.stop()
+    assert written == [0]
+    assert not q._thread.is_alive()
+    q.put(lambda: written.append(1))  # executed directly once stopped
+    assert written == [0, 1]
+    q.stop()
+
+
+NPT_XML = """<simulation verbosity='quiet'>
+  <total_steps> 10 </total_steps>
+  <prng><seed> 12345 </seed></prng>
+  <fflj name='lj'><parameters> {eps: 0.1, sigma: 0.7, cutoff: 3.0} </parameters></fflj>
+  <system>
+    <beads natoms='2' nbeads='4'>
+      <q shape='(4, 6)'> [ 0, 0, 0, 2, 0, 0, 0, 0, 0, 2, 0, 0,
+                           0, 0, 0, 2, 0, 0, 0, 0, 0, 2, 0, 0 ] </q>
+      <p shape='(4, 6)'> [ 1, 0, 0, -1, 0, 0, 1, 0, 0, -1, 0, 0,
+                           1, 0, 0, -1, 0, 0, 1, 0, 0, -1, 0, 0 ] </p>
+      <m shape='(2)'> [ 1837.0, 1837.0 ] </m>
+      <names shape='(2)'> [ H, H ] </names>
+    </beads>
+    <cell shape='(3, 3)'> [ 20, 0, 0, 0, 20, 0, 0, 0, 20 ] </cell>
+    <forces><force forcefield='lj'> </force></forces>
+    <motion mode='dynamics'>
+      <dynamics mode='npt'>
+        <barostat mode='isotropic'>
+          <tau units='femtosecond'> 100 </tau>
+          <thermostat mode='langevin'><tau units='femtosecond'> 100 </tau></thermostat>
+        </barostat>
+        <thermostat mode='pile_l'><tau units='femtosecond'> 100 </tau></thermostat>
+        <timestep units='femtosecond'> 1.0 </timestep>
+      </dynamics>
+    </motion>
+    <ensemble>
+      <temperature units='kelvin'> 100 </temperature>
+      <pressure> 0 </pressure>
+    </ensemble>
+  </system>
+</simulation>
+"""
+
+
+def full_status(simul):
+    status = isimulation.InputSimulation()
+    status.store(simul)
+    return status.write(name="simulation")
+
+
+def test_checkpoint_store_state(tmp_path):
+    (tmp_path / "input.xml").write_text(NPT_XML)
+    simul = Simulation.load_from_xml(
+        str(tmp_path / "input.xml"), custom_verbosity="quiet", read_only=True
+    )
+    chk = CheckpointOutput(str(tmp_path / "RESTART"))
+    chk.bind(simul)
+
+    def evolve():
+        system = simul.syslist[0]
+        system.beads.q += 0.1
+        system.beads.p *= 2.0
+        system.cell.h = system.cell.h * 1.01
+        system.ensemble.time += 1.0
+        system.ensemble.eens += 0.5
+        system.motion.thermostat.step()
+        system.motion.barostat.p += 0.5
+        system.motion.barostat.thermostat.step()
+        simul.step += 1
+
+    evolve()
+    chk.store()
+    stored = full_status(simul)
+    assert chk.status.write(name="simulation") == stored
+
+    # the snapshot does not follow the simulation until the next store
+    evolve()
+    assert chk.status.write(name="simulation") == stored
+    chk.store()
+    assert chk.status.write(name="simulation") == full_status(simul)
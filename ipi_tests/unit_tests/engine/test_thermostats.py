@@ -0,0 +1,155 @@
+"""Tests the normal-mode thermostats that act on all the modes at once."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import pytest
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.ensembles import Ensemble
+from ipi.engine.normalmodes import NormalModes
+from ipi.engine.thermostats import (
+    ThermoLangevin,
+    ThermoGLE,
+    ThermoPILE_L,
+    ThermoPILE_G,
+    ThermoNMGLE,
+    ThermoNMGLEG,
+)
+from ipi.utils.depend import dobject, dd, depend_value, dstrip
+from ipi.utils.prng import Random
+
+
+nbeads, natoms = 6, 4
+
+
+class Motion(dobject):
+
+    """A minimal motion object, that only holds the time step."""
+
+    def __init__(self, dt):
+        dd(self).dt = depend_value(name="dt", value=dt)
+
+
+def make_nm():
+    prng = np.random.RandomState(0)
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = prng.uniform(1.0, 5.0, natoms)
+
+    nm = NormalModes(transform_method="matrix")
+    nm.bind(Ensemble(temp=0.01), Motion(5.0), beads)
+    return nm
+
+
+def make_A(ns):
+    prng = np.random.RandomState(1)
+    A = []
+    for b in range(nbeads):
+        a = prng.normal(size=(ns + 1, ns + 1)) * 1e-2
+        A.append(np.dot(a, a.T) + np.identity(ns + 1) * 1e-2)
+    return np.array(A)
+
+
+def test_pile_l():
+    """Compares the stacked PILE_L with one Langevin thermostat per mode."""
+
+    nm, nmref = make_nm(), make_nm()
+    thermo = ThermoPILE_L(temp=0.01, dt=5.0, tau=50.0, ethermo=1.0)
+    thermo.bind(nm=nm, prng=Random(seed=42))
+
+    prng = Random(seed=42)
+    thermos = []
+    for b in range(nbeads):
+        tau = thermo.tau if b == 0 else thermo.tauk[b - 1]
+        t = ThermoLangevin(temp=0.01, dt=5.0, tau=tau)
+        t.bind(pm=(nmref.pnm[b, :], nmref.dynm3[b, :]), prng=prng)
+        thermos.append(t)
+
+    for step in range(3):
+        thermo.step()
+        for t in thermos:
+            t.step()
+        np.testing.assert_allclose(dstrip(nm.pnm), dstrip(nmref.pnm), rtol=1e-12)
+    et = 1.0 + sum(t.ethermo for t in thermos)
+    assert thermo.ethermo == pytest.approx(et, rel=1e-12)
+
+
+def test_nm_gle():
+    """Compares the stacked NM-GLE with one GLE thermostat per mode."""
+
+    ns = 3
+    nm, nmref = make_nm(), make_nm()
+    thermo = ThermoNMGLE(temp=0.01, dt=5.0, A=make_A(ns), ethermo=1.0)
+    thermo.bind(nm=nm, prng=Random(seed=42))
+    assert thermo.s.shape == (nbeads, ns + 1, 3 * natoms)
+
+    prng = Random(seed=43)
+    thermos = []
+    for b in range(nbeads):
+        t = ThermoGLE(temp=0.01, dt=5.0, A=make_A(ns)[b])
+        t.s = thermo.s[b].copy()
+        t.bind(pm=(nmref.pnm[b, :], nmref.dynm3[b, :]), prng=prng)
+        thermos.append(t)
+    thermo.prng = Random(seed=43)
+
+    for step in range(3):
+        thermo.step()
+        for t in thermos:
+            t.step()
+        np.testing.assert_allclose(dstrip(nm.pnm), dstrip(nmref.pnm), rtol=1e-10)
+        for b in range(nbeads):
+            np.testing.assert_allclose(thermo.s[b], thermos[b].s, rtol=1e-10)
+    et = 1.0 + sum(t.ethermo for t in thermos)
+    assert thermo.ethermo == pytest.approx(et, rel=1e-10)
+
+
+@pytest.mark.parametrize(
+    "thermo",
+    [
+        ThermoPILE_G(temp=0.01, dt=5.0, tau=50.0),
+        ThermoNMGLEG(temp=0.01, dt=5.0, A=make_A(2), tau=50.0),
+    ],
+)
+def test_conserved(thermo):
+    """Checks that the energy exchanged with the bath, including the one of
+    the global centroid thermostat, balances the change in kinetic energy."""
+
+    nm = make_nm()
+    thermo.bind(nm=nm, prng=Random(seed=42))
+
+    kin = 0.5 * np.sum(dstrip(nm.pnm) ** 2 / dstrip(nm.dynm3))
+    for step in range(3):
+        thermo.step()
+    dkin = 0.5 * np.sum(dstrip(nm.pnm) ** 2 / dstrip(nm.dynm3)) - kin
+    assert thermo.ethermo == pytest.approx(-dkin, rel=1e-10)
+
+
+@pytest.mark.parametrize(
+    "thermo",
+    [
+        ThermoPILE_L(temp=0.01, dt=5.0, tau=50.0),
+        ThermoPILE_G(temp=0.01, dt=5.0, tau=50.0),
+        ThermoNMGLE(temp=0.01, dt=5.0, A=make_A(2)),
+        ThermoNMGLEG(temp=0.01, dt=5.0, A=make_A(2), tau=50.0),
+    ],
+)
+def test_bind_consistent(thermo):
+    """Checks that binding the thermostat leaves the normal-mode momenta in
+    sync with the bead momenta, so that the kinetic energy at step zero is
+    the one of the initial momenta."""
+
+    nm = make_nm()
+    p = dstrip(nm.beads.p).copy()
+    thermo.bind(nm=nm, prng=Random(seed=42))
+    np.testing.assert_allclose(dstrip(nm.beads.p), p, rtol=1e-12)
+    np.testing.assert_allclose(nm.transform.nm2b(dstrip(nm.pnm)), p, atol=1e-12)
+
+    thermo.step()
+    np.testing.assert_allclose(
+        nm.transform.nm2b(dstrip(nm.pnm)), dstrip(nm.beads.p), atol=1e-12
+    )
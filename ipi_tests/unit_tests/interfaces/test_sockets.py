@@ -0,0 +1,492 @@
+"""Tests the socket interface with a minimal python client."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import sys
+import json
+import socket
+import threading
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+import numpy as np
+
+from ipi.interfaces.sockets import (
+    InterfaceSocket,
+    Driver,
+    ClientStats,
+    Status,
+    Message,
+    HDRLEN,
+)
+from ipi.engine.forcefields import ForceRequest
+
+
+def recvall(sock, nbytes):
+    """Reads exactly nbytes from sock."""
+
+    buf = b""
+    while len(buf) < nbytes:
+        part = sock.recv(nbytes - len(buf))
+        if len(part) == 0:
+            raise EOFError
+        buf += part
+    return buf
+
+
+def harmonic_client(address, batch, nconfs, k=0.5, slowed=None):
+    """A client computing harmonic forces, that optionally declares it can
+    evaluate batches of configurations. Appends to nconfs the number of
+    configurations received with each message. If slowed is a list, the
+    first client that gets a configuration with a coordinate larger than 100
+    appends something to it, and takes 3 seconds to evaluate it."""
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    for i in range(100):
+        try:
+            sock.connect("/tmp/ipi_" + address)
+            break
+        except OSError:
+            time.sleep(0.05)
+    harmonic_serve(sock, batch, nconfs, k, slowed)
+
+
+def harmonic_serve(sock, batch, nconfs, k=0.5, slowed=None, barrier=None):
+    """Answers the messages received through a connected socket as described
+    in harmonic_client. If barrier is given, the client waits for it before
+    sending the forces."""
+
+    results = []
+    try:
+        while True:
+            header = recvall(sock, HDRLEN)
+            if header == Message("status"):
+                if len(results) > 0:
+                    sock.sendall(Message("havedata"))
+                elif batch:
+                    sock.sendall(Message("readybatch"))
+                else:
+                    sock.sendall(Message("ready"))
+            elif header in [Message("posdata"), Message("posdatabatch")]:
+                if header == Message("posdata"):
+                    nconf = 1
+                else:
+                    nconf = np.frombuffer(recvall(sock, 4), np.int32)[0]
+                nconfs.append(nconf)
+                for i in range(nconf):
+                    if header == Message("posdatabatch"):
+                        recvall(sock, 4)  # request id
+                    recvall(sock, 9 * 8 * 2)  # cell and inverse
+                    nat = np.frombuffer(recvall(sock, 4), np.int32)[0]
+                    q = np.frombuffer(recvall(sock, nat * 3 * 8), np.float64)
+                    results.append((nat, 0.5 * k * (q ** 2).sum(), -k * q))
+                    if slowed == [] and q.max() > 100:
+                        slowed.append(True)
+                        time.sleep(3)
+            elif header == Message("getforce"):
+                if barrier is not None:
+                    barrier.wait()
+                msg = [Message("forceready")]
+                for nat, v, f in results:
+                    msg += [
+                        np.float64(v).tobytes(),
+                        np.int32(nat).tobytes(),
+                        f.tobytes(),
+                        np.zeros(9).tobytes(),
+                        np.int32(0).tobytes(),
+                    ]
+                sock.sendall(b"".join(msg))
+                results = []
+            else:
+                break
+    except (EOFError, OSError):
+        pass
+    sock.close()
+
+
+def harmonic_requests(pos, active):
+    """Returns a list of requests, one for each row of pos."""
+
+    return [
+        ForceRequest(
+            {
+                "id": i,
+                "pos": pos[i],
+                "active": active,
+                "cell": (np.eye(3), np.eye(3)),
+                "pars": " ",
+                "result": None,
+                "status": "Queued",
+                "start": -1,
+                "t_queued": time.time(),
+                "t_dispatched": 0,
+                "t_finished": 0,
+            }
+        )
+        for i in range(len(pos))
+    ]
+
+
+def check_results(requests, pos, active):
+    """Checks the results computed by a harmonic client with k=0.5."""
+
+    for i, r in enumerate(requests):
+        q = np.zeros(pos[i].shape)
+        q[active] = pos[i][active]
+        assert r["result"][0] == pytest.approx(0.25 * (q ** 2).sum())
+        np.testing.assert_allclose(r["result"][1], -0.5 * q)
+        np.testing.assert_allclose(r["result"][2], np.zeros((3, 3)))
+
+
+@pytest.mark.parametrize("match_mode", ["auto", "cost"])
+@pytest.mark.parametrize("batch", [False, True])
+@pytest.mark.parametrize("active", [slice(None), np.arange(15)])
+def test_dispatch(batch, active, match_mode):
+    """Sends a set of requests to two clients, and checks the results."""
+
+    address = "test_sockets_%d_%d_%d_%s" % (
+        os.getpid(),
+        batch,
+        isinstance(active, slice),
+        match_mode,
+    )
+    iface = InterfaceSocket(
+        address=address, mode="unix", timeout=10.0, match_mode=match_mode
+    )
+    iface.open()
+
+    clients = []
+    nconfs = []
+    for i in range(2):
+        clients.append(
+            threading.Thread(target=harmonic_client, args=(address, batch, nconfs))
+        )
+        clients[-1].daemon = True
+        clients[-1].start()
+
+    pos = np.random.RandomState(1).uniform(size=(8, 15))
+    requests = harmonic_requests(pos, active)
+    iface.requests = requests
+
+    try:
+        tstart = time.time()
+        while not all(r["status"] == "Done" for r in requests):
+            iface.poll()
+            assert time.time() - tstart < 20, "Requests were not completed in time"
+        assert len(iface.clients) > 0
+        assert all(c.batch == batch for c in iface.clients)
+        assert sum(nconfs) == len(requests)
+        if batch:
+            assert max(nconfs) > 1
+        else:
+            assert max(nconfs) == 1
+    finally:
+        iface.close()
+
+    check_results(requests, pos, active)
+
+
+def start_clients(address, nclients, nconfs, slowed=None):
+    """Starts nclients harmonic clients, each on its own thread."""
+
+    for i in range(nclients):
+        client = threading.Thread(
+            target=harmonic_client,
+            args=(address, False, nconfs),
+            kwargs={"slowed": slowed},
+        )
+        client.daemon = True
+        client.start()
+
+
+def wait_done(iface, requests, timeout=20):
+    """Polls the interface until all the requests are done."""
+
+    tstart = time.time()
+    while not all(r["status"] == "Done" for r in requests):
+        iface.poll()
+        assert time.time() - tstart < timeout, "Requests were not completed in time"
+
+
+def test_telemetry(tmp_path):
+    """Checks the statistics of the clients, and the status file."""
+
+    address = "test_telemetry_%d" % os.getpid()
+    status_file = str(tmp_path / "status.json")
+    iface = InterfaceSocket(
+        address=address, mode="unix", timeout=10.0, status_file=status_file
+    )
+    iface.open()
+    start_clients(address, 2, [])
+
+    pos = np.random.RandomState(3).uniform(size=(8, 15))
+    requests = harmonic_requests(pos, slice(None))
+    iface.requests = requests
+    try:
+        wait_done(iface, requests)
+        telemetry = iface.telemetry()
+        assert telemetry["interface"]["completed"] == len(requests)
+        assert sum(c["completed"] for c in telemetry["clients"]) == len(requests)
+        # at least the positions and the forces of every request
+        assert telemetry["interface"]["bytes_sent"] > 8 * 15 * 8
+        assert telemetry["interface"]["bytes_recv"] > 8 * 15 * 8
+        latency = telemetry["interface"]["latency"]
+        assert 0 < latency["p50"] <= latency["p90"] <= latency["max"]
+        assert 0 <= telemetry["interface"]["idle"] <= 1
+    finally:
+        iface.close()
+
+    with open(status_file) as f:
+        assert json.load(f)["interface"]["completed"] == len(requests)
+
+
+def test_redispatch():
+    """Checks that a request that takes too long is sent to another client,
+    and that the result of the fastest one is used."""
+
+    address = "test_redispatch_%d" % os.getpid()
+    iface = InterfaceSocket(address=address, mode="unix", timeout=10.0, redispatch=5)
+    iface.open()
+    slowed = []
+    start_clients(address, 2, [], slowed)
+
+    # collects enough round-trip times to know what is normal
+    pos = np.random.RandomState(4).uniform(size=(12, 15))
+    requests = harmonic_requests(pos, slice(None))
+    iface.requests = requests
+    try:
+        wait_done(iface, requests)
+
+        pos = np.full((1, 15), 200.0)
+        requests = harmonic_requests(pos, slice(None))
+        iface.requests = requests
+        tstart = time.time()
+        wait_done(iface, requests)
+        assert time.time() - tstart < 2
+        assert slowed == [True]
+        assert len(iface.stragglers) == 1
+    finally:
+        iface.close()
+
+    check_results(requests, pos, slice(None))
+
+
+class SlowRequest(ForceRequest):
+    """A request whose result takes a while to be set by the thread of the
+    original client, so that the copy can be evaluated in the meantime."""
+
+    def __setitem__(self, key, value):
+        if key == "result" and threading.current_thread().name == "original":
+            time.sleep(0.05)
+        super(SlowRequest, self).__setitem__(key, value)
+
+
+def test_simultaneous_replies():
+    """Checks that when the original client and the one that got a copy of a
+    request reply at the same time, a single result is set, and it is not
+    changed once the request is done."""
+
+    pos = np.ones((1, 15))
+    for trial in range(10):
+        orig = SlowRequest(harmonic_requests(pos, slice(None))[0])
+        orig.update({"status": "Running", "start": time.time()})
+        rcopy = {
+            k: orig[k] for k in ["id", "pos", "active", "cell", "pars", "t_queued"]
+        }
+        rcopy.update(
+            {"result": None, "status": "Running", "start": -1, "copy_of": orig}
+        )
+        orig["copy"] = rcopy
+
+        # the two clients have different force constants, and only send
+        # the forces when both have been asked for them
+        barrier = threading.Barrier(2)
+        drivers = []
+        for k in [0.5, 1.0]:
+            a, b = socket.socketpair()
+            client = threading.Thread(
+                target=harmonic_serve,
+                args=(b, False, []),
+                kwargs=dict(k=k, barrier=barrier),
+            )
+            client.daemon = True
+            client.start()
+            drivers.append(Driver(a))
+            a.close()
+
+        iface = InterfaceSocket()
+        iface.jobs = {id(orig): [orig, drivers[0]], id(rcopy): [rcopy, drivers[1]]}
+        iface.stragglers = []
+
+        # the result seen by whoever is waiting for the request
+        seen = []
+        waiter = threading.Thread(
+            target=lambda: seen.append(orig.wait(10) and orig["result"])
+        )
+        waiter.start()
+
+        threads = [
+            threading.Thread(target=d.dispatch_batch, args=([r],), name=name)
+            for d, r, name in zip(drivers, [orig, rcopy], ["original", "copy"])
+        ]
+        for t in threads:
+            t.start()
+        # checks the jobs while the clients reply, as InterfaceSocket.pool_distribute
+        while any(t.is_alive() for t in threads) or len(iface.jobs) > 0:
+            for [r, c] in list(iface.jobs.values()):
+                if id(r) in iface.jobs:
+                    iface.check_job_finished(r, c)
+        waiter.join()
+        for d in drivers:
+            d.close()
+
+        k = 0.5 if orig["claimed"] is orig else 1.0
+        assert orig["status"] == "Done"
+        assert seen[0] is orig["result"]
+        np.testing.assert_allclose(orig["result"][1], -k * pos[0])
+        assert rcopy["status"] == "Done"
+        assert (rcopy["result"] is None) == (k == 0.5)
+
+
+class FakeClient(object):
+    """A client that takes a given time per atom, and just keeps the lists
+    of requests that are submitted to it."""
+
+    def __init__(self, tperatom, lastreq=None):
+        self.stats = ClientStats()
+        self.stats.tperatom = tperatom
+        self.status = Status.Up | Status.Ready
+        self.batch = False
+        self.lastreq = lastreq
+        self.locked = False
+        self.peername = "fake"
+        self.submitted = []
+
+    def submit(self, rlist):
+        self.submitted.append([r["id"] for r in rlist])
+
+
+def cost_interface(clients, natoms):
+    """Returns an interface in cost mode, that has not been opened, with the
+    given clients and requests with the given numbers of atoms."""
+
+    iface = InterfaceSocket(match_mode="cost")
+    iface.clients = clients
+    iface.jobs = {}
+    iface.stragglers = []
+    iface.stats = ClientStats()
+    iface.requests = [
+        harmonic_requests(np.zeros((1, 3 * n)), slice(None))[0] for n in natoms
+    ]
+    for i, r in enumerate(iface.requests):
+        r["id"] = i
+    return iface
+
+
+def test_cost_scheduler():
+    """Checks that the most expensive request goes to the fastest client."""
+
+    fast, slow = FakeClient(1e-3), FakeClient(1e-2)
+    iface = cost_interface([slow, fast], [10, 100])
+    freec = [slow, fast]
+    assert iface.scheduler.distribute(iface, freec) == 2
+    assert freec == []
+    assert fast.submitted == [[1]] and slow.submitted == [[0]]
+
+
+def test_cost_scheduler_hold():
+    """Checks that a request waits for a busy client that will be done well
+    before a slow free client would be."""
+
+    fast, slow = FakeClient(1e-3), FakeClient(1e-2)
+    iface = cost_interface([slow, fast], [10, 10])
+    running = iface.requests[0]
+    running["status"] = "Running"
+    running["start"] = time.time()
+    iface.jobs[id(running)] = [running, fast]
+    assert iface.scheduler.distribute(iface, [slow]) == 0
+    assert slow.submitted == []
+
+    # unless it has nothing to do with it
+    fast.stats.tperatom = 1.0
+    assert iface.scheduler.distribute(iface, [slow]) == 1
+    assert slow.submitted == [[1]]
+
+
+def test_cost_scheduler_affinity():
+    """Checks that a replica stays on the same client, unless it is much
+    slower than the others."""
+
+    clients = [FakeClient(1e-3), FakeClient(1.2e-3, lastreq=0)]
+    iface = cost_interface(clients, [10])
+    iface.scheduler.distribute(iface, clients[:])
+    assert clients[1].submitted == [[0]]
+
+    clients = [FakeClient(1e-3), FakeClient(2e-3, lastreq=0)]
+    iface = cost_interface(clients, [10])
+    iface.scheduler.distribute(iface, clients[:])
+    assert clients[0].submitted == [[0]]
+
+
+CLIENT = """
+import sys
+import numpy as np
+from ipi.clients.client import Client
+
+def harmonic(cell, pos):
+    return 0.25 * (pos ** 2).sum(), -0.5 * pos, np.zeros((3, 3)), ""
+
+Client(sys.argv[1], mode=sys.argv[2], batch=sys.argv[3] == "1").run(harmonic)
+"""
+
+
+@pytest.mark.parametrize(
+    "mode,batch,active",
+    [
+        ("unix", False, slice(None)),
+        ("unix", True, slice(None)),
+        ("shm", False, slice(None)),
+        ("shm", False, np.arange(9)),
+    ],
+)
+def test_client(mode, batch, active):
+    """Runs two instances of the python reference client, and checks the
+    results and that the segments are removed when closing the interface."""
+
+    address = "test_client_%d_%s_%d" % (os.getpid(), mode, batch)
+    iface = InterfaceSocket(address=address, mode=mode, timeout=10.0)
+    iface.open()
+
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parents[3]))
+    clients = [
+        subprocess.Popen(
+            [sys.executable, "-c", CLIENT, address, mode, str(int(batch))], env=env
+        )
+        for i in range(2)
+    ]
+
+    pos = np.random.RandomState(2).uniform(size=(8, 15))
+    requests = harmonic_requests(pos, active)
+    iface.requests = requests
+
+    try:
+        tstart = time.time()
+        while not all(r["status"] == "Done" for r in requests):
+            iface.poll()
+            assert time.time() - tstart < 30, "Requests were not completed in time"
+        segments = [c.shm.name for c in iface.clients if mode == "shm" and c.shm]
+        assert all(c.batch == batch for c in iface.clients)
+    finally:
+        iface.close()
+        for c in clients:
+            c.wait(10)
+
+    for name in segments:
+        assert not os.path.exists("/dev/shm/" + name)
+    check_results(requests, pos, active)
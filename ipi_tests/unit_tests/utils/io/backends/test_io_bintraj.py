@@ -0,0 +1,115 @@
+"""Tests the binary trajectory backend."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, print_file_path, iter_file_name
+from ipi.utils.io.backends.io_bintraj import BinaryTrajectory, read_bintraj
+
+
+natoms, nframes = 5, 4
+prng = np.random.RandomState(12345)
+names = ["O", "H", "H", "Cl", "Na"]
+frames = prng.normal(size=(nframes, 3 * natoms)) * 10.0
+cells = [np.diag([10.0 + i, 11.0, 12.0]) for i in range(nframes)]
+
+
+def write(filename, mode):
+    with open(filename, "w") as f:
+        for i in range(nframes):
+            atoms = Atoms(natoms)
+            atoms.names[:] = names
+            atoms.q[:] = frames[i]
+            print_file(mode, atoms, Cell(cells[i]), f, title="Step: %d " % i)
+
+
+@pytest.mark.parametrize("mode, precision", [("bintraj", 1e-14), ("bintraj32", 1e-6)])
+def test_roundtrip(tmp_path, mode, precision):
+    filename = str(tmp_path / ("traj." + mode))
+    write(filename, mode)
+
+    read = list(iter_file_name(filename))
+    assert len(read) == nframes
+    for i, frame in enumerate(read):
+        npt.assert_allclose(frame["atoms"].q, frames[i], rtol=precision)
+        npt.assert_allclose(frame["cell"].h, cells[i])
+        assert list(frame["atoms"].names) == names
+
+
+def test_random_access(tmp_path):
+    filename = str(tmp_path / "traj.bintraj")
+    write(filename, "bintraj")
+
+    traj = BinaryTrajectory(filename)
+    assert len(traj) == nframes
+    assert traj.names == names
+    npt.assert_array_equal(traj.data[::2], frames[::2])
+    npt.assert_array_equal(traj.cells[3], cells[3])
+    assert traj.title(2).startswith("Step: 2 ")
+    assert np.all(np.diff(traj.offsets) == traj.frames.dtype.itemsize)
+
+    # a partially written frame is ignored
+    with open(filename, "ab") as f:
+        f.write(b"\0" * 100)
+    assert len(BinaryTrajectory(filename)) == nframes
+    with open(filename, "rb") as f:
+        for i in range(nframes):
+            read_bintraj(f)
+        with pytest.raises(EOFError):
+            read_bintraj(f)
+
+
+def test_append(tmp_path):
+    filename = str(tmp_path / "traj.bintraj")
+    write(filename, "bintraj")
+    atoms = Atoms(natoms + 1)
+    with open(filename, "a") as f:
+        print_file("bintraj", Atoms(natoms), Cell(cells[0]), f)
+        with pytest.raises(ValueError):
+            print_file("bintraj", atoms, Cell(cells[0]), f)
+    assert len(BinaryTrajectory(filename)) == nframes + 1
+
+
+def test_append_truncated(tmp_path):
+    """Appends after a frame that has only been partially written, e.g.
+    because the run was killed, and checks that the new frames are aligned."""
+
+    filename = str(tmp_path / "traj.bintraj")
+    write(filename, "bintraj")
+    with open(filename, "ab") as f:
+        f.write(b"\0" * 100)
+    atoms = Atoms(natoms)
+    atoms.names[:] = names
+    atoms.q[:] = frames[1]
+    with open(filename, "a") as f:
+        print_file("bintraj", atoms, Cell(cells[2]), f, title="Step: 9 ")
+
+    traj = BinaryTrajectory(filename)
+    assert len(traj) == nframes + 1
+    assert traj.title(nframes).startswith("Step: 9 ")
+    npt.assert_array_equal(traj.data[nframes], frames[1])
+    npt.assert_array_equal(traj.cells[nframes], cells[2])
+    read = list(iter_file_name(filename))
+    assert len(read) == nframes + 1
+    npt.assert_array_equal(read[-1]["atoms"].q, frames[1])
+
+
+def test_path(tmp_path):
+    filename = str(tmp_path / "path.bintraj")
+    beads = Beads(natoms, nframes)
+    beads.q = frames
+    beads.names = names
+    with open(filename, "w") as f:
+        print_file_path("bintraj", beads, Cell(cells[0]), f)
+    traj = BinaryTrajectory(filename)
+    npt.assert_array_equal(traj.data, frames)
+    assert traj.title(1) == "Bead: 1"
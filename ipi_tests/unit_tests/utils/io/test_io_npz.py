@@ -0,0 +1,100 @@
+"""Tests the binary checkpoint format."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from ipi.engine.beads import Beads
+from ipi.inputs.beads import InputBeads
+from ipi.utils.inputvalue import Input, InputArray
+from ipi.utils.io.inputs.io_npz import (
+    xml_write_npz,
+    xml_parse_npz,
+    xml_parse_checkpoint,
+)
+
+
+natoms, nbeads = 50, 4
+prng = np.random.RandomState(12345)
+
+
+def make_beads():
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms))
+    beads.m = prng.uniform(1.0, 2.0, size=natoms)
+    beads.names = ["Ar"] * natoms
+    return beads
+
+
+def test_roundtrip(tmp_path):
+    beads = make_beads()
+    ibeads = InputBeads()
+    ibeads.store(beads)
+    filename = str(tmp_path / "beads.npz")
+    with open(filename, "wb") as f:
+        xml_write_npz(ibeads, f, name="beads")
+
+    # the arrays are back in text mode after writing
+    assert ibeads.q.mode.fetch() == "manual"
+    xml = ibeads.write(name="beads")
+    assert "npz" not in xml
+
+    with np.load(filename) as archive:
+        assert "mode='npz'" in str(archive["xml"])
+        assert "beads.q" in archive.files
+
+    rbeads = InputBeads()
+    rbeads.parse(xml_parse_checkpoint(filename).fields[0][1])
+    rbeads = rbeads.fetch()
+    npt.assert_array_equal(rbeads.q, beads.q)  # no loss of precision
+    npt.assert_array_equal(rbeads.p, beads.p)
+    npt.assert_array_equal(rbeads.m, beads.m)
+    assert list(rbeads.names) == list(beads.names)
+
+
+class InputPair(Input):
+    fields = {
+        "h": (InputArray, {"dtype": float, "default": np.zeros(3)}),
+        "h0": (InputArray, {"dtype": float, "default": np.zeros(3)}),
+    }
+
+
+def test_small_arrays(tmp_path):
+    # small float arrays are written in binary form, unless they are not
+    # written at all because they have their default value
+    ipair = InputPair()
+    ipair.h.store(np.array([1.0 / 3.0, 2.0, 3.0]))
+    filename = str(tmp_path / "pair.npz")
+    with open(filename, "wb") as f:
+        xml_write_npz(ipair, f, name="pair")
+    with np.load(filename) as archive:
+        assert sorted(archive.files) == ["pair.h", "xml"]
+        assert "h0" not in str(archive["xml"])
+
+    rpair = InputPair()
+    rpair.parse(xml_parse_npz(filename).fields[0][1])
+    npt.assert_array_equal(rpair.h.fetch(), [1.0 / 3.0, 2.0, 3.0])
+
+
+def test_xml(tmp_path):
+    beads = make_beads()
+    ibeads = InputBeads()
+    ibeads.store(beads)
+    filename = str(tmp_path / "beads.xml")
+    with open(filename, "w") as f:
+        f.write(ibeads.write(name="beads"))
+    rbeads = InputBeads()
+    rbeads.parse(xml_parse_checkpoint(filename).fields[0][1])
+    npt.assert_allclose(rbeads.fetch().q, beads.q, rtol=1e-7)
+
+    # the npz mode can only be used in a binary checkpoint
+    with open(filename, "w") as f:
+        f.write("<beads><q mode='npz' shape='(4, 150)'> beads.q </q></beads>")
+    with pytest.raises(ValueError):
+        InputBeads().parse(xml_parse_checkpoint(filename).fields[0][1])
@@ -0,0 +1,119 @@
+"""Tests that the vectorised text writers print the same bytes as the
+% operator applied line by line."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import io
+
+import numpy as np
+import pytest
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.utils.io.textformat import format_columns
+from ipi.utils.io.backends.io_xyz import print_xyz_path, print_xyz
+from ipi.utils.io.backends.io_pdb import print_pdb_path, print_pdb
+
+
+prng = np.random.RandomState(12345)
+values = np.concatenate(
+    [
+        prng.normal(size=2000) * 10.0 ** prng.randint(-20, 20, size=2000),
+        prng.randint(-4000, 4000, size=2000) / 16.0,  # exact ties
+        prng.randint(-(10 ** 6), 10 ** 6, size=2000) * 1e-3,
+        [0.0, -0.0, np.nan, np.inf, -np.inf, 1e100, -1e-100, 9.999995, 0.5],
+        [2.5, 1e99, 99999.5, -99999.9999, 1e15, -123456789.0, 5e-324],
+    ]
+)
+n = len(values)
+labels = np.array(["H", "Ar", "Cl", "LONGNAME", "X"] * n)[:n]
+integers = prng.randint(-(10 ** 6), 10 ** 7, size=n)
+
+
+def reference(fmt, columns):
+    """Applies the template line by line."""
+
+    cols = [c if np.ndim(c) > 0 else [c] * n for c in columns]
+    return "".join(fmt % tuple(c[i] for c in cols) for i in range(n))
+
+
+@pytest.mark.parametrize(
+    "fmt, columns",
+    [
+        ("%8s %12.5e %12.5e %12.5e\n", [labels, values, values[::-1], -values]),
+        ("%5i %4s%1s%8.3f%6.2f%2i\n", [integers, labels, " ", values, 0.0, 0]),
+        ("%3.0f|%1.0e|%6.2f|%2d\n", [values, values, values[::-1], integers]),
+        ("%-8s %+12.5e %9.4E\n", [labels, values, values]),
+    ],
+)
+def test_format_columns(fmt, columns):
+    assert format_columns(fmt, columns) == reference(fmt, columns)
+
+
+def make_beads(natoms, nbeads):
+    beads = Beads(natoms, nbeads)
+    beads.q = prng.normal(size=(nbeads, 3 * natoms)) * 10.0
+    beads.q[0, :3] = [0.0, -0.0, 2.5]
+    beads.names = labels[:natoms]
+    cell = Cell(np.diag([10.0, 11.0, 12.0]))
+    return beads, cell
+
+
+def test_xyz():
+    natoms, nbeads = 17, 3
+    beads, cell = make_beads(natoms, nbeads)
+    header = "%d\n# bead: %d CELL(abcABC):   10.00000    11.00000    12.00000 "
+    header += "   90.00000    90.00000    90.00000 \n"
+    frames = [
+        "".join(
+            "%8s %12.5e %12.5e %12.5e\n"
+            % ((beads.names[i],) + tuple(beads.q[j, 3 * i : 3 * i + 3]))
+            for i in range(natoms)
+        )
+        for j in range(nbeads)
+    ]
+    out = io.StringIO()
+    print_xyz_path(beads, cell, out)
+    assert out.getvalue() == "".join(
+        header % (natoms, j) + frames[j] for j in range(nbeads)
+    )
+
+    out = io.StringIO()
+    print_xyz(beads[1], cell, out)
+    assert out.getvalue().split("\n", 2)[2] == frames[1]
+
+
+def test_pdb():
+    natoms, nbeads = 7, 4
+    beads, cell = make_beads(natoms, nbeads)
+    fmt_atom = "ATOM  %5i %4s%1s%3s %1s%4i%1s  %8.3f%8.3f%8.3f%6.2f%6.2f"
+    fmt_atom += "          %2s%2i\n"
+    atoms = [
+        fmt_atom
+        % (
+            (j * natoms + i + 1, beads.names[i], " ", "  1", " ", 1, " ")
+            + tuple(beads.q[j, 3 * i : 3 * i + 3])
+            + (0.0, 0.0, "  ", 0)
+        )
+        for j in range(nbeads)
+        for i in range(natoms)
+    ]
+    conect = [
+        "CONECT%5i%5i\n" % (i + 1, (nbeads - 1) * natoms + i + 1) for i in range(natoms)
+    ] + [
+        "CONECT%5i%5i\n" % (j * natoms + i + 1, (j + 1) * natoms + i + 1)
+        for j in range(nbeads - 1)
+        for i in range(natoms)
+    ]
+    out = io.StringIO()
+    print_pdb_path(beads, cell, out)
+    lines = out.getvalue().splitlines(True)
+    assert lines[1:] == atoms + conect + ["END\n"]
+
+    out = io.StringIO()
+    print_pdb(beads[0], cell, out)
+    lines = out.getvalue().splitlines(True)
+    assert lines[1:] == [l[:28] + " " + l[28:] for l in atoms[:natoms]] + ["END\n"]
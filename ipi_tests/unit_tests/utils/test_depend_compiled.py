@@ -0,0 +1,142 @@
+"""Tests the compiled mode of the dependency graph."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import ipi.utils.depend as dp
+from ipi.utils.depend import dd, dobject, depend_value, depend_array
+
+
+class Graph(dobject):
+    """A position in two synchronized units, and a few quantities that are
+    computed from it, counting how many times they are computed."""
+
+    def __init__(self):
+        self.ncalls = 0
+        dself = dd(self)
+        sync = dp.synchronizer()
+        dself.x = depend_array(
+            name="x",
+            value=np.zeros((2, 3)),
+            synchro=sync,
+            func={"y": self.get_x},
+        )
+        dself.y = depend_array(
+            name="y",
+            value=np.zeros((2, 3)),
+            synchro=sync,
+            func={"x": self.get_y},
+        )
+        dself.scale = depend_value(name="scale", value=2.0)
+        dself.z = depend_array(
+            name="z",
+            value=np.zeros((2, 3)),
+            func=self.get_z,
+            dependencies=[dself.x, dself.scale],
+        )
+        dself.norm = depend_value(
+            name="norm", func=self.get_norm, dependencies=[dself.z]
+        )
+
+    def get_x(self):
+        return self.y / 10.0
+
+    def get_y(self):
+        return self.x * 10.0
+
+    def get_z(self):
+        self.ncalls += 1
+        return self.x * self.scale
+
+    def get_norm(self):
+        return np.sqrt((self.z ** 2).sum())
+
+
+@pytest.fixture(params=[True, False], ids=["threadsafe", "nolock"])
+def compiled(request):
+    dp.dcompile(threadsafe=request.param)
+    yield
+    dp.ddynamic()
+
+
+def run(g):
+    """Changes the values in several ways, and returns what is read back."""
+
+    out = []
+    g.x = np.arange(6.0).reshape((2, 3))
+    out += [g.norm, g.y.copy()]
+    g.y[1] = 1.0
+    out += [g.norm, g.x.copy()]
+    g.scale = 3.0
+    out += [g.norm, g.z[0].copy(), g.z[1, 2]]
+    dd(g).x.taint(taintme=False)
+    out += [g.z.copy(), g.ncalls]
+    return out
+
+
+def test_same_results(compiled):
+    results = run(Graph())
+    dp.ddynamic()
+    reference = run(Graph())
+    for r, ref in zip(results, reference):
+        npt.assert_array_equal(r, ref)
+
+
+def test_views(compiled):
+    g = Graph()
+    g.x = np.ones((2, 3))
+
+    # the views are cached, and stay in sync with the parent
+    v = g.z[0]
+    assert isinstance(v, depend_array)
+    assert g.z[0] is v
+    assert g.z[:, 1:] is g.z[:, 1:]
+    g.x[0] = 3.0
+    npt.assert_array_equal(g.z[0], 6.0)
+    npt.assert_array_equal(v, 6.0)
+
+    # the view of another row, or of a modified array, is a new one
+    assert g.z[1] is not v
+    dp.dcopy(depend_array(name="z", value=np.zeros((2, 3))), dd(g).z)
+    assert g.z[0] is not v
+
+
+def test_new_dependency(compiled):
+    g = Graph()
+    g.x = np.ones((2, 3))
+    g.norm
+    dd(g).w = depend_value(
+        name="w", func=lambda: g.norm + 1.0, dependencies=[dd(g).norm]
+    )
+    w = g.w
+    g.scale = 1.0
+    assert g.w != w
+    npt.assert_allclose(g.w, np.sqrt(6.0) + 1.0)
+
+
+def test_hold(compiled):
+    g = Graph()
+    g.x = np.ones((2, 3))
+    z = g.z.copy()
+    dd(g).z.hold()
+    g.x = np.zeros((2, 3))
+    npt.assert_array_equal(g.z, z)
+    dd(g).z.resume()
+    npt.assert_array_equal(g.z, 0.0)
+
+
+def test_ddynamic():
+    methods = dict(dp.depend_array.__dict__)
+    dp.dcompile(threadsafe=False)
+    dp.dcompile(threadsafe=True)
+    assert dp.depend_array.__dict__["__setitem__"] is methods["__setitem__"]
+    assert dp.depend_array.__dict__["__getitem__"] is not methods["__getitem__"]
+    dp.ddynamic()
+    for name in ["__getitem__", "__setitem__", "__get__"]:
+        assert dp.depend_array.__dict__[name] is methods[name]
@@ -0,0 +1,103 @@
+"""Tests the profiler of the depend objects."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+
+import numpy as np
+import pytest
+
+import ipi.utils.depend as dp
+from ipi.utils.depend import dd, dobject, depend_value, depend_array
+
+
+class Chain(dobject):
+    """A position, and two quantities computed from it one after the other."""
+
+    def __init__(self):
+        dself = dd(self)
+        dself.x = depend_array(name="x", value=np.zeros(3))
+        dself.y = depend_array(
+            name="y", value=np.zeros(3), func=self.get_y, dependencies=[dself.x]
+        )
+        dself.z = depend_value(name="z", func=self.get_z, dependencies=[dself.y])
+
+    def get_y(self):
+        return self.x * 2.0
+
+    def get_z(self):
+        return self.y.sum()
+
+
+@pytest.fixture(params=["dynamic", "compiled"])
+def profile(request):
+    if request.param == "compiled":
+        dp.dcompile()
+    dp.dprofile(True)
+    yield
+    dp.dprofile(False)
+    dp.ddynamic()
+
+
+def run(c, nsteps):
+    for i in range(nsteps):
+        c.x = np.ones(3) * i
+        c.z
+        c.x[0] = 1.0
+        dp.dprofile_step()
+
+
+def test_stats(profile):
+    c = Chain()
+    dp.dprofile(True)  # leaves out the taints done while building the graph
+    run(c, 4)
+    stats = dp.dprofile_stats()
+    assert stats["nsteps"] == 4
+    nodes = {n["label"]: n for n in stats["nodes"]}
+    assert sorted(nodes) == ["Chain.y", "Chain.z", "x"]
+    assert nodes["Chain.y"]["recomputes"] == 4
+    assert nodes["Chain.z"]["recomputes"] == 4
+    assert nodes["Chain.z"]["time"] >= nodes["Chain.y"]["time"]
+    assert nodes["Chain.z"]["self_time"] <= nodes["Chain.z"]["time"]
+
+    # setting x taints y and z, unless they have not been recomputed since
+    # the last time it was set
+    assert nodes["x"]["taints"] == 8
+    assert nodes["x"]["tainted"] == 4 * 2
+
+    ids = {n["label"]: n["id"] for n in stats["nodes"]}
+    assert [ids["x"], ids["Chain.y"]] in stats["edges"]
+    assert [ids["Chain.y"], ids["Chain.z"]] in stats["edges"]
+
+    # the statistics are cleared when the profiler is restarted
+    dp.dprofile(True)
+    run(c, 1)
+    assert dp.dprofile_stats()["nsteps"] == 1
+
+
+def test_stop():
+    dp.dprofile(True)
+    dp.dprofile(False)
+    assert dp.depend_base.__dict__["taint"] is dp._profile["installed"]
+    c = Chain()
+    run(c, 2)
+    assert dp.dprofile_stats()["nodes"] == []
+
+
+def test_write(profile, tmp_path):
+    c = Chain()
+    run(c, 2)
+    filename = str(tmp_path / "profile.json")
+    dp.dprofile_write(filename)
+    with open(filename) as f:
+        assert json.load(f)["nsteps"] == 2
+
+    filename = str(tmp_path / "profile.dot")
+    dp.dprofile_write(filename)
+    with open(filename) as f:
+        dot = f.read()
+    assert dot.startswith("digraph")
+    assert "Chain.y\\n1 recomputes/step" in dot
@@ -0,0 +1,79 @@
+"""Tests the evaluation of the spring potential and forces of bosons."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+
+from ipi.utils import units
+from ipi.utils.exchange import (
+    Evaluate_VB,
+    Evaluate_dVB,
+    exchange_vspring_and_fspring,
+)
+
+
+def reference(q, m, omegaP_sq, temp, bosons):
+    """Computes potential and forces with the original implementation."""
+
+    P, natoms = q.shape[:2]
+    nm = SimpleNamespace(
+        beads=SimpleNamespace(q=q.reshape((P, -1)), m=m, nbeads=P),
+        bosons=bosons,
+        nbeads=P,
+        omegan2=omegaP_sq,
+        ensemble=SimpleNamespace(temp=temp),
+    )
+    E_k_N, V = Evaluate_VB(nm)
+    F = np.zeros((P, len(bosons), 3))
+    for ind in range(len(bosons)):
+        for j in range(P):
+            F[j, ind] = Evaluate_dVB(nm, E_k_N, V, ind, j)
+    return V[-1], F
+
+
+@pytest.mark.parametrize("nbeads", [1, 2, 5])
+@pytest.mark.parametrize("nbosons", [1, 2, 6])
+@pytest.mark.parametrize("temp", [1e-4, 1e-2])
+def test_exchange(nbeads, nbosons, temp):
+    """Compares the quadratic scaling algorithm with the original one."""
+
+    prng = np.random.RandomState(nbeads * 10 + nbosons)
+    natoms = nbosons + 2
+    bosons = np.arange(1, nbosons + 1)
+    m = np.full(natoms, 1837.0)
+    omegaP_sq = (nbeads * units.Constants.kb * temp) ** 2
+    # the original implementation overflows if the springs are much
+    # stiffer than kB T, so the positions are scaled by the thermal length
+    q = prng.normal(size=(nbeads, natoms, 3))
+    q /= np.sqrt(m[0] * nbeads * units.Constants.kb * temp)
+
+    vref, fref = reference(q, m, omegaP_sq, temp, bosons)
+    betaP = 1.0 / (nbeads * units.Constants.kb * temp)
+    v, f = exchange_vspring_and_fspring(q[:, bosons], m[1], omegaP_sq, betaP)
+
+    assert v == pytest.approx(vref, rel=1e-10)
+    np.testing.assert_allclose(f, fref, rtol=1e-8, atol=1e-12 * np.abs(fref).max())
+
+
+def test_forces():
+    """Checks the forces against finite differences of the potential, for
+    a number of bosons that the original implementation cannot handle."""
+
+    prng = np.random.RandomState(1)
+    q = prng.normal(size=(8, 40, 3))
+    betaP = 2.0
+    v, f = exchange_vspring_and_fspring(q, 1.0, 1.0, betaP)
+
+    delta = 1e-6
+    for j, l, a in [(0, 0, 0), (3, 17, 1), (7, 39, 2), (7, 5, 0)]:
+        dq = np.zeros(q.shape)
+        dq[j, l, a] = delta
+        vp = exchange_vspring_and_fspring(q + dq, 1.0, 1.0, betaP)[0]
+        vm = exchange_vspring_and_fspring(q - dq, 1.0, 1.0, betaP)[0]
+        assert f[j, l, a] == pytest.approx(-(vp - vm) / (2 * delta), rel=1e-5)
@@ -0,0 +1,55 @@
+"""Tests the storage of arrays in the input classes."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import numpy.testing as npt
+
+from ipi.utils.inputvalue import InputArray
+from ipi.utils.units import unit_to_user
+
+
+def test_store_reuses_buffer():
+    iarray = InputArray(dtype=float, dimension="length")
+    q = np.arange(12.0).reshape(4, 3)
+    iarray.store(q)
+    buffer = iarray.value
+
+    q += 1.0
+    npt.assert_array_equal(iarray.fetch(), q - 1.0)  # the data are copied
+
+    iarray.store(q)
+    assert iarray.value is buffer
+    npt.assert_array_equal(iarray.fetch(), q)
+    assert iarray.shape.fetch() == (4, 3)
+
+    # the fetched array must not share the buffer
+    iarray.fetch()[:] = 0.0
+    npt.assert_array_equal(iarray.value, q.flatten())
+
+
+def test_store_reallocates():
+    iarray = InputArray(dtype=float, dimension="length")
+    iarray.store(np.zeros(3))
+    buffer = iarray.value
+    iarray.store(np.ones(6))
+    assert iarray.value is not buffer
+    assert iarray.shape.fetch() == (6,)
+
+    iarray.store(np.ones(6), units="angstrom")
+    npt.assert_allclose(iarray.value, unit_to_user("length", "angstrom", 1.0))
+
+    inames = InputArray(dtype=str)
+    inames.store(np.array(["H", "O"]))
+    inames.store(np.array(["Na", "Cl"]))
+    assert list(inames.fetch()) == ["Na", "Cl"]
+
+
+def test_default_not_overwritten():
+    default = np.zeros(3)
+    iarray = InputArray(dtype=float, default=default)
+    iarray.store(np.ones(3))
+    npt.assert_array_equal(default, np.zeros(3))
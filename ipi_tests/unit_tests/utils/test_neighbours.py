@@ -0,0 +1,97 @@
+"""Tests the search of neighbouring pairs against a brute-force loop."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import itertools
+
+import pytest
+import numpy as np
+
+from ipi.utils.neighbours import neighbour_pairs, NeighbourList
+
+
+def brute_force(pos, h, rc):
+    """Returns the sorted distances of all pairs (and images) within rc."""
+
+    s = np.dot(pos, np.linalg.inv(h).T)
+    pos = np.dot(s - np.floor(s), h.T)
+    dist = []
+    for t in itertools.product(range(-2, 3), repeat=3):
+        d = pos[np.newaxis, :, :] - pos[:, np.newaxis, :] + np.dot(h, t)
+        r = np.sqrt((d ** 2).sum(axis=2))
+        if t == (0, 0, 0):
+            r = r[np.triu_indices(len(pos), 1)]
+        elif t > (0, 0, 0):
+            r = r.flatten()
+        else:
+            continue
+        dist += list(r[r < rc])
+    return np.sort(dist)
+
+
+@pytest.mark.parametrize(
+    "h,rc,natoms",
+    [
+        # linked cells, orthorhombic and triclinic
+        (np.diag([12.0, 13.0, 14.0]), 3.9, 80),
+        (np.array([[10.0, 2.0, 1.0], [0.0, 9.0, 1.5], [0.0, 0.0, 11.0]]), 3.0, 60),
+        # dilute system, with fewer cells than allowed by the cutoff
+        (np.diag([200.0, 210.0, 220.0]), 5.0, 30),
+        # small box, explicit loop over images
+        (np.array([[5.0, 1.0, 0.5], [0.0, 5.0, 0.3], [0.0, 0.0, 6.0]]), 3.5, 20),
+    ],
+)
+def test_pairs(h, rc, natoms):
+    """Compares the pairs found with brute force, for atoms outside the box."""
+
+    ih = np.linalg.inv(h)
+    pos = np.random.RandomState(0).uniform(-10, 20, size=(natoms, 3))
+    i, j, d = neighbour_pairs(pos, h, ih, rc)
+
+    # separations must connect i to an image of j
+    s = np.dot(pos[i] + d - pos[j], ih.T)
+    assert np.allclose(s, np.round(s))
+    np.testing.assert_allclose(
+        np.sort(np.sqrt((d ** 2).sum(axis=1))), brute_force(pos, h, rc)
+    )
+
+
+@pytest.mark.parametrize("periodic", [True, False])
+def test_verlet(periodic):
+    """Checks that a Verlet list follows the atoms as they move, are wrapped
+    in the box and the cell is deformed, and that it is not rebuilt at each
+    step."""
+
+    prng = np.random.RandomState(1)
+    h = np.array([[14.0, 1.0, 0.5], [0.0, 13.0, 1.0], [0.0, 0.0, 15.0]])
+    pos = prng.uniform(0, 14, size=(100, 3))
+    nlist = NeighbourList(3.0, skin=1.0)
+
+    nsteps = 40
+    for step in range(nsteps):
+        pos += prng.normal(scale=0.05, size=pos.shape)
+        if periodic:
+            h[0, 1] += 0.01
+            ih = np.linalg.inv(h)
+            s = np.dot(pos, ih.T)
+            pos = np.dot(s - np.floor(s), h.T)
+            i, j, d = nlist.pairs(pos, h, ih)
+            np.testing.assert_allclose(
+                np.sort(np.sqrt((d ** 2).sum(axis=1))), brute_force(pos, h, 3.0)
+            )
+            # separations must connect i to an image of j
+            s = np.dot(pos[i] + d - pos[j], ih.T)
+            assert np.allclose(s, np.round(s))
+        else:
+            i, j, d = nlist.pairs(pos, None, None)
+            ref = np.sqrt(((pos[:, np.newaxis] - pos) ** 2).sum(axis=2))
+            ref = ref[np.triu_indices(len(pos), 1)]
+            np.testing.assert_allclose(
+                np.sort(np.sqrt((d ** 2).sum(axis=1))), np.sort(ref[ref < 3.0])
+            )
+            np.testing.assert_allclose(d, pos[j] - pos[i])
+
+    assert 1 < nlist.nbuild < nsteps
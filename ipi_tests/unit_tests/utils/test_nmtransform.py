@@ -0,0 +1,44 @@
+"""Tests the normal mode transformations."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import pytest
+import numpy as np
+
+from ipi.utils import nmtransform
+
+
+@pytest.mark.parametrize("nbeads", [1, 2, 3, 4, 5, 8, 13, 32])
+@pytest.mark.parametrize("open_paths", [[], [0, 3]])
+@pytest.mark.parametrize("method", [nmtransform.nm_fft, nmtransform.nm_rfft])
+def test_fft(method, nbeads, open_paths):
+    """Checks the FFT transformations against the matrix multiplication,
+    to double precision."""
+
+    natoms = 5
+    q = np.random.RandomState(nbeads).normal(size=(nbeads, 3 * natoms)) * 1e3
+    ref = nmtransform.nm_trans(nbeads, open_paths=open_paths)
+    fft = method(nbeads, natoms, open_paths=open_paths)
+
+    qnm = ref.b2nm(q)
+    np.testing.assert_allclose(fft.b2nm(q), qnm, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(fft.nm2b(qnm), q, rtol=0, atol=1e-9)
+
+
+def test_rfft_buffers():
+    """Checks that nm_rfft reuses its output arrays and leaves its input
+    untouched."""
+
+    fft = nmtransform.nm_rfft(6, 4)
+    q = np.random.RandomState(0).normal(size=(6, 12))
+    q0 = q.copy()
+
+    qnm = fft.b2nm(q)
+    assert fft.b2nm(q * 2) is qnm
+    qnm = qnm.copy()
+    assert fft.nm2b(qnm) is fft.nm2b(qnm)
+    np.testing.assert_array_equal(q, q0)
+    np.testing.assert_allclose(fft.nm2b(qnm), 2 * q)
@@ -0,0 +1,79 @@
+"""Tests the vectorised tensor kernels against explicit loops."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+
+from ipi.utils.tensortools import (
+    kinetic_stress,
+    atom_kinetic,
+    centroid_virial_tensor,
+    gyration,
+    tensor_upper,
+)
+
+
+nbeads, natoms = 4, 6
+prng = np.random.RandomState(12345)
+q = prng.normal(size=(nbeads, 3 * natoms))
+p = prng.normal(size=(nbeads, 3 * natoms))
+f = prng.normal(size=(nbeads, 3 * natoms))
+m3 = np.repeat(prng.uniform(1.0, 5.0, natoms), 3)
+qc = q.mean(axis=0)
+
+
+def test_kinetic_stress():
+    w = prng.uniform(0.5, 2.0, nbeads)
+    ref = np.zeros((3, 3))
+    for b in range(nbeads):
+        for i in range(3):
+            for j in range(3):
+                ref[i, j] += w[b] * np.dot(p[b, i::3], p[b, j::3] / m3[i::3])
+    np.testing.assert_allclose(kinetic_stress(p, m3, w), ref, rtol=1e-12)
+    np.testing.assert_allclose(
+        kinetic_stress(p, m3), kinetic_stress(p, m3, np.ones(nbeads)), rtol=1e-12
+    )
+
+
+def test_atom_kinetic():
+    ref = np.zeros((nbeads, natoms))
+    for b in range(nbeads):
+        for a in range(natoms):
+            ref[b, a] = 0.5 * np.dot(p[b, 3 * a : 3 * a + 3], p[b, 3 * a : 3 * a + 3])
+            ref[b, a] /= m3[3 * a]
+    np.testing.assert_allclose(atom_kinetic(p, m3), ref, rtol=1e-12)
+    np.testing.assert_allclose(atom_kinetic(p[1], m3)[0], ref[1], rtol=1e-12)
+
+
+def test_centroid_virial_tensor():
+    ref = np.zeros((natoms, 3, 3))
+    for a in range(natoms):
+        for b in range(nbeads):
+            dq = q[b, 3 * a : 3 * a + 3] - qc[3 * a : 3 * a + 3]
+            fa = f[b, 3 * a : 3 * a + 3]
+            ref[a] += np.outer(dq, fa) + np.outer(fa, dq)
+    ref *= -0.25 / nbeads
+    np.testing.assert_allclose(centroid_virial_tensor(q, qc, f), ref, rtol=1e-12)
+
+    # the trace gives back the centroid-virial kinetic energy
+    kcv = -0.5 * np.dot((q - qc).flatten(), f.flatten()) / nbeads
+    np.testing.assert_allclose(
+        tensor_upper(centroid_virial_tensor(q, qc, f))[:, 0:3].sum(), kcv
+    )
+
+
+def test_gyration():
+    ref = np.zeros((natoms, 3))
+    for a in range(natoms):
+        for b in range(nbeads):
+            ref[a] += (q[b, 3 * a : 3 * a + 3] - qc[3 * a : 3 * a + 3]) ** 2
+    np.testing.assert_allclose(gyration(q, qc), ref / nbeads, rtol=1e-12)
+
+
+def test_tensor_upper():
+    t = np.arange(9.0).reshape((3, 3))
+    np.testing.assert_array_equal(tensor_upper(t), [0, 4, 8, 1, 2, 5])
+    np.testing.assert_array_equal(tensor_upper([t, t]), [[0, 4, 8, 1, 2, 5]] * 2)
@@ -0,0 +1,77 @@
+"""Tests the registry of the time spent in the phases of a step."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+import time
+
+import pytest
+
+from ipi.utils.timing import Timings
+
+
+@pytest.fixture
+def t():
+    return Timings()
+
+
+def test_nested(t):
+    with t.section("outer"):
+        time.sleep(0.02)
+        with t.section("inner"):
+            time.sleep(0.05)
+    assert t.calls == {"outer": 1, "inner": 1}
+    assert t.total["inner"] >= 0.05
+    # the time of the inner section is not counted in the outer one
+    assert 0.02 <= t.total["outer"] < 0.05
+
+
+def test_timed(t):
+    @t.timed("f")
+    def f(x):
+        if x < 0:
+            raise ValueError()
+        return 2 * x
+
+    assert f(2) == 4
+    with pytest.raises(ValueError):
+        f(-1)
+    assert t.calls["f"] == 2
+    assert t._stack() == []
+
+
+def test_step(t):
+    t.step()
+    t.add("forces", 1.0)
+    t.add("forces", 0.5)
+    assert t.last == {}
+    t.step()
+    assert t.nsteps == 1
+    assert t.last["forces"] == 1.5
+    assert t.last["step"] > 0.0
+    t.add("output", 0.25)
+    t.step()
+    assert "forces" not in t.last
+    summary = t.summary()
+    assert summary["nsteps"] == 2
+    assert summary["sections"]["forces"] == {
+        "total": 1.5,
+        "calls": 2,
+        "per_step": 0.75,
+    }
+    assert summary["sections"]["step"]["calls"] == 2
+
+
+def test_write_json(t, tmp_path):
+    t.step()
+    t.add("thermostat", 0.1)
+    t.step()
+    filename = str(tmp_path / "timings.json")
+    t.write_json(filename)
+    with open(filename) as f:
+        assert json.load(f)["sections"]["thermostat"]["calls"] == 1
+    t.reset()
+    assert t.summary() == {"nsteps": 0, "sections": {}}